@@ -47,6 +47,20 @@ ROOT_HELPER_OPTS = [
                       "in the hypervisor of XenServer, this item should be "
                       "set to 'xenapi_root_helper', so that it will keep a "
                       "XenAPI session to pass commands to Dom0.")),
+    cfg.IntOpt('root_helper_daemon_pool_size', default=1, min=1,
+               help=_("Number of root helper daemons to run commands with, "
+                      "when root_helper_daemon is set. Up to this number of "
+                      "commands are run concurrently, the others wait for a "
+                      "daemon to be free. This also limits how many commands "
+                      "are run concurrently when deleting conntrack "
+                      "entries.")),
+    cfg.StrOpt('ip_lib_backend', default='ip', choices=['ip', 'netlink'],
+               help=_("How ip_lib manages links, addresses, routes and "
+                      "network namespaces. 'ip' runs the ip command for "
+                      "each operation and parses its output. 'netlink' "
+                      "talks rtnetlink from the privsep helper instead, "
+                      "and sends batched changes with a single netlink "
+                      "socket per namespace.")),
 ]
 
 AGENT_STATE_OPTS = [
@@ -76,6 +90,19 @@ IPTABLES_OPTS = [
                        "of iptables-save. This option should not be turned "
                        "on for production systems because it imposes a "
                        "performance penalty.")),
+    cfg.BoolOpt('iptables_incremental_apply', default=False,
+                help=_("Compute iptables changes from the in-memory copy of "
+                       "the rules committed by the previous apply instead of "
+                       "running iptables-save on every apply. The rules are "
+                       "re-read from the kernel only periodically (see "
+                       "iptables_drift_check_interval) and after a failed "
+                       "iptables-restore. Only enable this if nothing else "
+                       "modifies the tables managed by the agent.")),
+    cfg.IntOpt('iptables_drift_check_interval', default=300, min=0,
+               help=_("Interval (seconds) between two iptables-save runs "
+                      "used to detect rules changed outside of the agent "
+                      "when iptables_incremental_apply is enabled. Use 0 to "
+                      "only re-read the rules after a failed apply.")),
 ]
 
 PROCESS_MONITOR_OPTS = [
@@ -15,8 +15,10 @@
 #    under the License.
 
 import collections
+import contextlib
 import itertools
 import operator
+import threading
 import time
 import uuid
 
@@ -43,6 +45,9 @@ UINT64_BITMASK = (1 << 64) - 1
 INVALID_OFPORT = -1
 UNASSIGNED_OFPORT = []
 
+# ovs-ofctl flow_mod commands for the *-flows actions, used in bundles
+_BUNDLE_FLOW_MOD_COMMANDS = {'add': 'add', 'mod': 'modify', 'del': 'delete'}
+
 # OVS bridge fail modes
 FAILMODE_SECURE = 'secure'
 FAILMODE_STANDALONE = 'standalone'
@@ -202,6 +207,11 @@ class OVSBridge(BaseOVS):
         self.datapath_type = datapath_type
         # 设置Agent的印戳
         self._default_cookie = generate_random_cookie()
+        # When True, batched flow mods are sent as one OpenFlow 1.4 bundle,
+        # which needs the OpenFlow14 protocol to be enabled on the bridge
+        self.use_bundle = False
+        # per-thread queue of the flow mods issued in bundled_flows()
+        self._flow_batch = threading.local()
 
     @property
     def default_cookie(self):
@@ -355,15 +365,22 @@ class OVSBridge(BaseOVS):
                               "%s."), self.br_name)
             raise RuntimeError('No datapath_id on bridge %s' % self.br_name)
 
-    # 构建ovs-ofctl命令行，并执行
-    def do_action_flows(self, action, kwargs_list):
+    def _build_flow_strs(self, action, kwargs_list):
         if action != 'del':
             for kw in kwargs_list:
                 if 'cookie' not in kw:
                     kw['cookie'] = self._default_cookie
         # _build_flow_expr_str函数的细节不是关键，就是构建*-flows的命令参数
         # *-flows指的是add-flows del-flows
-        flow_strs = [_build_flow_expr_str(kw, action) for kw in kwargs_list]
+        return [_build_flow_expr_str(kw, action) for kw in kwargs_list]
+
+    # 构建ovs-ofctl命令行，并执行
+    def do_action_flows(self, action, kwargs_list):
+        batch = getattr(self._flow_batch, 'action_flow_tuples', None)
+        if batch is not None:
+            batch.extend((action, kw) for kw in kwargs_list)
+            return
+        flow_strs = self._build_flow_strs(action, kwargs_list)
         # action = 'add'，所以命令行是add-flows
         '''
             假设bridge name = br0
@@ -385,6 +402,63 @@ class OVSBridge(BaseOVS):
     def delete_flows(self, **kwargs):
         self.do_action_flows('del', [kwargs])
 
+    def do_bundled_action_flows(self, action_flow_tuples):
+        """Apply (action, flow) tuples in order with one ovs-ofctl call.
+
+        The flow mods are sent as a single atomic OpenFlow 1.4 bundle.
+        """
+        flow_strs = [
+            '%s %s' % (_BUNDLE_FLOW_MOD_COMMANDS[action],
+                       self._build_flow_strs(action, [kw])[0])
+            for action, kw in action_flow_tuples]
+        self.run_ofctl('add-flows', ['--bundle', '-'], '\n'.join(flow_strs))
+
+    def apply_action_flows(self, action_flow_tuples):
+        """Apply (action, flow) tuples in order with as few calls as possible.
+
+        Consecutive flows with the same action share an ovs-ofctl call, or all
+        of them are sent in a single bundle if use_bundle is set.
+        """
+        if not action_flow_tuples:
+            return
+        if self.use_bundle:
+            self.do_bundled_action_flows(action_flow_tuples)
+            return
+        grouped = itertools.groupby(action_flow_tuples,
+                                    key=operator.itemgetter(0))
+        for action, action_flow_list in grouped:
+            self.do_action_flows(action, [kw for _a, kw in action_flow_list])
+
+    @contextlib.contextmanager
+    def bundled_flows(self):
+        """Batch the flow mods issued on the bridge within the context.
+
+        add_flow, mod_flow and delete_flows calls made by the current thread
+        are queued and applied in order when the outermost context exits.
+        Unlike deferred(), the bridge itself is yielded so that any bridge
+        method can be used. Nothing is applied if an exception is raised.
+        """
+        if getattr(self._flow_batch, 'action_flow_tuples', None) is not None:
+            yield self
+            return
+        self._flow_batch.action_flow_tuples = []
+        try:
+            yield self
+            action_flow_tuples = self._flow_batch.action_flow_tuples
+        finally:
+            self._flow_batch.action_flow_tuples = None
+        self.apply_action_flows(action_flow_tuples)
+
+    def install_flows(self, flows):
+        """Add a list of flows, given as add_flow() keyword dicts."""
+        with self.bundled_flows():
+            self.do_action_flows('add', flows)
+
+    def uninstall_flows(self, flows):
+        """Delete a list of flows, given as delete_flows() keyword dicts."""
+        with self.bundled_flows():
+            self.do_action_flows('del', flows)
+
     def dump_flows_for_table(self, table):
         return self.dump_flows_for(table=table)
 
@@ -31,6 +31,7 @@ import six
 from neutron._i18n import _, _LE, _LI, _LW
 from neutron.agent.linux import dhcp
 from neutron.agent.linux import external_process
+from neutron.agent.linux import utils as linux_utils
 from neutron.agent.metadata import driver as metadata_driver
 from neutron.agent import rpc as agent_rpc
 from neutron.common import constants as n_const
@@ -83,6 +84,9 @@ class DhcpAgent(manager.Manager):
         super(DhcpAgent, self).__init__(host=host)
         self.needs_resync_reasons = collections.defaultdict(list)
         self.dhcp_ready_ports = set()
+        # network id -> ids of the ports to mark as ready once the delayed
+        # reload of the allocations of the network is done
+        self._pending_reloads = {}
         self.conf = conf or cfg.CONF
         self.cache = NetworkCache()
         self.dhcp_driver_cls = importutils.import_class(self.conf.dhcp_driver)
@@ -183,9 +187,24 @@ class DhcpAgent(manager.Manager):
         known_network_ids = set(self.cache.get_network_ids())
 
         try:
-            active_networks = self.plugin_rpc.get_active_networks_info()
+            active_network_ids = set()
+            # the networks of a page are configured while the next pages
+            # are fetched
+            try:
+                for active_networks in self._get_active_networks_pages():
+                    for network in active_networks:
+                        active_network_ids.add(network.id)
+                        # resync all, the missing or the specific networks
+                        if (not only_nets or
+                                network.id not in known_network_ids or
+                                network.id in only_nets):
+                            pool.spawn(self.safe_configure_dhcp_for_network,
+                                       network)
+            finally:
+                # the networks of the pages already fetched are configured
+                # even if fetching a page failed
+                pool.waitall()
             LOG.info(_LI('All active networks have been fetched through RPC.'))
-            active_network_ids = set(network.id for network in active_networks)
             for deleted_id in known_network_ids - active_network_ids:
                 try:
                     self.disable_dhcp_helper(deleted_id)
@@ -193,13 +212,6 @@ class DhcpAgent(manager.Manager):
                     self.schedule_resync(e, deleted_id)
                     LOG.exception(_LE('Unable to sync network state on '
                                       'deleted network %s'), deleted_id)
-
-            for network in active_networks:
-                if (not only_nets or  # specifically resync all
-                        network.id not in known_network_ids or  # missing net
-                        network.id in only_nets):  # specific network to sync
-                    pool.spawn(self.safe_configure_dhcp_for_network, network)
-            pool.waitall()
             # we notify all ports in case some were created while the agent
             # was down
             self.dhcp_ready_ports |= set(self.cache.get_port_ids(only_nets))
@@ -213,6 +225,13 @@ class DhcpAgent(manager.Manager):
                 self.schedule_resync(e)
             LOG.exception(_LE('Unable to sync network state.'))
 
+    def _get_active_networks_pages(self):
+        """Yield the lists of active networks fetched through RPC."""
+        page_size = self.conf.sync_networks_page_size
+        if not page_size:
+            return iter([self.plugin_rpc.get_active_networks_info()])
+        return self.plugin_rpc.get_active_networks_info_pages(page_size)
+
     def _dhcp_ready_ports_loop(self):
         """Notifies the server of any ports that had reservations setup."""
         while True:
@@ -438,8 +457,11 @@ class DhcpAgent(manager.Manager):
                               network.id, old_ips, new_ips)
                     driver_action = 'restart'
             self.cache.put_port(updated_port)
-            self.call_driver(driver_action, network)
-            self.dhcp_ready_ports.add(updated_port.id)
+            if driver_action == 'reload_allocations':
+                self._reload_allocations(network, updated_port.id)
+            else:
+                self.call_driver(driver_action, network)
+                self.dhcp_ready_ports.add(updated_port.id)
 
     def _is_port_on_this_agent(self, port):
         thishost = utils.get_dhcp_agent_device_id(
@@ -469,7 +491,38 @@ class DhcpAgent(manager.Manager):
                 self.call_driver('disable', network)
                 self.schedule_resync("Agent port was deleted", port.network_id)
             else:
-                self.call_driver('reload_allocations', network)
+                self._reload_allocations(network)
+
+    def _reload_allocations(self, network, port_id=None):
+        """Reload the allocations of the network after a port change.
+
+        With a reload_allocations_window, the reload is delayed, and the
+        port changes of the network received in the meantime are applied
+        by the same reload.
+        """
+        if not self.conf.reload_allocations_window:
+            self.call_driver('reload_allocations', network)
+            if port_id:
+                self.dhcp_ready_ports.add(port_id)
+            return
+        if network.id not in self._pending_reloads:
+            self._pending_reloads[network.id] = set()
+            eventlet.spawn_after(self.conf.reload_allocations_window,
+                                 self._reload_pending_allocations,
+                                 network.id)
+        if port_id:
+            self._pending_reloads[network.id].add(port_id)
+
+    @_wait_if_syncing
+    @utils.exception_logger()
+    def _reload_pending_allocations(self, network_id):
+        with _net_lock(network_id):
+            port_ids = self._pending_reloads.pop(network_id, set())
+            network = self.cache.get_network_by_id(network_id)
+            if not network:
+                return
+            self.call_driver('reload_allocations', network)
+            self.dhcp_ready_ports |= port_ids
 
     def update_isolated_metadata_proxy(self, network):
         """Spawn or kill metadata proxy.
@@ -541,6 +594,7 @@ class DhcpPluginApi(object):
         1.1 - Added get_active_networks_info, create_dhcp_port,
               and update_dhcp_port methods.
         1.5 - Added dhcp_ready_on_ports
+        1.7 - Added get_active_networks_info_page
 
     """
 
@@ -568,6 +622,22 @@ class DhcpPluginApi(object):
                               host=self.host)
         return [dhcp.NetModel(n) for n in networks]
 
+    def get_active_networks_info_pages(self, limit):
+        """Make remote process calls to retrieve all network info by pages.
+
+        The networks of each page are yielded before the next page is
+        retrieved.
+        """
+        cctxt = self.client.prepare(version='1.7')
+        marker = None
+        while True:
+            page = cctxt.call(self.context, 'get_active_networks_info_page',
+                              host=self.host, marker=marker, limit=limit)
+            yield [dhcp.NetModel(n) for n in page['networks']]
+            marker = page['marker']
+            if not marker:
+                return
+
     def get_network_info(self, network_id):
         """Make a remote process call to retrieve network info."""
         cctxt = self.client.prepare()
@@ -725,6 +795,7 @@ class DhcpAgentWithStateReport(DhcpAgent):
             self.heartbeat.start(interval=report_interval)
 
     def _report_state(self):
+        linux_utils.log_command_stats()
         try:
             self.agent_state.get('configurations').update(
                 self.cache.get_state())
@@ -40,9 +40,11 @@ from neutron.agent.l3 import l3_agent_extensions_manager as l3_ext_manager
 from neutron.agent.l3 import legacy_router
 from neutron.agent.l3 import namespace_manager
 from neutron.agent.l3 import router_processing_queue as queue
+from neutron.agent.l3 import router_workers
 from neutron.agent.linux import external_process
 from neutron.agent.linux import ip_lib
 from neutron.agent.linux import pd
+from neutron.agent.linux import utils as linux_utils
 from neutron.agent.metadata import driver as metadata_driver
 from neutron.agent import rpc as agent_rpc
 from neutron.callbacks import events
@@ -91,15 +93,36 @@ class L3PluginApi(object):
               - delete_agent_gateway_port
         1.8 - Added address scope information
         1.9 - Added get_router_ids
+        1.10 - Added revisions to get_routers, to get router deltas
     """
 
     def __init__(self, topic, host):
         self.host = host
         target = oslo_messaging.Target(topic=topic, version='1.0')
         self.client = n_rpc.get_client(target)
+        self.revisions_supported = True
 
-    def get_routers(self, context, router_ids=None):
-        """Make a remote process call to retrieve the sync data for routers."""
+    def get_routers(self, context, router_ids=None, revisions=None):
+        """Make a remote process call to retrieve the sync data for routers.
+
+        If revisions is passed, a dict of the 'revisions' of the routers the
+        agent has by router ID, the routers are returned with their
+        'revisions', and as deltas from the ones the agent has. If the server
+        doesn't support it, the full routers are returned without revisions.
+        """
+        if revisions is not None and self.revisions_supported:
+            cctxt = self.client.prepare(version='1.10')
+            try:
+                return cctxt.call(context, 'sync_routers', host=self.host,
+                                  router_ids=router_ids, revisions=revisions)
+            except oslo_messaging.UnsupportedVersion:
+                pass
+            except oslo_messaging.RemoteError as e:
+                if e.exc_type != 'UnsupportedVersion':
+                    raise
+            LOG.info(_LI("The server does not support the router revisions, "
+                         "fetching the full routers"))
+            self.revisions_supported = False
         cctxt = self.client.prepare()
         return cctxt.call(context, 'sync_routers', host=self.host,
                           router_ids=router_ids)
@@ -182,6 +205,9 @@ class L3NATAgent(ha.AgentMixin,
     """
     target = oslo_messaging.Target(version='1.3')
 
+    # Index of the router worker the agent runs in, if any
+    worker_index = None
+
     def __init__(self, host, conf=None):
         if conf:
             self.conf = conf
@@ -191,6 +217,12 @@ class L3NATAgent(ha.AgentMixin,
 
         self._check_config_params()
 
+        self.router_workers = None
+        if self.conf.router_processing_workers and self.worker_index is None:
+            self.router_workers = router_workers.RouterWorkerPool(
+                self.conf.router_processing_workers,
+                self._create_worker_agent)
+
         self.process_monitor = external_process.ProcessMonitor(
             config=self.conf,
             resource_type='router')
@@ -279,6 +311,12 @@ class L3NATAgent(ha.AgentMixin,
                 LOG.error(msg, self.conf.ipv6_gateway)
                 raise SystemExit(1)
 
+        if (self.conf.router_processing_workers and
+                self.conf.agent_mode != lib_const.L3_AGENT_MODE_LEGACY):
+            LOG.error(_LE("router_processing_workers is only supported in "
+                          "the %s agent mode"), lib_const.L3_AGENT_MODE_LEGACY)
+            raise SystemExit(1)
+
     def _fetch_external_net_id(self, force=False):
         """Find UUID of single external network for this agent."""
         if self.conf.gateway_external_network_id:
@@ -411,7 +449,7 @@ class L3NATAgent(ha.AgentMixin,
         update = queue.RouterUpdate(router_id,
                                     queue.PRIORITY_RPC,
                                     action=queue.DELETE_ROUTER)
-        self._queue.add(update)
+        self._add_router_update(update)
 
     def routers_updated(self, context, routers):
         """Deal with routers modification and creation RPC message."""
@@ -424,7 +462,7 @@ class L3NATAgent(ha.AgentMixin,
                 # 构建元素：class RouterUpdate的对象实例
                 update = queue.RouterUpdate(id, queue.PRIORITY_RPC)
                 # 将class RouterUpdate的对象实例（update）存入数组 _queue
-                self._queue.add(update)
+                self._add_router_update(update)
 
     def router_removed_from_agent(self, context, payload):
         LOG.debug('Got router removed from agent :%r', payload)
@@ -432,13 +470,29 @@ class L3NATAgent(ha.AgentMixin,
         update = queue.RouterUpdate(router_id,
                                     queue.PRIORITY_RPC,
                                     action=queue.DELETE_ROUTER)
-        self._queue.add(update)
+        self._add_router_update(update)
 
     def router_added_to_agent(self, context, payload):
         LOG.debug('Got router added to agent :%r', payload)
         # 调用self.routers_updated
         self.routers_updated(context, payload)
 
+    def _add_router_update(self, update):
+        if self.router_workers:
+            self.router_workers.add_router_update(update)
+        else:
+            self._queue.add(update)
+
+    def _create_worker_agent(self, worker_index):
+        return L3NATWorkerAgent(self.host, worker_index, conf=self.conf)
+
+    def enqueue_state_change(self, router_id, state):
+        if self.router_workers:
+            # the router is processed by a worker
+            self.router_workers.enqueue_state_change(router_id, state)
+            return
+        super(L3NATAgent, self).enqueue_state_change(router_id, state)
+
     def _process_router_if_compatible(self, router):
         if (self.conf.external_network_bridge and
             not ip_lib.device_exists(self.conf.external_network_bridge)):
@@ -533,16 +587,12 @@ class L3NATAgent(ha.AgentMixin,
                     # 但是这个Router信息的时间戳已经不是当初发生变更消息的时间戳
                     # 而是当前重新获取Router消息中的时间戳
                     update.timestamp = timeutils.utcnow()
-                    routers = self.plugin_rpc.get_routers(self.context,
-                                                          [update.id])
+                    router = self._fetch_router(update.id)
                 except Exception:
                     msg = _LE("Failed to fetch router information for '%s'")
                     LOG.exception(msg, update.id)
                     self._resync_router(update)
                     continue
-
-                if routers:
-                    router = routers[0]
             # 变更消息中只有Router ID，而无Router真正内容，意味着要删除这个Router，
             # 当然实际代码中，还有其他判断逻辑，被忽略掉了
             if not router:
@@ -582,6 +632,24 @@ class L3NATAgent(ha.AgentMixin,
             # rp.fetched_and_processed，是为了保证过期的Router变更消息不在处理
             rp.fetched_and_processed(update.timestamp)
 
+    def _fetch_router(self, router_id):
+        """Fetch a router, as a delta from the one processed if any."""
+        ri = self.router_info.get(router_id)
+        revisions = ri and ri.router.get('revisions')
+        routers = self.plugin_rpc.get_routers(
+            self.context, [router_id],
+            revisions={router_id: revisions} if revisions else {})
+        if revisions and routers and routers[0].get('delta'):
+            router = ri.merge_router_delta(routers[0])
+            if router:
+                return router
+            LOG.debug("Failed to apply the delta of router %s, fetching it "
+                      "again", router_id)
+            routers = self.plugin_rpc.get_routers(self.context, [router_id],
+                                                  revisions={})
+        if routers:
+            return routers[0]
+
     def _process_routers_loop(self):
         LOG.debug("Starting _process_routers_loop")
         pool = eventlet.GreenPool(size=8)
@@ -596,6 +664,11 @@ class L3NATAgent(ha.AgentMixin,
     def periodic_sync_routers_task(self, context):
         if not self.fullsync:
             return
+        if self.router_workers:
+            LOG.debug("Requesting a fullsync from the router workers")
+            self.router_workers.fullsync()
+            self.fullsync = False
+            return
         LOG.debug("Starting fullsync periodic_sync_routers_task")
 
         # self.fullsync is True at this point. If an exception -- caught or
@@ -622,12 +695,14 @@ class L3NATAgent(ha.AgentMixin,
         is_snat_agent = (self.conf.agent_mode ==
                          lib_const.L3_AGENT_MODE_DVR_SNAT)
         try:
-            router_ids = self.plugin_rpc.get_router_ids(context)
+            router_ids = self._get_router_ids(context)
             # fetch routers by chunks to reduce the load on server and to
             # start router processing earlier
             for i in range(0, len(router_ids), self.sync_routers_chunk_size):
                 chunk = router_ids[i:i + self.sync_routers_chunk_size]
-                routers = self.plugin_rpc.get_routers(context, chunk)
+                # the full routers are fetched, with their revisions
+                routers = self.plugin_rpc.get_routers(context, chunk,
+                                                      revisions={})
                 LOG.debug('Processing :%r', routers)
                 for r in routers:
                     curr_router_ids.add(r['id'])
@@ -684,6 +759,36 @@ class L3NATAgent(ha.AgentMixin,
                                         action=queue.DELETE_ROUTER)
             self._queue.add(update)
 
+    def _get_router_ids(self, context):
+        return self.plugin_rpc.get_router_ids(context)
+
+    def get_router_stats(self):
+        """Return the number of routers, gateways, interfaces and FIPs."""
+        if self.router_workers:
+            return self.router_workers.get_stats()
+        num_ex_gw_ports = 0
+        num_interfaces = 0
+        num_floating_ips = 0
+        router_infos = self.router_info.values()
+        for ri in router_infos:
+            ex_gw_port = ri.get_ex_gw_port()
+            if ex_gw_port:
+                num_ex_gw_ports += 1
+            num_interfaces += len(ri.router.get(lib_const.INTERFACE_KEY,
+                                                []))
+            num_floating_ips += len(ri.router.get(lib_const.FLOATINGIP_KEY,
+                                                  []))
+        return {'routers': len(router_infos),
+                'ex_gw_ports': num_ex_gw_ports,
+                'interfaces': num_interfaces,
+                'floating_ips': num_floating_ips}
+
+    def _start_router_processing(self):
+        if self.router_workers:
+            self.router_workers.start()
+        else:
+            eventlet.spawn_n(self._process_routers_loop)
+
     @property
     def context(self):
         # generate a new request-id on each call to make server side tracking
@@ -697,10 +802,17 @@ class L3NATAgent(ha.AgentMixin,
         # vArmourL3NATAgent. We need to find out whether vArmourL3NATAgent
         # can have L3NATAgentWithStateReport as its base class instead of
         # L3NATAgent.
-        eventlet.spawn_n(self._process_routers_loop)
+        self._start_router_processing()
         LOG.info(_LI("L3 agent started"))
 
+    def stop(self):
+        if self.router_workers:
+            self.router_workers.stop()
+
     def create_pd_router_update(self):
+        if self.router_workers:
+            self.router_workers.process_prefix_update()
+            return
         router_id = None
         update = queue.RouterUpdate(router_id,
                                     queue.PRIORITY_PD_UPDATE,
@@ -727,7 +839,9 @@ class L3NATAgentWithStateReport(L3NATAgent):
                 'gateway_external_network_id':
                 self.conf.gateway_external_network_id,
                 'interface_driver': self.conf.interface_driver,
-                'log_agent_heartbeats': self.conf.AGENT.log_agent_heartbeats},
+                'log_agent_heartbeats': self.conf.AGENT.log_agent_heartbeats,
+                'router_processing_workers':
+                self.conf.router_processing_workers},
             'start_flag': True,
             'agent_type': lib_const.AGENT_TYPE_L3}
         # 报告状态周期，配置在配置文件 etc/neutron.conf, report_interval = 30(秒)
@@ -739,24 +853,9 @@ class L3NATAgentWithStateReport(L3NATAgent):
             self.heartbeat.start(interval=report_interval)
 
     def _report_state(self):
-        num_ex_gw_ports = 0
-        num_interfaces = 0
-        num_floating_ips = 0
-        router_infos = self.router_info.values()
-        num_routers = len(router_infos)
-        for ri in router_infos:
-            ex_gw_port = ri.get_ex_gw_port()
-            if ex_gw_port:
-                num_ex_gw_ports += 1
-            num_interfaces += len(ri.router.get(lib_const.INTERFACE_KEY,
-                                                []))
-            num_floating_ips += len(ri.router.get(lib_const.FLOATINGIP_KEY,
-                                                  []))
         configurations = self.agent_state['configurations']
-        configurations['routers'] = num_routers
-        configurations['ex_gw_ports'] = num_ex_gw_ports
-        configurations['interfaces'] = num_interfaces
-        configurations['floating_ips'] = num_floating_ips
+        configurations.update(self.get_router_stats())
+        linux_utils.log_command_stats()
         try:
             agent_status = self.state_rpc.report_state(self.context,
                                                        self.agent_state,
@@ -777,7 +876,7 @@ class L3NATAgentWithStateReport(L3NATAgent):
 
     def after_start(self):
         # 在协程里启动self._process_routers_loop
-        eventlet.spawn_n(self._process_routers_loop)
+        self._start_router_processing()
         LOG.info(_LI("L3 agent started"))
         # Do the report state before we do the first full sync.
         self._report_state()
@@ -788,3 +887,40 @@ class L3NATAgentWithStateReport(L3NATAgent):
         """Handle the agent_updated notification event."""
         self.fullsync = True
         LOG.info(_LI("agent_updated by server side %s!"), payload)
+
+
+class L3NATWorkerAgent(L3NATAgent):
+    """Manager of the routers of a router worker process.
+
+    When router_processing_workers is set, the L3 agent forwards the updates
+    of each router to the worker owning it, where they are processed by this
+    manager. It only syncs and cleans up the routers of its worker.
+    """
+
+    def __init__(self, host, worker_index, conf=None):
+        self.worker_index = worker_index
+        super(L3NATWorkerAgent, self).__init__(host=host, conf=conf)
+        self.namespaces_manager = namespace_manager.NamespaceManager(
+            self.conf,
+            self.driver,
+            self.metadata_driver,
+            router_filter=self._owns_router)
+
+    def _owns_router(self, router_id):
+        return router_workers.get_worker_index(
+            router_id,
+            self.conf.router_processing_workers) == self.worker_index
+
+    def _start_keepalived_notifications_server(self):
+        # The state changes are received by the agent, which forwards them
+        # to the worker of the router
+        pass
+
+    def _get_router_ids(self, context):
+        router_ids = super(L3NATWorkerAgent, self)._get_router_ids(context)
+        return [router_id for router_id in router_ids
+                if self._owns_router(router_id)]
+
+    def after_start(self):
+        super(L3NATWorkerAgent, self).after_start()
+        self.pd.after_start()
@@ -49,15 +49,19 @@ class NamespaceManager(object):
         dvr_fip_ns.FIP_NS_PREFIX: dvr_fip_ns.FipNamespace,
     }
 
-    def __init__(self, agent_conf, driver, metadata_driver=None):
+    def __init__(self, agent_conf, driver, metadata_driver=None,
+                 router_filter=None):
         """Initialize the NamespaceManager.
 
         :param agent_conf: configuration from l3 agent
         :param driver: to perform operations on devices
         :param metadata_driver: used to cleanup stale metadata proxy processes
+        :param router_filter: if set, only the namespaces of the routers
+                              it returns True for are managed
         """
         self.agent_conf = agent_conf
         self.driver = driver
+        self.router_filter = router_filter
         self._clean_stale = True
         self.metadata_driver = metadata_driver
         if metadata_driver:
@@ -110,7 +114,10 @@ class NamespaceManager(object):
 
     def is_managed(self, ns_name):
         """Return True if the namespace name passed belongs to this manager."""
-        return self.get_prefix_and_id(ns_name) is not None
+        prefix_and_id = self.get_prefix_and_id(ns_name)
+        if prefix_and_id is None:
+            return False
+        return not self.router_filter or self.router_filter(prefix_and_id[1])
 
     def list_all(self):
         """Get a set of all namespaces on host managed by this manager."""
@@ -14,6 +14,7 @@
 #    under the License.
 
 import collections
+import copy
 import netaddr
 from neutron_lib import constants as lib_constants
 from neutron_lib.utils import helpers
@@ -41,6 +42,9 @@ ADDRESS_SCOPE_MARK_MASK = "0xffff0000"
 ADDRESS_SCOPE_MARK_ID_MIN = 1024
 ADDRESS_SCOPE_MARK_ID_MAX = 2048
 DEFAULT_ADDRESS_SCOPE = "noscope"
+# The router keys whose items are sent separately in router deltas
+ROUTER_DELTA_KEYS = (lib_constants.INTERFACE_KEY,
+                     lib_constants.FLOATINGIP_KEY)
 
 
 class RouterInfo(object):
@@ -113,11 +117,49 @@ class RouterInfo(object):
     @router.setter
     def router(self, value):
         self._router = value
+        # the router as returned by the server, which the deltas apply to,
+        # as the agent changes its router while processing it
+        self._server_router = (copy.deepcopy(value)
+                               if value and value.get('revisions') else None)
         if not self._router:
             return
         # enable_snat by default if it wasn't specified by plugin
         self._snat_enabled = self._router.get('enable_snat', True)
 
+    def merge_router_delta(self, delta):
+        """Return the router a delta returned by sync_routers applies to.
+
+        The delta has the router attributes if they changed, and the
+        interfaces and floating IPs which changed or were added; its
+        'revisions' list all the current ones. Returns None if the delta
+        doesn't apply to the router.
+
+        The delta is merged into a copy of the last router returned by the
+        server, not into the router changed by the agent.
+        """
+        server_router = self._server_router
+        if not server_router:
+            return
+        revisions = delta['revisions']
+        if revisions['router'] == server_router['revisions'].get('router'):
+            router = {k: v for k, v in server_router.items()
+                      if k not in ROUTER_DELTA_KEYS}
+        else:
+            router = {k: v for k, v in delta.items()
+                      if k not in ROUTER_DELTA_KEYS and k != 'delta'}
+        for key in ROUTER_DELTA_KEYS:
+            items = dict((item['id'], item)
+                         for item in server_router.get(key, []))
+            items.update((item['id'], item) for item in delta.get(key, []))
+            try:
+                merged = [items[item_id] for item_id in revisions[key]]
+            except KeyError:
+                return
+            if merged:
+                router[key] = merged
+        router['revisions'] = revisions
+        return copy.deepcopy(router)
+
     def get_internal_device_name(self, port_id):
         return (INTERNAL_DEV_PREFIX + port_id)[:self.driver.DEV_NAME_LEN]
 
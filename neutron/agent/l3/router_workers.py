@@ -0,0 +1,229 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import signal
+import socket
+import zlib
+
+import eventlet
+from eventlet import semaphore
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_service import loopingcall
+
+from neutron._i18n import _LE, _LI, _LW
+from neutron.agent.l3 import router_processing_queue as queue
+from neutron.agent.linux import utils as agent_utils
+from neutron.common import rpc as n_rpc
+from neutron import context as n_context
+from neutron import privileged
+
+LOG = logging.getLogger(__name__)
+
+# Seconds to wait before restarting a worker which exited
+RESPAWN_DELAY = 1
+
+ROUTER_STATS = ('routers', 'ex_gw_ports', 'interfaces', 'floating_ips')
+
+
+def get_worker_index(router_id, workers):
+    """Return the index of the worker owning a router."""
+    return (zlib.crc32(router_id.encode('utf-8')) & 0xffffffff) % workers
+
+
+def _send(sock, message):
+    sock.sendall((jsonutils.dumps(message) + '\n').encode('utf-8'))
+
+
+def _reset_after_fork():
+    # Don't run the greenthreads of the parent, nor share its epoll fd
+    eventlet.hubs.use_hub()
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_DFL)
+    # The AMQP, privsep and root helper daemon connections of the parent
+    # can be neither used nor closed cleanly by the worker, it opens its own
+    n_rpc.TRANSPORT = n_rpc.NOTIFICATION_TRANSPORT = n_rpc.NOTIFIER = None
+    n_rpc.init(cfg.CONF)
+    privileged.default.channel = None
+    agent_utils.RootwrapDaemonHelper.reset_pool()
+
+
+class RouterWorkerPool(object):
+    """Worker processes the routers of the L3 agent are sharded across.
+
+    Each router is owned by the worker its ID hashes to, which holds its
+    RouterInfo and processes all of its updates. The agent forwards the
+    updates, HA state changes and sync requests to the workers through a
+    socket pair, and the workers send it back their router statistics.
+    A worker which exits is restarted, and does a full sync of its routers.
+    """
+
+    def __init__(self, workers, agent_factory):
+        """Initialize the pool, the workers are started by start().
+
+        :param workers: number of worker processes
+        :param agent_factory: called in each worker with the worker index,
+                              returns the L3 agent processing its routers.
+        """
+        self.workers = workers
+        self._agent_factory = agent_factory
+        self._sockets = [None] * workers
+        self._pids = [None] * workers
+        self._stats = [{} for i in range(workers)]
+        self._send_locks = [semaphore.Semaphore() for i in range(workers)]
+        self._stopped = False
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def stop(self):
+        self._stopped = True
+        for pid in self._pids:
+            if pid:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+    def _spawn(self, index):
+        parent_sock, worker_sock = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            parent_sock.close()
+            for sock in self._sockets:
+                if sock:
+                    sock.close()
+            status = 1
+            try:
+                RouterWorker(index, worker_sock, self._agent_factory).run()
+                status = 0
+            except BaseException:
+                LOG.exception(_LE("Router worker %d failed"), index)
+            finally:
+                os._exit(status)
+        worker_sock.close()
+        self._sockets[index] = parent_sock
+        self._pids[index] = pid
+        LOG.info(_LI("Started router worker %(index)d, pid %(pid)d"),
+                 {'index': index, 'pid': pid})
+        eventlet.spawn_n(self._watch_worker, index, parent_sock, pid)
+
+    def _watch_worker(self, index, sock, pid):
+        for line in sock.makefile('r'):
+            message = jsonutils.loads(line)
+            if message['op'] == 'stats':
+                self._stats[index] = message['stats']
+        sock.close()
+        os.waitpid(pid, 0)
+        self._sockets[index] = self._pids[index] = None
+        self._stats[index] = {}
+        if self._stopped:
+            return
+        LOG.error(_LE("Router worker %(index)d, pid %(pid)d, exited, "
+                      "restarting it"), {'index': index, 'pid': pid})
+        eventlet.sleep(RESPAWN_DELAY)
+        self._spawn(index)
+
+    def _send(self, index, message):
+        sock = self._sockets[index]
+        if sock is None:
+            # the worker syncs all its routers when it (re)starts
+            LOG.debug("Router worker %(index)d is not running, dropping "
+                      "%(message)s", {'index': index, 'message': message})
+            return
+        with self._send_locks[index]:
+            try:
+                _send(sock, message)
+            except socket.error as e:
+                LOG.warning(_LW("Failed to send %(message)s to router "
+                                "worker %(index)d: %(error)s"),
+                            {'message': message, 'index': index,
+                             'error': e})
+
+    def _send_all(self, message):
+        for index in range(self.workers):
+            self._send(index, message)
+
+    def add_router_update(self, update):
+        """Forward a RouterUpdate to the worker owning the router.
+
+        The router is always fetched again by the worker.
+        """
+        self._send(get_worker_index(update.id, self.workers),
+                   {'op': 'router_update', 'router_id': update.id,
+                    'priority': update.priority, 'action': update.action})
+
+    def enqueue_state_change(self, router_id, state):
+        self._send(get_worker_index(router_id, self.workers),
+                   {'op': 'ha_state', 'router_id': router_id,
+                    'state': state})
+
+    def fullsync(self):
+        self._send_all({'op': 'fullsync'})
+
+    def process_prefix_update(self):
+        self._send_all({'op': 'pd_update'})
+
+    def get_stats(self):
+        """Return the sum of the router statistics of the workers."""
+        return {key: sum(stats.get(key, 0) for stats in self._stats)
+                for key in ROUTER_STATS}
+
+
+class RouterWorker(object):
+    """Runs the L3 agent of a worker, fed by the parent agent."""
+
+    def __init__(self, index, sock, agent_factory):
+        self.index = index
+        self.sock = sock
+        self._agent_factory = agent_factory
+
+    def run(self):
+        _reset_after_fork()
+        self.agent = self._agent_factory(self.index)
+        self.agent.init_host()
+        self.agent.after_start()
+
+        periodic = loopingcall.FixedIntervalLoopingCall(self._periodic_tasks)
+        periodic.start(interval=cfg.CONF.periodic_interval)
+        report_interval = cfg.CONF.AGENT.report_interval
+        if report_interval:
+            report = loopingcall.FixedIntervalLoopingCall(self._send_stats)
+            report.start(interval=report_interval)
+
+        # the worker exits with the agent, when the socket is closed
+        for line in self.sock.makefile('r'):
+            self._handle_message(jsonutils.loads(line))
+
+    def _periodic_tasks(self):
+        self.agent.periodic_tasks(n_context.get_admin_context())
+
+    def _send_stats(self):
+        _send(self.sock, {'op': 'stats',
+                          'stats': self.agent.get_router_stats()})
+
+    def _handle_message(self, message):
+        op = message['op']
+        if op == 'router_update':
+            self.agent._queue.add(queue.RouterUpdate(
+                message['router_id'], message['priority'],
+                action=message['action']))
+        elif op == 'ha_state':
+            self.agent.enqueue_state_change(message['router_id'],
+                                            message['state'])
+        elif op == 'fullsync':
+            self.agent.fullsync = True
+        elif op == 'pd_update':
+            self.agent.create_pd_router_update()
@@ -15,6 +15,7 @@
 
 import abc
 import collections
+import itertools
 import os
 import re
 import shutil
@@ -59,40 +60,76 @@ NS_PREFIX = 'qdhcp-'
 DNSMASQ_SERVICE_NAME = 'dnsmasq'
 
 
-class DictModel(dict):
-    """Convert dict into an object that provides attribute access to values."""
+def _needs_upgrade(item):
+    """Check if `item` is a dict and needs to be changed to DictModel."""
+    return isinstance(item, dict) and not isinstance(item, DictModel)
+
 
-    def __init__(self, *args, **kwargs):
-        """Convert dict values to DictModel values."""
-        super(DictModel, self).__init__(*args, **kwargs)
+def _upgrade(item):
+    """Upgrade item if it needs to be upgraded."""
+    if _needs_upgrade(item):
+        return DictModel(item)
+    return item
 
-        def needs_upgrade(item):
-            """Check if `item` is a dict and needs to be changed to DictModel.
-            """
-            return isinstance(item, dict) and not isinstance(item, DictModel)
 
-        def upgrade(item):
-            """Upgrade item if it needs to be upgraded."""
-            if needs_upgrade(item):
-                return DictModel(item)
+class DictModel(dict):
+    """Convert dict into an object that provides attribute access to values.
+
+    The dict values, and the dicts in the list and tuple values, are
+    converted to DictModel values when they are first read rather than when
+    the model is built: most of the nested values of the RPC payloads, like
+    the binding details or the security groups of the ports, are never read
+    by the agent.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, (dict, list, tuple)):
+            value = self._upgrade_value(key, value)
+        return value
+
+    def _upgrade_value(self, key, value):
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, dict) and not isinstance(item, DictModel):
+                    break
             else:
-                return item
+                return value
+            # Keep the same type but convert dicts to DictModels
+            value = type(value)(_upgrade(item) for item in value)
+        elif isinstance(value, DictModel):
+            return value
+        else:
+            value = DictModel(value)
+        dict.__setitem__(self, key, value)
+        return value
 
-        for key, value in six.iteritems(self):
-            if isinstance(value, (list, tuple)):
-                # Keep the same type but convert dicts to DictModels
-                self[key] = type(value)(
-                    (upgrade(item) for item in value)
-                )
-            elif needs_upgrade(value):
-                # Change dict instance values to DictModel instance values
-                self[key] = DictModel(value)
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        for key in self:
+            self[key]
+        return super(DictModel, self).items()
+
+    def values(self):
+        for key in self:
+            self[key]
+        return super(DictModel, self).values()
 
     def __getattr__(self, name):
         try:
-            return self[name]
+            value = dict.__getitem__(self, name)
         except KeyError as e:
             raise AttributeError(e)
+        if isinstance(value, (dict, list, tuple)):
+            value = self._upgrade_value(name, value)
+        return value
 
     def __setattr__(self, name, value):
         self[name] = value
@@ -107,16 +144,69 @@ class DictModel(dict):
 
 class NetModel(DictModel):
 
+    __slots__ = ()
+
+    # The attributes of the subnets and ports of a network whose values are
+    # mostly the same for all of them.
+    _SHARED_VALUE_KEYS = ('network_id', 'tenant_id', 'project_id',
+                          'device_owner', 'status', 'binding:host_id',
+                          'binding:vif_type', 'binding:vnic_type')
+
     def __init__(self, d):
         super(NetModel, self).__init__(d)
 
         self._ns_name = "%s%s" % (NS_PREFIX, self.id)
+        self._share_values()
+
+    def _share_values(self):
+        """Keep a single copy of the values repeated in the subnets and ports.
+
+        Every string of an RPC payload is decoded separately, the network id
+        of each port would otherwise be a copy of its own.
+        """
+        values = {}
+
+        def share(item, key):
+            value = item.get(key)
+            if isinstance(value, six.string_types):
+                item[key] = values.setdefault(value, value)
+
+        for item in itertools.chain(dict.get(self, 'subnets') or (),
+                                    dict.get(self, 'ports') or ()):
+            if not isinstance(item, dict):
+                continue
+            for key in self._SHARED_VALUE_KEYS:
+                share(item, key)
+            for fixed_ip in dict.get(item, 'fixed_ips') or ():
+                if isinstance(fixed_ip, dict):
+                    share(fixed_ip, 'subnet_id')
 
     @property
     def namespace(self):
         return self._ns_name
 
 
+# The config file entries generated for a port, and the leases of the port
+# listed in the hosts file.
+PortConfigEntries = collections.namedtuple(
+    'PortConfigEntries', ['port', 'hosts', 'addn_hosts', 'opts', 'leases'])
+
+
+class NetworkConfigEntries(object):
+    """The config file entries generated for the ports of a network.
+
+    The entries of a port are only generated again when the port is
+    replaced in the network, as the agent does when the port is updated.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        # port id -> PortConfigEntries
+        self.ports = {}
+        # config file kind -> contents last written
+        self.files = {}
+
+
 @six.add_metaclass(abc.ABCMeta)
 class DhcpBase(object):
 
@@ -297,6 +387,10 @@ class Dnsmasq(DhcpLocalProcess):
 
     _IS_DHCP_RELEASE6_SUPPORTED = None
 
+    # network id -> NetworkConfigEntries of the config files last written
+    # by reload_allocations
+    _CONFIG_ENTRIES = {}
+
     @classmethod
     def check_version(cls):
         pass
@@ -441,7 +535,9 @@ class Dnsmasq(DhcpLocalProcess):
         """
 
         self._output_config_files()
+        self._enable_process(reload_with_HUP)
 
+    def _enable_process(self, reload_with_HUP):
         pm = self._get_process_manager(
             cmd_callback=self._build_cmdline_callback)
 
@@ -481,11 +577,91 @@ class Dnsmasq(DhcpLocalProcess):
             LOG.warning(_LW('DHCP release failed for %(cmd)s. '
                             'Reason: %(e)s'), {'cmd': cmd, 'e': e})
 
+    def _remove_config_files(self):
+        self._CONFIG_ENTRIES.pop(self.network.id, None)
+        super(Dnsmasq, self)._remove_config_files()
+
     def _output_config_files(self):
+        # the entries are generated again on the next reload
+        self._CONFIG_ENTRIES.pop(self.network.id, None)
         self._output_hosts_file()
         self._output_addn_hosts_file()
         self._output_opts_file()
 
+    def _update_config_files(self):
+        """Update the config files with the entries of the changed ports.
+
+        The config file entries of the ports are kept between the reloads of
+        the allocations of the network. Only the entries of the ports
+        replaced or removed since the previous reload are generated again,
+        and only the config files whose contents changed are written.
+
+        :returns: whether any config file was written
+        """
+        entries = self._CONFIG_ENTRIES.get(self.network.id)
+        if entries is None or entries.network is not self.network:
+            # the network was fetched again from the server, or the files
+            # were last written when dnsmasq was spawned
+            self._release_unused_leases()
+            entries = NetworkConfigEntries(self.network)
+        v6_nets = self._get_v6_nets()
+        dhcp_enabled_subnet_ids = [s.id for s in self.network.subnets
+                                   if s.enable_dhcp]
+        old_ports_entries = entries.ports
+        entries.ports = {}
+        ports_entries = []
+        old_leases = set()
+        new_leases = set()
+        for port in self.network.ports:
+            port_entries = old_ports_entries.pop(port.id, None)
+            if port_entries is None or port_entries.port is not port:
+                if port_entries is not None:
+                    old_leases |= port_entries.leases
+                port_entries = self._make_port_config_entries(
+                    port, v6_nets, dhcp_enabled_subnet_ids)
+                new_leases |= self._get_port_leases(port)
+            entries.ports[port.id] = port_entries
+            ports_entries.append(port_entries)
+        for port_entries in old_ports_entries.values():
+            old_leases |= port_entries.leases
+        self._release_leases(old_leases - new_leases)
+
+        options, subnet_index_map = self._generate_opts_per_subnet()
+        for port_entries in ports_entries:
+            options += port_entries.opts
+        options += self._generate_dhcp_servers_opts(subnet_index_map)
+        files = [
+            ('host', ''.join(e.hosts for e in ports_entries)),
+            ('addn_hosts', ''.join(e.addn_hosts for e in ports_entries)),
+            ('opts', '\n'.join(options))]
+        changed = False
+        for kind, contents in files:
+            if entries.files.get(kind) != contents:
+                file_utils.replace_file(self.get_conf_file_name(kind),
+                                        contents)
+                entries.files[kind] = contents
+                changed = True
+        self._CONFIG_ENTRIES[self.network.id] = entries
+        return changed
+
+    def _make_port_config_entries(self, port, v6_nets,
+                                  dhcp_enabled_subnet_ids):
+        host_tuples = list(self._iter_port_hosts(port, v6_nets))
+        client_id = self._get_client_id(port)
+        # the leases listed in the hosts file, see _read_hosts_file_leases
+        leases = set(
+            (host_tuple[1].ip_address, port.mac_address, client_id)
+            for host_tuple in host_tuples
+            if not host_tuple[4] and
+            host_tuple[1].subnet_id in dhcp_enabled_subnet_ids)
+        return PortConfigEntries(
+            port,
+            ''.join(self._iter_hosts_file_lines(host_tuples,
+                                                dhcp_enabled_subnet_ids)),
+            ''.join(self._iter_addn_hosts_file_lines(host_tuples)),
+            self._generate_port_opts(port),
+            leases)
+
     def reload_allocations(self):
         """Rebuild the dnsmasq config and signal the dnsmasq to reload."""
 
@@ -502,9 +678,13 @@ class Dnsmasq(DhcpLocalProcess):
                       'anymore, skipping reload: %s', self.network.id)
             return
 
-        self._release_unused_leases()
-        self._spawn_or_reload_process(reload_with_HUP=True)
-        LOG.debug('Reloading allocations for network: %s', self.network.id)
+        if self._update_config_files() or not self.active:
+            self._enable_process(reload_with_HUP=True)
+            LOG.debug('Reloading allocations for network: %s',
+                      self.network.id)
+        else:
+            LOG.debug('Allocations of network %s unchanged, skipping '
+                      'reload', self.network.id)
         self.device_manager.update(self.network, self.interface_name)
 
     def _sort_fixed_ips_for_dnsmasq(self, fixed_ips, v6_nets):
@@ -561,41 +741,49 @@ class Dnsmasq(DhcpLocalProcess):
             no_opts,  # A flag indication that options shouldn't be written
         )
         """
-        v6_nets = dict((subnet.id, subnet) for subnet in
-                       self.network.subnets if subnet.ip_version == 6)
+        v6_nets = self._get_v6_nets()
 
         for port in self.network.ports:
-            fixed_ips = self._sort_fixed_ips_for_dnsmasq(port.fixed_ips,
-                                                         v6_nets)
-            # Confirm whether Neutron server supports dns_name attribute in the
-            # ports API
-            dns_assignment = getattr(port, 'dns_assignment', None)
+            for host_tuple in self._iter_port_hosts(port, v6_nets):
+                yield host_tuple
+
+    def _get_v6_nets(self):
+        return dict((subnet.id, subnet) for subnet in
+                    self.network.subnets if subnet.ip_version == 6)
+
+    def _iter_port_hosts(self, port, v6_nets):
+        """Iterate over the hosts of a port, see _iter_hosts."""
+        fixed_ips = self._sort_fixed_ips_for_dnsmasq(port.fixed_ips,
+                                                     v6_nets)
+        # Confirm whether Neutron server supports dns_name attribute in the
+        # ports API
+        dns_assignment = getattr(port, 'dns_assignment', None)
+        if dns_assignment:
+            dns_ip_map = {d.ip_address: d for d in dns_assignment}
+        for alloc in fixed_ips:
+            no_dhcp = False
+            no_opts = False
+            if alloc.subnet_id in v6_nets:
+                addr_mode = v6_nets[alloc.subnet_id].ipv6_address_mode
+                no_dhcp = addr_mode in (constants.IPV6_SLAAC,
+                                        constants.DHCPV6_STATELESS)
+                # we don't setup anything for SLAAC. It doesn't make sense
+                # to provide options for a client that won't use DHCP
+                no_opts = addr_mode == constants.IPV6_SLAAC
+
+            # If dns_name attribute is supported by ports API, return the
+            # dns_assignment generated by the Neutron server. Otherwise,
+            # generate hostname and fqdn locally (previous behaviour)
             if dns_assignment:
-                dns_ip_map = {d.ip_address: d for d in dns_assignment}
-            for alloc in fixed_ips:
-                no_dhcp = False
-                no_opts = False
-                if alloc.subnet_id in v6_nets:
-                    addr_mode = v6_nets[alloc.subnet_id].ipv6_address_mode
-                    no_dhcp = addr_mode in (constants.IPV6_SLAAC,
-                                            constants.DHCPV6_STATELESS)
-                    # we don't setup anything for SLAAC. It doesn't make sense
-                    # to provide options for a client that won't use DHCP
-                    no_opts = addr_mode == constants.IPV6_SLAAC
-
-                # If dns_name attribute is supported by ports API, return the
-                # dns_assignment generated by the Neutron server. Otherwise,
-                # generate hostname and fqdn locally (previous behaviour)
-                if dns_assignment:
-                    hostname = dns_ip_map[alloc.ip_address].hostname
-                    fqdn = dns_ip_map[alloc.ip_address].fqdn
-                else:
-                    hostname = 'host-%s' % alloc.ip_address.replace(
-                        '.', '-').replace(':', '-')
-                    fqdn = hostname
-                    if self.conf.dns_domain:
-                        fqdn = '%s.%s' % (fqdn, self.conf.dns_domain)
-                yield (port, alloc, hostname, fqdn, no_dhcp, no_opts)
+                hostname = dns_ip_map[alloc.ip_address].hostname
+                fqdn = dns_ip_map[alloc.ip_address].fqdn
+            else:
+                hostname = 'host-%s' % alloc.ip_address.replace(
+                    '.', '-').replace(':', '-')
+                fqdn = hostname
+                if self.conf.dns_domain:
+                    fqdn = '%s.%s' % (fqdn, self.conf.dns_domain)
+            yield (port, alloc, hostname, fqdn, no_dhcp, no_opts)
 
     def _get_port_extra_dhcp_opts(self, port):
         return getattr(port, edo_ext.EXTRADHCPOPTS, False)
@@ -676,14 +864,22 @@ class Dnsmasq(DhcpLocalProcess):
         LOG.debug('Building host file: %s', filename)
         dhcp_enabled_subnet_ids = [s.id for s in self.network.subnets
                                    if s.enable_dhcp]
+        for line in self._iter_hosts_file_lines(self._iter_hosts(),
+                                                dhcp_enabled_subnet_ids):
+            buf.write(line)
+
+        file_utils.replace_file(filename, buf.getvalue())
+        LOG.debug('Done building host file %s', filename)
+        return filename
+
+    def _iter_hosts_file_lines(self, host_tuples, dhcp_enabled_subnet_ids):
         # NOTE(ihrachyshka): the loop should not log anything inside it, to
         # avoid potential performance drop when lots of hosts are dumped
-        for host_tuple in self._iter_hosts():
+        for host_tuple in host_tuples:
             port, alloc, hostname, name, no_dhcp, no_opts = host_tuple
             if no_dhcp:
                 if not no_opts and self._get_port_extra_dhcp_opts(port):
-                    buf.write('%s,%s%s\n' %
-                              (port.mac_address, 'set:', port.id))
+                    yield '%s,%s%s\n' % (port.mac_address, 'set:', port.id)
                 continue
 
             # don't write ip address which belongs to a dhcp disabled subnet.
@@ -695,24 +891,19 @@ class Dnsmasq(DhcpLocalProcess):
             if self._get_port_extra_dhcp_opts(port):
                 client_id = self._get_client_id(port)
                 if client_id and len(port.extra_dhcp_opts) > 1:
-                    buf.write('%s,%s%s,%s,%s,%s%s\n' %
-                              (port.mac_address, self._ID, client_id, name,
-                               ip_address, 'set:', port.id))
+                    yield ('%s,%s%s,%s,%s,%s%s\n' %
+                           (port.mac_address, self._ID, client_id, name,
+                            ip_address, 'set:', port.id))
                 elif client_id and len(port.extra_dhcp_opts) == 1:
-                    buf.write('%s,%s%s,%s,%s\n' %
-                          (port.mac_address, self._ID, client_id, name,
-                           ip_address))
+                    yield ('%s,%s%s,%s,%s\n' %
+                           (port.mac_address, self._ID, client_id, name,
+                            ip_address))
                 else:
-                    buf.write('%s,%s,%s,%s%s\n' %
-                              (port.mac_address, name, ip_address,
-                               'set:', port.id))
+                    yield ('%s,%s,%s,%s%s\n' %
+                           (port.mac_address, name, ip_address,
+                            'set:', port.id))
             else:
-                buf.write('%s,%s,%s\n' %
-                          (port.mac_address, name, ip_address))
-
-        file_utils.replace_file(filename, buf.getvalue())
-        LOG.debug('Done building host file %s', filename)
-        return filename
+                yield '%s,%s,%s\n' % (port.mac_address, name, ip_address)
 
     def _get_client_id(self, port):
         if self._get_port_extra_dhcp_opts(port):
@@ -806,19 +997,27 @@ class Dnsmasq(DhcpLocalProcess):
                                   }
         return leases
 
+    def _get_port_leases(self, port):
+        client_id = self._get_client_id(port)
+        return set((alloc.ip_address, port.mac_address, client_id)
+                   for alloc in port.fixed_ips)
+
     def _release_unused_leases(self):
         filename = self.get_conf_file_name('host')
         old_leases = self._read_hosts_file_leases(filename)
-        leases_filename = self.get_conf_file_name('leases')
-        # here is dhcpv6 stuff needed to craft dhcpv6 packet
-        v6_leases = self._read_v6_leases_file_leases(leases_filename)
         new_leases = set()
         for port in self.network.ports:
-            client_id = self._get_client_id(port)
-            for alloc in port.fixed_ips:
-                new_leases.add((alloc.ip_address, port.mac_address, client_id))
+            new_leases |= self._get_port_leases(port)
+        self._release_leases(old_leases - new_leases)
 
-        for ip, mac, client_id in old_leases - new_leases:
+    def _release_leases(self, leases):
+        """Release the leases, a set of (ip, mac, client_id) tuples."""
+        if not leases:
+            return
+        leases_filename = self.get_conf_file_name('leases')
+        # here is dhcpv6 stuff needed to craft dhcpv6 packet
+        v6_leases = self._read_v6_leases_file_leases(leases_filename)
+        for ip, mac, client_id in leases:
             entry = v6_leases.get(ip, None)
             version = netaddr.IPAddress(ip).version
             if entry:
@@ -842,15 +1041,19 @@ class Dnsmasq(DhcpLocalProcess):
         file.
         """
         buf = six.StringIO()
-        for host_tuple in self._iter_hosts():
+        for line in self._iter_addn_hosts_file_lines(self._iter_hosts()):
+            buf.write(line)
+        addn_hosts = self.get_conf_file_name('addn_hosts')
+        file_utils.replace_file(addn_hosts, buf.getvalue())
+        return addn_hosts
+
+    def _iter_addn_hosts_file_lines(self, host_tuples):
+        for host_tuple in host_tuples:
             port, alloc, hostname, fqdn, no_dhcp, no_opts = host_tuple
             # It is compulsory to write the `fqdn` before the `hostname` in
             # order to obtain it in PTR responses.
             if alloc:
-                buf.write('%s\t%s %s\n' % (alloc.ip_address, fqdn, hostname))
-        addn_hosts = self.get_conf_file_name('addn_hosts')
-        file_utils.replace_file(addn_hosts, buf.getvalue())
-        return addn_hosts
+                yield '%s\t%s %s\n' % (alloc.ip_address, fqdn, hostname)
 
     def _output_opts_file(self):
         """Write a dnsmasq compatible options file."""
@@ -943,27 +1146,36 @@ class Dnsmasq(DhcpLocalProcess):
 
     def _generate_opts_per_port(self, subnet_index_map):
         options = []
-        dhcp_ips = collections.defaultdict(list)
         for port in self.network.ports:
-            if self._get_port_extra_dhcp_opts(port):
-                port_ip_versions = set(
-                    [netaddr.IPAddress(ip.ip_address).version
-                     for ip in port.fixed_ips])
-                for opt in port.extra_dhcp_opts:
-                    if opt.opt_name == edo_ext.CLIENT_ID:
-                        continue
-                    opt_ip_version = opt.ip_version
-                    if opt_ip_version in port_ip_versions:
-                        options.append(
-                            self._format_option(opt_ip_version, port.id,
-                                                opt.opt_name, opt.opt_value))
-                    else:
-                        LOG.info(_LI("Cannot apply dhcp option %(opt)s "
-                                     "because it's ip_version %(version)d "
-                                     "is not in port's address IP versions"),
-                                 {'opt': opt.opt_name,
-                                  'version': opt_ip_version})
+            options += self._generate_port_opts(port)
+        return options + self._generate_dhcp_servers_opts(subnet_index_map)
+
+    def _generate_port_opts(self, port):
+        options = []
+        if self._get_port_extra_dhcp_opts(port):
+            port_ip_versions = set(
+                [netaddr.IPAddress(ip.ip_address).version
+                 for ip in port.fixed_ips])
+            for opt in port.extra_dhcp_opts:
+                if opt.opt_name == edo_ext.CLIENT_ID:
+                    continue
+                opt_ip_version = opt.ip_version
+                if opt_ip_version in port_ip_versions:
+                    options.append(
+                        self._format_option(opt_ip_version, port.id,
+                                            opt.opt_name, opt.opt_value))
+                else:
+                    LOG.info(_LI("Cannot apply dhcp option %(opt)s "
+                                 "because it's ip_version %(version)d "
+                                 "is not in port's address IP versions"),
+                             {'opt': opt.opt_name,
+                              'version': opt_ip_version})
+        return options
 
+    def _generate_dhcp_servers_opts(self, subnet_index_map):
+        options = []
+        dhcp_ips = collections.defaultdict(list)
+        for port in self.network.ports:
             # provides all dnsmasq ip as dns-server if there is more than
             # one dnsmasq for a subnet and there is no dns-server submitted
             # by the server
@@ -161,18 +161,21 @@ class LinuxInterfaceDriver(object):
         # 删除端口上的不需要的IP地址
         # 假设namespace = qrouter - 12345
         # 对应的命令行是：ip netns exec qrouter-12345 ip addr del ...
-        for ip_cidr in remove_ips:
-            if clean_connections:
+        if clean_connections:
+            for ip_cidr in remove_ips:
                 device.delete_addr_and_conntrack_state(ip_cidr)
-            else:
+            remove_ips = set()
+
+        with ip_lib.batched_changes():
+            for ip_cidr in remove_ips:
                 device.addr.delete(ip_cidr)
 
-        # add any new addresses
-        # 在端口上添加需要新增的IP地址
-        # 假设namespace = qrouter-12345
-        # 对应的命令行是：ip netns exec qrouter-12345 ip addr add
-        for ip_cidr in cidrs:
-            device.addr.add(ip_cidr)
+            # add any new addresses
+            # 在端口上添加需要新增的IP地址
+            # 假设namespace = qrouter-12345
+            # 对应的命令行是：ip netns exec qrouter-12345 ip addr add
+            for ip_cidr in cidrs:
+                device.addr.add(ip_cidr)
 
     def init_router_port(self,
                          device_name,
@@ -212,15 +215,16 @@ class LinuxInterfaceDriver(object):
         existing_onlink_cidrs = set(r['cidr'] for r in v4_onlink + v6_onlink)
         # 天啊及需要新增的路由表项
         # 对应的命令行是ip netns exec qrouter-12345 ip router add...
-        for route in new_onlink_cidrs - existing_onlink_cidrs:
-            LOG.debug("adding onlink route(%s)", route)
-            device.route.add_onlink_route(route)
-        # 删除需要新增的路由表项
-        # 对应的命令行是ip netns exec qrouter-12345 ip router del...
-        for route in (existing_onlink_cidrs - new_onlink_cidrs -
-                      set(preserve_ips or [])):
-            LOG.debug("deleting onlink route(%s)", route)
-            device.route.delete_onlink_route(route)
+        with ip_lib.batched_changes():
+            for route in new_onlink_cidrs - existing_onlink_cidrs:
+                LOG.debug("adding onlink route(%s)", route)
+                device.route.add_onlink_route(route)
+            # 删除需要新增的路由表项
+            # 对应的命令行是ip netns exec qrouter-12345 ip router del...
+            for route in (existing_onlink_cidrs - new_onlink_cidrs -
+                          set(preserve_ips or [])):
+                LOG.debug("deleting onlink route(%s)", route)
+                device.route.delete_onlink_route(route)
 
     def add_ipv6_addr(self, device_name, v6addr, namespace, scope='global'):
         device = ip_lib.IPDevice(device_name,
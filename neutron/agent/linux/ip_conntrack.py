@@ -101,14 +101,18 @@ class IpConntrackManager(object):
     def _delete_conntrack_state(self, device_info_list, rule, remote_ip=None):
         conntrack_cmds = self._get_conntrack_cmds(device_info_list,
                                                   rule, remote_ip)
-        for cmd in conntrack_cmds:
-            try:
-                self.execute(list(cmd), run_as_root=True,
-                             check_exit_code=True,
-                             extra_ok_codes=[1])
-            except RuntimeError:
-                LOG.exception(
-                    _LE("Failed execute conntrack command %s"), cmd)
+        # the commands are independent, don't wait for each of them in turn
+        linux_utils.run_concurrently(self._execute_conntrack_cmd,
+                                     conntrack_cmds)
+
+    def _execute_conntrack_cmd(self, cmd):
+        try:
+            self.execute(list(cmd), run_as_root=True,
+                         check_exit_code=True,
+                         extra_ok_codes=[1])
+        except RuntimeError:
+            LOG.exception(
+                _LE("Failed execute conntrack command %s"), cmd)
 
     def delete_conntrack_state_by_rule(self, device_info_list, rule):
         self._delete_conntrack_state(device_info_list, rule)
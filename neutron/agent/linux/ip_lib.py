@@ -13,8 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import itertools
 import os
 import re
+import threading
 import time
 
 from debtcollector import removals
@@ -52,6 +55,49 @@ METRIC_PATTERN = re.compile(r"metric (\S+)")
 DEVICE_NAME_PATTERN = re.compile(r"(\d+?): (\S+?):.*")
 
 
+_netlink_batch = threading.local()
+
+
+def _use_netlink():
+    return cfg.CONF.AGENT.ip_lib_backend == 'netlink'
+
+
+@contextlib.contextmanager
+def batched_changes():
+    """Apply the link, address and route changes made in the context at once.
+
+    With the netlink backend, the changes are queued and sent to the
+    privileged helper when the context exits, each namespace's changes
+    going through a single netlink socket. They are not applied if the
+    context exits with an exception. Reads are not deferred, so they don't
+    see the queued changes. With the ip backend, the changes are applied
+    immediately. Nested contexts are part of the outermost one.
+    """
+    if (not _use_netlink() or
+            getattr(_netlink_batch, 'changes', None) is not None):
+        yield
+        return
+    _netlink_batch.changes = []
+    try:
+        yield
+        changes = _netlink_batch.changes
+    finally:
+        _netlink_batch.changes = None
+    for namespace, ns_changes in itertools.groupby(changes,
+                                                   lambda c: c[0]):
+        privileged.apply_netlink_changes(
+            namespace,
+            [(change, kwargs) for _ns, change, kwargs in ns_changes])
+
+
+def _apply_netlink_change(namespace, change, **kwargs):
+    changes = getattr(_netlink_batch, 'changes', None)
+    if changes is not None:
+        changes.append((namespace, change, kwargs))
+    else:
+        privileged.apply_netlink_changes(namespace, [(change, kwargs)])
+
+
 def remove_interface_suffix(interface):
     """Remove a possible "<if>@<endpoint>" suffix from an interface' name.
 
@@ -496,37 +542,63 @@ class IpDeviceCommandBase(IpCommandBase):
     def name(self):
         return self._parent.name
 
+    def _netlink_change(self, change, **kwargs):
+        _apply_netlink_change(self._parent.namespace, change,
+                              device=self.name, **kwargs)
+
 
 class IpLinkCommand(IpDeviceCommandBase):
     COMMAND = 'link'
 
     def set_address(self, mac_address):
+        if _use_netlink():
+            self._netlink_change('set_link_attribute', address=mac_address)
+            return
         self._as_root([], ('set', self.name, 'address', mac_address))
 
     def set_allmulticast_on(self):
         self._as_root([], ('set', self.name, 'allmulticast', 'on'))
 
     def set_mtu(self, mtu_size):
+        if _use_netlink():
+            self._netlink_change('set_link_attribute', mtu=int(mtu_size))
+            return
         self._as_root([], ('set', self.name, 'mtu', mtu_size))
 
     def set_up(self):
+        if _use_netlink():
+            return self._netlink_change('set_link_attribute', state='up')
         return self._as_root([], ('set', self.name, 'up'))
 
     def set_down(self):
+        if _use_netlink():
+            return self._netlink_change('set_link_attribute', state='down')
         return self._as_root([], ('set', self.name, 'down'))
 
     def set_netns(self, namespace):
-        self._as_root([], ('set', self.name, 'netns', namespace))
+        if _use_netlink():
+            self._netlink_change('set_link_attribute', net_ns_fd=namespace)
+        else:
+            self._as_root([], ('set', self.name, 'netns', namespace))
         self._parent.namespace = namespace
 
     def set_name(self, name):
-        self._as_root([], ('set', self.name, 'name', name))
+        if _use_netlink():
+            self._netlink_change('set_link_attribute', ifname=name)
+        else:
+            self._as_root([], ('set', self.name, 'name', name))
         self._parent.name = name
 
     def set_alias(self, alias_name):
+        if _use_netlink():
+            self._netlink_change('set_link_attribute', ifalias=alias_name)
+            return
         self._as_root([], ('set', self.name, 'alias', alias_name))
 
     def delete(self):
+        if _use_netlink():
+            self._netlink_change('delete_link')
+            return
         self._as_root([], ('delete', self.name))
 
     @property
@@ -555,6 +627,9 @@ class IpLinkCommand(IpDeviceCommandBase):
 
     @property
     def attributes(self):
+        if _use_netlink():
+            return privileged.get_link_attributes(self.name,
+                                                  self._parent.namespace)
         return self._parse_line(self._run(['o'], ('show', self.name)))
 
     def _parse_line(self, value):
@@ -575,6 +650,13 @@ class IpAddrCommand(IpDeviceCommandBase):
 
     def add(self, cidr, scope='global', add_broadcast=True):
         net = netaddr.IPNetwork(cidr)
+        if _use_netlink():
+            broadcast = (str(net[-1]) if add_broadcast and net.version == 4
+                         else None)
+            self._netlink_change('add_ip_address',
+                                 cidr='%s/%s' % (net.ip, net.prefixlen),
+                                 scope=scope, broadcast=broadcast)
+            return
         args = ['add', cidr,
                 'scope', scope,
                 'dev', self.name]
@@ -583,12 +665,20 @@ class IpAddrCommand(IpDeviceCommandBase):
         self._as_root([net.version], tuple(args))
 
     def delete(self, cidr):
+        if _use_netlink():
+            net = netaddr.IPNetwork(cidr)
+            self._netlink_change('delete_ip_address',
+                                 cidr='%s/%s' % (net.ip, net.prefixlen))
+            return
         ip_version = get_ip_version(cidr)
         self._as_root([ip_version],
                       ('del', cidr,
                        'dev', self.name))
 
     def flush(self, ip_version):
+        if _use_netlink():
+            self._netlink_change('flush_ip_addresses', ip_version=ip_version)
+            return
         self._as_root([ip_version], ('flush', self.name))
 
     def get_devices_with_ip(self, name=None, scope=None, to=None,
@@ -603,6 +693,16 @@ class IpAddrCommand(IpDeviceCommandBase):
         :param filters: list of any other filters supported by /sbin/ip
         :param ip_version: 4 or 6
         """
+        if _use_netlink() and not filters:
+            addresses = privileged.get_ip_addresses(
+                self._parent.namespace, device=name, ip_version=ip_version,
+                scope=scope)
+            if to:
+                to_net = netaddr.IPNetwork(to)
+                addresses = [a for a in addresses
+                             if netaddr.IPNetwork(a['cidr']).ip in to_net]
+            return list(addresses)
+
         options = [ip_version] if ip_version else []
 
         args = ['show']
@@ -694,8 +794,23 @@ class IpRouteCommand(IpDeviceCommandBase):
     def _dev_args(self):
         return ['dev', self.name] if self.name else []
 
+    def _netlink_route_change(self, change, ip_version, cidr=None, via=None,
+                              table=None, **kwargs):
+        try:
+            _apply_netlink_change(self._parent.namespace, change,
+                                  ip_version=ip_version, cidr=cidr, via=via,
+                                  device=self.name,
+                                  table=table or self._table, **kwargs)
+        except privileged.NetworkInterfaceNotFound:
+            raise exceptions.DeviceNotFoundError(device_name=self.name)
+
     def add_gateway(self, gateway, metric=None, table=None):
         ip_version = get_ip_version(gateway)
+        if _use_netlink():
+            self._netlink_route_change('replace_route', ip_version,
+                                       via=gateway, table=table,
+                                       metric=metric)
+            return
         args = ['replace', 'default', 'via', gateway]
         if metric:
             args += ['metric', metric]
@@ -714,6 +829,10 @@ class IpRouteCommand(IpDeviceCommandBase):
 
     def delete_gateway(self, gateway, table=None):
         ip_version = get_ip_version(gateway)
+        if _use_netlink():
+            self._netlink_route_change('delete_route', ip_version,
+                                       via=gateway, table=table)
+            return
         args = ['del', 'default',
                 'via', gateway]
         args += self._dev_args()
@@ -800,6 +919,11 @@ class IpRouteCommand(IpDeviceCommandBase):
 
     def add_route(self, cidr, via=None, table=None, **kwargs):
         ip_version = get_ip_version(cidr)
+        if _use_netlink() and set(kwargs) <= set(['scope']):
+            self._netlink_route_change('replace_route', ip_version,
+                                       cidr=cidr, via=via, table=table,
+                                       **kwargs)
+            return
         args = ['replace', cidr]
         if via:
             args += ['via', via]
@@ -811,6 +935,11 @@ class IpRouteCommand(IpDeviceCommandBase):
 
     def delete_route(self, cidr, via=None, table=None, **kwargs):
         ip_version = get_ip_version(cidr)
+        if _use_netlink() and set(kwargs) <= set(['scope']):
+            self._netlink_route_change('delete_route', ip_version,
+                                       cidr=cidr, via=via, table=table,
+                                       **kwargs)
+            return
         args = ['del', cidr]
         if via:
             args += ['via', via]
@@ -877,13 +1006,19 @@ class IpNetnsCommand(IpCommandBase):
     COMMAND = 'netns'
 
     def add(self, name):
-        self._as_root([], ('add', name), use_root_namespace=True)
+        if _use_netlink():
+            privileged.create_netns(name)
+        else:
+            self._as_root([], ('add', name), use_root_namespace=True)
         wrapper = IPWrapper(namespace=name)
         wrapper.netns.execute(['sysctl', '-w',
                                'net.ipv4.conf.all.promote_secondaries=1'])
         return wrapper
 
     def delete(self, name):
+        if _use_netlink():
+            privileged.remove_netns(name)
+            return
         self._as_root([], ('delete', name), use_root_namespace=True)
 
     def execute(self, cmds, addl_env=None, check_exit_code=True,
@@ -905,6 +1040,8 @@ class IpNetnsCommand(IpCommandBase):
                              log_fail_as_error=log_fail_as_error, **kwargs)
 
     def exists(self, name):
+        if _use_netlink():
+            return name in privileged.list_netns()
         output = self._parent._execute(
             ['o'], 'netns', ['list'],
             run_as_root=cfg.CONF.AGENT.use_helper_for_ns_read)
@@ -86,6 +86,8 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         self.sg_members = collections.defaultdict(
             lambda: collections.defaultdict(list))
         self.pre_sg_members = None
+        # (remote group id, ethertype) -> (member ips, their prefixes)
+        self._sg_member_prefixes = {}
         self.enable_ipset = cfg.CONF.SECURITYGROUP.enable_ipset
         self._enabled_netfilter_for_bridges = False
         self.updated_rule_sg_ids = set()
@@ -551,18 +553,33 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         if remote_group_id:
             ethertype = rule['ethertype']
             port_ips = port.get('fixed_ips', [])
+            direction_ip_prefix = firewall.DIRECTION_IP_PREFIX[direction]
 
-            for ip in self.sg_members[remote_group_id][ethertype]:
+            for ip, ip_prefix in self._get_sg_member_prefixes(
+                    remote_group_id, ethertype):
                 if ip not in port_ips:
                     ip_rule = rule.copy()
-                    direction_ip_prefix = firewall.DIRECTION_IP_PREFIX[
-                        direction]
-                    ip_prefix = str(netaddr.IPNetwork(ip).cidr)
                     ip_rule[direction_ip_prefix] = ip_prefix
                     yield ip_rule
         else:
             yield rule
 
+    def _get_sg_member_prefixes(self, remote_group_id, ethertype):
+        """Return the (ip, prefix) pairs of the members of a remote group.
+
+        The prefixes are computed once per update of the members, rather
+        than once per port and rule referencing the remote group.
+        """
+        member_ips = self.sg_members[remote_group_id][ethertype]
+        key = (remote_group_id, ethertype)
+        cached = self._sg_member_prefixes.get(key)
+        if cached is None or cached[0] is not member_ips:
+            cached = (member_ips,
+                      [(ip, str(netaddr.IPNetwork(ip).cidr))
+                       for ip in member_ips])
+            self._sg_member_prefixes[key] = cached
+        return cached[1]
+
     def _get_remote_sg_ids(self, port, direction=None):
         sg_ids = port.get('security_groups', [])
         remote_sg_ids = {constants.IPv4: set(), constants.IPv6: set()}
@@ -826,6 +843,8 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         for sg_id in (ipv4_sec_group_set & ipv6_sec_group_set):
             if sg_id in self.sg_members:
                 del self.sg_members[sg_id]
+            for ethertype in (constants.IPv4, constants.IPv6):
+                self._sg_member_prefixes.pop((sg_id, ethertype), None)
 
     def _find_deleted_sg_rules(self, sg_id):
         del_rules = list()
@@ -24,6 +24,7 @@ import difflib
 import os
 import re
 import sys
+import time
 
 from oslo_concurrency import lockutils
 from oslo_config import cfg
@@ -118,6 +119,9 @@ class IptablesRule(object):
     def __ne__(self, other):
         return not self == other
 
+    def __hash__(self):
+        return hash((self.chain, self.rule, self.top, self.wrap))
+
     def __str__(self):
         if self.wrap:
             chain = '%s-%s' % (self.wrap_name, self.chain)
@@ -130,16 +134,42 @@ class IptablesRule(object):
 
 
 class IptablesTable(object):
-    """An iptables table."""
+    """An iptables table.
+
+    Rules are indexed per (chain, wrap) pair, each chain keeping its rules
+    in insertion order in a hashed mapping, so that membership checks and
+    removals do not have to scan every rule of the table. The names of the
+    chains modified since the last successful apply are recorded in
+    dirty_chains.
+    """
 
     def __init__(self, binary_name=binary_name):
-        self.rules = []
+        # (chain, wrap) -> OrderedDict(IptablesRule -> [IptablesRule, ...]);
+        # the value list holds every instance added for an equal rule since
+        # equal rules may differ by tag or comment.
+        self._rules = collections.OrderedDict()
         self.remove_rules = []
         self.chains = set()
         self.unwrapped_chains = set()
         self.remove_chains = set()
+        self.dirty_chains = set()
         self.wrap_name = binary_name[:16]
 
+    @property
+    def rules(self):
+        return [rule
+                for chain_rules in self._rules.values()
+                for instances in chain_rules.values()
+                for rule in instances]
+
+    def _get_full_chain_name(self, chain, wrap):
+        if wrap:
+            return '%s-%s' % (self.wrap_name, chain)
+        return chain
+
+    def _mark_dirty(self, chain, wrap):
+        self.dirty_chains.add(self._get_full_chain_name(chain, wrap))
+
     def add_chain(self, name, wrap=True):
         """Adds a named chain to the table.
 
@@ -157,6 +187,7 @@ class IptablesTable(object):
             self.chains.add(name)
         else:
             self.unwrapped_chains.add(name)
+        self._mark_dirty(name, wrap)
 
     def _select_chain_set(self, wrap):
         if wrap:
@@ -182,6 +213,7 @@ class IptablesTable(object):
             return
 
         chain_set.remove(name)
+        self._mark_dirty(name, wrap)
 
         if not wrap:
             # non-wrapped chains and rules need to be dealt with specially,
@@ -196,10 +228,18 @@ class IptablesTable(object):
         else:
             jump_snippet = '-j %s-%s' % (self.wrap_name, name)
 
-        # Remove rules from list that have a matching chain name or
-        # a matching jump chain
-        self.rules = [r for r in self.rules
-                      if r.chain != name and jump_snippet not in r.rule]
+        # Remove rules that have a matching chain name or a matching jump
+        # chain
+        for (chain, chain_wrap), chain_rules in list(self._rules.items()):
+            if chain == name:
+                del self._rules[(chain, chain_wrap)]
+                self._mark_dirty(chain, chain_wrap)
+                continue
+            jumps = [r for r in chain_rules if jump_snippet in r.rule]
+            for rule in jumps:
+                del chain_rules[rule]
+            if jumps:
+                self._mark_dirty(chain, chain_wrap)
 
     def add_rule(self, chain, rule, wrap=True, top=False, tag=None,
                  comment=None):
@@ -221,8 +261,12 @@ class IptablesTable(object):
             rule = ' '.join(
                 self._wrap_target_chain(e, wrap) for e in rule.split(' '))
 
-        self.rules.append(IptablesRule(chain, rule, wrap, top, self.wrap_name,
-                                       tag, comment))
+        iptables_rule = IptablesRule(chain, rule, wrap, top, self.wrap_name,
+                                     tag, comment)
+        chain_rules = self._rules.setdefault((chain, wrap),
+                                             collections.OrderedDict())
+        chain_rules.setdefault(iptables_rule, []).append(iptables_rule)
+        self._mark_dirty(chain, wrap)
 
     def _wrap_target_chain(self, s, wrap):
         if s.startswith('$'):
@@ -230,6 +274,17 @@ class IptablesTable(object):
 
         return s
 
+    def _remove_rule_instance(self, rule):
+        chain_rules = self._rules.get((rule.chain, rule.wrap), {})
+        instances = chain_rules.get(rule)
+        if not instances:
+            return False
+        instances.pop(0)
+        if not instances:
+            del chain_rules[rule]
+        self._mark_dirty(rule.chain, rule.wrap)
+        return True
+
     def remove_rule(self, chain, rule, wrap=True, top=False, comment=None):
         """Remove a rule from a chain.
 
@@ -239,41 +294,46 @@ class IptablesTable(object):
 
         """
         chain = get_chain_name(chain, wrap)
-        try:
-            if '$' in rule:
-                rule = ' '.join(
-                    self._wrap_target_chain(e, wrap) for e in rule.split(' '))
-
-            self.rules.remove(IptablesRule(chain, rule, wrap, top,
-                                           self.wrap_name,
-                                           comment=comment))
-            if not wrap:
-                self.remove_rules.append(str(IptablesRule(chain, rule, wrap,
-                                                          top, self.wrap_name,
-                                                          comment=comment)))
-        except ValueError:
+        if '$' in rule:
+            rule = ' '.join(
+                self._wrap_target_chain(e, wrap) for e in rule.split(' '))
+
+        iptables_rule = IptablesRule(chain, rule, wrap, top, self.wrap_name,
+                                     comment=comment)
+        if not self._remove_rule_instance(iptables_rule):
             LOG.warning(_LW('Tried to remove rule that was not there:'
                             ' %(chain)r %(rule)r %(wrap)r %(top)r'),
                         {'chain': chain, 'rule': rule,
                          'top': top, 'wrap': wrap})
+            return
+        if not wrap:
+            self.remove_rules.append(str(iptables_rule))
 
     def _get_chain_rules(self, chain, wrap):
         chain = get_chain_name(chain, wrap)
-        return [rule for rule in self.rules
-                if rule.chain == chain and rule.wrap == wrap]
+        return [rule
+                for instances in self._rules.get((chain, wrap), {}).values()
+                for rule in instances]
 
     def empty_chain(self, chain, wrap=True):
         """Remove all rules from a chain."""
-        chained_rules = self._get_chain_rules(chain, wrap)
-        for rule in chained_rules:
-            self.rules.remove(rule)
+        chain = get_chain_name(chain, wrap)
+        if self._rules.pop((chain, wrap), None):
+            self._mark_dirty(chain, wrap)
 
     def clear_rules_by_tag(self, tag):
         if not tag:
             return
-        rules = [rule for rule in self.rules if rule.tag == tag]
-        for rule in rules:
-            self.rules.remove(rule)
+        for (chain, wrap), chain_rules in self._rules.items():
+            for rule, instances in list(chain_rules.items()):
+                kept = [r for r in instances if r.tag != tag]
+                if len(kept) == len(instances):
+                    continue
+                if kept:
+                    chain_rules[rule] = kept
+                else:
+                    del chain_rules[rule]
+                self._mark_dirty(chain, wrap)
 
 
 class IptablesManager(object):
@@ -310,6 +370,11 @@ class IptablesManager(object):
         self.namespace = namespace
         self.iptables_apply_deferred = False
         self.wrap_name = binary_name[:16]
+        # Last committed state of every table, per command ('iptables' or
+        # 'ip6tables'), used instead of iptables-save output when
+        # iptables_incremental_apply is enabled.
+        self._committed_rules = {}
+        self._last_save_time = {}
 
         self.ipv4 = {'filter': IptablesTable(binary_name=self.wrap_name)}
         self.ipv6 = {'filter': IptablesTable(binary_name=self.wrap_name)}
@@ -455,7 +520,9 @@ class IptablesManager(object):
             first = self._apply_synchronized()
             if not cfg.CONF.AGENT.debug_iptables_rules:
                 return first
-            second = self._apply_synchronized()
+            # the second pass has to compare against the real kernel state
+            # or it would trivially converge on the committed copy
+            second = self._apply_synchronized(force_save=True)
             if second:
                 msg = (_("IPTables Rules did not converge. Diff: %s") %
                        '\n'.join(second))
@@ -507,7 +574,48 @@ class IptablesManager(object):
                       "following set of iptables rules:\n%s"),
                   '\n'.join(log_lines))
 
-    def _apply_synchronized(self):
+    def _need_iptables_save(self, cmd):
+        if not cfg.CONF.AGENT.iptables_incremental_apply:
+            return True
+        if cmd not in self._committed_rules:
+            return True
+        interval = cfg.CONF.AGENT.iptables_drift_check_interval
+        return bool(interval and
+                    time.time() - self._last_save_time[cmd] >= interval)
+
+    def _get_current_rules(self, cmd, tables):
+        """Return the current lines of every table, keyed by table name.
+
+        The rules are read with iptables-save. Returns None if the namespace
+        disappeared in the meantime.
+        """
+        args = ['%s-save' % (cmd,)]
+        if self.namespace:
+            args = ['ip', 'netns', 'exec', self.namespace] + args
+        try:
+            save_output = self.execute(args, run_as_root=True)
+        except RuntimeError:
+            # We could be racing with a cron job deleting namespaces.
+            # It is useless to try to apply iptables rules over and
+            # over again in a endless loop if the namespace does not
+            # exist.
+            with excutils.save_and_reraise_exception() as ctx:
+                if (self.namespace and not
+                        ip_lib.IPWrapper().netns.exists(self.namespace)):
+                    ctx.reraise = False
+                    LOG.error(_LE("Namespace %s was deleted during "
+                              "IPTables operations."), self.namespace)
+                    return
+        self._last_save_time[cmd] = time.time()
+        all_lines = save_output.split('\n')
+        current_rules = {}
+        for table_name in tables:
+            # isolate the lines of the table we are modifying
+            start, end = self._find_table(all_lines, table_name)
+            current_rules[table_name] = all_lines[start:end]
+        return current_rules
+
+    def _apply_synchronized(self, force_save=False):
         """Apply the current in-memory set of iptables rules.
 
         This will create a diff between the rules from the previous runs
@@ -521,36 +629,30 @@ class IptablesManager(object):
             s += [('ip6tables', self.ipv6)]
         all_commands = []  # variable to keep track all commands for return val
         for cmd, tables in s:
-            args = ['%s-save' % (cmd,)]
-            if self.namespace:
-                args = ['ip', 'netns', 'exec', self.namespace] + args
-            try:
-                save_output = self.execute(args, run_as_root=True)
-            except RuntimeError:
-                # We could be racing with a cron job deleting namespaces.
-                # It is useless to try to apply iptables rules over and
-                # over again in a endless loop if the namespace does not
-                # exist.
-                with excutils.save_and_reraise_exception() as ctx:
-                    if (self.namespace and not
-                            ip_lib.IPWrapper().netns.exists(self.namespace)):
-                        ctx.reraise = False
-                        LOG.error(_LE("Namespace %s was deleted during "
-                                  "IPTables operations."), self.namespace)
-                        return []
-            all_lines = save_output.split('\n')
+            use_committed = (not force_save and
+                             not self._need_iptables_save(cmd))
+            if use_committed:
+                current_rules = self._committed_rules[cmd]
+            else:
+                current_rules = self._get_current_rules(cmd, tables)
+                if current_rules is None:
+                    self._committed_rules.clear()
+                    return []
             commands = []
+            committed_rules = {}
             # Traverse tables in sorted order for predictable dump output
             for table_name in sorted(tables):
                 table = tables[table_name]
-                # isolate the lines of the table we are modifying
-                start, end = self._find_table(all_lines, table_name)
-                old_rules = all_lines[start:end]
+                old_rules = current_rules.get(table_name, [])
                 # generate the new table state we want
                 new_rules = self._modify_rules(old_rules, table, table_name)
+                committed_rules[table_name] = new_rules
                 # generate the iptables commands to get between the old state
-                # and the new state
-                changes = _generate_path_between_rules(old_rules, new_rules)
+                # and the new state; compared to the committed copy only the
+                # chains touched since the last apply can have changed
+                changes = _generate_path_between_rules(
+                    old_rules, new_rules,
+                    table.dirty_chains if use_committed else None)
                 if changes:
                     # if there are changes to the table, we put on the header
                     # and footer that iptables-save needs
@@ -558,6 +660,7 @@ class IptablesManager(object):
                                  ['*%s' % table_name] + changes +
                                  ['COMMIT', '# Completed by iptables_manager'])
             if not commands:
+                self._set_committed_rules(cmd, tables, committed_rules)
                 continue
             all_commands += commands
 
@@ -578,13 +681,21 @@ class IptablesManager(object):
                 # acquire xlock.
                 err = self._run_restore(args, commands, lock=True)
             if err:
+                # the kernel state is unknown now, re-read it next time
+                self._committed_rules.pop(cmd, None)
                 self._log_restore_err(err, commands)
                 raise err
+            self._set_committed_rules(cmd, tables, committed_rules)
 
         LOG.debug("IPTablesManager.apply completed with success. %d iptables "
                   "commands were issued", len(all_commands))
         return all_commands
 
+    def _set_committed_rules(self, cmd, tables, committed_rules):
+        self._committed_rules[cmd] = committed_rules
+        for table in tables.values():
+            table.dirty_chains.clear()
+
     def _find_table(self, lines, table_name):
         if len(lines) < 3:
             # length only <2 when fake iptables
@@ -637,8 +748,10 @@ class IptablesManager(object):
         # the unwrapped chains (e.g. neutron-filter-top) may already exist in
         # the new_filter since they aren't marked by the wrap_name so we only
         # want to add them if they arent' already there
+        declared_chains = set(line[1:].split(' ', 1)[0]
+                              for line in new_filter if line.startswith(':'))
         our_chains += [':%s' % name for name in unwrapped_chains
-                       if not any(':%s' % name in s for s in new_filter)]
+                       if name not in declared_chains]
 
         our_top_rules = []
         our_bottom_rules = []
@@ -752,12 +865,15 @@ class IptablesManager(object):
         return acc
 
 
-def _generate_path_between_rules(old_rules, new_rules):
+def _generate_path_between_rules(old_rules, new_rules, changed_chains=None):
     """Generates iptables commands to get from old_rules to new_rules.
 
     This function diffs the two rule sets and then calculates the iptables
     commands necessary to get from the old rules to the new rules using
     insert and delete commands.
+
+    If changed_chains is given, the rules of the chains present in both rule
+    sets are only compared for the chains it contains.
     """
     old_by_chain = _get_rules_by_chain(old_rules)
     new_by_chain = _get_rules_by_chain(new_rules)
@@ -770,6 +886,9 @@ def _generate_path_between_rules(old_rules, new_rules):
     sg_chains = []
     other_chains = []
     for chain in sorted(old_chains | new_chains):
+        if (changed_chains is not None and chain not in changed_chains and
+                chain in old_chains and chain in new_chains):
+            continue
         if '-sg-' in chain:
             sg_chains.append(chain)
         else:
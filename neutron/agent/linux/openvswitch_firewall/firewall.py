@@ -89,9 +89,10 @@ class SecurityGroup(object):
 
     def get_ethertype_filtered_addresses(self, ethertype,
                                          exclude_addresses=None):
-        exclude_addresses = set(exclude_addresses) or set()
-        group_addresses = set(self.members.get(ethertype, []))
-        return list(group_addresses - exclude_addresses)
+        exclude_addresses = set(exclude_addresses or [])
+        # the members of large groups are not copied for each port
+        return [address for address in self.members.get(ethertype, [])
+                if address not in exclude_addresses]
 
 
 class OFPort(object):
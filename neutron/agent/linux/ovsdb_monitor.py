@@ -12,13 +12,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from ovs.db import idl
 
 from neutron._i18n import _LE
+from neutron.agent.common import ovs_lib
 from neutron.agent.linux import async_process
 from neutron.agent.ovsdb import api as ovsdb
+from neutron.agent.ovsdb.native import connection
 from neutron.agent.ovsdb.native import helpers
+from neutron.agent.ovsdb.native import idlutils
 from neutron.common import utils
 
 
@@ -123,3 +129,129 @@ class SimpleInterfaceMonitor(OvsdbMonitor):
         super(SimpleInterfaceMonitor, self).start()
         if block:
             utils.wait_until_true(self.is_active)
+
+
+class InterfaceMonitorIdl(idl.Idl):
+    """Idl forwarding Interface row changes to a NativeInterfaceMonitor."""
+
+    def __init__(self, monitor, remote, schema_helper):
+        super(InterfaceMonitorIdl, self).__init__(remote, schema_helper)
+        self._monitor = monitor
+
+    def notify(self, event, row, updates=None):
+        self._monitor.handle_row_event(event, row)
+
+    def run(self):
+        changed = super(InterfaceMonitorIdl, self).run()
+        # The IDL drops its rows without notification when it reconnects to
+        # the server and only notifies the creation of the rows found in the
+        # new dump, so rows removed while disconnected have to be found by
+        # comparing the tables.
+        rows = self.tables['Interface'].rows
+        if len(rows) != self._monitor.interface_count:
+            self._monitor.remove_stale_rows(rows)
+        return changed
+
+
+class NativeInterfaceMonitor(object):
+    """Monitors the Interface table through the native OVSDB IDL.
+
+    The change notifications of the IDL are used to keep a local replica of
+    the Interface rows and to build events in the same format as the ones
+    of SimpleInterfaceMonitor, without running an 'ovsdb-client monitor'
+    process.
+    """
+
+    def __init__(self, ovsdb_connection, timeout):
+        self.ovsdb_connection = ovsdb_connection
+        self.timeout = timeout
+        self._connection = None
+        self._active = False
+        self._lock = threading.Lock()
+        self._interfaces = {}
+        self._uuids_by_name = {}
+        self.new_events = {'added': [], 'removed': []}
+
+    def _idl_factory(self):
+        helper = idlutils.get_schema_helper(self.ovsdb_connection,
+                                            'Open_vSwitch')
+        helper.register_columns('Interface',
+                                ['name', 'ofport', 'external_ids'])
+        return InterfaceMonitorIdl(self, self.ovsdb_connection, helper)
+
+    @staticmethod
+    def _row_to_device(row):
+        return {'name': row.name,
+                'ofport': (row.ofport[0] if row.ofport
+                           else ovs_lib.UNASSIGNED_OFPORT),
+                'external_ids': dict(row.external_ids)}
+
+    @property
+    def interface_count(self):
+        return len(self._interfaces)
+
+    def handle_row_event(self, event, row):
+        with self._lock:
+            if event == idl.ROW_DELETE:
+                device = self._interfaces.pop(row.uuid, None)
+                if device:
+                    self._uuids_by_name.pop(device['name'], None)
+                    self.new_events['removed'].append(dict(device))
+                return
+            device = self._row_to_device(row)
+            old_device = self._interfaces.get(row.uuid)
+            self._interfaces[row.uuid] = device
+            self._uuids_by_name[device['name']] = row.uuid
+            if old_device is None:
+                self.new_events['added'].append(dict(device))
+            elif old_device['ofport'] != device['ofport']:
+                # same as the 'new' action of SimpleInterfaceMonitor: only
+                # refresh the ofport of the pending events
+                for added in self.new_events['added']:
+                    if added['name'] == device['name']:
+                        added['ofport'] = device['ofport']
+
+    def remove_stale_rows(self, rows):
+        with self._lock:
+            for uuid in set(self._interfaces) - set(rows):
+                device = self._interfaces.pop(uuid)
+                self._uuids_by_name.pop(device['name'], None)
+                self.new_events['removed'].append(dict(device))
+
+    def get_interfaces(self, names):
+        """Return the replicated rows of the interfaces named in names."""
+        with self._lock:
+            return [dict(self._interfaces[self._uuids_by_name[name]])
+                    for name in names if name in self._uuids_by_name]
+
+    def is_active(self):
+        return self._active
+
+    @property
+    def has_updates(self):
+        return bool(self.new_events['added'] or self.new_events['removed'])
+
+    def get_events(self):
+        with self._lock:
+            events = self.new_events
+            self.new_events = {'added': [], 'removed': []}
+        return events
+
+    def start(self, block=False, timeout=5):
+        if self._connection is None:
+            # the initial dump of the table is notified as created rows
+            self._connection = connection.Connection(
+                idl_factory=self._idl_factory, timeout=self.timeout)
+            self._connection.start()
+        else:
+            # like a respawned ovsdb-client, report all the known interfaces
+            # as added
+            with self._lock:
+                self.new_events['added'].extend(
+                    dict(device) for device in self._interfaces.values())
+        self._active = True
+
+    def stop(self):
+        # The IDL connection is kept so that restarting the monitor does not
+        # need to download the table again.
+        self._active = False
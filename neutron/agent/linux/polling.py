@@ -29,10 +29,12 @@ LOG = logging.getLogger(__name__)
 @contextlib.contextmanager
 def get_polling_manager(minimize_polling=False,
                         ovsdb_monitor_respawn_interval=(
-                            constants.DEFAULT_OVSDBMON_RESPAWN)):
+                            constants.DEFAULT_OVSDBMON_RESPAWN),
+                        native_monitor=False):
     if minimize_polling:
         pm = InterfacePollingMinimizer(
-            ovsdb_monitor_respawn_interval=ovsdb_monitor_respawn_interval)
+            ovsdb_monitor_respawn_interval=ovsdb_monitor_respawn_interval,
+            native_monitor=native_monitor)
         pm.start()
     else:
         pm = base_polling.AlwaysPoll()
@@ -48,12 +50,18 @@ class InterfacePollingMinimizer(base_polling.BasePollingManager):
 
     def __init__(
             self,
-            ovsdb_monitor_respawn_interval=constants.DEFAULT_OVSDBMON_RESPAWN):
+            ovsdb_monitor_respawn_interval=constants.DEFAULT_OVSDBMON_RESPAWN,
+            native_monitor=False):
 
         super(InterfacePollingMinimizer, self).__init__()
-        self._monitor = ovsdb_monitor.SimpleInterfaceMonitor(
-            respawn_interval=ovsdb_monitor_respawn_interval,
-            ovsdb_connection=cfg.CONF.OVS.ovsdb_connection)
+        if native_monitor:
+            self._monitor = ovsdb_monitor.NativeInterfaceMonitor(
+                ovsdb_connection=cfg.CONF.OVS.ovsdb_connection,
+                timeout=cfg.CONF.ovs_vsctl_timeout)
+        else:
+            self._monitor = ovsdb_monitor.SimpleInterfaceMonitor(
+                respawn_interval=ovsdb_monitor_respawn_interval,
+                ovsdb_connection=cfg.CONF.OVS.ovsdb_connection)
 
     def start(self):
         self._monitor.start(block=True)
@@ -72,3 +80,13 @@ class InterfacePollingMinimizer(base_polling.BasePollingManager):
 
     def get_events(self):
         return self._monitor.get_events()
+
+    def get_interfaces(self, names):
+        """Return the Interface rows named in names from the local replica.
+
+        None is returned when the monitor does not keep a replica of the
+        Interface table.
+        """
+        get_interfaces = getattr(self._monitor, 'get_interfaces', None)
+        if get_interfaces:
+            return get_interfaces(names)
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import contextlib
 import fcntl
 import glob
 import grp
@@ -22,11 +24,13 @@ import shlex
 import socket
 import struct
 import threading
+import time
 
 import debtcollector
 import eventlet
 from eventlet.green import subprocess
 from eventlet import greenthread
+from eventlet import semaphore
 from neutron_lib import constants
 from neutron_lib.utils import helpers
 from oslo_config import cfg
@@ -54,8 +58,40 @@ class ProcessExecutionError(RuntimeError):
         self.returncode = returncode
 
 
+class RootwrapDaemonPool(object):
+    """Pool of long-lived root helper daemon clients.
+
+    Each client has its own daemon, so up to size commands run concurrently
+    instead of being serialized on a single daemon socket. Clients are
+    created on demand and callers wait for a free one when all of them are
+    busy.
+    """
+
+    def __init__(self, size, client_factory):
+        self.size = size
+        self._client_factory = client_factory
+        self._semaphore = semaphore.Semaphore(size)
+        self._idle_clients = []
+
+    @contextlib.contextmanager
+    def client(self):
+        with self._semaphore:
+            if self._idle_clients:
+                cmd_client = self._idle_clients.pop()
+            else:
+                cmd_client = self._client_factory()
+            try:
+                yield cmd_client
+            finally:
+                self._idle_clients.append(cmd_client)
+
+    def execute(self, cmd, process_input):
+        with self.client() as cmd_client:
+            return cmd_client.execute(cmd, process_input)
+
+
 class RootwrapDaemonHelper(object):
-    __client = None
+    __pool = None
     __lock = threading.Lock()
 
     def __new__(cls):
@@ -64,15 +100,99 @@ class RootwrapDaemonHelper(object):
 
     @classmethod
     def get_client(cls):
+        """Create a new root helper daemon client."""
+        if xenapi_root_helper.ROOT_HELPER_DAEMON_TOKEN == \
+                cfg.CONF.AGENT.root_helper_daemon:
+            return xenapi_root_helper.XenAPIClient()
+        return client.Client(shlex.split(cfg.CONF.AGENT.root_helper_daemon))
+
+    @classmethod
+    def get_pool(cls):
+        with cls.__lock:
+            if cls.__pool is None:
+                cls.__pool = RootwrapDaemonPool(
+                    cfg.CONF.AGENT.root_helper_daemon_pool_size,
+                    lambda: cls.get_client())
+            return cls.__pool
+
+    @classmethod
+    def reset_pool(cls):
+        """Forget the clients of the pool, e.g. in a forked process."""
         with cls.__lock:
-            if cls.__client is None:
-                if xenapi_root_helper.ROOT_HELPER_DAEMON_TOKEN == \
-                    cfg.CONF.AGENT.root_helper_daemon:
-                    cls.__client = xenapi_root_helper.XenAPIClient()
-                else:
-                    cls.__client = client.Client(
-                        shlex.split(cfg.CONF.AGENT.root_helper_daemon))
-            return cls.__client
+            cls.__pool = None
+
+
+class CommandStats(object):
+    """Number of runs, errors and latency of the executed commands."""
+
+    def __init__(self):
+        self._stats = collections.defaultdict(
+            lambda: {'count': 0, 'errors': 0,
+                     'total_time': 0.0, 'max_time': 0.0})
+
+    @staticmethod
+    def get_command_name(cmd):
+        """Return the name commands are accounted under.
+
+        The environment and namespace wrappers are skipped, and the object
+        of ip commands is kept, e.g. 'ip link' or 'ip addr'.
+        """
+        cmd = [str(arg) for arg in cmd]
+        if cmd and cmd[0] == 'env':
+            cmd = cmd[1:]
+            while cmd and '=' in cmd[0]:
+                cmd = cmd[1:]
+        if cmd[:3] == ['ip', 'netns', 'exec']:
+            cmd = cmd[4:]
+        if not cmd:
+            return ''
+        name = os.path.basename(cmd[0])
+        if name == 'ip':
+            args = [arg for arg in cmd[1:] if not arg.startswith('-')]
+            if args:
+                name = '%s %s' % (name, args[0])
+        return name
+
+    def record(self, name, duration, failed=False):
+        stats = self._stats[name]
+        stats['count'] += 1
+        if failed:
+            stats['errors'] += 1
+        stats['total_time'] += duration
+        stats['max_time'] = max(stats['max_time'], duration)
+
+    def get_stats(self):
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self):
+        self._stats.clear()
+
+
+COMMAND_STATS = CommandStats()
+
+
+def get_command_stats():
+    """Return the execution statistics of the commands run by this process.
+
+    :returns: a dict mapping the command names to dicts with the 'count',
+              'errors', 'total_time' and 'max_time' keys, times in seconds.
+    """
+    return COMMAND_STATS.get_stats()
+
+
+def log_command_stats():
+    """Log the execution statistics of the commands run by this process."""
+    stats = COMMAND_STATS.get_stats()
+    for name in sorted(stats):
+        command_stats = stats[name]
+        LOG.debug("Command %(name)s: %(count)d runs, %(errors)d errors, "
+                  "%(avg).3f seconds average, %(max).3f seconds max",
+                  {'name': name,
+                   'count': command_stats['count'],
+                   'errors': command_stats['errors'],
+                   'avg': (command_stats['total_time'] /
+                           command_stats['count']),
+                   'max': command_stats['max_time']})
 
 
 def addl_env_args(addl_env):
@@ -111,9 +231,8 @@ def execute_rootwrap_daemon(cmd, process_input, addl_env):
     # would throw those errors, and if it does it should be fixed as opposed to
     # just logging the execution error.
     LOG.debug("Running command (rootwrap daemon): %s", cmd)
-    client = RootwrapDaemonHelper.get_client()
     try:
-        return client.execute(cmd, process_input)
+        return RootwrapDaemonHelper.get_pool().execute(cmd, process_input)
     except Exception:
         with excutils.save_and_reraise_exception():
             LOG.error(_LE("Rootwrap error running command: %s"), cmd)
@@ -122,6 +241,10 @@ def execute_rootwrap_daemon(cmd, process_input, addl_env):
 def execute(cmd, process_input=None, addl_env=None,
             check_exit_code=True, return_stderr=False, log_fail_as_error=True,
             extra_ok_codes=None, run_as_root=False):
+    # cmd gets the root helper prepended below, account the command itself
+    cmd_name = CommandStats.get_command_name(cmd)
+    start = time.time()
+    failed = True
     try:
         if process_input is not None:
             _process_input = encodeutils.to_utf8(process_input)
@@ -156,8 +279,10 @@ def execute(cmd, process_input=None, addl_env=None,
                 raise ProcessExecutionError(msg, returncode=returncode)
         else:
             LOG.debug("Exit code: %d", returncode)
+        failed = bool(returncode) and returncode not in extra_ok_codes
 
     finally:
+        COMMAND_STATS.record(cmd_name, time.time() - start, failed)
         # NOTE(termie): this appears to be necessary to let the subprocess
         #               call clean something up in between calls, without
         #               it two execute calls in a row hangs the second one
@@ -166,6 +291,19 @@ def execute(cmd, process_input=None, addl_env=None,
     return (_stdout, _stderr) if return_stderr else _stdout
 
 
+def run_concurrently(func, items):
+    """Call func on each of the items concurrently.
+
+    This is meant for independent commands: up to root_helper_daemon_pool_size
+    calls are run at once, so that each of them can use a root helper daemon
+    of the pool.
+
+    :returns: the list of the results, in the order of the items.
+    """
+    pool = eventlet.GreenPool(cfg.CONF.AGENT.root_helper_daemon_pool_size)
+    return list(pool.imap(func, items))
+
+
 @debtcollector.removals.remove(
     version='Ocata', removal_version='Pike',
     message="Use 'neutron.agent.linux.ip_lib.get_device_mac' instead."
@@ -14,6 +14,7 @@
 #    under the License.
 #
 
+import collections
 import functools
 
 from debtcollector import moves
@@ -67,6 +68,124 @@ def disable_security_group_extension_by_config(aliases):
         _disable_extension('allowed-address-pairs', aliases)
 
 
+class SecurityGroupInfoCache(object):
+    """Rules and member IPs of the security groups known by the agent.
+
+    The rules of a security group are kept until a notification of their
+    update, and its member IPs, for all the ethertypes, until a notification
+    of its membership update which doesn't follow their revision.
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.members = {}
+        self.member_revisions = {}
+        # bumped by each invalidation, the information received while the
+        # generation changed might be stale and is not stored
+        self.generation = 0
+
+    def update(self, security_groups, sg_member_ips, sg_member_revisions,
+               generation):
+        if generation != self.generation:
+            return
+        self.rules.update(security_groups)
+        self.members.update(sg_member_ips)
+        self.member_revisions.update(
+            (sg_id, sg_member_revisions.get(sg_id)) for sg_id in sg_member_ips)
+
+    def invalidate_rules(self, sg_ids):
+        self.generation += 1
+        for sg_id in sg_ids:
+            self.rules.pop(sg_id, None)
+
+    def invalidate_members(self, sg_ids):
+        self.generation += 1
+        for sg_id in sg_ids:
+            self.members.pop(sg_id, None)
+            self.member_revisions.pop(sg_id, None)
+
+    def update_members(self, sg_ids, added_members, removed_members,
+                       member_revisions):
+        """Apply the changes of the member IPs of the groups.
+
+        The changes of a group are applied only if they follow the cached
+        revision of its members, otherwise a notification was missed or is
+        late, and its members are dropped to be fetched again.
+
+        The members are replaced rather than updated in place, as they are
+        shared with the firewall driver.
+        """
+        self.generation += 1
+        for sg_id in sg_ids:
+            if sg_id not in self.members:
+                continue
+            revision = self.member_revisions.get(sg_id)
+            if (revision is None or
+                    member_revisions.get(sg_id) != revision + 1):
+                LOG.debug("Member changes of security group %(sg_id)s out "
+                          "of order, fetching its members again",
+                          {'sg_id': sg_id})
+                del self.members[sg_id]
+                self.member_revisions.pop(sg_id, None)
+                continue
+            self.member_revisions[sg_id] = revision + 1
+            members = dict(self.members[sg_id])
+            self.members[sg_id] = members
+            added = added_members.get(sg_id, {})
+            removed = removed_members.get(sg_id, {})
+            for ethertype in set(added) | set(removed):
+                removed_ips = set(removed.get(ethertype, []))
+                ips = [ip for ip in members.get(ethertype, [])
+                       if ip not in removed_ips]
+                known_ips = set(ips)
+                ips.extend(ip for ip in added.get(ethertype, [])
+                           if ip not in known_ips)
+                members[ethertype] = ips
+
+    def clear(self):
+        self.generation += 1
+        self.rules.clear()
+        self.members.clear()
+        self.member_revisions.clear()
+
+    def prune(self, sg_ids):
+        """Drop the information of the groups not in sg_ids."""
+        for cache in (self.rules, self.members, self.member_revisions):
+            for sg_id in set(cache) - set(sg_ids):
+                del cache[sg_id]
+
+    def get_info(self, devices, security_groups, sg_member_ips):
+        """Return the rules and member IPs of the groups of the devices.
+
+        The information just received from the server, security_groups and
+        sg_member_ips, takes precedence over the cached one. The member IPs
+        are returned for the ethertypes used by the rules referencing the
+        remote groups, as the server does for the agents not caching them.
+        """
+        rules = {}
+        ethertypes = collections.defaultdict(set)
+        for device in devices:
+            for sg_id in device.get('security_groups', []):
+                if sg_id in rules:
+                    continue
+                sg_rules = security_groups.get(sg_id, self.rules.get(sg_id))
+                if sg_rules is None:
+                    continue
+                rules[sg_id] = sg_rules
+                for rule in sg_rules:
+                    remote_group_id = rule.get('remote_group_id')
+                    if remote_group_id:
+                        ethertypes[remote_group_id].add(rule['ethertype'])
+        member_ips = {}
+        for remote_group_id, remote_ethertypes in ethertypes.items():
+            members = sg_member_ips.get(
+                remote_group_id, self.members.get(remote_group_id, {}))
+            member_ips[remote_group_id] = dict(
+                (ethertype, members.get(ethertype, []))
+                for ethertype in remote_ethertypes)
+        return rules, member_ips
+
+
 class SecurityGroupAgentRpc(object):
     """Enables SecurityGroup agent support in agent implementations."""
 
@@ -98,6 +217,8 @@ class SecurityGroupAgentRpc(object):
         # Flag raised when a global refresh is needed
         self.global_refresh_firewall = False
         self._use_enhanced_rpc = None
+        self._use_sg_info_cache = None
+        self.sg_info_cache = SecurityGroupInfoCache()
 
     @property
     def use_enhanced_rpc(self):
@@ -118,6 +239,26 @@ class SecurityGroupAgentRpc(object):
             return False
         return True
 
+    @property
+    def use_sg_info_cache(self):
+        if self._use_sg_info_cache is None:
+            self._use_sg_info_cache = (
+                cfg.CONF.SECURITYGROUP.cache_security_group_info and
+                self.use_enhanced_rpc and
+                self._check_sg_info_cache_is_supported_by_server())
+        return self._use_sg_info_cache
+
+    def _check_sg_info_cache_is_supported_by_server(self):
+        try:
+            self.plugin_rpc.security_group_info_for_devices(
+                self.context, devices=[], cached_rules=[], cached_members=[])
+        except oslo_messaging.UnsupportedVersion:
+            LOG.warning(_LW('The server does not support caching the '
+                            'security group information in the agent, it '
+                            'is requested again for each port.'))
+            return False
+        return True
+
     def skip_if_noopfirewall_or_firewall_disabled(func):
         @functools.wraps(func)
         def decorated_function(self, *args, **kwargs):
@@ -138,10 +279,28 @@ class SecurityGroupAgentRpc(object):
         LOG.info(_LI("Preparing filters for devices %s"), device_ids)
         self._apply_port_filter(device_ids)
 
+    def _get_security_group_info(self, device_ids):
+        if not self.use_sg_info_cache:
+            return self.plugin_rpc.security_group_info_for_devices(
+                self.context, list(device_ids))
+        cache = self.sg_info_cache
+        generation = cache.generation
+        devices_info = self.plugin_rpc.security_group_info_for_devices(
+            self.context, list(device_ids),
+            cached_rules=list(cache.rules),
+            cached_members=list(cache.members))
+        cache.update(devices_info['security_groups'],
+                     devices_info['sg_member_ips'],
+                     devices_info.get('sg_member_revisions', {}), generation)
+        devices_info['security_groups'], devices_info['sg_member_ips'] = (
+            cache.get_info(devices_info['devices'].values(),
+                           devices_info['security_groups'],
+                           devices_info['sg_member_ips']))
+        return devices_info
+
     def _apply_port_filter(self, device_ids, update_filter=False):
         if self.use_enhanced_rpc:
-            devices_info = self.plugin_rpc.security_group_info_for_devices(
-                self.context, list(device_ids))
+            devices_info = self._get_security_group_info(device_ids)
             devices = devices_info['devices']
             security_groups = devices_info['security_groups']
             security_group_member_ips = devices_info['sg_member_ips']
@@ -175,14 +334,26 @@ class SecurityGroupAgentRpc(object):
     def security_groups_rule_updated(self, security_groups):
         LOG.info(_LI("Security group "
                  "rule updated %r"), security_groups)
+        self.sg_info_cache.invalidate_rules(security_groups)
         self._security_group_updated(
             security_groups,
             'security_groups',
             'sg_rule')
 
-    def security_groups_member_updated(self, security_groups):
+    def security_groups_member_updated(self, security_groups,
+                                       added_members=None,
+                                       removed_members=None,
+                                       member_revisions=None):
         LOG.info(_LI("Security group "
                  "member updated %r"), security_groups)
+        if added_members is None and removed_members is None:
+            self.sg_info_cache.invalidate_members(security_groups)
+        else:
+            # the cached members are patched, the refresh of the firewall
+            # does not request them again
+            self.sg_info_cache.update_members(
+                security_groups, added_members or {}, removed_members or {},
+                member_revisions or {})
         self._security_group_updated(
             security_groups,
             'security_group_source_groups',
@@ -236,11 +407,23 @@ class SecurityGroupAgentRpc(object):
                 if not device:
                     continue
                 self.firewall.remove_port_filter(device)
+        if self.use_sg_info_cache:
+            self.sg_info_cache.prune(self._get_used_security_groups())
+
+    def _get_used_security_groups(self):
+        sg_ids = set()
+        for device in self.firewall.ports.values():
+            sg_ids.update(device.get('security_groups', []))
+            sg_ids.update(device.get('security_group_source_groups', []))
+        return sg_ids
 
     @skip_if_noopfirewall_or_firewall_disabled
     def refresh_firewall(self, device_ids=None):
         LOG.info(_LI("Refresh firewall rules"))
         if not device_ids:
+            # the global refresh requests the information of all the
+            # security groups again, in case an update was missed
+            self.sg_info_cache.clear()
             device_ids = self.firewall.ports.keys()
             if not device_ids:
                 LOG.info(_LI("No ports here to refresh firewall"))
@@ -27,6 +27,7 @@ import oslo_messaging
 from oslo_utils import excutils
 
 from neutron._i18n import _, _LW
+from neutron.api.rpc.handlers import result_cache
 from neutron.callbacks import resources
 from neutron.common import constants as n_const
 from neutron.common import exceptions as n_exc
@@ -71,18 +72,19 @@ class DhcpRpcCallback(object):
     #     1.6 - Removed get_active_networks. It's not used by reference
     #           DHCP agent since Havana, so similar rationale for not bumping
     #           the major version as above applies here too.
+    #     1.7 - Added get_active_networks_info_page.
 
     target = oslo_messaging.Target(
         namespace=n_const.RPC_NAMESPACE_DHCP_PLUGIN,
-        version='1.6')
+        version='1.7')
 
-    def _get_active_networks(self, context, **kwargs):
+    def _get_active_networks(self, context, auto_schedule=True, **kwargs):
         """Retrieve and return a list of the active networks."""
         host = kwargs.get('host')
         plugin = directory.get_plugin()
         if utils.is_extension_supported(
             plugin, constants.DHCP_AGENT_SCHEDULER_EXT_ALIAS):
-            if cfg.CONF.network_auto_schedule:
+            if auto_schedule and cfg.CONF.network_auto_schedule:
                 plugin.auto_schedule_networks(context, host)
             nets = plugin.list_active_networks_on_active_dhcp_agent(
                 context, host)
@@ -140,6 +142,41 @@ class DhcpRpcCallback(object):
         host = kwargs.get('host')
         LOG.debug('get_active_networks_info from %s', host)
         networks = self._get_active_networks(context, **kwargs)
+        return self._get_networks_info(context, host, networks)
+
+    def get_active_networks_info_page(self, context, **kwargs):
+        """Returns a page of the networks/subnets/ports in system.
+
+        The networks are returned by increasing id, at most limit of them
+        after the marker network id, along with the marker of the next page,
+        None on the last page.
+        """
+        host = kwargs.get('host')
+        marker = kwargs.get('marker')
+        limit = kwargs.get('limit')
+        LOG.debug('get_active_networks_info_page from %(host)s after '
+                  '%(marker)s', {'host': host, 'marker': marker})
+        # the networks are only scheduled when the first page is requested
+        networks = sorted(
+            self._get_active_networks(context, auto_schedule=not marker,
+                                      host=host),
+            key=operator.itemgetter('id'))
+        if marker:
+            networks = [network for network in networks
+                        if network['id'] > marker]
+        next_marker = None
+        if limit and len(networks) > limit:
+            networks = networks[:limit]
+            next_marker = networks[-1]['id']
+        return {'networks': self._get_networks_info(context, host, networks),
+                'marker': next_marker}
+
+    # NOTE: only the subnets and ports are cached, the networks are scheduled
+    # and listed on each call since their bindings to the agents don't
+    # invalidate the cache.
+    @result_cache.cached((result_cache.NETWORKS,))
+    def _get_networks_info(self, context, host, networks):
+        """Add the subnets and ports of the networks to them."""
         plugin = directory.get_plugin()
         filters = {'network_id': [network['id'] for network in networks]}
         ports = plugin.get_ports(context, filters=filters)
@@ -182,6 +219,8 @@ class DhcpRpcCallback(object):
 
         return networks
 
+    @result_cache.cached(
+        lambda kwargs: (result_cache.network_tag(kwargs.get('network_id')),))
     def get_network_info(self, context, **kwargs):
         """Retrieve and return extended information about a network."""
         network_id = kwargs.get('network_id')
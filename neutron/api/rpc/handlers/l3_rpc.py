@@ -13,12 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+
 from neutron_lib import constants
 from neutron_lib import exceptions
 from neutron_lib.plugins import directory
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_serialization import jsonutils
 import six
 
 from neutron._i18n import _LI
@@ -32,6 +35,52 @@ from neutron.extensions import portbindings
 
 LOG = logging.getLogger(__name__)
 
+# The router keys whose items are sent separately in router deltas
+ROUTER_DELTA_KEYS = (constants.INTERFACE_KEY, constants.FLOATINGIP_KEY)
+
+
+def _get_fingerprint(resource):
+    return hashlib.md5(
+        jsonutils.dumps(resource, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_router_revisions(router):
+    """Return the fingerprints of a router and of its sub-resources.
+
+    The revision_number of a router is not bumped by the changes of its
+    floating IPs, nor of the subnets, MTUs and address scopes returned with
+    its ports, so the router and each of its sub-resources is fingerprinted
+    as returned to the agent.
+
+    :returns: {'router': fingerprint of the router without the items of
+               ROUTER_DELTA_KEYS,
+               <key in ROUTER_DELTA_KEYS>: {item id: fingerprint}}
+    """
+    revisions = {'router': _get_fingerprint(
+        {k: v for k, v in router.items() if k not in ROUTER_DELTA_KEYS})}
+    for key in ROUTER_DELTA_KEYS:
+        revisions[key] = {item['id']: _get_fingerprint(item)
+                          for item in router.get(key, [])}
+    return revisions
+
+
+def make_router_delta(router, revisions, known_revisions):
+    """Return the changes of a router from the revisions an agent knows.
+
+    The delta has the 'delta' key set. It has the router attributes only if
+    they changed, and the items of ROUTER_DELTA_KEYS which changed or were
+    added. The items whose ID isn't in its 'revisions' were removed.
+    """
+    delta = {'id': router['id'], 'delta': True, 'revisions': revisions}
+    if revisions['router'] != known_revisions.get('router'):
+        delta.update((k, v) for k, v in router.items()
+                     if k not in ROUTER_DELTA_KEYS)
+    for key in ROUTER_DELTA_KEYS:
+        known = known_revisions.get(key) or {}
+        delta[key] = [item for item in router.get(key, [])
+                      if known.get(item['id']) != revisions[key][item['id']]]
+    return delta
+
 
 class L3RpcCallback(object):
     """L3 agent RPC callback in plugin implementations."""
@@ -47,7 +96,8 @@ class L3RpcCallback(object):
     # 1.7 Added method delete_agent_gateway_port for DVR Routers
     # 1.8 Added address scope information
     # 1.9 Added get_router_ids
-    target = oslo_messaging.Target(version='1.9')
+    # 1.10 Added revisions to sync_routers, to return router deltas
+    target = oslo_messaging.Target(version='1.10')
 
     @property
     def plugin(self):
@@ -96,12 +146,17 @@ class L3RpcCallback(object):
         """Sync routers according to filters to a specific agent.
 
         @param context: contain user information
-        @param kwargs: host, router_ids
+        @param kwargs: host, router_ids, revisions
         @return: a list of routers
                  with their interfaces and floating_ips
+
+        If revisions is passed, which is a dict of the 'revisions' of the
+        routers known by the agent by router ID, each router is returned with
+        its 'revisions', and as a delta from the ones known by the agent.
         """
         router_ids = kwargs.get('router_ids')
         host = kwargs.get('host')
+        known_revisions = kwargs.get('revisions')
         context = neutron_context.get_admin_context()
         if utils.is_extension_supported(
             self.l3plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
@@ -113,8 +168,20 @@ class L3RpcCallback(object):
         if utils.is_extension_supported(
             self.plugin, constants.PORT_BINDING_EXT_ALIAS):
             self._ensure_host_set_on_ports(context, host, routers)
+        if known_revisions is not None:
+            routers = [self._get_router_delta(router, known_revisions)
+                       for router in routers]
         return routers
 
+    @staticmethod
+    def _get_router_delta(router, known_revisions):
+        revisions = get_router_revisions(router)
+        if router['id'] not in known_revisions:
+            router['revisions'] = revisions
+            return router
+        return make_router_delta(router, revisions,
+                                 known_revisions[router['id']])
+
     def _ensure_host_set_on_ports(self, context, host, routers):
         for router in routers:
             LOG.debug("Checking router: %(id)s for host: %(host)s",
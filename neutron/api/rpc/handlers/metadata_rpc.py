@@ -16,6 +16,7 @@
 from neutron_lib.plugins import directory
 import oslo_messaging
 
+from neutron.api.rpc.handlers import result_cache
 from neutron.common import constants
 
 
@@ -39,5 +40,6 @@ class MetadataRpcCallback(object):
             self._plugin = directory.get_plugin()
         return self._plugin
 
+    @result_cache.cached((result_cache.PORTS,))
     def get_ports(self, context, filters):
         return self.plugin.get_ports(context, filters=filters)
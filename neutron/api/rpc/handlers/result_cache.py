@@ -0,0 +1,202 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Per worker cache of the results of the read-only RPCs of the agents.
+
+The DHCP and metadata agents repeatedly call the same read-only RPCs with the
+same arguments, e.g. on each resync. Their results are cached for
+rpc_result_cache_ttl seconds, and tagged with the resources they depend on.
+The entries are invalidated as soon as the callback registry notifies a
+change of one of these resources.
+"""
+
+import collections
+import copy
+import functools
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+
+from neutron.callbacks import events
+from neutron.callbacks import registry
+from neutron.callbacks import resources
+
+LOG = logging.getLogger(__name__)
+
+# Tags of the results depending on any network, subnet or port, and on any
+# port
+NETWORKS = 'networks'
+PORTS = 'ports'
+
+_INVALIDATING_EVENTS = (events.AFTER_CREATE, events.AFTER_UPDATE,
+                        events.AFTER_DELETE)
+
+_CACHE = None
+
+
+def network_tag(network_id):
+    """Tag of the results depending on the given network."""
+    return (resources.NETWORK, network_id)
+
+
+class RpcResultCache(object):
+    """Bounded LRU cache of RPC results, with a TTL and tags.
+
+    Each result is stored with the set of tags it depends on, invalidating
+    a tag drops all the results depending on it.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        # key -> (expiration time, tags, result)
+        self._entries = collections.OrderedDict()
+        # tag -> keys of the entries depending on it
+        self._tags = collections.defaultdict(set)
+        # bumped by each invalidation, a result computed while the
+        # generation changed might be stale and is not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries)}
+
+    def get(self, key):
+        """Return a copy of the result cached for key, or None."""
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                self._drop_tags(key, entry[1])
+            self.misses += 1
+            return None
+        # most recently used last
+        self._entries[key] = entry
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    def set(self, key, result, tags, generation):
+        """Cache a copy of result, unless invalidated since generation."""
+        if generation != self.generation:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._drop_tags(key, old[1])
+        tags = frozenset(tags)
+        self._entries[key] = (time.time() + self.ttl, tags,
+                              copy.deepcopy(result))
+        for tag in tags:
+            self._tags[tag].add(key)
+        while len(self._entries) > self.size:
+            old_key, old = self._entries.popitem(last=False)
+            self._drop_tags(old_key, old[1])
+
+    def _drop_tags(self, key, tags):
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, tags):
+        self.generation += 1
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._drop_tags(key, entry[1])
+                    self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._tags.clear()
+
+    def _invalidate_network(self, network_id, *tags):
+        if network_id is None:
+            # the changed network is not known, anything might depend on it
+            self.clear()
+        else:
+            self.invalidate((network_tag(network_id),) + tags)
+
+    def _network_changed(self, resource, event, trigger, **kwargs):
+        network = kwargs.get('network') or {}
+        self._invalidate_network(network.get('id'), NETWORKS, PORTS)
+
+    def _subnet_changed(self, resource, event, trigger, **kwargs):
+        subnet = kwargs.get('subnet') or {}
+        self._invalidate_network(subnet.get('network_id'), NETWORKS)
+
+    def _port_changed(self, resource, event, trigger, **kwargs):
+        port = kwargs.get('port') or {}
+        self._invalidate_network(port.get('network_id'), NETWORKS, PORTS)
+
+    def subscribe(self):
+        for event in _INVALIDATING_EVENTS:
+            registry.subscribe(self._network_changed, resources.NETWORK,
+                               event)
+            registry.subscribe(self._subnet_changed, resources.SUBNET, event)
+            registry.subscribe(self._port_changed, resources.PORT, event)
+
+
+def get_cache():
+    """Return the cache of this worker, None if disabled."""
+    global _CACHE
+    if _CACHE is None and cfg.CONF.rpc_result_cache_ttl:
+        _CACHE = RpcResultCache(cfg.CONF.rpc_result_cache_size,
+                                cfg.CONF.rpc_result_cache_ttl)
+        _CACHE.subscribe()
+    return _CACHE
+
+
+def cached(tags):
+    """Cache the results of an RPC handler method.
+
+    The results are cached by method and arguments, the context is ignored:
+    these RPCs are only called by the agents, with admin contexts. None
+    results are not cached.
+
+    :param tags: the tags the results depend on, or a callable returning
+                 them from the keyword arguments of the RPC.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(self, context, *args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return f(self, context, *args, **kwargs)
+            key = jsonutils.dumps([f.__module__, f.__name__, args, kwargs],
+                                  sort_keys=True)
+            result = cache.get(key)
+            if result is not None:
+                return result
+            generation = cache.generation
+            result = f(self, context, *args, **kwargs)
+            if result is not None:
+                cache.set(key, result,
+                          tags(kwargs) if callable(tags) else tags,
+                          generation)
+            LOG.debug("RPC result cache stats: %s", cache.stats)
+            return result
+        return wrapper
+    return decorator
@@ -47,12 +47,19 @@ class SecurityGroupServerRpcApi(object):
         return cctxt.call(context, 'security_group_rules_for_devices',
                           devices=devices)
 
-    def security_group_info_for_devices(self, context, devices):
+    def security_group_info_for_devices(self, context, devices,
+                                        cached_rules=None,
+                                        cached_members=None):
         LOG.debug("Get security group information for devices via rpc %r",
                   devices)
-        cctxt = self.client.prepare(version='1.2')
+        if cached_rules is None and cached_members is None:
+            cctxt = self.client.prepare(version='1.2')
+            return cctxt.call(context, 'security_group_info_for_devices',
+                              devices=devices)
+        cctxt = self.client.prepare(version='1.3')
         return cctxt.call(context, 'security_group_info_for_devices',
-                          devices=devices)
+                          devices=devices, cached_rules=cached_rules or [],
+                          cached_members=cached_members or [])
 
 
 class SecurityGroupServerRpcCallback(object):
@@ -66,10 +73,12 @@ class SecurityGroupServerRpcCallback(object):
     # API version history:
     #   1.1 - Initial version
     #   1.2 - security_group_info_for_devices introduced as an optimization
+    #   1.3 - security_group_info_for_devices accepts the ids of the security
+    #         groups whose rules and members are cached by the agent
 
     # NOTE: target must not be overridden in subclasses
     # to keep RPC API version consistent across plugins.
-    target = oslo_messaging.Target(version='1.2',
+    target = oslo_messaging.Target(version='1.3',
                                    namespace=constants.RPC_NAMESPACE_SECGROUP)
 
     @property
@@ -100,18 +109,30 @@ class SecurityGroupServerRpcCallback(object):
         """Return security group information for requested devices.
 
         :params devices: list of devices
+        :params cached_rules: ids of the security groups whose rules are
+                              cached by the agent, they are not returned
+        :params cached_members: ids of the security groups whose member IPs
+                                are cached by the agent, they are not
+                                returned
         :returns:
         sg_info{
           'security_groups': {sg_id: [rule1, rule2]}
           'sg_member_ips': {sg_id: {'IPv4': set(), 'IPv6': set()}}
+          'sg_member_revisions': {sg_id: revision}
           'devices': {device_id: {device_info}}
         }
 
+        sg_member_revisions is only returned with cached_rules.
+
         Note that sets are serialized into lists by rpc code.
         """
         devices_info = kwargs.get('devices')
         ports = self._get_devices_info(context, devices_info)
-        return self.plugin.security_group_info_for_ports(context, ports)
+        if 'cached_rules' not in kwargs and 'cached_members' not in kwargs:
+            return self.plugin.security_group_info_for_ports(context, ports)
+        return self.plugin.security_group_info_for_ports(
+            context, ports, cached_rules=kwargs.get('cached_rules') or [],
+            cached_members=kwargs.get('cached_members') or [])
 
 
 class SecurityGroupAgentRpcApiMixin(object):
@@ -143,15 +164,33 @@ class SecurityGroupAgentRpcApiMixin(object):
         cctxt.cast(context, 'security_groups_rule_updated',
                    security_groups=security_groups)
 
-    def security_groups_member_updated(self, context, security_groups):
-        """Notify member updated security groups."""
+    def security_groups_member_updated(self, context, security_groups,
+                                       added_members=None,
+                                       removed_members=None,
+                                       member_revisions=None):
+        """Notify member updated security groups.
+
+        :param added_members: member IPs added to the groups, by group and
+                              ethertype
+        :param removed_members: member IPs removed from the groups, by group
+                                and ethertype
+        :param member_revisions: member revisions of the groups after the
+                                 changes
+        """
         if not security_groups:
             return
+        # NOTE: the version is not bumped for the member changes, the
+        # agents ignore the unknown parameters and fetch the members again.
         cctxt = self.client.prepare(version=self.SG_RPC_VERSION,
                                     topic=self._get_security_group_topic(),
                                     fanout=True)
+        kwargs = {}
+        if added_members is not None or removed_members is not None:
+            kwargs = {'added_members': added_members or {},
+                      'removed_members': removed_members or {},
+                      'member_revisions': member_revisions or {}}
         cctxt.cast(context, 'security_groups_member_updated',
-                   security_groups=security_groups)
+                   security_groups=security_groups, **kwargs)
 
     def security_groups_provider_updated(self, context,
                                          devices_to_update=None):
@@ -206,13 +245,26 @@ class SecurityGroupAgentRpcCallbackMixin(object):
         """Callback for security group member update.
 
         :param security_groups: list of updated security_groups
+        :param added_members: member IPs added to the groups, by group and
+                              ethertype, if known by the server
+        :param removed_members: member IPs removed from the groups, by group
+                                and ethertype, if known by the server
+        :param member_revisions: member revisions of the groups after the
+                                 changes
         """
         security_groups = kwargs.get('security_groups', [])
         LOG.debug("Security group member updated on remote: %s",
                   security_groups)
         if not self.sg_agent:
             return self._security_groups_agent_not_set()
-        self.sg_agent.security_groups_member_updated(security_groups)
+        if 'added_members' in kwargs or 'removed_members' in kwargs:
+            self.sg_agent.security_groups_member_updated(
+                security_groups,
+                added_members=kwargs.get('added_members') or {},
+                removed_members=kwargs.get('removed_members') or {},
+                member_revisions=kwargs.get('member_revisions') or {})
+        else:
+            self.sg_agent.security_groups_member_updated(security_groups)
 
     def security_groups_provider_updated(self, context, **kwargs):
         """Callback for security group provider update.
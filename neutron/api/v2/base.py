@@ -19,6 +19,7 @@ import copy
 
 import netaddr
 from neutron_lib import exceptions
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_policy import policy as oslo_policy
 from oslo_utils import excutils
@@ -220,6 +221,14 @@ class Controller(object):
         return dict(item for item in six.iteritems(data)
                     if (item[0] not in fields_to_strip))
 
+    def _iter_filtered_attributes(self, obj_list, fields_to_strip):
+        # Consume obj_list, so that the objects can be freed once they
+        # were serialized
+        obj_list.reverse()
+        while obj_list:
+            yield self._filter_attributes(obj_list.pop(),
+                                          fields_to_strip=fields_to_strip)
+
     def _do_field_list(self, original_fields):
         fields_to_add = None
         # don't do anything if fields were not specified in the request
@@ -315,12 +324,17 @@ class Controller(object):
             # FIXME(salvatore-orlando): obj_getter might return references to
             # other resources. Must check authZ on them too.
             # Omit items from list that should not be visible
+            check_cache = policy.CheckCache(request.context)
             obj_list = [obj for obj in obj_list
-                        if policy.check(request.context,
-                                        self._plugin_handlers[self.SHOW],
-                                        obj,
-                                        plugin=self._plugin,
-                                        pluralized=self._collection)]
+                        if check_cache.check(self._plugin_handlers[self.SHOW],
+                                             obj,
+                                             pluralized=self._collection)]
+            LOG.debug("Policy checks of %(count)d %(collection)s: hit rate "
+                      "%(hit_rate).2f, evaluated in %(eval_time).3fs",
+                      {'count': check_cache.hits + check_cache.misses,
+                       'collection': self._collection,
+                       'hit_rate': check_cache.hit_rate,
+                       'eval_time': check_cache.eval_time})
         # Use the first element in the list for discriminating which attributes
         # should be filtered out because of authZ policies
         # fields_to_add contains a list of attributes added for request policy
@@ -330,10 +344,15 @@ class Controller(object):
         if obj_list:
             fields_to_strip += self._exclude_attributes_by_policy(
                 request.context, obj_list[0])
-        collection = {self._collection:
-                      [self._filter_attributes(obj,
-                          fields_to_strip=fields_to_strip)
-                       for obj in obj_list]}
+        if cfg.CONF.stream_list_responses:
+            # the objects are filtered as they are serialized
+            objects = self._iter_filtered_attributes(obj_list,
+                                                     fields_to_strip)
+        else:
+            objects = [self._filter_attributes(obj,
+                           fields_to_strip=fields_to_strip)
+                       for obj in obj_list]
+        collection = {self._collection: objects}
         pagination_links = pagination_helper.get_links(obj_list)
         if pagination_links:
             collection[self._collection + "_links"] = pagination_links
@@ -18,7 +18,10 @@
 Utility methods for working with WSGI servers redux
 """
 
+import types
+
 from oslo_log import log as logging
+import six
 import webob.dec
 import webob.exc
 
@@ -35,6 +38,13 @@ class Request(wsgi.Request):
     pass
 
 
+def _is_streamed(result):
+    """Return whether a result has values to serialize as they come."""
+    return isinstance(result, dict) and any(
+        isinstance(value, types.GeneratorType)
+        for value in six.itervalues(result))
+
+
 def Resource(controller, faults=None, deserializers=None, serializers=None,
              action_status=None):
     """Represents an API entity resource and the associated serialization and
@@ -115,6 +125,10 @@ def Resource(controller, faults=None, deserializers=None, serializers=None,
             raise mapped_exc
 
         status = action_status.get(action, 200)
+        if _is_streamed(result):
+            return webob.Response(request=request, status=status,
+                                  content_type=content_type,
+                                  app_iter=serializer.iter_serialize(result))
         body = serializer.serialize(result)
         # NOTE(jkoelker) Comply with RFC2616 section 9.7
         if status == 204:
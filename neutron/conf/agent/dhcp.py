@@ -58,7 +58,21 @@ DHCP_AGENT_OPTS = [
     cfg.IntOpt('num_sync_threads', default=4,
                help=_('Number of threads to use during sync process. '
                       'Should not exceed connection pool size configured on '
-                      'server.'))
+                      'server.')),
+    cfg.IntOpt('sync_networks_page_size', default=0, min=0,
+               help=_("Number of networks fetched per RPC call when the DHCP "
+                      "agent synchronizes all of its networks. The DHCP "
+                      "servers of the networks of a page are configured while "
+                      "the next pages are fetched. The default of 0 fetches "
+                      "all the networks with a single call, which servers "
+                      "running an older release require.")),
+    cfg.FloatOpt('reload_allocations_window', default=0, min=0,
+                 help=_("Number of seconds the reload of the allocations of "
+                        "a network is delayed after a port update or "
+                        "deletion, so that the port changes received in the "
+                        "meantime are applied by a single reload of the DHCP "
+                        "server. The default of 0 reloads the allocations "
+                        "for each port change.")),
 ]
 
 DHCP_OPTS = [
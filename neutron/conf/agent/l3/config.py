@@ -97,6 +97,14 @@ OPTS = [
                help=_('Iptables mangle mark used to mark ingress from '
                       'external network. This mark will be masked with '
                       '0xffff so that only the lower 16 bits will be used.')),
+    cfg.IntOpt('router_processing_workers', default=0, min=0,
+               help=_("Number of worker processes to process the routers "
+                      "with. Each router is owned by the worker its ID "
+                      "hashes to, which holds its state and processes its "
+                      "updates, so that the routers are processed on "
+                      "several CPUs. When 0, the routers are processed by "
+                      "the agent process. Only supported in the 'legacy' "
+                      "agent mode.")),
 ]
 
 OPTS += config.EXT_NET_BRIDGE_OPTS
@@ -36,7 +36,15 @@ security_group_opts = [
         default=True,
         help=_('Use ipset to speed-up the iptables based security groups. '
                'Enabling ipset support requires that ipset is installed on L2 '
-               'agent node.'))
+               'agent node.')),
+    cfg.BoolOpt(
+        'cache_security_group_info',
+        default=False,
+        help=_('Cache the rules and the member IPs of the security groups '
+               'in the L2 agent, so that they are only requested again from '
+               'the server after a notification of their update, rather '
+               'than each time the firewall of a port is set up or '
+               'refreshed. Requires a server supporting it.'))
 ]
 
 
@@ -51,6 +51,24 @@ core_opts = [
                help=_("The maximum number of items returned in a single "
                       "response, value was 'infinite' or negative integer "
                       "means no limit")),
+    cfg.BoolOpt('stream_list_responses', default=False,
+                help=_("Serialize the responses of the list requests "
+                       "incrementally and send them in chunks, rather than "
+                       "building the whole response body in memory. This "
+                       "reduces the memory used and the time to the first "
+                       "byte of large listings. Only supported by the "
+                       "legacy web framework.")),
+    cfg.IntOpt('rpc_result_cache_ttl', default=0, min=0,
+               help=_("Number of seconds the results of the read-only RPCs "
+                      "of the DHCP and metadata agents are cached by "
+                      "each server worker. The cache of a worker is "
+                      "invalidated by the changes it makes itself, the "
+                      "changes made by the other workers are seen after at "
+                      "most this TTL. 0 disables the cache.")),
+    cfg.IntOpt('rpc_result_cache_size', default=1000, min=1,
+               help=_("Maximum number of RPC results cached by each server "
+                      "worker, the least recently used ones are evicted "
+                      "first.")),
     cfg.ListOpt('default_availability_zones', default=[],
                 help=_("Default value of availability zone hints. The "
                        "availability zone aware schedulers use this when "
@@ -114,6 +132,13 @@ core_opts = [
                help=_("Neutron IPAM (IP address management) driver to use. "
                       "By default, the reference implementation of the "
                       "Neutron IPAM driver is used.")),
+    cfg.IntOpt('ipam_free_ranges_cache_size', default=0, min=0,
+               help=_("Number of subnets whose free addresses are cached "
+                      "by each server worker with the internal IPAM "
+                      "driver, so that generating an address does not load "
+                      "all the allocations of the subnet. The least "
+                      "recently used subnets are evicted first. 0 disables "
+                      "the cache.")),
     cfg.BoolOpt('vlan_transparent', default=False,
                 help=_('If True, then allow plugins that support it to '
                        'create VLAN transparent networks.')),
@@ -93,6 +93,10 @@ ovs_opts = [
                help=_("Timeout in seconds to wait for a single "
                       "OpenFlow request. "
                       "Used only for 'native' driver.")),
+    cfg.BoolOpt('of_bundle', default=False,
+                help=_("Send the flows batched by the agent as a single "
+                       "OpenFlow 1.4 bundle. Requires Open vSwitch 2.6 or "
+                       "newer. Used only for 'ovs-ofctl' driver.")),
 ]
 
 agent_opts = [
@@ -107,6 +111,13 @@ agent_opts = [
                default=constants.DEFAULT_OVSDBMON_RESPAWN,
                help=_("The number of seconds to wait before respawning the "
                       "ovsdb monitor after losing communication with it.")),
+    cfg.BoolOpt('native_ovsdb_monitor', default=False,
+                help=_("Monitor the Interface table through the native OVSDB "
+                       "IDL instead of an 'ovsdb-client monitor' process. A "
+                       "local replica of the Interface rows is then used to "
+                       "process port events without querying OVSDB. Only "
+                       "used when minimize_polling is enabled; connects to "
+                       "the [OVS] ovsdb_connection address.")),
     cfg.ListOpt('tunnel_types', default=DEFAULT_TUNNEL_TYPES,
                 help=_("Network types supported by the agent "
                        "(gre and/or vxlan).")),
@@ -153,6 +164,14 @@ agent_opts = [
     cfg.BoolOpt('tunnel_csum', default=False,
                 help=_("Set or un-set the tunnel header checksum  on "
                        "outgoing IP packet carrying GRE/VXLAN tunnel.")),
+    cfg.IntOpt('port_processing_chunk_size', default=0, min=0,
+               help=_("Number of added or updated ports processed together "
+                      "in one rpc_loop iteration step. When set, device "
+                      "details are fetched chunk by chunk, the OVSDB writes "
+                      "of a chunk are grouped in transactions and the "
+                      "firewall setup of a chunk overlaps with fetching the "
+                      "details of the next one. Use 0 to process all the "
+                      "ports of an iteration at once.")),
     cfg.StrOpt('agent_type', default=n_const.AGENT_TYPE_OVS,
                deprecated_for_removal=True,
                help=_("Selects the Agent Type reported"))
@@ -18,6 +18,7 @@ from neutron_lib.api import validators
 from neutron.api.v2 import attributes as attr
 from neutron.db import _utils as db_utils
 from neutron.db import db_base_plugin_v2
+from neutron.db import models_v2
 
 from neutron.common import utils
 from neutron.extensions import allowedaddresspairs as addr_pair
@@ -76,6 +77,8 @@ class AllowedAddressPairsMixin(object):
     # Register dict extend functions for ports
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
         attr.PORTS, ['_extend_port_dict_allowed_address_pairs'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Port, ['allowed_address_pairs'])
 
     def _delete_allowed_address_pairs(self, context, id):
         obj_addr_pair.AllowedAddressPair.delete_objects(
@@ -13,6 +13,7 @@
 
 from neutron.api.v2 import attributes
 from neutron.db import common_db_mixin
+from neutron.db import models_v2
 from neutron.extensions import availability_zone as az_ext
 from neutron.extensions import network_availability_zone as net_az
 
@@ -28,3 +29,5 @@ class NetworkAvailabilityZoneMixin(net_az.NetworkAvailabilityZonePluginBase):
 
     common_db_mixin.CommonDbMixin.register_dict_extend_funcs(
         attributes.NETWORKS, ['_extend_availability_zone'])
+    common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+        models_v2.Network, ['dhcp_agents'])
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import weakref
 
 from neutron_lib.db import utils as db_utils
@@ -21,6 +22,7 @@ import six
 from sqlalchemy import and_
 from sqlalchemy.ext import associationproxy
 from sqlalchemy import or_
+from sqlalchemy import orm
 from sqlalchemy import sql
 
 from neutron.api.v2 import attributes
@@ -34,6 +36,10 @@ model_query_scope = ndb_utils.model_query_scope_is_project
 model_query = ndb_utils.model_query
 resource_fields = ndb_utils.resource_fields
 
+# The loading strategies of the relationships already loaded with their
+# objects
+_EAGER_LOADS = ('joined', 'subquery', 'selectin', 'immediate')
+
 
 class CommonDbMixin(object):
     """Common methods used in core and service plugins."""
@@ -49,6 +55,17 @@ class CommonDbMixin(object):
     # TODO(salvatore-orlando): Avoid using class-level variables
     _dict_extend_functions = {}
 
+    # The relationships of the models read when building the api resources,
+    # by the _make_*_dict methods and the dict extend functions. They are
+    # loaded up front by the collection queries, rather than lazily for each
+    # object.
+    _dict_extend_loads = {}
+
+    # The fields of the api resources copied as is from the columns of the
+    # same name of their models. The collection queries of the requests of
+    # only these fields load only their columns, rather than whole objects.
+    _projectable_fields = {}
+
     @classmethod
     def register_model_query_hook(cls, model, name, query_hook, filter_hook,
                                   result_filters=None):
@@ -82,6 +99,78 @@ class CommonDbMixin(object):
                  for f in funcs]
         cls._dict_extend_functions.setdefault(resource, []).extend(funcs)
 
+    @classmethod
+    def register_dict_extend_loads(cls, model, relationships):
+        """Declare the relationships of a model read by dict extend functions.
+
+        The relationships are names of relationships of the model, or dotted
+        paths of relationships, e.g. 'standard_attr.tags'. They are eager
+        loaded by the collection queries of the model, with a subquery for
+        the lists and a join for the scalars, unless already eager loaded by
+        the model.
+        """
+        cls._dict_extend_loads.setdefault(model, set()).update(relationships)
+
+    @classmethod
+    def register_projectable_fields(cls, model, fields):
+        """Declare the fields of a resource copied as is from its model."""
+        cls._projectable_fields.setdefault(model, set()).update(fields)
+
+    def _get_projected_fields(self, model, fields):
+        """Return the fields to project from the model, or None.
+
+        None when no fields are requested or when some of them are not
+        projectable, the resources are then built from whole objects.
+        """
+        if not fields:
+            return None
+        projectable = self._projectable_fields.get(model, ())
+        if not all(field in projectable for field in fields):
+            return None
+        # the duplicates are dropped, in order
+        return list(collections.OrderedDict.fromkeys(fields))
+
+    def _make_projected_dicts(self, model, fields, rows):
+        """Make the resource dicts of the rows of a projected query.
+
+        The rows start with the primary key of the model, used to drop the
+        duplicates the joins of the query might return, like the query of
+        whole objects does.
+        """
+        fields = self._get_projected_fields(model, fields)
+        pk_len = len(orm.class_mapper(model).primary_key)
+        seen = set()
+        items = []
+        for row in rows:
+            pk = tuple(row[:pk_len])
+            if pk not in seen:
+                seen.add(pk)
+                items.append(dict(zip(fields, row[pk_len:])))
+        return items
+
+    def _get_dict_extend_load_options(self, model):
+        options = []
+        for path in sorted(self._dict_extend_loads.get(model, ())):
+            option = None
+            eager = False
+            mapper = orm.class_mapper(model)
+            for name in path.split('.'):
+                prop = mapper.relationships.get(name)
+                if prop is None or prop.lazy in ('dynamic', 'noload'):
+                    break
+                if prop.lazy in _EAGER_LOADS:
+                    loader = 'defaultload'
+                else:
+                    loader = 'subqueryload' if prop.uselist else 'joinedload'
+                    eager = True
+                attr = getattr(mapper.class_, name)
+                option = getattr(option or orm, loader)(attr)
+                mapper = prop.mapper
+            else:
+                if eager:
+                    options.append(option)
+        return options
+
     @property
     def safe_reference(self):
         """Return a weakref to the instance.
@@ -225,10 +314,26 @@ class CommonDbMixin(object):
 
     def _get_collection_query(self, context, model, filters=None,
                               sorts=None, limit=None, marker_obj=None,
-                              page_reverse=False):
+                              page_reverse=False, fields=None):
+        """Return the query of a collection.
+
+        If fields are given and are all projectable, the query returns rows
+        of the primary key and of the columns of the fields, to be turned in
+        dicts by _make_projected_dicts, rather than objects.
+        """
         collection = self._model_query(context, model)
         collection = self._apply_filters_to_query(collection, model, filters,
                                                   context)
+        projected_fields = self._get_projected_fields(model, fields)
+        if projected_fields:
+            columns = list(orm.class_mapper(model).primary_key)
+            columns.extend(getattr(model, field)
+                           for field in projected_fields)
+            collection = collection.with_entities(*columns)
+        else:
+            load_options = self._get_dict_extend_load_options(model)
+            if load_options:
+                collection = collection.options(*load_options)
         if sorts:
             sort_keys = db_utils.get_and_validate_sort_keys(sorts, model)
             sort_dirs = db_utils.get_sort_dirs(sorts, page_reverse)
@@ -272,9 +377,14 @@ class CommonDbMixin(object):
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
-                                           page_reverse=page_reverse)
-        items = [attributes.populate_project_info(dict_func(c, fields))
-                 for c in query]
+                                           page_reverse=page_reverse,
+                                           fields=fields)
+        if self._get_projected_fields(model, fields):
+            items = [attributes.populate_project_info(item) for item in
+                     self._make_projected_dicts(model, fields, query)]
+        else:
+            items = [attributes.populate_project_info(dict_func(c, fields))
+                     for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
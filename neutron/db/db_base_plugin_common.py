@@ -70,6 +70,18 @@ def filter_fields(f):
     return inner_filter
 
 
+def _extensions_requested(res, fields):
+    """Return whether fields requests attributes added by extensions.
+
+    res is the resource dict before its extension, the extensions only
+    add attributes to it.
+    """
+    if not fields:
+        return True
+    return any(field not in res and field != 'project_id'
+               for field in fields)
+
+
 class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
     """Stores getters and helper methods for db_base_plugin_v2
 
@@ -80,6 +92,28 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
     backends.
     """
 
+    # The relationships read by the _make_*_dict methods
+    common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+        models_v2.Port, ['fixed_ips'])
+    common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+        models_v2.Network, ['subnets', 'rbac_entries'])
+    common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+        models_v2.Subnet, ['allocation_pools', 'dns_nameservers', 'routes',
+                           'rbac_entries'])
+    # The fields copied as is from the models by the _make_*_dict methods
+    common_db_mixin.CommonDbMixin.register_projectable_fields(
+        models_v2.Port, ['id', 'name', 'network_id', 'tenant_id',
+                         'project_id', 'mac_address', 'admin_state_up',
+                         'status', 'device_id', 'device_owner'])
+    common_db_mixin.CommonDbMixin.register_projectable_fields(
+        models_v2.Network, ['id', 'name', 'tenant_id', 'project_id',
+                            'admin_state_up', 'status'])
+    common_db_mixin.CommonDbMixin.register_projectable_fields(
+        models_v2.Subnet, ['id', 'name', 'tenant_id', 'project_id',
+                           'network_id', 'ip_version', 'cidr', 'gateway_ip',
+                           'enable_dhcp', 'ipv6_ra_mode', 'ipv6_address_mode',
+                           'subnetpool_id'])
+
     @staticmethod
     def _generate_mac():
         return utils.get_random_mac(cfg.CONF.base_mac.split(':'))
@@ -151,7 +185,8 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
         # The shared attribute for a subnet is the same as its parent network
         res['shared'] = self._is_network_shared(context, subnet.rbac_entries)
         # Call auxiliary extend functions, if any
-        self._apply_dict_extend_functions(attributes.SUBNETS, res, subnet)
+        if _extensions_requested(res, fields):
+            self._apply_dict_extend_functions(attributes.SUBNETS, res, subnet)
         return db_utils.resource_fields(res, fields)
 
     def _make_subnetpool_dict(self, subnetpool, fields=None):
@@ -189,7 +224,7 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
                "device_id": port["device_id"],
                "device_owner": port["device_owner"]}
         # Call auxiliary extend functions, if any
-        if process_extensions:
+        if process_extensions and _extensions_requested(res, fields):
             self._apply_dict_extend_functions(
                 attributes.PORTS, res, port)
         return db_utils.resource_fields(res, fields)
@@ -270,7 +305,7 @@ class DbBasePluginCommon(common_db_mixin.CommonDbMixin):
                            for subnet in network['subnets']]}
         res['shared'] = self._is_network_shared(context, network.rbac_entries)
         # Call auxiliary extend functions, if any
-        if process_extensions:
+        if process_extensions and _extensions_requested(res, fields):
             self._apply_dict_extend_functions(
                 attributes.NETWORKS, res, network)
         return db_utils.resource_fields(res, fields)
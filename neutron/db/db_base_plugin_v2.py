@@ -1371,8 +1371,12 @@ class NeutronDbPluginV2(db_base_plugin_common.DbBasePluginCommon,
         query = self._get_ports_query(context, filters=filters,
                                       sorts=sorts, limit=limit,
                                       marker_obj=marker_obj,
-                                      page_reverse=page_reverse)
-        items = [self._make_port_dict(c, fields) for c in query]
+                                      page_reverse=page_reverse,
+                                      fields=fields)
+        if self._get_projected_fields(models_v2.Port, fields):
+            items = self._make_projected_dicts(models_v2.Port, fields, query)
+        else:
+            items = [self._make_port_dict(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
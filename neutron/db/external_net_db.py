@@ -98,6 +98,8 @@ class External_net_db_mixin(object):
     # Register dict extend functions for networks
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
         attributes.NETWORKS, ['_extend_network_dict_l3'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Network, ['external'])
 
     def _process_l3_create(self, context, net_data, req_data):
         external = req_data.get(external_net.EXTERNAL)
@@ -15,6 +15,7 @@
 
 from neutron.api.v2 import attributes
 from neutron.db import db_base_plugin_v2
+from neutron.db import models_v2
 from neutron.extensions import extra_dhcp_opt as edo_ext
 from neutron.objects.port.extensions import extra_dhcp_opt as obj_extra_dhcp
 
@@ -122,3 +123,5 @@ class ExtraDhcpOptMixin(object):
 
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
         attributes.PORTS, ['_extend_port_dict_extra_dhcp_opt'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Port, ['dhcp_opts'])
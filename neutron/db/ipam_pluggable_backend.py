@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import copy
 
 import netaddr
@@ -36,6 +37,9 @@ from neutron.ipam import exceptions as ipam_exc
 
 LOG = logging.getLogger(__name__)
 
+# Key of the IPs allocated by allocate_ips_for_ports in the port attributes
+PREALLOCATED_IPS = 'preallocated_ips'
+
 
 # ML2 Plugin调用的是class IpamPluggableBackend
 # allocate_ips_for_port_and_store进行Port的IP地址分配
@@ -105,6 +109,7 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
         allocated ip addresses.
         """
         allocated = []
+        results = [None] * len(ips)
 
         # we need to start with entries that asked for a specific IP in case
         # those IPs happen to be next in the line for allocation for ones that
@@ -112,24 +117,12 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
         ips.sort(key=lambda x: 'ip_address' not in x)
         try:
             # 针对ips中的每一个元素,调用ipam_allocator.allocate函数进行ip地址分配
-            for ip in ips:
-                # By default IP info is dict, used to allocate single ip
-                # from single subnet.
-                # IP info can be list, used to allocate single ip from
-                # multiple subnets
-                ip_list = [ip] if isinstance(ip, dict) else ip
-                subnets = [ip_dict['subnet_id'] for ip_dict in ip_list]
-                try:
-                    factory = ipam_driver.get_address_request_factory()
-                    ip_request = factory.get_request(context, port, ip_list[0])
-                    ipam_allocator = ipam_driver.get_allocator(subnets)
-                    ip_address, subnet_id = ipam_allocator.allocate(ip_request)
-                except ipam_exc.IpAddressGenerationFailureAllSubnets:
-                    raise n_exc.IpAddressGenerationFailure(
-                        net_id=port['network_id'])
-
-                allocated.append({'ip_address': ip_address,
-                                  'subnet_id': subnet_id})
+            for subnets, requests in self._get_ip_requests_by_subnets(
+                    context, ipam_driver, [(port, ip) for ip in ips]):
+                for index, ip_dict in self._ipam_allocate_ip_requests(
+                        ipam_driver, subnets, requests):
+                    results[index] = ip_dict
+                    allocated.append(ip_dict)
         except Exception:
             with excutils.save_and_reraise_exception():
                 if not ipam_driver.needs_rollback():
@@ -151,7 +144,48 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
                     LOG.error(_LE("IP allocation failed on "
                                   "external system for %s"), addresses)
 
-        return allocated
+        return results
+
+    def _get_ip_requests_by_subnets(self, context, ipam_driver, port_ips):
+        """Group the address requests for the same subnets.
+
+        :param port_ips: a list of (port, ip) tuples. By default the IP info
+            is a dict, used to allocate single ip from single subnet. It can
+            be a list, used to allocate single ip from multiple subnets.
+        :returns: a list of (subnet ids, requests) tuples, where requests is
+            a list of (index in port_ips, port, address request) tuples
+        """
+        factory = ipam_driver.get_address_request_factory()
+        groups = collections.OrderedDict()
+        for index, (port, ip) in enumerate(port_ips):
+            ip_list = [ip] if isinstance(ip, dict) else ip
+            subnets = tuple(ip_dict['subnet_id'] for ip_dict in ip_list)
+            groups.setdefault(subnets, []).append(
+                (index, port, factory.get_request(context, port, ip_list[0])))
+        return [(list(subnet_ids), subnet_requests)
+                for subnet_ids, subnet_requests in groups.items()]
+
+    def _ipam_allocate_ip_requests(self, ipam_driver, subnets, requests):
+        """Allocate the addresses requested from the same subnets.
+
+        The requests are passed at once to the IPAM driver, so that it can
+        pick the addresses from one snapshot of the available addresses.
+
+        :returns: a list of (index, ip dict) tuples
+        """
+        try:
+            ipam_allocator = ipam_driver.get_allocator(subnets)
+            if len(requests) == 1:
+                addresses = [ipam_allocator.allocate(requests[0][2])]
+            else:
+                addresses = ipam_allocator.bulk_allocate(
+                    [ip_request for index, port, ip_request in requests])
+        except ipam_exc.IpAddressGenerationFailureAllSubnets:
+            raise n_exc.IpAddressGenerationFailure(
+                net_id=requests[0][1]['network_id'])
+        return [(index, {'ip_address': ip_address, 'subnet_id': subnet_id})
+                for (index, port, ip_request), (ip_address, subnet_id) in
+                zip(requests, addresses)]
 
     def _ipam_update_allocation_pools(self, context, ipam_driver, subnet):
         factory = ipam_driver.get_subnet_request_factory()
@@ -169,13 +203,15 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
         # Deepcopy doesn't work correctly in this case, because copy of
         # ATTR_NOT_SPECIFIED object happens. Address of copied object doesn't
         # match original object, so 'is' check fails
+        preallocated_ips = port['port'].pop(PREALLOCATED_IPS, None)
         port_copy = {'port': port['port'].copy()}
         port_copy['port']['id'] = port_id
         network_id = port_copy['port']['network_id']
         ips = []
         try:
             # 关注这里
-            ips = self._allocate_ips_for_port(context, port_copy)
+            ips = self._allocate_ips_for_port(context, port_copy,
+                                              preallocated_ips)
             for ip in ips:
                 ip_address = ip['ip_address']
                 subnet_id = ip['subnet_id']
@@ -197,12 +233,62 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
                                         ipam_driver, port_copy['port'], ips,
                                         revert_on_fail=False)
 
-    def _allocate_ips_for_port(self, context, port):
+    def allocate_ips_for_ports(self, context, ports):
+        """Allocate the IP addresses of several ports at once.
+
+        The addresses generated for the ports without fixed IPs are
+        requested from the IPAM driver at once, per group of subnets, so
+        that it can pick them from one snapshot of the available addresses.
+        They are stored in the ports when allocate_ips_for_port_and_store
+        is called for each of them, in the same transaction.
+
+        Nothing is allocated in advance with the drivers needing explicit
+        rollbacks, as the ports might not be created.
+        """
+        ipam_driver = driver.Pool.get_instance(None, context)
+        if ipam_driver.needs_rollback():
+            return
+        port_ips = []
+        for port in ports:
+            p = port['port']
+            if (p.get('fixed_ips', constants.ATTR_NOT_SPECIFIED) is not
+                    constants.ATTR_NOT_SPECIFIED):
+                continue
+            try:
+                subnets = self._ipam_get_subnets(
+                    context, network_id=p['network_id'],
+                    host=p.get(portbindings.HOST_ID),
+                    service_type=p.get('device_owner'),
+                    fixed_configured=False)
+            except ipam_exc.DeferIpam:
+                continue
+            p[PREALLOCATED_IPS] = []
+            port_ips.extend((p, ip) for ip in
+                            self._get_subnets_ips(context, subnets))
+        for subnets, requests in self._get_ip_requests_by_subnets(
+                context, ipam_driver, port_ips):
+            for index, ip_dict in self._ipam_allocate_ip_requests(
+                    ipam_driver, subnets, requests):
+                port_ips[index][0][PREALLOCATED_IPS].append(ip_dict)
+
+    def _get_subnets_ips(self, context, subnets):
+        """Return the IPs to generate for a port without fixed IPs."""
+        ips = []
+        v4, v6_stateful = self._classify_subnets(context, subnets)[:2]
+        for version_subnets in (v4, v6_stateful):
+            if version_subnets:
+                ips.append([{'subnet_id': s['id']} for s in version_subnets])
+        return ips
+
+    def _allocate_ips_for_port(self, context, port, preallocated_ips=None):
         """Allocate IP addresses for the port. IPAM version.
 
         If port['fixed_ips'] is set to 'ATTR_NOT_SPECIFIED', allocate IP
         addresses for the port. If port['fixed_ips'] contains an IP address or
         a subnet_id then allocate an IP address accordingly.
+
+        :param preallocated_ips: the IPs generated for the port by
+            allocate_ips_for_ports, if any
         """
         # port['post']是创建Port时传入的参数
         p = port['port']
@@ -227,19 +313,22 @@ class IpamPluggableBackend(ipam_backend_mixin.IpamBackendMixin):
                                                 p['device_owner'],
                                                 subnets)
         # 如果没有传入'fixed_ips'参数,则根据关联的Subnet构建ips
-        else:
+        elif preallocated_ips is None:
             ips = []
             version_subnets = [v4, v6_stateful]
             for subnets in version_subnets:
                 if subnets:
                     ips.append([{'subnet_id': s['id']}
                                 for s in subnets])
+        else:
+            ips = []
 
         ips.extend(self._get_auto_address_ips(v6_stateless, p))
 
         ipam_driver = driver.Pool.get_instance(None, context)
         # 调用_ipam_allocate_ips,进行IP地址分配
-        return self._ipam_allocate_ips(context, ipam_driver, p, ips)
+        return (preallocated_ips or []) + self._ipam_allocate_ips(
+            context, ipam_driver, p, ips)
 
     def _get_auto_address_ips(self, v6_stateless_subnets, port,
                               exclude_subnet_ids=None):
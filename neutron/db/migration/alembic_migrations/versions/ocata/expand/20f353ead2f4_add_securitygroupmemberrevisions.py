@@ -0,0 +1,40 @@
+# Copyright 2017 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add securitygroupmemberrevisions
+
+Revision ID: 20f353ead2f4
+Revises: a9c43481023c
+Create Date: 2017-03-02 10:12:41.377210
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '20f353ead2f4'
+down_revision = 'a9c43481023c'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'securitygroupmemberrevisions',
+        sa.Column('security_group_id', sa.String(length=36),
+                  sa.ForeignKey('securitygroups.id', ondelete='CASCADE'),
+                  nullable=False, primary_key=True),
+        sa.Column('revision_number', sa.BigInteger(), nullable=False,
+                  server_default='0'),
+    )
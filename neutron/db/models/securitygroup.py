@@ -63,6 +63,21 @@ class SecurityGroupPortBinding(model_base.BASEV2):
                             lazy='joined', cascade='delete'))
 
 
+class SecurityGroupMemberRevision(model_base.BASEV2):
+    """Represents the revision of the members of a security group.
+
+    It is bumped by each notification of the changes of the member IPs of
+    the group, so that the agents apply them in order.
+    """
+
+    security_group_id = sa.Column(sa.String(36),
+                                  sa.ForeignKey("securitygroups.id",
+                                                ondelete="CASCADE"),
+                                  primary_key=True)
+    revision_number = sa.Column(sa.BigInteger, nullable=False,
+                                server_default='0')
+
+
 class SecurityGroupRule(standard_attr.HasStandardAttributes, model_base.BASEV2,
                         model_base.HasId, model_base.HasProject):
     """Represents a v2 neutron security group rule."""
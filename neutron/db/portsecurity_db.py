@@ -17,6 +17,7 @@ from neutron_lib.api import validators
 from neutron.api.v2 import attributes as attrs
 from neutron.common import utils
 from neutron.db import db_base_plugin_v2
+from neutron.db import models_v2
 from neutron.db import portsecurity_db_common
 from neutron.extensions import portsecurity as psec
 
@@ -27,6 +28,10 @@ class PortSecurityDbMixin(portsecurity_db_common.PortSecurityDbCommon):
         attrs.NETWORKS, ['_extend_port_security_dict'])
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
         attrs.PORTS, ['_extend_port_security_dict'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Network, ['port_security'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Port, ['port_security'])
 
     def _extend_port_security_dict(self, response_data, db_data):
         if ('port-security' in
@@ -33,6 +33,7 @@ from neutron.db import _utils as db_utils
 from neutron.db import api as db_api
 from neutron.db import db_base_plugin_v2
 from neutron.db.models import securitygroup as sg_models
+from neutron.db import models_v2
 from neutron.extensions import securitygroup as ext_sg
 
 
@@ -677,6 +678,8 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
     # Register dict extend functions for ports
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
         attributes.PORTS, ['_extend_port_dict_security_group'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Port, ['security_groups'])
 
     def _process_port_create_security_group(self, context, port,
                                             security_group_ids):
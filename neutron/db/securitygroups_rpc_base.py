@@ -13,6 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import itertools
+
 import netaddr
 from neutron_lib import constants as const
 from neutron_lib.utils import helpers
@@ -24,6 +27,7 @@ from neutron.db.models import allowed_address_pair as aap_models
 from neutron.db.models import securitygroup as sg_models
 from neutron.db import models_v2
 from neutron.db import securitygroups_db as sg_db
+from neutron.extensions import allowedaddresspairs as addr_pair
 from neutron.extensions import securitygroup as ext_sg
 
 LOG = logging.getLogger(__name__)
@@ -34,6 +38,11 @@ DIRECTION_IP_PREFIX = {'ingress': 'source_ip_prefix',
 
 DHCP_RULE_PORT = {4: (67, 68, const.IPv4), 6: (547, 546, const.IPv6)}
 
+# The columns of the security group rules sent to the agents
+_RULE_COLUMNS = ('security_group_id', 'direction', 'ethertype', 'protocol',
+                 'port_range_min', 'port_range_max', 'remote_ip_prefix',
+                 'remote_group_id')
+
 
 class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
     """Mixin class to add agent-based security group implementation."""
@@ -96,11 +105,14 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         sg_change = not helpers.compare_elements(
             original_port.get(ext_sg.SECURITYGROUPS),
             updated_port.get(ext_sg.SECURITYGROUPS))
-        if sg_change:
+        # NOTE: the original port is notified too, so that its addresses
+        # which are no longer members are sent as removed members
+        if (sg_change or
+                original_port['fixed_ips'] != updated_port['fixed_ips'] or
+                original_port.get(addr_pair.ADDRESS_PAIRS) !=
+                updated_port.get(addr_pair.ADDRESS_PAIRS)):
             self.notify_security_groups_member_updated_bulk(
                 context, [original_port, updated_port])
-        elif original_port['fixed_ips'] != updated_port['fixed_ips']:
-            self.notify_security_groups_member_updated(context, updated_port)
 
     def is_security_group_member_updated(self, context,
                                          original_port, updated_port):
@@ -132,6 +144,7 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         """
         sg_provider_updated_networks = set()
         sec_groups = set()
+        member_ports = []
         for port in ports:
             if port['device_owner'] == const.DEVICE_OWNER_DHCP:
                 sg_provider_updated_networks.add(
@@ -148,6 +161,7 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
                         port['network_id'])
             else:
                 sec_groups |= set(port.get(ext_sg.SECURITYGROUPS))
+                member_ports.append(port)
 
         if sg_provider_updated_networks:
             ports_query = context.session.query(models_v2.Port.id).filter(
@@ -157,65 +171,177 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
             self.notifier.security_groups_provider_updated(
                 context, ports_to_update)
         if sec_groups:
+            member_revisions, added_members, removed_members = (
+                self._get_security_group_member_changes(
+                    context, sec_groups, member_ports))
             self.notifier.security_groups_member_updated(
-                context, list(sec_groups))
+                context, list(sec_groups), added_members=added_members,
+                removed_members=removed_members,
+                member_revisions=member_revisions)
 
     def notify_security_groups_member_updated(self, context, port):
         self.notify_security_groups_member_updated_bulk(context, [port])
 
     @db_api.retry_if_session_inactive()
-    def security_group_info_for_ports(self, context, ports):
+    def _get_security_group_member_changes(self, context, sg_ids, ports):
+        """Return the member IPs added to and removed from the groups.
+
+        The changes are computed from the addresses of the created, updated
+        or deleted ports, and the current members of the groups. An address
+        of the ports which is still a member of a group through another
+        port is not removed from it.
+
+        The member revisions of the groups are bumped first, in the same
+        transaction, so that the changes computed with a higher revision
+        are the most recent ones.
+
+        :returns: the new member revision of each group, and the added and
+                  removed member IPs of each group, by ethertype, like the
+                  sg_member_ips of security_group_info_for_ports
+        """
+        ips = set()
+        for port in ports:
+            ips.update(fixed_ip['ip_address']
+                       for fixed_ip in port.get('fixed_ips') or [])
+            ips.update(pair['ip_address']
+                       for pair in port.get(addr_pair.ADDRESS_PAIRS) or [])
+        with context.session.begin(subtransactions=True):
+            member_revisions = self._bump_security_group_member_revisions(
+                context, sg_ids)
+            members = self._select_members_among_ips(context, sg_ids, ips)
+        added_members = {}
+        removed_members = {}
+        for sg_id in sg_ids:
+            for ip in ips:
+                changes = (added_members if (sg_id, ip) in members
+                           else removed_members)
+                ethertype = const.IPv6 if ':' in ip else const.IPv4
+                changes.setdefault(sg_id, {}).setdefault(
+                    ethertype, []).append(ip)
+        return member_revisions, added_members, removed_members
+
+    def _bump_security_group_member_revisions(self, context, sg_ids):
+        """Bump the member revisions of the groups and return them."""
+        revision_model = sg_models.SecurityGroupMemberRevision
+        query = context.session.query(revision_model).filter(
+            revision_model.security_group_id.in_(sg_ids))
+        query.update({revision_model.revision_number:
+                      revision_model.revision_number + 1},
+                     synchronize_session=False)
+        member_revisions = self._select_member_revisions(context, sg_ids)
+        missing_sg_ids = set(sg_ids) - set(member_revisions)
+        if missing_sg_ids:
+            # the revisions of the groups are created on their first change,
+            # the groups might have been deleted since then
+            query = context.session.query(sg_models.SecurityGroup.id).filter(
+                sg_models.SecurityGroup.id.in_(missing_sg_ids))
+            for sg_id, in query:
+                context.session.add(revision_model(security_group_id=sg_id,
+                                                   revision_number=1))
+                member_revisions[sg_id] = 1
+        return member_revisions
+
+    def _select_member_revisions(self, context, sg_ids):
+        """Return the member revisions of the groups which have one."""
+        if not sg_ids:
+            return {}
+        revision_model = sg_models.SecurityGroupMemberRevision
+        query = context.session.query(revision_model.security_group_id,
+                                      revision_model.revision_number)
+        query = query.filter(revision_model.security_group_id.in_(sg_ids))
+        return dict(query)
+
+    def _select_members_among_ips(self, context, sg_ids, ips):
+        """Return the (security group id, ip) members among the ips."""
+        members = set()
+        if not ips:
+            return members
+        sg_binding_port = sg_models.SecurityGroupPortBinding.port_id
+        sg_binding_sgid = sg_models.SecurityGroupPortBinding.security_group_id
+        for ip_model in (models_v2.IPAllocation,
+                         aap_models.AllowedAddressPair):
+            query = context.session.query(sg_binding_sgid,
+                                          ip_model.ip_address)
+            query = query.join(ip_model, ip_model.port_id == sg_binding_port)
+            query = query.filter(sg_binding_sgid.in_(sg_ids),
+                                 ip_model.ip_address.in_(ips))
+            members.update((sg_id, ip) for sg_id, ip in query)
+        return members
+
+    @db_api.retry_if_session_inactive()
+    def security_group_info_for_ports(self, context, ports,
+                                      cached_rules=None, cached_members=None):
+        """Return the security group information of the ports.
+
+        :param cached_rules: ids of the security groups whose rules are
+            cached by the agent. When given, their rules are not returned,
+            and the member IPs of the remote groups not in cached_members
+            are returned for all the ethertypes, so that the agent can cache
+            them whatever rules are added later.
+        :param cached_members: ids of the remote security groups whose
+            member IPs are cached by the agent, they are not returned.
+            When cached_rules is given, the member revisions of the
+            returned remote groups are returned as 'sg_member_revisions'.
+        """
         sg_info = {'devices': ports,
                    'security_groups': {},
                    'sg_member_ips': {}}
-        rules_in_db = self._select_rules_for_ports(context, ports)
+        agent_caches = cached_rules is not None
+        cached_rules = set(cached_rules or [])
+        cached_members = set(cached_members or [])
+        port_sg_ids = self._select_sg_ids_by_port(context, ports)
+        sg_ids = set(itertools.chain.from_iterable(port_sg_ids.values()))
+        # The rules are built once per security group, not once per port
+        # bound to it, the agent expands them for each of its ports.
+        security_groups = dict((sg_id, []) for sg_id in sg_ids)
+        sg_remote_group_ids = collections.defaultdict(list)
         remote_security_group_info = {}
-        for (port_id, rule_in_db) in rules_in_db:
-            remote_gid = rule_in_db.get('remote_group_id')
-            security_group_id = rule_in_db.get('security_group_id')
-            ethertype = rule_in_db['ethertype']
-            if ('security_group_source_groups'
-                not in sg_info['devices'][port_id]):
-                sg_info['devices'][port_id][
-                    'security_group_source_groups'] = []
-
+        seen_rules = set()
+        for rule_in_db in self._select_rules_for_security_groups(context,
+                                                                 sg_ids):
+            security_group_id = rule_in_db.security_group_id
+            rule_dict = self._make_agent_rule_dict(rule_in_db)
+            rule_key = (security_group_id, tuple(sorted(rule_dict.items())))
+            if rule_key in seen_rules:
+                continue
+            seen_rules.add(rule_key)
+            security_groups[security_group_id].append(rule_dict)
+
+            remote_gid = rule_in_db.remote_group_id
             if remote_gid:
-                if (remote_gid
-                    not in sg_info['devices'][port_id][
-                        'security_group_source_groups']):
-                    sg_info['devices'][port_id][
-                        'security_group_source_groups'].append(remote_gid)
-                if remote_gid not in remote_security_group_info:
-                    remote_security_group_info[remote_gid] = {}
-                if ethertype not in remote_security_group_info[remote_gid]:
-                    # this set will be serialized into a list by rpc code
-                    remote_security_group_info[remote_gid][ethertype] = set()
-
-            direction = rule_in_db['direction']
-            rule_dict = {
-                'direction': direction,
-                'ethertype': ethertype}
-
-            for key in ('protocol', 'port_range_min', 'port_range_max',
-                        'remote_ip_prefix', 'remote_group_id'):
-                if rule_in_db.get(key) is not None:
-                    if key == 'remote_ip_prefix':
-                        direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
-                        rule_dict[direction_ip_prefix] = rule_in_db[key]
-                        continue
-                    rule_dict[key] = rule_in_db[key]
-            if security_group_id not in sg_info['security_groups']:
-                sg_info['security_groups'][security_group_id] = []
-            if rule_dict not in sg_info['security_groups'][security_group_id]:
-                sg_info['security_groups'][security_group_id].append(
-                    rule_dict)
-        # Update the security groups info if they don't have any rules
-        sg_ids = self._select_sg_ids_for_ports(context, ports)
-        for (sg_id, ) in sg_ids:
-            if sg_id not in sg_info['security_groups']:
-                sg_info['security_groups'][sg_id] = []
-
+                if remote_gid not in sg_remote_group_ids[security_group_id]:
+                    sg_remote_group_ids[security_group_id].append(remote_gid)
+                if remote_gid in cached_members:
+                    continue
+                # these sets will be serialized into lists by rpc code
+                member_info = remote_security_group_info.setdefault(
+                    remote_gid, {})
+                if agent_caches:
+                    member_info.setdefault(const.IPv4, set())
+                    member_info.setdefault(const.IPv6, set())
+                else:
+                    member_info.setdefault(rule_in_db.ethertype, set())
+
+        for port_id, port_sg_id_list in port_sg_ids.items():
+            source_groups = sg_info['devices'][port_id].setdefault(
+                'security_group_source_groups', [])
+            for sg_id in port_sg_id_list:
+                for remote_gid in sg_remote_group_ids.get(sg_id, ()):
+                    if remote_gid not in source_groups:
+                        source_groups.append(remote_gid)
+
+        sg_info['security_groups'] = dict(
+            (sg_id, rules) for sg_id, rules in security_groups.items()
+            if sg_id not in cached_rules)
         sg_info['sg_member_ips'] = remote_security_group_info
+        if agent_caches:
+            # read before the members, which are then at least as recent,
+            # a group without revision has never been changed
+            revisions = self._select_member_revisions(
+                context, remote_security_group_info.keys())
+            sg_info['sg_member_revisions'] = dict(
+                (sg_id, revisions.get(sg_id, 0))
+                for sg_id in remote_security_group_info)
         # the provider rules do not belong to any security group, so these
         # rules still reside in sg_info['devices'] [port_id]
         self._apply_provider_rule(context, sg_info['devices'])
@@ -226,34 +352,56 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
         ips = self._select_ips_for_remote_group(
             context, sg_info['sg_member_ips'].keys())
         for sg_id, member_ips in ips.items():
+            member_info = sg_info['sg_member_ips'][sg_id]
             for ip in member_ips:
-                ethertype = 'IPv%d' % netaddr.IPNetwork(ip).version
-                if ethertype in sg_info['sg_member_ips'][sg_id]:
-                    sg_info['sg_member_ips'][sg_id][ethertype].add(ip)
+                ethertype = const.IPv6 if ':' in ip else const.IPv4
+                if ethertype in member_info:
+                    member_info[ethertype].add(ip)
         return sg_info
 
-    def _select_sg_ids_for_ports(self, context, ports):
+    def _make_agent_rule_dict(self, rule_in_db,
+                              with_security_group_id=False):
+        direction = rule_in_db.direction
+        rule_dict = {
+            'direction': direction,
+            'ethertype': rule_in_db.ethertype}
+        if with_security_group_id:
+            rule_dict['security_group_id'] = rule_in_db.security_group_id
+        for key in ('protocol', 'port_range_min', 'port_range_max',
+                    'remote_group_id'):
+            value = getattr(rule_in_db, key)
+            if value is not None:
+                rule_dict[key] = value
+        if rule_in_db.remote_ip_prefix is not None:
+            direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
+            rule_dict[direction_ip_prefix] = rule_in_db.remote_ip_prefix
+        return rule_dict
+
+    def _select_sg_ids_by_port(self, context, ports):
+        """Return the ids of the security groups of each port."""
+        port_sg_ids = collections.defaultdict(list)
         if not ports:
-            return []
+            return port_sg_ids
         sg_binding_port = sg_models.SecurityGroupPortBinding.port_id
         sg_binding_sgid = sg_models.SecurityGroupPortBinding.security_group_id
-        query = context.session.query(sg_binding_sgid)
+        query = context.session.query(sg_binding_port, sg_binding_sgid)
         query = query.filter(sg_binding_port.in_(ports.keys()))
-        return query.all()
-
-    def _select_rules_for_ports(self, context, ports):
-        if not ports:
-            return []
-        sg_binding_port = sg_models.SecurityGroupPortBinding.port_id
-        sg_binding_sgid = sg_models.SecurityGroupPortBinding.security_group_id
+        for port_id, sg_id in query:
+            port_sg_ids[port_id].append(sg_id)
+        return port_sg_ids
 
-        sgr_sgid = sg_models.SecurityGroupRule.security_group_id
+    def _select_rules_for_security_groups(self, context, sg_ids):
+        """Return the columns of the rules of the security groups.
 
-        query = context.session.query(sg_binding_port,
-                                      sg_models.SecurityGroupRule)
-        query = query.join(sg_models.SecurityGroupRule,
-                           sgr_sgid == sg_binding_sgid)
-        query = query.filter(sg_binding_port.in_(ports.keys()))
+        Only the columns sent to the agents are loaded, and each rule is
+        loaded once, whatever the number of ports bound to its group.
+        """
+        if not sg_ids:
+            return []
+        sgr_model = sg_models.SecurityGroupRule
+        query = context.session.query(*[getattr(sgr_model, column)
+                                        for column in _RULE_COLUMNS])
+        query = query.filter(sgr_model.security_group_id.in_(sg_ids))
         return query.all()
 
     def _select_ips_for_remote_group(self, context, remote_group_ids):
@@ -301,28 +449,33 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
     def _convert_remote_group_id_to_ip_prefix(self, context, ports):
         remote_group_ids = self._select_remote_group_ids(ports)
         ips = self._select_ips_for_remote_group(context, remote_group_ids)
+        # The prefixes of the members of the remote groups are computed once,
+        # not once per port and rule referencing them.
+        remote_prefixes = {}
+        for remote_group_id, member_ips in ips.items():
+            prefixes = {const.IPv4: [], const.IPv6: []}
+            for ip in member_ips:
+                net = netaddr.IPNetwork(ip)
+                prefixes['IPv%s' % net.version].append((ip, str(net.cidr)))
+            remote_prefixes[remote_group_id] = prefixes
         for port in ports.values():
             updated_rule = []
+            port_ips = set(port.get('fixed_ips', []))
             for rule in port.get('security_group_rules'):
                 remote_group_id = rule.get('remote_group_id')
-                direction = rule.get('direction')
-                direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
                 if not remote_group_id:
                     updated_rule.append(rule)
                     continue
 
                 port['security_group_source_groups'].append(remote_group_id)
-                base_rule = rule
-                for ip in ips[remote_group_id]:
-                    if ip in port.get('fixed_ips', []):
-                        continue
-                    ip_rule = base_rule.copy()
-                    version = netaddr.IPNetwork(ip).version
-                    ethertype = 'IPv%s' % version
-                    if base_rule['ethertype'] != ethertype:
+                direction_ip_prefix = DIRECTION_IP_PREFIX[rule['direction']]
+                prefixes = remote_prefixes[remote_group_id].get(
+                    rule['ethertype'], [])
+                for ip, prefix in prefixes:
+                    if ip in port_ips:
                         continue
-                    ip_rule[direction_ip_prefix] = str(
-                        netaddr.IPNetwork(ip).cidr)
+                    ip_rule = rule.copy()
+                    ip_rule[direction_ip_prefix] = prefix
                     updated_rule.append(ip_rule)
             port['security_group_rules'] = updated_rule
         return ports
@@ -370,23 +523,18 @@ class SecurityGroupServerRpcMixin(sg_db.SecurityGroupDbMixin):
 
     @db_api.retry_if_session_inactive()
     def security_group_rules_for_ports(self, context, ports):
-        rules_in_db = self._select_rules_for_ports(context, ports)
-        for (port_id, rule_in_db) in rules_in_db:
-            port = ports[port_id]
-            direction = rule_in_db['direction']
-            rule_dict = {
-                'security_group_id': rule_in_db['security_group_id'],
-                'direction': direction,
-                'ethertype': rule_in_db['ethertype'],
-            }
-            for key in ('protocol', 'port_range_min', 'port_range_max',
-                        'remote_ip_prefix', 'remote_group_id'):
-                if rule_in_db.get(key) is not None:
-                    if key == 'remote_ip_prefix':
-                        direction_ip_prefix = DIRECTION_IP_PREFIX[direction]
-                        rule_dict[direction_ip_prefix] = rule_in_db[key]
-                        continue
-                    rule_dict[key] = rule_in_db[key]
-            port['security_group_rules'].append(rule_dict)
+        port_sg_ids = self._select_sg_ids_by_port(context, ports)
+        sg_ids = set(itertools.chain.from_iterable(port_sg_ids.values()))
+        sg_port_ids = collections.defaultdict(list)
+        for port_id, port_sg_id_list in port_sg_ids.items():
+            for sg_id in port_sg_id_list:
+                sg_port_ids[sg_id].append(port_id)
+        for rule_in_db in self._select_rules_for_security_groups(context,
+                                                                 sg_ids):
+            rule_dict = self._make_agent_rule_dict(
+                rule_in_db, with_security_group_id=True)
+            for port_id in sg_port_ids[rule_in_db.security_group_id]:
+                ports[port_id]['security_group_rules'].append(
+                    dict(rule_dict))
         self._apply_provider_rule(context, ports)
         return self._convert_remote_group_id_to_ip_prefix(context, ports)
@@ -20,6 +20,7 @@ from neutron.api.v2 import attributes
 from neutron.common import _deprecate
 from neutron.db import common_db_mixin
 from neutron.db.models import subnet_service_type as sst_model
+from neutron.db import models_v2
 
 
 _deprecate._moved_global('SubnetServiceType', new_module=sst_model)
@@ -35,6 +36,8 @@ class SubnetServiceTypeMixin(object):
 
     common_db_mixin.CommonDbMixin.register_dict_extend_funcs(
         attributes.SUBNETS, [_extend_subnet_service_types])
+    common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+        models_v2.Subnet, ['service_types'])
 
 
 _deprecate._MovedGlobals()
@@ -14,6 +14,7 @@ import abc
 
 from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import excutils
 import six
 
 from neutron.ipam import requests as ipam_req
@@ -153,6 +154,35 @@ class Subnet(object):
             AddressOutsideSubnet
         """
 
+    def bulk_allocate(self, address_requests):
+        """Allocates the IP addresses of several requests at once
+
+        Drivers can override this method to allocate the addresses from a
+        single snapshot of the available addresses. The default
+        implementation allocates them one by one, and deallocates them if
+        one of the allocations fails.
+
+        :param address_requests: Specify what to allocate.
+        :type address_requests: A list of instances of subclasses of
+            AddressRequest
+        :returns: A list of netaddr.IPAddress, in the order of the requests
+        :raises: AddressNotAvailable, AddressOutsideAllocationPool,
+            AddressOutsideSubnet
+        """
+        addresses = []
+        try:
+            for address_request in address_requests:
+                addresses.append(self.allocate(address_request))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for address in addresses:
+                    try:
+                        self.deallocate(address)
+                    except Exception:
+                        LOG.debug("Reverting IP allocation failed for %s",
+                                  address)
+        return addresses
+
     @abc.abstractmethod
     def deallocate(self, address):
         """Returns a previously allocated address to the pool
@@ -191,3 +221,17 @@ class SubnetGroup(object):
         :raises: AddressNotAvailable, AddressOutsideAllocationPool,
             AddressOutsideSubnet, IpAddressGenerationFailureAllSubnets
         """
+
+    def bulk_allocate(self, address_requests):
+        """Allocates the IP addresses of several requests at once
+
+        :param address_requests: Specify what to allocate.
+        :type address_requests: A list of instances of subclasses of
+            AddressRequest
+        :returns: A list of netaddr.IPAddress, subnet_id tuples, in the order
+            of the requests
+        :raises: AddressNotAvailable, AddressOutsideAllocationPool,
+            AddressOutsideSubnet, IpAddressGenerationFailureAllSubnets
+        """
+        return [self.allocate(address_request)
+                for address_request in address_requests]
@@ -114,6 +114,21 @@ class IpamSubnetManager(object):
         return ipam_objs.IpamAllocation.get_objects(
             context, ipam_subnet_id=self._ipam_subnet_id, status=status)
 
+    def list_allocated_ips(self, context):
+        """Return the IP addresses currently allocated on the subnet.
+
+        Unlike list_allocations, this method only loads the addresses, not
+        the allocation objects.
+
+        :param context: neutron api request context
+        :returns: a list of IP address strings
+        """
+        model = ipam_objs.IpamAllocation.db_model
+        query = context.session.query(model.ip_address).filter_by(
+            ipam_subnet_id=self._ipam_subnet_id,
+            status=const.IPAM_ALLOCATION_STATUS_ALLOCATED)
+        return [ip_address for ip_address, in query]
+
     def create_allocation(self, context, ip_address,
                           status=const.IPAM_ALLOCATION_STATUS_ALLOCATED):
         """Create an IP allocation entry.
@@ -27,6 +27,7 @@ from oslo_utils import uuidutils
 from neutron._i18n import _, _LE
 from neutron.ipam import driver as ipam_base
 from neutron.ipam.drivers.neutrondb_ipam import db_api as ipam_db_api
+from neutron.ipam.drivers.neutrondb_ipam import free_ranges
 from neutron.ipam import exceptions as ipam_exc
 from neutron.ipam import requests as ipam_req
 from neutron.ipam import subnet_alloc
@@ -35,6 +36,10 @@ from neutron.ipam import utils as ipam_utils
 
 LOG = log.getLogger(__name__)
 
+# Number of cached free addresses found allocated by other server workers
+# after which the free addresses of the subnet are loaded again
+MAX_STALE_FREE_IPS = 10
+
 
 class NeutronDbSubnet(ipam_base.Subnet):
     """Manage IP addresses for Neutron DB IPAM driver.
@@ -154,6 +159,8 @@ class NeutronDbSubnet(ipam_base.Subnet):
 
     def _generate_ip(self, context, prefer_next=False):
         """Generate an IP address from the set of available addresses."""
+        if free_ranges.get_cache() is not None:
+            return self._generate_ips(context, [prefer_next])[0]
         ip_allocations = netaddr.IPSet()
         for ipallocation in self.subnet_manager.list_allocations(context):
             ip_allocations.add(ipallocation.ip_address)
@@ -178,6 +185,87 @@ class NeutronDbSubnet(ipam_base.Subnet):
         raise ipam_exc.IpAddressGenerationFailure(
                   subnet_id=self.subnet_manager.neutron_id)
 
+    def _load_free_ranges(self, context, pools):
+        allocated = [int(netaddr.IPAddress(ip_address)) for ip_address in
+                     self.subnet_manager.list_allocated_ips(context)]
+        return [free_ranges.FreeRanges(int(netaddr.IPAddress(pool.first_ip)),
+                                       int(netaddr.IPAddress(pool.last_ip)),
+                                       allocated)
+                for pool in pools]
+
+    @staticmethod
+    def _remove_free_ips(pools_free_ranges, ip_addresses):
+        for ip_address in ip_addresses:
+            ip = int(netaddr.IPAddress(ip_address))
+            for pool_free_ranges in pools_free_ranges:
+                if pool_free_ranges.remove(ip):
+                    break
+
+    @staticmethod
+    def _pick_free_ip(pools, pools_free_ranges, prefer_next):
+        for ip_pool, pool_free_ranges in zip(pools, pools_free_ranges):
+            if not pool_free_ranges.size:
+                continue
+            # Same selection window as when computing the available set
+            window = 1 if prefer_next else min(pool_free_ranges.size, 10)
+            ip = random.choice(pool_free_ranges.first_ips(window))
+            pool_free_ranges.remove(ip)
+            ip_version = netaddr.IPAddress(ip_pool.first_ip).version
+            return str(netaddr.IPAddress(ip, ip_version)), ip_pool.id
+
+    def _generate_ips(self, context, prefer_next_flags, excluded_ips=()):
+        """Generate IP addresses from one snapshot of the free addresses.
+
+        The free addresses are taken from the cache of the worker if
+        enabled, or loaded from the allocations of the subnet. The cached
+        candidate addresses are checked against the allocations, as they
+        might have been allocated by another server worker since the free
+        addresses were loaded.
+
+        :param prefer_next_flags: for each address to generate, whether the
+            next available address is preferred
+        :param excluded_ips: addresses not to generate, as they are being
+            allocated by specific requests
+        :returns: a list of (IP address, pool id) tuples
+        """
+        cache = free_ranges.get_cache()
+        subnet_id = self.subnet_manager.neutron_id
+        pools = self.subnet_manager.list_pools(context)
+        pools_free_ranges = None
+        if cache is not None:
+            pools_free_ranges = cache.get(subnet_id, pools)
+        excluded_ips = [str(ip) for ip in excluded_ips]
+        if pools_free_ranges is not None:
+            self._remove_free_ips(pools_free_ranges, excluded_ips)
+        reloaded = False
+        stale_ips = 0
+        ips = []
+        while len(ips) < len(prefer_next_flags):
+            if not reloaded and (
+                    pools_free_ranges is None or
+                    stale_ips >= MAX_STALE_FREE_IPS or
+                    not any(r.size for r in pools_free_ranges)):
+                pools_free_ranges = self._load_free_ranges(context, pools)
+                if cache is not None:
+                    cache.set(subnet_id, pools, pools_free_ranges)
+                reloaded = True
+                # the addresses generated so far are not stored yet
+                self._remove_free_ips(
+                    pools_free_ranges,
+                    excluded_ips + [ip for ip, pool_id in ips])
+            candidate = self._pick_free_ip(
+                pools, pools_free_ranges, prefer_next_flags[len(ips)])
+            if candidate is None:
+                raise ipam_exc.IpAddressGenerationFailure(
+                    subnet_id=subnet_id)
+            self._remove_free_ips(pools_free_ranges, [candidate[0]])
+            if reloaded or self.subnet_manager.check_unique_allocation(
+                    context, candidate[0]):
+                ips.append(candidate)
+            else:
+                stale_ips += 1
+        return ips
+
     def allocate(self, address_request):
         # NOTE(pbondar): Ipam driver is always called in context of already
         # running transaction, which is started on create_port or upper level.
@@ -210,6 +298,44 @@ class NeutronDbSubnet(ipam_base.Subnet):
             ip_address, all_pool_id = self._generate_ip(self._context,
                                                         prefer_next)
 
+        self._create_allocations([ip_address])
+        return ip_address
+
+    def bulk_allocate(self, address_requests):
+        """Allocate the IP addresses of several requests at once.
+
+        The addresses to generate are picked from one snapshot of the free
+        addresses of the subnet, rather than from a new one for each
+        address.
+        """
+        ip_addresses = [None] * len(address_requests)
+        generated = []
+        for index, address_request in enumerate(address_requests):
+            if isinstance(address_request, ipam_req.SpecificAddressRequest):
+                ip_address = str(address_request.address)
+                if ip_address in ip_addresses:
+                    raise ipam_exc.IpAddressAlreadyAllocated(
+                        subnet_id=self.subnet_manager.neutron_id,
+                        ip=ip_address)
+                self._verify_ip(self._context, ip_address)
+                ip_addresses[index] = ip_address
+            else:
+                generated.append(index)
+        if generated:
+            prefer_next_flags = [
+                isinstance(address_requests[index],
+                           ipam_req.PreferNextAddressRequest)
+                for index in generated]
+            specific_ips = [ip for ip in ip_addresses if ip is not None]
+            for index, (ip_address, pool_id) in zip(
+                    generated, self._generate_ips(self._context,
+                                                  prefer_next_flags,
+                                                  specific_ips)):
+                ip_addresses[index] = ip_address
+        self._create_allocations(ip_addresses)
+        return ip_addresses
+
+    def _create_allocations(self, ip_addresses):
         # Create IP allocation request object
         # The only defined status at this stage is 'ALLOCATED'.
         # More states will be available in the future - e.g.: RECYCLABLE
@@ -223,12 +349,17 @@ class NeutronDbSubnet(ipam_base.Subnet):
                     将上述IP地址(或者是传入,或者是生成)存入ipamallocations表中,
                     表示这个IP地址已经被分配了
                 '''
-                self.subnet_manager.create_allocation(self._context,
-                                                      ip_address)
+                for ip_address in ip_addresses:
+                    self.subnet_manager.create_allocation(self._context,
+                                                          ip_address)
         except db_exc.DBReferenceError:
             raise n_exc.SubnetNotFound(
                 subnet_id=self.subnet_manager.neutron_id)
-        return ip_address
+        cache = free_ranges.get_cache()
+        if cache is not None:
+            for ip_address in ip_addresses:
+                cache.allocated(self.subnet_manager.neutron_id,
+                                int(netaddr.IPAddress(ip_address)))
 
     def deallocate(self, address):
         # This is almost a no-op because the Neutron DB IPAM driver does not
@@ -241,6 +372,10 @@ class NeutronDbSubnet(ipam_base.Subnet):
             raise ipam_exc.IpAddressAllocationNotFound(
                 subnet_id=self.subnet_manager.neutron_id,
                 ip_address=address)
+        cache = free_ranges.get_cache()
+        if cache is not None:
+            cache.deallocated(self.subnet_manager.neutron_id,
+                              int(netaddr.IPAddress(address)))
 
     def _no_pool_changes(self, context, pools):
         """Check if pool updates in db are required."""
@@ -330,6 +465,9 @@ class NeutronDbPool(subnet_alloc.SubnetAllocator):
         """
         count = ipam_db_api.IpamSubnetManager.delete(self._context,
                                                      subnet_id)
+        cache = free_ranges.get_cache()
+        if cache is not None:
+            cache.remove(subnet_id)
         if count < 1:
             LOG.error(_LE("IPAM subnet referenced to "
                           "Neutron subnet %s does not exist"),
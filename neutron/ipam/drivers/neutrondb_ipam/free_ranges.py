@@ -0,0 +1,181 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Per worker cache of the free addresses of the allocation pools.
+
+Generating an address used to load all the allocations of the subnet and to
+compute the difference between its pools and these allocations. The free
+addresses of the pools of the recently used subnets are instead kept as
+sorted lists of ranges, updated by the allocations and deallocations of the
+worker, so that picking an address is a bisection.
+
+The IpamAllocation table remains the reference: the addresses allocated by
+the other workers are still seen as free, the driver checks a candidate
+address is not allocated before using it, and loads the ranges again from
+the database when they look exhausted.
+"""
+
+import bisect
+import collections
+
+from oslo_config import cfg
+from six import moves
+
+_CACHE = None
+
+
+class FreeRanges(object):
+    """Free addresses of an allocation pool, as sorted disjoint ranges.
+
+    The addresses are integers, the ranges are inclusive.
+    """
+
+    def __init__(self, first, last, allocated=()):
+        # the bounds of the pool
+        self.first = first
+        self.last = last
+        self._firsts = []
+        self._lasts = []
+        self.size = 0
+        for ip in sorted(ip for ip in allocated if first <= ip <= last):
+            if ip > first:
+                self._append(first, ip - 1)
+            first = ip + 1
+        if first <= last:
+            self._append(first, last)
+
+    def _append(self, first, last):
+        self._firsts.append(first)
+        self._lasts.append(last)
+        self.size += last - first + 1
+
+    def __contains__(self, ip):
+        index = bisect.bisect_right(self._firsts, ip) - 1
+        return index >= 0 and ip <= self._lasts[index]
+
+    def first_ips(self, count):
+        """Return up to count of the lowest free addresses."""
+        ips = []
+        for first, last in moves.zip(self._firsts, self._lasts):
+            ips.extend(moves.range(
+                first, min(last, first + count - len(ips) - 1) + 1))
+            if len(ips) == count:
+                break
+        return ips
+
+    def remove(self, ip):
+        """Mark an address as allocated, return False if it was not free."""
+        index = bisect.bisect_right(self._firsts, ip) - 1
+        if index < 0 or ip > self._lasts[index]:
+            return False
+        first, last = self._firsts[index], self._lasts[index]
+        if first == last:
+            del self._firsts[index]
+            del self._lasts[index]
+        elif ip == first:
+            self._firsts[index] = ip + 1
+        elif ip == last:
+            self._lasts[index] = ip - 1
+        else:
+            self._lasts[index] = ip - 1
+            self._firsts.insert(index + 1, ip + 1)
+            self._lasts.insert(index + 1, last)
+        self.size -= 1
+        return True
+
+    def add(self, ip):
+        """Mark an address as free, return False if it already was."""
+        index = bisect.bisect_right(self._firsts, ip) - 1
+        if index >= 0 and ip <= self._lasts[index]:
+            return False
+        joins_previous = index >= 0 and self._lasts[index] == ip - 1
+        joins_next = (index + 1 < len(self._firsts) and
+                      self._firsts[index + 1] == ip + 1)
+        if joins_previous and joins_next:
+            self._lasts[index] = self._lasts[index + 1]
+            del self._firsts[index + 1]
+            del self._lasts[index + 1]
+        elif joins_previous:
+            self._lasts[index] = ip
+        elif joins_next:
+            self._firsts[index + 1] = ip
+        else:
+            self._firsts.insert(index + 1, ip)
+            self._lasts.insert(index + 1, ip)
+        self.size += 1
+        return True
+
+
+class FreeRangesCache(object):
+    """Bounded LRU cache of the free ranges of the pools of the subnets.
+
+    The entries are keyed by subnet, and hold the pools they were computed
+    for: an entry computed for other pools, e.g. before the pools of the
+    subnet were updated by another worker, is ignored.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        # subnet id -> (pools, list of FreeRanges, one per pool)
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _pools_key(pools):
+        return tuple((pool.id, pool.first_ip, pool.last_ip)
+                     for pool in pools)
+
+    def get(self, subnet_id, pools):
+        """Return the free ranges of the pools of the subnet, or None."""
+        entry = self._entries.pop(subnet_id, None)
+        if entry is None or entry[0] != self._pools_key(pools):
+            return None
+        # most recently used last
+        self._entries[subnet_id] = entry
+        return entry[1]
+
+    def set(self, subnet_id, pools, free_ranges):
+        self._entries.pop(subnet_id, None)
+        self._entries[subnet_id] = (self._pools_key(pools), free_ranges)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def remove(self, subnet_id):
+        self._entries.pop(subnet_id, None)
+
+    def allocated(self, subnet_id, ip):
+        """Mark an address of the subnet as allocated."""
+        entry = self._entries.get(subnet_id)
+        if entry is not None:
+            for free_ranges in entry[1]:
+                if free_ranges.remove(ip):
+                    return
+
+    def deallocated(self, subnet_id, ip):
+        """Mark an address of the subnet as free."""
+        entry = self._entries.get(subnet_id)
+        if entry is None:
+            return
+        for free_ranges in entry[1]:
+            if free_ranges.first <= ip <= free_ranges.last:
+                free_ranges.add(ip)
+                return
+
+
+def get_cache():
+    """Return the cache of this worker, None if disabled."""
+    global _CACHE
+    if _CACHE is None and cfg.CONF.ipam_free_ranges_cache_size:
+        _CACHE = FreeRangesCache(cfg.CONF.ipam_free_ranges_cache_size)
+    return _CACHE
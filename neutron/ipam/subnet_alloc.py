@@ -20,6 +20,8 @@ import netaddr
 from neutron_lib import constants
 from neutron_lib import exceptions as lib_exc
 from oslo_db import exception as db_exc
+from oslo_log import log as logging
+from oslo_utils import excutils
 from oslo_utils import uuidutils
 
 from neutron._i18n import _
@@ -30,6 +32,8 @@ from neutron.ipam import exceptions as ipam_exc
 from neutron.ipam import requests as ipam_req
 from neutron.ipam import utils as ipam_utils
 
+LOG = logging.getLogger(__name__)
+
 
 class SubnetAllocator(driver.Pool):
     """Class for handling allocation of subnet prefixes from a subnet pool.
@@ -234,6 +238,36 @@ class IpamSubnetGroup(driver.SubnetGroup):
                 continue
         raise ipam_exc.IpAddressGenerationFailureAllSubnets()
 
+    def bulk_allocate(self, address_requests):
+        """Allocate the addresses from the first subnet if it can fit them.
+
+        Otherwise the addresses are allocated one by one, from each subnet
+        in turn as the allocate method does.
+        """
+        if self._subnet_ids:
+            subnet_id = self._subnet_ids[0]
+            try:
+                ipam_subnet = self._driver.get_subnet(subnet_id)
+                return [(ip_address, subnet_id) for ip_address in
+                        ipam_subnet.bulk_allocate(address_requests)]
+            except ipam_exc.IpAddressGenerationFailure:
+                pass
+        allocated = []
+        try:
+            for address_request in address_requests:
+                allocated.append(self.allocate(address_request))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if self._driver.needs_rollback():
+                    for ip_address, subnet_id in allocated:
+                        try:
+                            self._driver.get_subnet(subnet_id).deallocate(
+                                ip_address)
+                        except Exception:
+                            LOG.debug("Reverting IP allocation failed for "
+                                      "%s", ip_address)
+        return allocated
+
 
 class SubnetPoolReader(object):
     '''Class to assist with reading a subnetpool, loading defaults, and
@@ -71,6 +71,13 @@ class Manager(periodic_task.PeriodicTasks):
         """
         pass
 
+    def stop(self):
+        """Handle the stop of the service.
+
+        Child classes can override this method.
+        """
+        pass
+
 
 def validate_post_plugin_load():
     """Checks if the configuration variables are valid.
@@ -15,6 +15,11 @@
 
 from neutron.agent.common import ovs_lib
 
+# Bridge external_ids key recording the cookies of the flows installed by
+# the agent, so that the next agent run can delete them by cookie instead of
+# dumping all the flows of the bridge.
+COOKIES_EXTERNAL_ID = 'neutron-flow-cookies'
+
 
 class OVSBridgeCookieMixin(object):
     '''Mixin to provide cookie retention functionality
@@ -24,6 +29,7 @@ class OVSBridgeCookieMixin(object):
     def __init__(self, *args, **kwargs):
         super(OVSBridgeCookieMixin, self).__init__(*args, **kwargs)
         self._reserved_cookies = set()
+        self._retired_cookies = set()
 
     @property
     def reserved_cookies(self):
@@ -46,4 +52,59 @@ class OVSBridgeCookieMixin(object):
         self._reserved_cookies.add(val)
         if self._default_cookie in self._reserved_cookies:
             self._reserved_cookies.remove(self._default_cookie)
+        # flows might have been installed with the previous cookie
+        if self._default_cookie != val:
+            self._retired_cookies.add(self._default_cookie)
         super(OVSBridgeCookieMixin, self).set_agent_uuid_stamp(val)
+
+    def create(self, *args, **kwargs):
+        super(OVSBridgeCookieMixin, self).create(*args, **kwargs)
+        self.add_recorded_cookies()
+
+    def _get_recorded_cookies(self):
+        external_ids = self.db_get_val('Bridge', self.br_name,
+                                       'external_ids') or {}
+        recorded = external_ids.get(COOKIES_EXTERNAL_ID)
+        if recorded is None:
+            return None
+        return set(int(c, 16) for c in recorded.split(',') if c)
+
+    def _set_recorded_cookies(self, cookies):
+        recorded = ','.join('0x%x' % c for c in sorted(cookies))
+        self.set_db_attribute('Bridge', self.br_name, 'external_ids',
+                              {COOKIES_EXTERNAL_ID: recorded})
+
+    def add_recorded_cookies(self):
+        """Add the reserved cookies to the ones recorded on the bridge.
+
+        Flows may be installed with the reserved cookies from now on, they
+        are recorded first so that the flows are found even if the agent
+        dies before the next cleanup. Without a record, the cleanup has to
+        dump the flows anyway so there is nothing to add to.
+        """
+        cookies = self.reserved_cookies
+        recorded = self._get_recorded_cookies()
+        if recorded is not None and not cookies <= recorded:
+            self._set_recorded_cookies(recorded | cookies)
+
+    def get_retired_cookies(self):
+        """Return the cookies of the flows that are no longer used.
+
+        They are the cookies recorded on the bridge, by this or a previous
+        run of the agent, that are not reserved anymore. None is returned if
+        the bridge has no record of cookies, in which case the stale flows
+        can only be found by dumping the flows.
+        """
+        recorded = self._get_recorded_cookies()
+        if recorded is None:
+            return None
+        return (recorded | self._retired_cookies) - self.reserved_cookies
+
+    def record_cookies(self):
+        """Record the reserved cookies as the only ones in use.
+
+        The caller is expected to have deleted the flows of the retired
+        cookies.
+        """
+        self._retired_cookies.clear()
+        self._set_recorded_cookies(self.reserved_cookies)
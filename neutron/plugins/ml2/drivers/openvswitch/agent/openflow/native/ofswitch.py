@@ -14,6 +14,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import threading
+
 import eventlet
 import netaddr
 from oslo_config import cfg
@@ -44,6 +47,8 @@ class OpenFlowSwitchMixin(object):
 
     def __init__(self, *args, **kwargs):
         self._app = kwargs.pop('ryu_app')
+        # per-thread queue of the flow mods issued in bundled_flows()
+        self._flow_mod_batch = threading.local()
         super(OpenFlowSwitchMixin, self).__init__(*args, **kwargs)
 
     def _get_dp_by_dpid(self, dpid_int):
@@ -93,6 +98,83 @@ class OpenFlowSwitchMixin(object):
                   {"request": msg, "result": result})
         return result
 
+    def _send_flow_mod(self, msg):
+        msgs = getattr(self._flow_mod_batch, 'msgs', None)
+        if msgs is None:
+            self._send_msg(msg)
+        else:
+            msgs.append(msg)
+
+    def _send_flow_mods(self, msgs):
+        """Send flow mods pipelined, followed by a single barrier.
+
+        All the flow mods but the last one are sent to the switch without
+        waiting for any reply, the Ryu app collects their errors by xid. The
+        last one is sent through ofctl, which follows it with a barrier: once
+        it is replied to, the switch processed all of them. The first error
+        is then raised like _send_msg does.
+        """
+        if not msgs:
+            return
+        pipelined = msgs[:-1]
+        for msg in pipelined:
+            msg.datapath.set_xid(msg)
+        xids = [msg.xid for msg in pipelined]
+        self._app.watch_flow_mod_errors(xids)
+        error = None
+        try:
+            for msg in pipelined:
+                msg.datapath.send_msg(msg)
+            try:
+                self._send_msg(msgs[-1])
+            except RuntimeError as e:
+                error = e
+        finally:
+            errors = self._app.get_flow_mod_errors(xids)
+        for msg in pipelined:
+            if msg.xid in errors:
+                m = _("ofctl request %(request)s error %(error)s") % {
+                    "request": msg,
+                    "error": errors[msg.xid],
+                }
+                LOG.error(m)
+                # NOTE(yamamoto): use RuntimeError for compat with ovs_lib
+                error = RuntimeError(m)
+                break
+        if error is not None:
+            raise error
+
+    @contextlib.contextmanager
+    def bundled_flows(self):
+        """Batch the flow mods issued on the bridge within the context.
+
+        The flow mods issued by the current thread are queued and sent in
+        order when the outermost context exits, with a single barrier, see
+        _send_flow_mods(). Nothing is sent if an exception is raised.
+        """
+        if getattr(self._flow_mod_batch, 'msgs', None) is not None:
+            yield self
+            return
+        self._flow_mod_batch.msgs = []
+        try:
+            yield self
+            msgs = self._flow_mod_batch.msgs
+        finally:
+            self._flow_mod_batch.msgs = None
+        self._send_flow_mods(msgs)
+
+    def install_flows(self, flows):
+        """Add flows, given as install_instructions() keyword dicts."""
+        with self.bundled_flows():
+            for flow in flows:
+                self.install_instructions(**flow)
+
+    def uninstall_flows(self, flows):
+        """Delete flows, given as delete_flows() keyword dicts."""
+        with self.bundled_flows():
+            for flow in flows:
+                self.delete_flows(**flow)
+
     @staticmethod
     def _match(_ofp, ofpp, match, **match_kwargs):
         if match is not None:
@@ -119,7 +201,7 @@ class OpenFlowSwitchMixin(object):
                               priority=priority,
                               out_group=ofp.OFPG_ANY,
                               out_port=ofp.OFPP_ANY)
-        self._send_msg(msg)
+        self._send_flow_mod(msg)
 
     def dump_flows(self, table_id=None):
         (dp, ofp, ofpp) = self._get_dp()
@@ -135,14 +217,22 @@ class OpenFlowSwitchMixin(object):
         return flows
 
     def cleanup_flows(self):
-        cookies = set([f.cookie for f in self.dump_flows()]) - \
-                  self.reserved_cookies
         LOG.debug("Reserved cookies for %s: %s", self.br_name,
                   self.reserved_cookies)
-        for c in cookies:
-            LOG.warning(_LW("Deleting flow with cookie 0x%(cookie)x"),
-                        {'cookie': c})
-            self.delete_flows(cookie=c, cookie_mask=((1 << 64) - 1))
+        cookies = self.get_retired_cookies()
+        if cookies is None:
+            cookies = set([f.cookie for f in self.dump_flows()]) - \
+                      self.reserved_cookies
+            for c in cookies:
+                LOG.warning(_LW("Deleting flow with cookie 0x%(cookie)x"),
+                            {'cookie': c})
+        else:
+            LOG.debug("Deleting flows with retired cookies %s from bridge "
+                      "%s", cookies, self.br_name)
+        with self.bundled_flows():
+            for c in sorted(cookies):
+                self.delete_flows(cookie=c, cookie_mask=((1 << 64) - 1))
+        self.record_cookies()
 
     def install_goto_next(self, table_id):
         self.install_goto(table_id=table_id, dest_table_id=table_id + 1)
@@ -187,7 +277,7 @@ class OpenFlowSwitchMixin(object):
                               match=match,
                               priority=priority,
                               instructions=instructions)
-        self._send_msg(msg)
+        self._send_flow_mod(msg)
 
     def install_apply_actions(self, actions,
                               table_id=0, priority=0,
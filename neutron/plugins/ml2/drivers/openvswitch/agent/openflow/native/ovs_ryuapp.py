@@ -20,6 +20,9 @@ from oslo_log import log as logging
 from oslo_utils import excutils
 import ryu.app.ofctl.api  # noqa
 from ryu.base import app_manager
+from ryu.controller import event
+from ryu.controller import handler
+from ryu.controller import ofp_event
 from ryu.lib import hub
 from ryu.ofproto import ofproto_v1_3
 
@@ -50,9 +53,58 @@ def agent_main_wrapper(bridge_classes):
         hub.spawn(app_manager.AppManager.get_instance().close)
 
 
+class _FlowModErrorsRequest(event.EventRequestBase):
+    def __init__(self, dst, xids):
+        super(_FlowModErrorsRequest, self).__init__()
+        self.dst = dst
+        self.xids = xids
+
+
+class _FlowModErrorsReply(event.EventReplyBase):
+    def __init__(self, dst, errors):
+        super(_FlowModErrorsReply, self).__init__(dst)
+        self.errors = errors
+
+
 class OVSNeutronAgentRyuApp(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
 
+    def __init__(self, *args, **kwargs):
+        super(OVSNeutronAgentRyuApp, self).__init__(*args, **kwargs)
+        # xid -> error message, of the flow mods sent without barrier
+        self._flow_mod_errors = {}
+
+    def watch_flow_mod_errors(self, xids):
+        """Collect the errors of the flow mods with these xids."""
+        for xid in xids:
+            self._flow_mod_errors[xid] = None
+
+    def get_flow_mod_errors(self, xids):
+        """Return the errors of the flow mods with these xids by xid.
+
+        The request is handled after the events the app already received,
+        so once a barrier following the flow mods was replied to, all their
+        errors are returned. The xids are not watched anymore.
+        """
+        if not xids:
+            return {}
+        return self.send_request(
+            _FlowModErrorsRequest(self.name, xids)).errors
+
+    @handler.set_ev_cls(ofp_event.EventOFPErrorMsg, handler.MAIN_DISPATCHER)
+    def _error_msg_handler(self, ev):
+        if ev.msg.xid in self._flow_mod_errors:
+            self._flow_mod_errors[ev.msg.xid] = ev.msg
+
+    @handler.set_ev_cls(_FlowModErrorsRequest)
+    def _flow_mod_errors_handler(self, req):
+        errors = {}
+        for xid in req.xids:
+            error = self._flow_mod_errors.pop(xid, None)
+            if error is not None:
+                errors[xid] = error
+        self.reply_to_request(req, _FlowModErrorsReply(req.src, errors))
+
     def start(self):
         # Start Ryu event loop thread
         super(OVSNeutronAgentRyuApp, self).start()
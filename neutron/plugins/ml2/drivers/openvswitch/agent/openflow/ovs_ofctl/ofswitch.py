@@ -105,9 +105,20 @@ class OpenFlowSwitchMixin(object):
                 yield flow, fl_cookie, fl_table
 
     def cleanup_flows(self):
-        flows = self.dump_flows_all_tables()
-        for flow, cookie, table in self._filter_flows(flows):
-            # deleting a stale flow should be rare.
-            # it might deserve some attention
-            LOG.warning(_LW("Deleting flow %s"), flow)
-            self.delete_flows(cookie=cookie + '/-1', table=table)
+        retired_cookies = self.get_retired_cookies()
+        if retired_cookies is None:
+            flows = self.dump_flows_all_tables()
+            stale_flows = []
+            for flow, cookie, table in self._filter_flows(flows):
+                # deleting a stale flow should be rare.
+                # it might deserve some attention
+                LOG.warning(_LW("Deleting flow %s"), flow)
+                stale_flows.append({'cookie': cookie + '/-1',
+                                    'table': table})
+        else:
+            LOG.debug("Deleting flows with retired cookies %s from bridge "
+                      "%s", retired_cookies, self.br_name)
+            stale_flows = [{'cookie': '0x%x/-1' % cookie}
+                           for cookie in sorted(retired_cookies)]
+        self.uninstall_flows(stale_flows)
+        self.record_cookies()
@@ -17,6 +17,8 @@
 
 
 from neutron.agent.common import ovs_lib
+from neutron.plugins.ml2.drivers.openvswitch.agent.common import constants \
+        as ovs_consts
 from neutron.plugins.ml2.drivers.openvswitch.agent.openflow \
     import br_cookie
 from neutron.plugins.ml2.drivers.openvswitch.agent.openflow.ovs_ofctl \
@@ -34,6 +36,9 @@ class OVSAgentBridge(ofswitch.OpenFlowSwitchMixin,
         # 这里教书的是ovs-ofctl，这个模块就是没有控制器
         # 所以setup controller就是删除控制器
         self.del_controller()
+        if conf.OVS.of_bundle:
+            self.add_protocols(ovs_consts.OPENFLOW14)
+            self.use_bundle = True
 
     def drop_port(self, in_port):
         self.install_drop(priority=2, in_port=in_port)
@@ -16,12 +16,14 @@
 
 import base64
 import collections
+import contextlib
 import functools
 import hashlib
 import signal
 import sys
 import time
 
+import eventlet
 import netaddr
 from neutron_lib import constants as n_const
 from neutron_lib.utils import helpers
@@ -86,6 +88,18 @@ class OVSPluginApi(agent_rpc.PluginApi):
     pass
 
 
+@contextlib.contextmanager
+def bundled_flows(bridges):
+    """Batch the flow mods issued on all the given bridges."""
+    bridges = [br for br in bridges if br is not None]
+    if not bridges:
+        yield
+        return
+    with bridges[0].bundled_flows():
+        with bundled_flows(bridges[1:]):
+            yield
+
+
 def has_zero_prefixlen_address(ip_addresses):
     return any(netaddr.IPNetwork(ip).prefixlen == 0 for ip in ip_addresses)
 
@@ -197,9 +211,14 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
 
         self.polling_interval = agent_conf.polling_interval
         self.minimize_polling = agent_conf.minimize_polling
+        self.port_processing_chunk_size = (
+            agent_conf.port_processing_chunk_size)
+        # Port table writes queued by _batched_port_db_writes()
+        self._port_db_updates = None
         self.ovsdb_monitor_respawn_interval = (
             agent_conf.ovsdb_monitor_respawn_interval or
             constants.DEFAULT_OVSDBMON_RESPAWN)
+        self.native_ovsdb_monitor = agent_conf.native_ovsdb_monitor
         self.local_ip = ovs_conf.local_ip
         self.tunnel_count = 0
         self.vxlan_udp_port = agent_conf.vxlan_udp_port
@@ -216,6 +235,9 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
             self.setup_tunnel_br_flows()
 
         self.init_extension_manager(self.connection)
+        # the extensions have requested their cookies, record them before
+        # they install any flow
+        self._record_flow_cookies()
 
         self.dvr_agent = ovs_dvr_neutron_agent.OVSDVRNeutronAgent(
             self.context,
@@ -510,30 +532,36 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
 
     def fdb_add(self, context, fdb_entries):
         LOG.debug("fdb_add received")
-        for lvm, agent_ports in self.get_agent_ports(fdb_entries):
-            agent_ports.pop(self.local_ip, None)
-            if len(agent_ports):
-                if not self.enable_distributed_routing:
-                    with self.tun_br.deferred() as deferred_br:
-                        self.fdb_add_tun(context, deferred_br, lvm,
-                                         agent_ports, self._tunnel_port_lookup)
-                else:
-                    self.fdb_add_tun(context, self.tun_br, lvm,
-                                     agent_ports, self._tunnel_port_lookup)
+        # the flows of all the networks are sent to br-tun at once
+        with bundled_flows([self.tun_br]):
+            for lvm, agent_ports in self.get_agent_ports(fdb_entries):
+                agent_ports.pop(self.local_ip, None)
+                if len(agent_ports):
+                    if not self.enable_distributed_routing:
+                        with self.tun_br.deferred() as deferred_br:
+                            self.fdb_add_tun(context, deferred_br, lvm,
+                                             agent_ports,
+                                             self._tunnel_port_lookup)
+                    else:
+                        self.fdb_add_tun(context, self.tun_br, lvm,
+                                         agent_ports,
+                                         self._tunnel_port_lookup)
 
     def fdb_remove(self, context, fdb_entries):
         LOG.debug("fdb_remove received")
-        for lvm, agent_ports in self.get_agent_ports(fdb_entries):
-            agent_ports.pop(self.local_ip, None)
-            if len(agent_ports):
-                if not self.enable_distributed_routing:
-                    with self.tun_br.deferred() as deferred_br:
-                        self.fdb_remove_tun(context, deferred_br, lvm,
+        with bundled_flows([self.tun_br]):
+            for lvm, agent_ports in self.get_agent_ports(fdb_entries):
+                agent_ports.pop(self.local_ip, None)
+                if len(agent_ports):
+                    if not self.enable_distributed_routing:
+                        with self.tun_br.deferred() as deferred_br:
+                            self.fdb_remove_tun(context, deferred_br, lvm,
+                                                agent_ports,
+                                                self._tunnel_port_lookup)
+                    else:
+                        self.fdb_remove_tun(context, self.tun_br, lvm,
                                             agent_ports,
                                             self._tunnel_port_lookup)
-                else:
-                    self.fdb_remove_tun(context, self.tun_br, lvm,
-                                        agent_ports, self._tunnel_port_lookup)
 
     def add_fdb_flow(self, br, port_info, remote_ip, lvm, ofport):
         if port_info == n_const.FLOODING_ENTRY:
@@ -823,10 +851,39 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
             vlan_mapping['segmentation_id'] = str(segmentation_id)
         port_other_config.update(vlan_mapping)
         # 将内外VID映射的规则（vlan_mapping）存储在br-int的Port表中
-        self.int_br.set_db_attribute("Port", port.port_name, "other_config",
-                                     port_other_config)
+        self._set_port_db_attribute(port.port_name, "other_config",
+                                    port_other_config)
         return True
 
+    @contextlib.contextmanager
+    def _batched_port_db_writes(self):
+        """Group the Port table writes done in this context.
+
+        When ports are processed in chunks, the writes issued through
+        _set_port_db_attribute() are queued and executed in a single OVSDB
+        transaction when the context exits.
+        """
+        if (not self.port_processing_chunk_size or
+                self._port_db_updates is not None):
+            yield
+            return
+        self._port_db_updates = []
+        try:
+            yield
+        finally:
+            updates, self._port_db_updates = self._port_db_updates, None
+        if updates:
+            with self.int_br.ovsdb.transaction() as txn:
+                for port_name, column, value in updates:
+                    txn.add(self.int_br.ovsdb.db_set(
+                        "Port", port_name, (column, value)))
+
+    def _set_port_db_attribute(self, port_name, column, value):
+        if self._port_db_updates is not None:
+            self._port_db_updates.append((port_name, column, value))
+        else:
+            self.int_br.set_db_attribute("Port", port_name, column, value)
+
     def _add_port_tag_info(self, need_binding_ports):
         port_names = [p['vif_port'].port_name for p in need_binding_ports]
         port_info = self.int_br.get_ports_attributes(
@@ -853,8 +910,8 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
             if (cur_info['tag'] != lvm.vlan or
                     other_config.get('tag') != lvm.vlan):
                 other_config['tag'] = str(lvm.vlan)
-                self.int_br.set_db_attribute(
-                    "Port", port.port_name, "other_config", other_config)
+                self._set_port_db_attribute(
+                    port.port_name, "other_config", other_config)
                 # Uninitialized port has tag set to []
                 if cur_info['tag']:
                     self.int_br.delete_flows(in_port=port.ofport)
@@ -867,42 +924,45 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         port_info = self.int_br.get_ports_attributes(
             "Port", columns=["name", "tag"], ports=port_names, if_exists=True)
         tags_by_name = {x['name']: x['tag'] for x in port_info}
-        for port_detail in need_binding_ports:
-            try:
-                lvm = self.vlan_manager.get(port_detail['network_id'])
-            except vlanmanager.MappingNotFound:
-                # network for port was deleted. skip this port since it
-                # will need to be handled as a DEAD port in the next scan
-                continue
-            port = port_detail['vif_port']
-            device = port_detail['device']
-            # Do not bind a port if it's already bound
-            cur_tag = tags_by_name.get(port.port_name)
-            if cur_tag is None:
-                LOG.debug("Port %s was deleted concurrently, skipping it",
-                          port.port_name)
-                continue
-            if self.prevent_arp_spoofing:
-                self.setup_arp_spoofing_protection(self.int_br,
-                                                   port, port_detail)
-            # cur_tag 就是端口当前配置的tag(VLAN ID) lvm.vlan就是端口理论上的Tag
-            # 如果两个不相等，则应该重新配置端口的tag，使其等于lvm.vlan
-            if cur_tag != lvm.vlan:
-                # 设置该端口的Tag(等于lvm.vlam)
-                self.int_br.set_db_attribute(
-                    "Port", port.port_name, "tag", lvm.vlan)
-
-            # update plugin about port status
-            # FIXME(salv-orlando): Failures while updating device status
-            # must be handled appropriately. Otherwise this might prevent
-            # neutron server from sending network-vif-* events to the nova
-            # API server, thus possibly preventing instance spawn.
-            if port_detail.get('admin_state_up'):
-                LOG.debug("Setting status for %s to UP", device)
-                devices_up.append(device)
-            else:
-                LOG.debug("Setting status for %s to DOWN", device)
-                devices_down.append(device)
+        # the tags have to be written before the server is told that the
+        # ports are up, so the batch is flushed before update_device_list
+        with self._batched_port_db_writes():
+            for port_detail in need_binding_ports:
+                try:
+                    lvm = self.vlan_manager.get(port_detail['network_id'])
+                except vlanmanager.MappingNotFound:
+                    # network for port was deleted. skip this port since it
+                    # will need to be handled as a DEAD port in the next scan
+                    continue
+                port = port_detail['vif_port']
+                device = port_detail['device']
+                # Do not bind a port if it's already bound
+                cur_tag = tags_by_name.get(port.port_name)
+                if cur_tag is None:
+                    LOG.debug("Port %s was deleted concurrently, skipping it",
+                              port.port_name)
+                    continue
+                if self.prevent_arp_spoofing:
+                    self.setup_arp_spoofing_protection(self.int_br,
+                                                       port, port_detail)
+                # cur_tag 就是端口当前配置的tag(VLAN ID) lvm.vlan就是端口理论上的Tag
+                # 如果两个不相等，则应该重新配置端口的tag，使其等于lvm.vlan
+                if cur_tag != lvm.vlan:
+                    # 设置该端口的Tag(等于lvm.vlam)
+                    self._set_port_db_attribute(port.port_name, "tag",
+                                                lvm.vlan)
+
+                # update plugin about port status
+                # FIXME(salv-orlando): Failures while updating device status
+                # must be handled appropriately. Otherwise this might prevent
+                # neutron server from sending network-vif-* events to the
+                # nova API server, thus possibly preventing instance spawn.
+                if port_detail.get('admin_state_up'):
+                    LOG.debug("Setting status for %s to UP", device)
+                    devices_up.append(device)
+                else:
+                    LOG.debug("Setting status for %s to DOWN", device)
+                    devices_down.append(device)
         if devices_up or devices_down:
             devices_set = self.plugin_rpc.update_device_list(
                 self.context, devices_up, devices_down, self.agent_id,
@@ -1306,9 +1366,31 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         port_info['current'] |= port_info['added']
         port_info['current'] -= port_info['removed']
 
+    def _get_replica_lookup(self, polling_manager):
+        """Return the Interface lookup of the native OVSDB monitor, if used."""
+        if not self.native_ovsdb_monitor:
+            return None
+        return getattr(polling_manager, 'get_interfaces', None)
+
     def process_ports_events(self, events, registered_ports, ancillary_ports,
                              old_ports_not_ready, failed_devices,
-                             failed_ancillary_devices, updated_ports=None):
+                             failed_ancillary_devices, updated_ports=None,
+                             get_interfaces=None):
+        """Build port_info from the events of the polling manager.
+
+        get_interfaces, when given, returns the Interface rows with the given
+        names from the local replica kept by the polling manager. It is used
+        instead of querying OVSDB; when it returns None OVSDB is queried.
+        """
+        def _get_interfaces(names):
+            if get_interfaces:
+                interfaces = get_interfaces(names)
+                if interfaces is not None:
+                    return interfaces
+            return self.int_br.get_ports_attributes(
+                'Interface', columns=['name', 'external_ids', 'ofport'],
+                ports=names, if_exists=True)
+
         port_info = {}
         port_info['added'] = set()
         port_info['removed'] = set()
@@ -1326,8 +1408,14 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         added_ports = {p['name'] for p in events['added']}
         removed_ports = {p['name'] for p in events['removed']}
         ports_removed_and_added = added_ports & removed_ports
+        existing_ports = None
+        if ports_removed_and_added and get_interfaces:
+            interfaces = get_interfaces(ports_removed_and_added)
+            if interfaces is not None:
+                existing_ports = {i['name'] for i in interfaces}
         for p in ports_removed_and_added:
-            if ovs_lib.BaseOVS().port_exists(p):
+            if (p in existing_ports if existing_ports is not None
+                    else ovs_lib.BaseOVS().port_exists(p)):
                 events['removed'] = [e for e in events['removed']
                                      if e['name'] != p]
             else:
@@ -1361,9 +1449,7 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                     else:
                         ports.add(iface_id)
         if old_ports_not_ready:
-            old_ports_not_ready_attrs = self.int_br.get_ports_attributes(
-                'Interface', columns=['name', 'external_ids', 'ofport'],
-                ports=old_ports_not_ready, if_exists=True)
+            old_ports_not_ready_attrs = _get_interfaces(old_ports_not_ready)
             now_ready_ports = set(
                 [p['name'] for p in old_ports_not_ready_attrs])
             LOG.debug("Ports %s are now ready", now_ready_ports)
@@ -1545,15 +1631,31 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                     br.cleanup_tunnel_port(ofport)
                     self.tun_br_ofports[tunnel_type].pop(remote_ip, None)
 
-    def treat_devices_added_or_updated(self, devices, ovs_restarted):
+    def _get_devices_details_list(self, devices):
+        return self.plugin_rpc.get_devices_details_list_and_failed_devices(
+            self.context, devices, self.agent_id, self.conf.host)
+
+    def _get_flow_bridges(self):
+        bridges = [self.int_br]
+        bridges.extend(self.phys_brs.values())
+        if self.enable_tunneling:
+            bridges.append(self.tun_br)
+        return bridges
+
+    def treat_devices_added_or_updated(self, devices, ovs_restarted,
+                                       devices_details_list=None):
+        # the flows installed by port_bound() and port_dead() for all the
+        # devices are sent to the bridges at once
+        with bundled_flows(self._get_flow_bridges()):
+            return self._treat_devices_added_or_updated(
+                devices, ovs_restarted, devices_details_list)
+
+    def _treat_devices_added_or_updated(self, devices, ovs_restarted,
+                                        devices_details_list):
         skipped_devices = []
         need_binding_devices = []
-        devices_details_list = (
-            self.plugin_rpc.get_devices_details_list_and_failed_devices(
-                self.context,
-                devices,
-                self.agent_id,
-                self.conf.host))
+        if devices_details_list is None:
+            devices_details_list = self._get_devices_details_list(devices)
         failed_devices = set(devices_details_list.get('failed_devices'))
 
         devices = devices_details_list.get('devices')
@@ -1688,33 +1790,41 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                                  port_info.get('updated', set()))
         need_binding_devices = []
         skipped_devices = set()
-        if devices_added_updated:
-            start = time.time()
-            (skipped_devices, need_binding_devices,
-            failed_devices['added']) = (
-                self.treat_devices_added_or_updated(
-                    devices_added_updated, ovs_restarted))
-            LOG.debug("process_network_ports - iteration:%(iter_num)d - "
-                      "treat_devices_added_or_updated completed. "
-                      "Skipped %(num_skipped)d devices of "
-                      "%(num_current)d devices currently available. "
-                      "Time elapsed: %(elapsed).3f",
-                      {'iter_num': self.iter_num,
-                       'num_skipped': len(skipped_devices),
-                       'num_current': len(port_info['current']),
-                       'elapsed': time.time() - start})
-            # Update the list of current ports storing only those which
-            # have been actually processed.
-            skipped_devices = set(skipped_devices)
+        if self.port_processing_chunk_size and devices_added_updated:
+            skipped_devices = self._process_devices_in_chunks(
+                port_info, devices_added_updated, ovs_restarted,
+                failed_devices)
             port_info['current'] = (port_info['current'] - skipped_devices)
-
-        # TODO(salv-orlando): Optimize avoiding applying filters
-        # unnecessarily, (eg: when there are no IP address changes)
-        added_ports = port_info.get('added', set()) - skipped_devices
-        self._add_port_tag_info(need_binding_devices)
-        self.sg_agent.setup_port_filters(added_ports,
-                                         port_info.get('updated', set()))
-        failed_devices['added'] |= self._bind_devices(need_binding_devices)
+        else:
+            if devices_added_updated:
+                start = time.time()
+                (skipped_devices, need_binding_devices,
+                failed_devices['added']) = (
+                    self.treat_devices_added_or_updated(
+                        devices_added_updated, ovs_restarted))
+                LOG.debug("process_network_ports - iteration:%(iter_num)d - "
+                          "treat_devices_added_or_updated completed. "
+                          "Skipped %(num_skipped)d devices of "
+                          "%(num_current)d devices currently available. "
+                          "Time elapsed: %(elapsed).3f",
+                          {'iter_num': self.iter_num,
+                           'num_skipped': len(skipped_devices),
+                           'num_current': len(port_info['current']),
+                           'elapsed': time.time() - start})
+                # Update the list of current ports storing only those which
+                # have been actually processed.
+                skipped_devices = set(skipped_devices)
+                port_info['current'] = (port_info['current'] -
+                                        skipped_devices)
+
+            # TODO(salv-orlando): Optimize avoiding applying filters
+            # unnecessarily, (eg: when there are no IP address changes)
+            added_ports = port_info.get('added', set()) - skipped_devices
+            self._add_port_tag_info(need_binding_devices)
+            self.sg_agent.setup_port_filters(added_ports,
+                                             port_info.get('updated', set()))
+            failed_devices['added'] |= self._bind_devices(
+                need_binding_devices)
 
         if 'removed' in port_info and port_info['removed']:
             start = time.time()
@@ -1733,6 +1843,76 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                        'elapsed': time.time() - start})
         return failed_devices
 
+    def _process_devices_in_chunks(self, port_info, devices, ovs_restarted,
+                                   failed_devices):
+        """Wire added or updated devices chunk by chunk.
+
+        The details of the next chunk are fetched from the server while the
+        current chunk is wired and its port filters are set up. Returns the
+        set of devices which were skipped.
+        """
+        added = port_info.get('added', set())
+        updated = port_info.get('updated', set())
+        devices = sorted(devices)
+        size = self.port_processing_chunk_size
+        chunks = [devices[i:i + size] for i in range(0, len(devices), size)]
+        skipped_devices = set()
+        elapsed = collections.OrderedDict(
+            (stage, 0.0) for stage in ('get_devices_details',
+                                       'treat_devices_added_or_updated',
+                                       'add_port_tag_info',
+                                       'setup_port_filters',
+                                       'bind_devices'))
+
+        def _timed(stage, func, *args):
+            start = time.time()
+            try:
+                return func(*args)
+            finally:
+                elapsed[stage] += time.time() - start
+
+        details_fetch = eventlet.spawn(self._get_devices_details_list,
+                                       chunks[0])
+        try:
+            for index, chunk in enumerate(chunks):
+                devices_details_list = _timed('get_devices_details',
+                                              details_fetch.wait)
+                details_fetch = None
+                if index + 1 < len(chunks):
+                    details_fetch = eventlet.spawn(
+                        self._get_devices_details_list, chunks[index + 1])
+                with self._batched_port_db_writes():
+                    skipped, need_binding_devices, failed = _timed(
+                        'treat_devices_added_or_updated',
+                        self.treat_devices_added_or_updated,
+                        chunk, ovs_restarted, devices_details_list)
+                skipped = set(skipped)
+                skipped_devices |= skipped
+                failed_devices['added'] |= failed
+                with self._batched_port_db_writes():
+                    _timed('add_port_tag_info', self._add_port_tag_info,
+                           need_binding_devices)
+                chunk = set(chunk)
+                _timed('setup_port_filters', self.sg_agent.setup_port_filters,
+                       (chunk & added) - skipped, chunk & updated)
+                failed_devices['added'] |= _timed(
+                    'bind_devices', self._bind_devices, need_binding_devices)
+        finally:
+            if details_fetch:
+                details_fetch.kill()
+
+        LOG.debug("process_network_ports - iteration:%(iter_num)d - "
+                  "%(num_devices)d devices processed in %(num_chunks)d "
+                  "chunks, skipped %(num_skipped)d. Time elapsed per stage: "
+                  "%(elapsed)s",
+                  {'iter_num': self.iter_num,
+                   'num_devices': len(devices),
+                   'num_chunks': len(chunks),
+                   'num_skipped': len(skipped_devices),
+                   'elapsed': ', '.join('%s %.3f' % item
+                                        for item in elapsed.items())})
+        return skipped_devices
+
     def process_ancillary_network_ports(self, port_info):
         failed_devices = {'added': set(), 'removed': set()}
         if 'added' in port_info and port_info['added']:
@@ -1873,12 +2053,12 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                 'removed': len(ancillary_port_info.get('removed', []))}
         return port_stats
 
+    def _record_flow_cookies(self):
+        for bridge in self._get_flow_bridges():
+            bridge.add_recorded_cookies()
+
     def cleanup_stale_flows(self):
-        bridges = [self.int_br]
-        bridges.extend(self.phys_brs.values())
-        if self.enable_tunneling:
-            bridges.append(self.tun_br)
-        for bridge in bridges:
+        for bridge in self._get_flow_bridges():
             LOG.info(_LI("Cleaning stale %s flows"), bridge.br_name)
             bridge.cleanup_flows()
 
@@ -1933,11 +2113,12 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
             consecutive_resyncs = 0
             events = polling_manager.get_events()
             port_info, ancillary_port_info, ports_not_ready_yet = (
-                self.process_ports_events(events, ports, ancillary_ports,
-                                          ports_not_ready_yet,
-                                          failed_devices,
-                                          failed_ancillary_devices,
-                                          updated_ports_copy))
+                self.process_ports_events(
+                    events, ports, ancillary_ports, ports_not_ready_yet,
+                    failed_devices, failed_ancillary_devices,
+                    updated_ports_copy,
+                    get_interfaces=self._get_replica_lookup(
+                        polling_manager)))
             registry.notify(
                 constants.OVSDB_RESOURCE,
                 callback_events.AFTER_READ,
@@ -2177,7 +2358,8 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
             signal.signal(signal.SIGHUP, self._handle_sighup)
         with polling.get_polling_manager(
             self.minimize_polling,
-            self.ovsdb_monitor_respawn_interval) as pm:
+            self.ovsdb_monitor_respawn_interval,
+            native_monitor=self.native_ovsdb_monitor) as pm:
             # rpc_loop函数就是一个死循环
             self.rpc_loop(polling_manager=pm)
 
@@ -27,6 +27,7 @@ from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import importutils
 from oslo_utils import uuidutils
+import sqlalchemy as sa
 from sqlalchemy.orm import exc as sa_exc
 
 from neutron._i18n import _, _LE, _LI, _LW
@@ -57,6 +58,7 @@ from neutron.db import dvr_mac_db
 from neutron.db import external_net_db
 from neutron.db import extradhcpopt_db
 from neutron.db.models import securitygroup as sg_models
+from neutron.db.models import segment as segment_model
 from neutron.db import models_v2
 from neutron.db import provisioning_blocks
 from neutron.db.quota import driver  # noqa
@@ -95,6 +97,9 @@ SERVICE_PLUGINS_REQUIRED_DRIVERS = {
     'qos': [qos_ext.QOS_EXT_DRIVER_ALIAS]
 }
 
+# The network attributes computed by get_networks from the segments
+_ML2_NETWORK_ATTRIBUTES = set(provider.ATTRIBUTES) | {mpnet.SEGMENTS, api.MTU}
+
 
 class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                 dvr_mac_db.DVRDbMixin,
@@ -280,12 +285,6 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                           fanout=False)
         return self.conn_reports.consume_in_threads()
 
-    def _filter_nets_provider(self, context, networks, filters):
-        return [network
-                for network in networks
-                if self.type_manager.network_matches_filters(network, filters)
-                ]
-
     def _check_mac_update_allowed(self, orig_port, port, binding):
         unplugged_types = (portbindings.VIF_TYPE_BINDING_FAILED,
                            portbindings.VIF_TYPE_UNBOUND)
@@ -599,6 +598,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
     db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_funcs(
         attributes.PORTS, ['_ml2_extend_port_dict_binding'])
+    db_base_plugin_v2.NeutronDbPluginV2.register_dict_extend_loads(
+        models_v2.Port, ['port_binding'])
 
     # Register extend dict methods for network and port resources.
     # Each mechanism driver that supports extend attribute for the resources
@@ -641,6 +642,31 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         None,
         '_ml2_port_result_filter_hook')
 
+    def _ml2_network_result_filter_hook(self, query, filters):
+        # A network matches the provider filters if one of its static
+        # segments matches all of them, or if it has no segment, as done
+        # by TypeManager.network_matches_filters
+        segment = segment_model.NetworkSegment
+        columns = {provider.NETWORK_TYPE: segment.network_type,
+                   provider.PHYSICAL_NETWORK: segment.physical_network,
+                   provider.SEGMENTATION_ID: segment.segmentation_id}
+        criteria = [column.in_(filters[attr])
+                    for attr, column in columns.items()
+                    if filters and filters.get(attr)]
+        if not criteria:
+            return query
+        static = segment.is_dynamic == sa.false()
+        return query.filter(sa.or_(
+            models_v2.Network.segments.any(sa.and_(static, *criteria)),
+            ~models_v2.Network.segments.any(static)))
+
+    db_base_plugin_v2.NeutronDbPluginV2.register_model_query_hook(
+        models_v2.Network,
+        "ml2_network_segments",
+        None,
+        None,
+        '_ml2_network_result_filter_hook')
+
     def _notify_port_updated(self, mech_context):
         port = mech_context.current
         segment = mech_context.bottom_bound_segment
@@ -676,6 +702,9 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         collection = "%ss" % resource
         items = request_items[collection]
         with context.session.begin(subtransactions=True):
+            if resource == attributes.PORT:
+                # the addresses of the ports are generated at once
+                self.ipam.allocate_ips_for_ports(context, items)
             obj_creator = getattr(self, '_create_%s_db' % resource)
             for item in items:
                 try:
@@ -886,6 +915,10 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
     @db_api.retry_if_session_inactive()
     def get_networks(self, context, filters=None, fields=None,
                      sorts=None, limit=None, marker=None, page_reverse=False):
+        if fields and not set(fields) & _ML2_NETWORK_ATTRIBUTES:
+            # none of the attributes computed below is requested
+            return super(Ml2Plugin, self).get_networks(
+                context, filters, fields, sorts, limit, marker, page_reverse)
         session = context.session
         with session.begin(subtransactions=True):
             nets = super(Ml2Plugin,
@@ -893,8 +926,6 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                                             limit, marker, page_reverse)
             self.type_manager.extend_networks_dict_provider(context, nets)
 
-            nets = self._filter_nets_provider(context, nets, filters)
-
             for net in nets:
                 net[api.MTU] = self._get_network_mtu(net)
 
@@ -1804,6 +1835,75 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
         return port['id']
 
+    @utils.transaction_guard
+    @db_api.retry_if_session_inactive()
+    def update_ports_status(self, context, port_statuses, host=None,
+                            networks=None):
+        """Update the status of several ports in a single transaction.
+
+        port_statuses maps the port IDs, which may be truncated, to their
+        new status. Returns a dict mapping them to the non-truncated port
+        IDs, or to None if the port doesn't exist.
+        networks can be passed in as a dict of network ID to network to
+        avoid get_network calls if they were already performed by the
+        caller.
+        """
+        result = {}
+        dvr_port_statuses = {}
+        updates = []
+        mech_contexts = []
+        networks = networks or {}
+        if not port_statuses:
+            return result
+        with db_api.context_manager.writer.using(context):
+            full_ids = db.partial_port_ids_to_full_ids(context,
+                                                       list(port_statuses))
+            port_dbs = db.get_port_db_objects(context,
+                                              set(full_ids.values()))
+            for port_id, status in port_statuses.items():
+                port = port_dbs.get(full_ids.get(port_id))
+                if not port:
+                    LOG.debug("Port %(port)s update to %(val)s by agent not "
+                              "found", {'port': port_id, 'val': status})
+                    result[port_id] = None
+                elif port.device_owner == const.DEVICE_OWNER_DVR_INTERFACE:
+                    # the status of DVR ports depends on their bindings on
+                    # all the hosts, they are updated by update_port_status
+                    dvr_port_statuses[port_id] = status
+                else:
+                    result[port_id] = port.id
+                    if port.status != status:
+                        updates.append((port, self._make_port_dict(port)))
+                        port.status = status
+            # explicit flush before _make_port_dict to ensure extensions
+            # listening for db events can modify the ports if necessary
+            context.session.flush()
+            for port, original_port in updates:
+                binding = port.port_binding
+                levels = sorted((l for l in port.binding_levels
+                                 if l.host == binding.host),
+                                key=lambda l: l.level)
+                mech_context = driver_context.PortContext(
+                    self, context, self._make_port_dict(port),
+                    networks.get(port.network_id), binding, levels,
+                    original_port=original_port)
+                self.mechanism_manager.update_port_precommit(mech_context)
+                mech_contexts.append(mech_context)
+
+        for mech_context in mech_contexts:
+            self.mechanism_manager.update_port_postcommit(mech_context)
+            kwargs = {'context': context, 'port': mech_context.current,
+                      'original_port': mech_context.original}
+            if mech_context.current['status'] == const.PORT_STATUS_ACTIVE:
+                kwargs['update_device_up'] = True
+            registry.notify(resources.PORT, events.AFTER_UPDATE, self,
+                            **kwargs)
+
+        for port_id, status in dvr_port_statuses.items():
+            result[port_id] = self.update_port_status(context, port_id,
+                                                      status, host)
+        return result
+
     @db_api.retry_if_session_inactive()
     def port_bound_to_host(self, context, port_id, host):
         if not host:
@@ -93,7 +93,7 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
                                         port_context=port_context)
 
     def _get_device_details(self, rpc_context, agent_id, host, device,
-                            port_context):
+                            port_context, port_statuses=None):
         segment = port_context.bottom_bound_segment
         port = port_context.current
         plugin = directory.get_plugin()
@@ -113,11 +113,15 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
             new_status = (n_const.PORT_STATUS_BUILD if port['admin_state_up']
                           else n_const.PORT_STATUS_DOWN)
             if port['status'] != new_status:
-                plugin.update_port_status(rpc_context,
-                                          port_id,
-                                          new_status,
-                                          host,
-                                          port_context.network.current)
+                if port_statuses is not None:
+                    # the caller updates the status of its ports in bulk
+                    port_statuses[port_id] = new_status
+                else:
+                    plugin.update_port_status(rpc_context,
+                                              port_id,
+                                              new_status,
+                                              host,
+                                              port_context.network.current)
 
         network_qos_policy_id = port_context.network._network.get(
             qos_consts.QOS_POLICY_ID)
@@ -158,6 +162,7 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
                                                     **kwargs):
         devices = []
         failed_devices = []
+        port_statuses = {}
         devices_to_fetch = kwargs.pop('devices', [])
         plugin = directory.get_plugin()
         host = kwargs.get('host')
@@ -179,12 +184,32 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
                                agent_id=kwargs.get('agent_id'),
                                host=host,
                                device=device,
-                               port_context=bound_contexts[device]))
+                               port_context=bound_contexts[device],
+                               port_statuses=port_statuses))
             except Exception:
                 LOG.exception(_LE("Failed to get details for device %s"),
                               device)
                 failed_devices.append(device)
 
+        if port_statuses:
+            networks = {
+                port_context.current['network_id']:
+                port_context.network.current
+                for port_context in bound_contexts.values()
+                if port_context and
+                port_context.current['id'] in port_statuses}
+            try:
+                plugin.update_ports_status(rpc_context, port_statuses, host,
+                                           networks)
+            except Exception:
+                LOG.exception(_LE("Failed to update the status of ports %s"),
+                              list(port_statuses))
+                failed_devices.extend(
+                    entry['device'] for entry in devices
+                    if entry.get('port_id') in port_statuses)
+                devices = [entry for entry in devices
+                           if entry.get('port_id') not in port_statuses]
+
         return {'devices': devices,
                 'failed_devices': failed_devices}
 
@@ -299,6 +324,49 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
             else:
                 l2pop_driver.obj.update_port_down(port_context)
 
+    def _update_devices_down(self, rpc_context, devices, **kwargs):
+        """Devices no longer exist on agent.
+
+        The status of their ports is updated in a single transaction, an
+        exception is raised if it fails. Returns the update_device_down
+        results of the devices, and the devices which failed afterwards.
+        """
+        host = kwargs.get('host')
+        LOG.debug("Devices %(devices)s no longer exist at agent "
+                  "%(agent_id)s",
+                  {'devices': devices, 'agent_id': kwargs.get('agent_id')})
+        plugin = directory.get_plugin()
+        device_port_ids = []
+        port_statuses = {}
+        for device in devices:
+            port_id = plugin._device_to_port_id(rpc_context, device)
+            device_port_ids.append((device, port_id))
+            if (host and not plugin.port_bound_to_host(rpc_context,
+                                                       port_id, host)):
+                LOG.debug("Device %(device)s not bound to the"
+                          " agent host %(host)s",
+                          {'device': device, 'host': host})
+            else:
+                port_statuses[port_id] = n_const.PORT_STATUS_DOWN
+        port_ids = plugin.update_ports_status(rpc_context, port_statuses,
+                                              host)
+
+        devices_down = []
+        failed_devices_down = []
+        for device, port_id in device_port_ids:
+            try:
+                self.notify_ha_port_status(port_id, rpc_context,
+                                           n_const.PORT_STATUS_DOWN, host)
+            except Exception:
+                failed_devices_down.append(device)
+                LOG.error(_LE("Failed to update device %s down"), device)
+            else:
+                port_exists = (port_id not in port_statuses or
+                               bool(port_ids.get(port_id)))
+                devices_down.append({'device': device,
+                                     'exists': port_exists})
+        return devices_down, failed_devices_down
+
     def update_device_list(self, rpc_context, **kwargs):
         devices_up = []
         failed_devices_up = []
@@ -320,17 +388,24 @@ class RpcCallbacks(type_tunnel.TunnelRpcCallbackMixin):
 
         devices = kwargs.get('devices_down')
         if devices:
-            for device in devices:
-                try:
-                    dev = self.update_device_down(
-                        rpc_context,
-                        device=device,
-                        **kwargs)
-                except Exception:
-                    failed_devices_down.append(device)
-                    LOG.error(_LE("Failed to update device %s down"), device)
-                else:
-                    devices_down.append(dev)
+            try:
+                devices_down, failed_devices_down = self._update_devices_down(
+                    rpc_context, devices, **kwargs)
+            except Exception:
+                LOG.exception(_LE("Failed to update devices %s down, "
+                                  "updating them one by one"), devices)
+                for device in devices:
+                    try:
+                        dev = self.update_device_down(
+                            rpc_context,
+                            device=device,
+                            **kwargs)
+                    except Exception:
+                        failed_devices_down.append(device)
+                        LOG.error(_LE("Failed to update device %s down"),
+                                  device)
+                    else:
+                        devices_down.append(dev)
 
         return {'devices_up': devices_up,
                 'failed_devices_up': failed_devices_up,
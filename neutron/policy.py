@@ -15,6 +15,7 @@
 
 import collections
 import re
+import time
 
 from neutron_lib import constants
 from neutron_lib import exceptions
@@ -39,12 +40,22 @@ _ENFORCER = None
 ADMIN_CTX_POLICY = 'context_is_admin'
 ADVSVC_CTX_POLICY = 'context_is_advsvc'
 
+# The rules of the actions which don't depend on the target attributes,
+# along with the target fields they read, by (action, pluralized). It is
+# only valid for the _ENFORCER rules it was compiled from.
+_COMPILED_RULES = {}
+_COMPILED_FROM = None
+
+_TARGET_FIELD_RE = re.compile(r'%\(([^)]+)\)s')
+_MISSING = object()
+
 
 def reset():
     global _ENFORCER
     if _ENFORCER:
         _ENFORCER.clear()
         _ENFORCER = None
+    _COMPILED_RULES.clear()
 
 
 def init(conf=cfg.CONF, policy_file=None):
@@ -83,6 +94,7 @@ def set_rules(policies, overwrite=True):
     LOG.debug("Loading policies from file: %s", _ENFORCER.policy_path)
     init()
     _ENFORCER.set_rules(policies, overwrite)
+    _COMPILED_RULES.clear()
 
 
 def _is_attribute_explicitly_set(attribute_name, resource, target, action):
@@ -330,6 +342,139 @@ def _prepare_check(context, action, target, pluralized):
     return match_rule, target, credentials
 
 
+def _get_target_fields(rule, fields, seen):
+    """Add the target fields read by a rule to fields.
+
+    Return False if they can't be known, e.g. for an HTTP check, which
+    sends the whole target.
+    """
+    if isinstance(rule, (policy.AndCheck, policy.OrCheck)):
+        return all(_get_target_fields(r, fields, seen) for r in rule.rules)
+    if isinstance(rule, policy.NotCheck):
+        return _get_target_fields(rule.rule, fields, seen)
+    if isinstance(rule, policy.RuleCheck):
+        if rule.match in seen:
+            return True
+        seen.add(rule.match)
+        try:
+            # the default rule is used for the rules which don't exist
+            sub_rule = _ENFORCER.rules[rule.match]
+        except KeyError:
+            # or the check is False, and reads nothing
+            return True
+        return _get_target_fields(sub_rule, fields, seen)
+    if isinstance(rule, OwnerCheck):
+        fields.add(rule.target_field)
+        # the field may be one of a parent resource, see OwnerCheck
+        for separator in (':', '_'):
+            parent_res = rule.target_field.split(separator, 1)[0]
+            foreign_key = attributes.RESOURCE_FOREIGN_KEYS.get(
+                "%ss" % parent_res)
+            if foreign_key:
+                fields.add(foreign_key)
+        return True
+    if isinstance(rule, FieldCheck):
+        fields.add(rule.field)
+        return True
+    if isinstance(rule, policy.Check):
+        # the generic and role checks only read the target fields
+        # substituted in their match
+        if (rule.kind in ('http', 'https') or
+                not type(rule).__module__.startswith('oslo_policy')):
+            return False
+        fields.update(_TARGET_FIELD_RE.findall(rule.match))
+        return True
+    # the true and false checks
+    return str(rule) in ('@', '!')
+
+
+def _compile_rule(action, pluralized):
+    """Return the rule of an action and the target fields it reads.
+
+    The fields are None if the rule depends on the target attributes or
+    if they are not known.
+    """
+    global _COMPILED_FROM
+    if _COMPILED_FROM is not _ENFORCER.rules:
+        _COMPILED_RULES.clear()
+        _COMPILED_FROM = _ENFORCER.rules
+    key = (action, pluralized)
+    if key not in _COMPILED_RULES:
+        fields = None
+        enforce_attr_based_check = get_resource_and_action(
+            action, pluralized)[1]
+        match_rule = policy.RuleCheck('rule', action)
+        if not enforce_attr_based_check:
+            read_fields = set()
+            if _get_target_fields(match_rule, read_fields, set()):
+                fields = tuple(sorted(read_fields))
+        _COMPILED_RULES[key] = (match_rule, fields)
+    return _COMPILED_RULES[key]
+
+
+class CheckCache(object):
+    """Memoizes the policy checks of a request.
+
+    The result of the check of an action on a target is cached along with
+    the values of the target fields the rule of the action reads, so that
+    e.g. the objects owned by the same tenant are only checked once.
+    Only the actions whose rule doesn't depend on the attributes of the
+    target, like the get ones, are cached.
+    """
+
+    def __init__(self, context):
+        init()
+        # take the policy file changes into account before compiling
+        _ENFORCER.load_rules()
+        self.context = context
+        self.credentials = context.to_policy_values()
+        self.hits = 0
+        self.misses = 0
+        # seconds spent evaluating the rules
+        self.eval_time = 0.0
+        self._results = {}
+
+    @property
+    def hit_rate(self):
+        checks = self.hits + self.misses
+        return float(self.hits) / checks if checks else 0.0
+
+    def check(self, action, target, might_not_exist=False, pluralized=None):
+        """Same as check(), with the context of the request."""
+        if self.context.is_admin:
+            return True
+        if might_not_exist and not (_ENFORCER.rules and
+                                    action in _ENFORCER.rules):
+            return True
+        match_rule, fields = _compile_rule(action, pluralized)
+        key = None
+        if fields is not None:
+            key = (action, pluralized,
+                   tuple(target.get(f, _MISSING) for f in fields))
+            try:
+                result = self._results.get(key)
+            except TypeError:
+                # a field value is not hashable
+                key = result = None
+            if result is not None:
+                self.hits += 1
+                return result
+        self.misses += 1
+        start = time.time()
+        if key is None:
+            result = check(self.context, action, target,
+                           might_not_exist=might_not_exist,
+                           pluralized=pluralized)
+        else:
+            result = _ENFORCER.enforce(match_rule, target, self.credentials,
+                                       pluralized=pluralized)
+            self._results[key] = result
+            if not result:
+                log_rule_list(match_rule)
+        self.eval_time += time.time() - start
+        return result
+
+
 def log_rule_list(match_rule):
     if LOG.isEnabledFor(logging.DEBUG):
         rules = _process_rules_list([], match_rule)
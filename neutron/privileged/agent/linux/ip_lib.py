@@ -11,12 +11,14 @@
 # under the License.
 
 import errno
+import os
 import socket
 
 import pyroute2
 from pyroute2.netlink import rtnl
 from pyroute2.netlink.rtnl import ndmsg
 from pyroute2 import NetlinkError
+from pyroute2 import netns
 
 from neutron._i18n import _
 from neutron import privileged
@@ -58,12 +60,12 @@ def get_routing_table(ip_version, namespace=None):
     """
     family = _IP_VERSION_FAMILY_MAP[ip_version]
     try:
-        netns = pyroute2.NetNS(namespace, flags=0) if namespace else None
+        nl = pyroute2.NetNS(namespace, flags=0) if namespace else None
     except OSError as e:
         if e.errno == errno.ENOENT:
             raise NetworkNamespaceNotFound(netns_name=namespace)
         raise
-    with pyroute2.IPDB(nl=netns) as ipdb:
+    with pyroute2.IPDB(nl=nl) as ipdb:
         ipdb_routes = ipdb.routes
         ipdb_interfaces = ipdb.interfaces
         routes = [{'destination': route['dst'],
@@ -74,15 +76,35 @@ def get_routing_table(ip_version, namespace=None):
     return routes
 
 
+# The network namespace of the privsep daemon. setns() only switches the
+# calling thread, which always switches back to it.
+_DAEMON_NETNS = '/proc/self/ns/net'
+
+
 def _get_iproute(namespace):
     # From iproute.py:
     # `IPRoute` -- RTNL API to the current network namespace
     # `NetNS` -- RTNL API to another network namespace
-    if namespace:
-        # do not try and create the namespace
-        return pyroute2.NetNS(namespace, flags=0)
-    else:
+    if not namespace:
         return pyroute2.IPRoute()
+    # NOTE: NetNS forks a helper process for each socket. The socket is
+    # rather opened by this thread while it is in the namespace, it remains
+    # bound to the namespace once the thread has switched back.
+    daemon_netns = os.open(_DAEMON_NETNS, os.O_RDONLY)
+    try:
+        # do not try and create the namespace
+        namespace_fd = os.open(os.path.join(netns.NETNS_RUN_DIR, namespace),
+                               os.O_RDONLY)
+        try:
+            netns.setns(namespace_fd)
+            try:
+                return pyroute2.IPRoute()
+            finally:
+                netns.setns(daemon_netns)
+        finally:
+            os.close(namespace_fd)
+    finally:
+        os.close(daemon_netns)
 
 
 def _run_iproute(command, device, namespace, **kwargs):
@@ -175,3 +197,251 @@ def dump_neigh_entries(ip_version, device, namespace, **kwargs):
                      'lladdr': attrs.get('NDA_LLADDR'),
                      'device': device}]
     return entries
+
+
+# Address scopes, as named by the ip command
+_IP_ADDRESS_SCOPE = {0: 'global', 200: 'site', 253: 'link', 254: 'host'}
+_IP_ADDRESS_SCOPE_NAME = {name: scope
+                          for scope, name in _IP_ADDRESS_SCOPE.items()}
+
+_ROUTE_TABLES = {'default': 253, 'main': 254, 'local': 255}
+
+# Address flags, from linux/if_addr.h
+IFA_F_DADFAILED = 0x08
+IFA_F_TENTATIVE = 0x40
+IFA_F_PERMANENT = 0x80
+
+
+def _translate_netlink_error(e, device, namespace):
+    if e.code == errno.ENODEV:
+        msg = _("Network interface %(device)s not found in namespace "
+                "%(namespace)s.") % {'device': device,
+                                     'namespace': namespace}
+        return NetworkInterfaceNotFound(msg)
+    # the callers expect the RuntimeError raised by the ip command
+    return RuntimeError(_("Netlink error %(code)s on device %(device)s in "
+                          "namespace %(namespace)s: %(msg)s") %
+                        {'code': e.code, 'device': device,
+                         'namespace': namespace, 'msg': e})
+
+
+class _NetlinkChanges(object):
+    """Apply changes to links, addresses and routes with one socket."""
+
+    def __init__(self, ip, namespace):
+        self.ip = ip
+        self.namespace = namespace
+        self._indexes = {}
+
+    def _get_index(self, device):
+        if device not in self._indexes:
+            try:
+                self._indexes[device] = self.ip.link_lookup(ifname=device)[0]
+            except IndexError:
+                msg = _("Network interface %(device)s not found in "
+                        "namespace %(namespace)s.") % {
+                            'device': device, 'namespace': self.namespace}
+                raise NetworkInterfaceNotFound(msg)
+        return self._indexes[device]
+
+    def set_link_attribute(self, device, **attributes):
+        self.ip.link('set', index=self._get_index(device), **attributes)
+        if 'ifname' in attributes or 'net_ns_fd' in attributes:
+            del self._indexes[device]
+
+    def delete_link(self, device):
+        self.ip.link('del', index=self._get_index(device))
+        del self._indexes[device]
+
+    def add_ip_address(self, device, cidr, scope, broadcast=None):
+        ip, prefixlen = cidr.split('/')
+        kwargs = {'broadcast': broadcast} if broadcast else {}
+        self.ip.addr('add', index=self._get_index(device), address=ip,
+                     mask=int(prefixlen), scope=_IP_ADDRESS_SCOPE_NAME[scope],
+                     family=_IP_VERSION_FAMILY_MAP[_get_ip_version(ip)],
+                     **kwargs)
+
+    def delete_ip_address(self, device, cidr):
+        ip, prefixlen = cidr.split('/')
+        self.ip.addr('del', index=self._get_index(device), address=ip,
+                     mask=int(prefixlen),
+                     family=_IP_VERSION_FAMILY_MAP[_get_ip_version(ip)])
+
+    def flush_ip_addresses(self, device, ip_version):
+        index = self._get_index(device)
+        family = _IP_VERSION_FAMILY_MAP[ip_version]
+        for address in self.ip.get_addr(family=family, index=index):
+            self.ip.addr('del', index=index,
+                         address=_get_address(address),
+                         mask=address['prefixlen'], family=family)
+
+    def _route_kwargs(self, ip_version, cidr, via, device, table, scope,
+                      metric):
+        kwargs = {'family': _IP_VERSION_FAMILY_MAP[ip_version]}
+        if cidr is None:
+            kwargs['dst_len'] = 0
+        else:
+            dst, _sep, dst_len = cidr.partition('/')
+            kwargs['dst'] = dst
+            kwargs['dst_len'] = (int(dst_len) if dst_len else
+                                 32 if ip_version == 4 else 128)
+        if via:
+            kwargs['gateway'] = via
+        if device:
+            kwargs['oif'] = self._get_index(device)
+        if table:
+            kwargs['table'] = _ROUTE_TABLES.get(table) or int(table)
+        if scope:
+            kwargs['scope'] = _IP_ADDRESS_SCOPE_NAME.get(scope, scope)
+        if metric:
+            kwargs['priority'] = int(metric)
+        return kwargs
+
+    def replace_route(self, ip_version, cidr=None, via=None, device=None,
+                      table=None, scope=None, metric=None):
+        self.ip.route('replace', **self._route_kwargs(
+            ip_version, cidr, via, device, table, scope, metric))
+
+    def delete_route(self, ip_version, cidr=None, via=None, device=None,
+                     table=None, scope=None, metric=None):
+        self.ip.route('del', **self._route_kwargs(
+            ip_version, cidr, via, device, table, scope, metric))
+
+
+_NETLINK_CHANGES = ('set_link_attribute', 'delete_link', 'add_ip_address',
+                    'delete_ip_address', 'flush_ip_addresses',
+                    'replace_route', 'delete_route')
+
+
+def _get_ip_version(ip):
+    return 6 if ':' in ip else 4
+
+
+def _get_address(address):
+    attrs = dict(address['attrs'])
+    # IFA_LOCAL is the address of the interface for point to point links,
+    # which is the one the ip command shows
+    return attrs.get('IFA_LOCAL') or attrs['IFA_ADDRESS']
+
+
+@privileged.default.entrypoint
+def apply_netlink_changes(namespace, changes):
+    """Apply a list of changes in a namespace, with a single socket.
+
+    :param namespace: The name of the namespace to apply the changes in
+    :param changes: a list of (change, kwargs) tuples, change being one of
+                    _NETLINK_CHANGES, i.e. the name of a _NetlinkChanges
+                    method, and kwargs the dict of arguments of the method.
+    """
+    device = None
+    try:
+        with _get_iproute(namespace) as ip:
+            netlink_changes = _NetlinkChanges(ip, namespace)
+            for change, kwargs in changes:
+                if change not in _NETLINK_CHANGES:
+                    raise ValueError(_("Unknown netlink change %s") % change)
+                device = kwargs.get('device')
+                getattr(netlink_changes, change)(**kwargs)
+    except NetlinkError as e:
+        raise _translate_netlink_error(e, device, namespace)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            raise NetworkNamespaceNotFound(netns_name=namespace)
+        raise
+
+
+@privileged.default.entrypoint
+def get_link_attributes(device, namespace):
+    """Return the attributes of a link, named as by the ip command.
+
+    :param device: Device name
+    :param namespace: The name of the namespace of the device
+    :return: a dictionary with the 'link/ether', 'state', 'mtu', 'qdisc',
+             'qlen' and 'alias' keys, the ones the link has.
+    """
+    try:
+        with _get_iproute(namespace) as ip:
+            link = ip.get_links(
+                _NetlinkChanges(ip, namespace)._get_index(device))[0]
+    except NetlinkError as e:
+        raise _translate_netlink_error(e, device, namespace)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            raise NetworkNamespaceNotFound(netns_name=namespace)
+        raise
+    attrs = dict(link['attrs'])
+    attributes = {'link/ether': attrs.get('IFLA_ADDRESS'),
+                  'state': attrs.get('IFLA_OPERSTATE'),
+                  'mtu': attrs.get('IFLA_MTU'),
+                  'qdisc': attrs.get('IFLA_QDISC'),
+                  'qlen': attrs.get('IFLA_TXQLEN'),
+                  'alias': attrs.get('IFLA_IFALIAS')}
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+@privileged.default.entrypoint
+def get_ip_addresses(namespace, device=None, ip_version=None, scope=None):
+    """Return the IP addresses of the devices of a namespace.
+
+    :param namespace: The name of the namespace
+    :param device: Only return the addresses of this device
+    :param ip_version: Only return the addresses of this version
+    :param scope: Only return the addresses of this scope, e.g. 'link'
+    :return: a list of dictionaries, formatted as by
+             IpAddrCommand.get_devices_with_ip: {'name': device_name,
+                                                 'cidr': cidr,
+                                                 'scope': scope,
+                                                 'dynamic': bool,
+                                                 'tentative': bool,
+                                                 'dadfailed': bool}
+    """
+    kwargs = {}
+    if ip_version:
+        kwargs['family'] = _IP_VERSION_FAMILY_MAP[ip_version]
+    if scope:
+        kwargs['scope'] = _IP_ADDRESS_SCOPE_NAME[scope]
+    try:
+        with _get_iproute(namespace) as ip:
+            if device:
+                kwargs['index'] = _NetlinkChanges(
+                    ip, namespace)._get_index(device)
+            names = {link['index']: dict(link['attrs'])['IFLA_IFNAME']
+                     for link in ip.get_links()}
+            addresses = ip.get_addr(**kwargs)
+    except NetlinkError as e:
+        raise _translate_netlink_error(e, device, namespace)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            raise NetworkNamespaceNotFound(netns_name=namespace)
+        raise
+    retval = []
+    for address in addresses:
+        attrs = dict(address['attrs'])
+        flags = attrs.get('IFA_FLAGS', address['flags'])
+        retval.append({
+            'name': names.get(address['index']),
+            'cidr': '%s/%s' % (_get_address(address), address['prefixlen']),
+            'scope': _IP_ADDRESS_SCOPE.get(address['scope'],
+                                           str(address['scope'])),
+            'dynamic': not flags & IFA_F_PERMANENT,
+            'tentative': bool(flags & IFA_F_TENTATIVE),
+            'dadfailed': bool(flags & IFA_F_DADFAILED)})
+    return retval
+
+
+@privileged.default.entrypoint
+def create_netns(name):
+    """Create a network namespace."""
+    netns.create(name)
+
+
+@privileged.default.entrypoint
+def remove_netns(name):
+    """Remove a network namespace."""
+    netns.remove(name)
+
+
+@privileged.default.entrypoint
+def list_netns():
+    """Return the names of the network namespaces."""
+    return netns.listnetns()
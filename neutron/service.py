@@ -433,6 +433,7 @@ class Service(n_rpc.Service):
             except Exception:
                 LOG.exception(_LE("Exception occurs when timer stops"))
         self.timers = []
+        self.manager.stop()
 
     def wait(self):
         super(Service, self).wait()
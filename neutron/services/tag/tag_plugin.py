@@ -133,6 +133,8 @@ class TagPlugin(common_db_mixin.CommonDbMixin, tag_ext.TagPluginBase):
         for resource, model in resource_model_map.items():
             common_db_mixin.CommonDbMixin.register_dict_extend_funcs(
                 resource, [_extend_tags_dict])
+            common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+                model, ['standard_attr.tags'])
             method = functools.partial(tag_methods.apply_tag_filters, model)
             inst._filter_methods.append(method)
             common_db_mixin.CommonDbMixin.register_model_query_hook(
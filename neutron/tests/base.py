@@ -41,6 +41,7 @@ import testtools
 
 from neutron._i18n import _
 from neutron.agent.linux import external_process
+from neutron.agent.linux import utils as agent_utils
 from neutron.api.rpc.callbacks.consumer import registry as rpc_consumer_reg
 from neutron.api.rpc.callbacks.producer import registry as rpc_producer_reg
 from neutron.callbacks import manager as registry_manager
@@ -301,6 +302,9 @@ class BaseTestCase(DietTestCase):
         self.addCleanup(db_api.sqla_remove_all)
         self.addCleanup(rpc_consumer_reg.clear)
         self.addCleanup(rpc_producer_reg.clear)
+        # the root helper daemon pool is created from the configuration of
+        # the first test using it
+        self.addCleanup(agent_utils.RootwrapDaemonHelper.reset_pool)
 
     def get_new_temp_dir(self):
         """Create a new temporary directory.
@@ -0,0 +1,34 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import time
+
+from testtools import content
+
+from neutron.tests import base
+
+
+class BaseBenchmarkTestCase(base.BaseTestCase):
+    """Base class for micro-benchmarks.
+
+    Benchmarks are not part of the unit test run, they are run with
+    'tox -e benchmark'. The duration of every timed section is attached to
+    the test result as a detail.
+    """
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.time()
+        yield
+        self.addDetail(name, content.text_content(
+            '%.3f seconds' % (time.time() - start)))
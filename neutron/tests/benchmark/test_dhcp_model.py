@@ -0,0 +1,132 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+
+from neutron_lib import constants
+from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
+import six
+from testtools import content
+
+from neutron.agent.dhcp import agent as dhcp_agent
+from neutron.agent.linux import dhcp
+from neutron.tests.benchmark import base
+
+NUM_NETWORKS = 1000
+PORTS_PER_NETWORK = 50
+
+
+def _deep_size(obj, seen=None):
+    """Return the size of obj and of the objects it holds, counted once."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(value, seen)
+                    for key, value in six.iteritems(dict(obj)))
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    return size
+
+
+class DhcpNetworkModelBenchmarkTestCase(base.BaseBenchmarkTestCase):
+
+    def _port(self, network_id, tenant_id, subnet_ids, index):
+        return {
+            'id': uuidutils.generate_uuid(),
+            'name': '',
+            'network_id': network_id,
+            'tenant_id': tenant_id,
+            'project_id': tenant_id,
+            'mac_address': 'fa:16:3e:%02x:%02x:%02x' % (
+                index >> 16 & 0xff, index >> 8 & 0xff, index & 0xff),
+            'admin_state_up': True,
+            'status': constants.PORT_STATUS_ACTIVE,
+            'device_id': uuidutils.generate_uuid(),
+            'device_owner': constants.DEVICE_OWNER_COMPUTE_PREFIX + 'nova',
+            'fixed_ips': [{'subnet_id': subnet_id,
+                           'ip_address': '10.%d.%d.%d' % (
+                               i, index // 250, index % 250 + 2)}
+                          for i, subnet_id in enumerate(subnet_ids)],
+            'allowed_address_pairs': [],
+            'extra_dhcp_opts': [],
+            'security_groups': [uuidutils.generate_uuid()],
+            'description': '',
+            'binding:host_id': 'compute-%d' % (index % 100),
+            'binding:vif_type': 'ovs',
+            'binding:vnic_type': 'normal',
+            'binding:profile': {},
+            'binding:vif_details': {'port_filter': True,
+                                    'ovs_hybrid_plug': True},
+            'port_security_enabled': True,
+            'dns_name': '',
+            'dns_assignment': [{'hostname': 'host-%d' % index,
+                                'ip_address': '10.0.%d.%d' % (
+                                    index // 250, index % 250 + 2),
+                                'fqdn': 'host-%d.openstacklocal.' % index}],
+            'tags': [],
+            'created_at': '2017-01-01T00:00:00Z',
+            'updated_at': '2017-01-01T00:00:00Z',
+            'revision_number': 4,
+        }
+
+    def _network(self, index):
+        network_id = uuidutils.generate_uuid()
+        tenant_id = uuidutils.generate_uuid(dashed=False)
+        subnets = [{'id': uuidutils.generate_uuid(),
+                    'network_id': network_id,
+                    'tenant_id': tenant_id,
+                    'ip_version': 4,
+                    'cidr': '10.%d.0.0/16' % i,
+                    'gateway_ip': '10.%d.0.1' % i,
+                    'enable_dhcp': True,
+                    'dns_nameservers': [],
+                    'host_routes': [],
+                    'ipv6_ra_mode': None,
+                    'ipv6_address_mode': None} for i in range(2)]
+        subnet_ids = [subnet['id'] for subnet in subnets]
+        return {'id': network_id,
+                'name': 'net-%d' % index,
+                'tenant_id': tenant_id,
+                'admin_state_up': True,
+                'mtu': 1450,
+                'subnets': subnets,
+                'ports': [self._port(network_id, tenant_id, subnet_ids, i)
+                          for i in range(PORTS_PER_NETWORK)]}
+
+    def test_network_models(self):
+        # the payload is decoded as the agent receives it from the server
+        payload = jsonutils.dumps(
+            [self._network(i) for i in range(NUM_NETWORKS)])
+        networks = jsonutils.loads(payload)
+        self.addDetail('payload size', content.text_content(
+            '%d bytes' % _deep_size(networks)))
+        with self.timed('build %d network models' % NUM_NETWORKS):
+            networks = [dhcp.NetModel(network) for network in networks]
+        cache = dhcp_agent.NetworkCache()
+        with self.timed('cache %d network models' % NUM_NETWORKS):
+            for network in networks:
+                cache.put(network)
+        with self.timed('read the hosts of %d ports' %
+                        (NUM_NETWORKS * PORTS_PER_NETWORK)):
+            hosts = [(port.mac_address, alloc.ip_address, alloc.subnet_id,
+                      port.extra_dhcp_opts, port.dns_assignment)
+                     for network in networks
+                     for port in network.ports
+                     for alloc in port.fixed_ips]
+        self.assertEqual(NUM_NETWORKS * PORTS_PER_NETWORK * 2, len(hosts))
+        self.addDetail('network models size', content.text_content(
+            '%d bytes' % _deep_size(networks)))
@@ -0,0 +1,85 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+
+import mock
+import netaddr
+from oslo_utils import uuidutils
+
+from neutron.common import constants as const
+from neutron import context
+from neutron.ipam.drivers.neutrondb_ipam import db_api as ipam_db_api
+from neutron.ipam.drivers.neutrondb_ipam import db_models
+from neutron.ipam.drivers.neutrondb_ipam import driver
+from neutron.ipam.drivers.neutrondb_ipam import free_ranges
+from neutron.ipam import requests as ipam_req
+from neutron.tests.benchmark import base
+from neutron.tests.unit.db import test_db_base_plugin_v2 as test_db_plugin
+from neutron.tests.unit import testlib_api
+
+CIDR = netaddr.IPNetwork('10.0.0.0/16')
+NUM_ALLOCATE = 10
+
+
+class IpamAllocationBenchmarkTestCase(testlib_api.BaseSqlTestCase,
+                                      base.BaseBenchmarkTestCase):
+
+    def setUp(self):
+        super(IpamAllocationBenchmarkTestCase, self).setUp()
+        # the IPAM objects are read through the core plugin
+        self.setup_coreplugin(test_db_plugin.DB_PLUGIN_KLASS)
+        self.ctx = context.get_admin_context()
+        mock.patch.object(free_ranges, '_CACHE', None).start()
+
+    def _create_subnet(self, num_allocations):
+        subnet_id = uuidutils.generate_uuid()
+        subnet_manager = ipam_db_api.IpamSubnetManager(None, subnet_id)
+        ipam_subnet_id = subnet_manager.create(self.ctx)
+        subnet_manager.create_pool(self.ctx, str(CIDR[1]), str(CIDR[-2]))
+        # the allocations are spread over the pool, as after the ports of a
+        # subnet have been created and deleted for a while
+        ips = random.Random(0).sample(range(CIDR.first + 1, CIDR.last),
+                                      num_allocations)
+        self.ctx.session.execute(
+            db_models.IpamAllocation.__table__.insert(),
+            [{'ip_address': str(netaddr.IPAddress(ip)),
+              'status': const.IPAM_ALLOCATION_STATUS_ALLOCATED,
+              'ipam_subnet_id': ipam_subnet_id} for ip in ips])
+        return driver.NeutronDbSubnet(ipam_subnet_id, self.ctx,
+                                      cidr=str(CIDR), subnet_id=subnet_id)
+
+    def _test_allocate(self, num_allocations):
+        subnet = self._create_subnet(num_allocations)
+        with self.timed('allocate %d addresses, allocations table scan' %
+                        NUM_ALLOCATE):
+            for _ in range(NUM_ALLOCATE):
+                subnet.allocate(ipam_req.AnyAddressRequest)
+        self.config(ipam_free_ranges_cache_size=1)
+        with self.timed('load free ranges'):
+            subnet.allocate(ipam_req.AnyAddressRequest)
+        with self.timed('allocate %d addresses, free ranges' %
+                        NUM_ALLOCATE):
+            for _ in range(NUM_ALLOCATE):
+                subnet.allocate(ipam_req.AnyAddressRequest)
+        self.assertEqual(
+            num_allocations + 2 * NUM_ALLOCATE + 1,
+            len(subnet.subnet_manager.list_allocated_ips(self.ctx)))
+
+    def test_allocate_1k_allocations(self):
+        self._test_allocate(1000)
+
+    def test_allocate_10k_allocations(self):
+        self._test_allocate(10000)
+
+    def test_allocate_60k_allocations(self):
+        self._test_allocate(60000)
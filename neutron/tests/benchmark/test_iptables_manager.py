@@ -0,0 +1,64 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+
+from neutron.agent.linux import iptables_manager
+from neutron.tests.benchmark import base
+
+NUM_CHAINS = 1000
+RULES_PER_CHAIN = 100
+
+
+class IptablesManagerBenchmarkTestCase(base.BaseBenchmarkTestCase):
+
+    def setUp(self):
+        super(IptablesManagerBenchmarkTestCase, self).setUp()
+        cfg.CONF.set_override('comment_iptables_rules', False, 'AGENT')
+        cfg.CONF.set_override('iptables_incremental_apply', True, 'AGENT')
+        self.iptables = iptables_manager.IptablesManager(state_less=True)
+        self.execute = mock.patch.object(self.iptables, "execute",
+                                         return_value='').start()
+        self.table = self.iptables.ipv4['filter']
+
+    def _rule(self, index):
+        return '-s 10.0.%d.%d/32 -j RETURN' % (index // 256, index % 256)
+
+    def _add_rules(self):
+        for chain in range(NUM_CHAINS):
+            self.table.add_chain('c%d' % chain)
+            for index in range(RULES_PER_CHAIN):
+                self.table.add_rule('c%d' % chain, self._rule(index))
+
+    def test_add_remove_100k_rules(self):
+        with self.timed('add'):
+            self._add_rules()
+        with self.timed('remove'):
+            for chain in range(NUM_CHAINS):
+                for index in range(RULES_PER_CHAIN):
+                    self.table.remove_rule('c%d' % chain, self._rule(index))
+        self.assertEqual(0, sum(len(self.table._get_chain_rules('c%d' % c,
+                                                                True))
+                                for c in range(NUM_CHAINS)))
+
+    def test_apply_100k_rules(self):
+        self._add_rules()
+        with self.timed('initial apply'):
+            self.iptables.apply()
+        self.table.remove_rule('c0', self._rule(0))
+        self.table.add_rule('c1', self._rule(RULES_PER_CHAIN))
+        with self.timed('incremental apply'):
+            commands = self.iptables.apply()
+        self.assertEqual(1, sum(1 for c in self.execute.call_args_list
+                                if c[0][0] == ['iptables-save']))
+        self.assertIn('-D %s-c0 1' % self.iptables.wrap_name, commands)
@@ -306,6 +306,62 @@ class OVS_Lib_Test(base.BaseTestCase):
         ]
         self.execute.assert_has_calls(expected_calls)
 
+    def test_bundled_flows(self):
+        with self.br.bundled_flows() as br:
+            br.add_flow(cookie=1234, actions='normal')
+            br.add_flow(cookie=1234, in_port=1, actions='drop')
+            br.delete_flows(in_port=2)
+            self.assertFalse(self.execute.called)
+        self.execute.assert_has_calls([
+            self._ofctl_mock("add-flows", self.BR_NAME, '-',
+                             process_input="hard_timeout=0,idle_timeout=0,"
+                                           "priority=1,cookie=1234,"
+                                           "actions=normal\n"
+                                           "hard_timeout=0,idle_timeout=0,"
+                                           "priority=1,cookie=1234,"
+                                           "in_port=1,actions=drop"),
+            self._ofctl_mock("del-flows", self.BR_NAME, '-',
+                             process_input="in_port=2"),
+        ])
+        self.assertEqual(2, self.execute.call_count)
+
+    def test_bundled_flows_with_bundle(self):
+        self.br.use_bundle = True
+        with self.br.bundled_flows():
+            self.br.add_flow(cookie=1234, actions='normal')
+            with self.br.bundled_flows():
+                self.br.delete_flows(in_port=2)
+        self._verify_ofctl_mock(
+            "add-flows", self.BR_NAME, '--bundle', '-',
+            process_input="add hard_timeout=0,idle_timeout=0,priority=1,"
+                          "cookie=1234,actions=normal\n"
+                          "delete in_port=2")
+
+    def test_bundled_flows_not_applied_on_error(self):
+        def bundle():
+            with self.br.bundled_flows():
+                self.br.add_flow(cookie=1234, actions='normal')
+                raise RuntimeError()
+        self.assertRaises(RuntimeError, bundle)
+        self.assertFalse(self.execute.called)
+        self.br.add_flow(cookie=1234, actions='normal')
+        self.assertEqual(1, self.execute.call_count)
+
+    def test_install_flows(self):
+        self.br.install_flows([{'cookie': 1234, 'actions': 'normal'},
+                               {'cookie': 1234, 'actions': 'drop'}])
+        self._verify_ofctl_mock(
+            "add-flows", self.BR_NAME, '-',
+            process_input="hard_timeout=0,idle_timeout=0,priority=1,"
+                          "cookie=1234,actions=normal\n"
+                          "hard_timeout=0,idle_timeout=0,priority=1,"
+                          "cookie=1234,actions=drop")
+
+    def test_uninstall_flows(self):
+        self.br.uninstall_flows([{'in_port': 1}, {'in_port': 2}])
+        self._verify_ofctl_mock("del-flows", self.BR_NAME, '-',
+                                process_input="in_port=1\nin_port=2")
+
     def test_delete_flow_with_priority_set(self):
         params = {'in_port': '1',
                   'priority': '1'}
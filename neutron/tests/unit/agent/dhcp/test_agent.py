@@ -379,6 +379,62 @@ class TestDhcpAgent(base.BaseTestCase):
             self._test_sync_state_helper(known_net_ids, active_net_ids)
             w.assert_called_once_with()
 
+    def test_sync_state_pages(self):
+        cfg.CONF.set_override('sync_networks_page_size', 2)
+        pages = [[mock.Mock(id='a'), mock.Mock(id='b')], [mock.Mock(id='c')]]
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks_info_pages.return_value = (
+                iter(pages))
+            plug.return_value = mock_plugin
+
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            attrs_to_mock = dict([(a, mock.DEFAULT)
+                                 for a in ['disable_dhcp_helper', 'cache',
+                                           'safe_configure_dhcp_for_network']])
+            with mock.patch.multiple(dhcp, **attrs_to_mock) as mocks:
+                mocks['cache'].get_network_ids.return_value = ['a', 'd']
+                mocks['cache'].get_port_ids.return_value = []
+                dhcp.sync_state()
+
+                get_pages = mock_plugin.get_active_networks_info_pages
+                get_pages.assert_called_once_with(2)
+                self.assertFalse(mock_plugin.get_active_networks_info.called)
+                mocks['safe_configure_dhcp_for_network'].assert_has_calls(
+                    [mock.call(network) for network in pages[0] + pages[1]],
+                    any_order=True)
+                mocks['disable_dhcp_helper'].assert_called_once_with('d')
+
+    def test_sync_state_page_error(self):
+        cfg.CONF.set_override('sync_networks_page_size', 2)
+        network = mock.Mock(id='a')
+
+        def pages(page_size):
+            yield [network]
+            raise Exception('fake')
+
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_networks_info_pages.side_effect = pages
+            plug.return_value = mock_plugin
+
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            attrs_to_mock = dict([(a, mock.DEFAULT)
+                                 for a in ['disable_dhcp_helper', 'cache',
+                                           'safe_configure_dhcp_for_network',
+                                           'schedule_resync']])
+            with mock.patch.multiple(dhcp, **attrs_to_mock) as mocks:
+                mocks['cache'].get_network_ids.return_value = ['d']
+                dhcp.sync_state()
+
+                # the networks already fetched are configured before
+                # sync_state returns
+                configure = mocks['safe_configure_dhcp_for_network']
+                configure.assert_called_once_with(network)
+                mocks['schedule_resync'].assert_called_once_with(mock.ANY)
+                # the networks of the missing pages are not disabled
+                self.assertFalse(mocks['disable_dhcp_helper'].called)
+
     def test_sync_state_for_all_networks_plugin_error(self):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
@@ -1116,6 +1172,35 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.call_driver.assert_has_calls(
             [mock.call.call_driver('reload_allocations', fake_network)])
 
+    def test_port_changes_coalesced_reload(self):
+        cfg.CONF.set_override('reload_allocations_window', 1)
+        self.cache.get_network_by_id.return_value = fake_network
+        self.cache.get_port_by_id.side_effect = [fake_port1, fake_port1,
+                                                 fake_port2, fake_port2]
+        with mock.patch.object(eventlet, 'spawn_after') as spawn_after:
+            self.dhcp.port_update_end(None, dict(port=fake_port1))
+            self.dhcp.port_delete_end(None, dict(port_id=fake_port2.id))
+            spawn_after.assert_called_once_with(
+                1, self.dhcp._reload_pending_allocations, fake_network.id)
+            self.assertFalse(self.call_driver.called)
+            self.assertNotIn(fake_port1.id, self.dhcp.dhcp_ready_ports)
+
+            self.dhcp._reload_pending_allocations(fake_network.id)
+            self.call_driver.assert_called_once_with('reload_allocations',
+                                                     fake_network)
+            self.assertIn(fake_port1.id, self.dhcp.dhcp_ready_ports)
+
+            # the next port change schedules another reload
+            self.dhcp.port_update_end(None, dict(port=fake_port1))
+            self.assertEqual(2, spawn_after.call_count)
+
+    def test_reload_pending_allocations_deleted_network(self):
+        self.cache.get_network_by_id.return_value = None
+        self.dhcp._pending_reloads[fake_network.id] = {fake_port1.id}
+        self.dhcp._reload_pending_allocations(fake_network.id)
+        self.assertFalse(self.call_driver.called)
+        self.assertEqual({}, self.dhcp._pending_reloads)
+
     def test_port_delete_end_unknown_port(self):
         payload = dict(port_id='unknown')
         self.cache.get_port_by_id.return_value = None
@@ -1160,6 +1245,27 @@ class TestDhcpPluginApiProxy(base.BaseTestCase):
     def test_get_active_networks_info(self):
         self._test_dhcp_api('get_active_networks_info', version='1.1')
 
+    def test_get_active_networks_info_pages(self):
+        proxy = dhcp_agent.DhcpPluginApi('foo', host='foo')
+        with mock.patch.object(proxy.client, 'call') as rpc_mock,\
+                mock.patch.object(proxy.client, 'prepare') as prepare_mock:
+            prepare_mock.return_value = proxy.client
+            rpc_mock.side_effect = [
+                {'networks': [{'id': 'a'}], 'marker': 'a'},
+                {'networks': [{'id': 'b'}], 'marker': None}]
+
+            pages = list(proxy.get_active_networks_info_pages(1))
+
+            self.assertEqual([['a'], ['b']],
+                             [[network.id for network in page]
+                              for page in pages])
+            prepare_mock.assert_called_once_with(version='1.7')
+            rpc_mock.assert_has_calls([
+                mock.call(mock.ANY, 'get_active_networks_info_page',
+                          host='foo', marker=None, limit=1),
+                mock.call(mock.ANY, 'get_active_networks_info_page',
+                          host='foo', marker='a', limit=1)])
+
     def test_get_network_info(self):
         self._test_dhcp_api('get_network_info', network_id='fake_id',
                             return_value=None)
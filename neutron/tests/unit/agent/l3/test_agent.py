@@ -41,6 +41,7 @@ from neutron.agent.l3 import namespace_manager
 from neutron.agent.l3 import namespaces
 from neutron.agent.l3 import router_info as l3router
 from neutron.agent.l3 import router_processing_queue
+from neutron.agent.l3 import router_workers
 from neutron.agent.linux import dibbler
 from neutron.agent.linux import external_process
 from neutron.agent.linux import interface
@@ -352,6 +353,121 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
             self.assertEqual(len(stale_router_ids), destroy_proxy.call_count)
             destroy_proxy.assert_has_calls(expected_calls, any_order=True)
 
+    def test_check_config_params_router_workers_dvr(self):
+        self.conf.set_override('router_processing_workers', 2)
+        self.conf.set_override('agent_mode', 'dvr_snat')
+        self.assertRaises(SystemExit, l3_agent.L3NATAgent,
+                          HOSTNAME, self.conf)
+
+    def _create_agent_with_router_workers(self):
+        self.conf.set_override('router_processing_workers', 2)
+        pool_cls = mock.patch.object(router_workers,
+                                     'RouterWorkerPool').start()
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        pool_cls.assert_called_once_with(2, agent._create_worker_agent)
+        self.assertEqual(pool_cls.return_value, agent.router_workers)
+        return agent
+
+    def test_routers_updated_router_workers(self):
+        agent = self._create_agent_with_router_workers()
+        agent._queue = mock.Mock()
+        agent.routers_updated(None, [FAKE_ID])
+        agent.router_deleted(None, FAKE_ID_2)
+        updates = [c[0][0] for c in
+                   agent.router_workers.add_router_update.call_args_list]
+        self.assertEqual([FAKE_ID, FAKE_ID_2], [u.id for u in updates])
+        self.assertEqual(router_processing_queue.DELETE_ROUTER,
+                         updates[1].action)
+        self.assertFalse(agent._queue.add.called)
+
+    def test_periodic_sync_routers_task_router_workers(self):
+        agent = self._create_agent_with_router_workers()
+        agent.periodic_sync_routers_task(agent.context)
+        agent.router_workers.fullsync.assert_called_once_with()
+        self.assertFalse(agent.fullsync)
+        self.assertFalse(self.plugin_api.get_router_ids.called)
+
+    def test_enqueue_state_change_router_workers(self):
+        agent = self._create_agent_with_router_workers()
+        agent.router_info[FAKE_ID] = mock.Mock()
+        with mock.patch.object(agent.state_change_notifier,
+                               'queue_event') as queue_event:
+            agent.enqueue_state_change(FAKE_ID, 'master')
+        agent.router_workers.enqueue_state_change.assert_called_once_with(
+            FAKE_ID, 'master')
+        self.assertFalse(queue_event.called)
+
+    def test_after_start_router_workers(self):
+        agent = self._create_agent_with_router_workers()
+        with mock.patch.object(eventlet, 'spawn_n') as spawn_n:
+            agent.after_start()
+        agent.router_workers.start.assert_called_once_with()
+        self.assertFalse(spawn_n.called)
+
+    def test_stop_router_workers(self):
+        agent = self._create_agent_with_router_workers()
+        agent.stop()
+        agent.router_workers.stop.assert_called_once_with()
+
+    def test_get_router_stats_router_workers(self):
+        agent = self._create_agent_with_router_workers()
+        self.assertEqual(agent.router_workers.get_stats.return_value,
+                         agent.get_router_stats())
+
+    def test_worker_agent(self):
+        self.conf.set_override('router_processing_workers', 2)
+        router_ids = [_uuid() for i in range(8)]
+        owned = [r_id for r_id in router_ids
+                 if router_workers.get_worker_index(r_id, 2) == 1]
+        agent = l3_agent.L3NATWorkerAgent(HOSTNAME, 1, conf=self.conf)
+        self.assertIsNone(agent.router_workers)
+        self.plugin_api.get_router_ids.return_value = router_ids
+        self.assertEqual(owned, agent._get_router_ids(agent.context))
+        for r_id in router_ids:
+            self.assertEqual(
+                r_id in owned, agent.namespaces_manager.is_managed(
+                    namespaces.NS_PREFIX + r_id))
+
+    def test_fetch_router_new_router(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = {'id': FAKE_ID, 'revisions': {}}
+        self.plugin_api.get_routers.return_value = [router]
+        self.assertEqual(router, agent._fetch_router(FAKE_ID))
+        self.plugin_api.get_routers.assert_called_once_with(
+            agent.context, [FAKE_ID], revisions={})
+
+    def test_fetch_router_delta(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        ri = mock.Mock()
+        ri.router = {'id': FAKE_ID, 'revisions': mock.sentinel.revisions}
+        agent.router_info[FAKE_ID] = ri
+        delta = {'id': FAKE_ID, 'delta': True}
+        self.plugin_api.get_routers.return_value = [delta]
+        self.assertEqual(ri.merge_router_delta.return_value,
+                         agent._fetch_router(FAKE_ID))
+        self.plugin_api.get_routers.assert_called_once_with(
+            agent.context, [FAKE_ID],
+            revisions={FAKE_ID: mock.sentinel.revisions})
+        ri.merge_router_delta.assert_called_once_with(delta)
+
+    def test_fetch_router_delta_not_applicable(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        ri = mock.Mock()
+        ri.router = {'id': FAKE_ID, 'revisions': mock.sentinel.revisions}
+        ri.merge_router_delta.return_value = None
+        agent.router_info[FAKE_ID] = ri
+        router = {'id': FAKE_ID, 'revisions': {}}
+        self.plugin_api.get_routers.side_effect = [
+            [{'id': FAKE_ID, 'delta': True}], [router]]
+        self.assertEqual(router, agent._fetch_router(FAKE_ID))
+        self.plugin_api.get_routers.assert_called_with(
+            agent.context, [FAKE_ID], revisions={})
+
+    def test_fetch_router_deleted(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_routers.return_value = []
+        self.assertIsNone(agent._fetch_router(FAKE_ID))
+
     def test_router_info_create(self):
         id = _uuid()
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
@@ -3102,3 +3218,51 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
             pass
         self.assertTrue(mock_delete.called)
         self.assertFalse(mock_dscm.called)
+
+
+class TestL3PluginApi(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestL3PluginApi, self).setUp()
+        self.client = mock.patch.object(l3_agent.n_rpc,
+                                        'get_client').start().return_value
+        self.cctxt = self.client.prepare.return_value
+        self.api = l3_agent.L3PluginApi('topic', HOSTNAME)
+
+    def test_get_routers_revisions(self):
+        self.assertEqual(self.cctxt.call.return_value,
+                         self.api.get_routers(mock.sentinel.ctx, [FAKE_ID],
+                                              revisions={}))
+        self.client.prepare.assert_called_once_with(version='1.10')
+        self.cctxt.call.assert_called_once_with(
+            mock.sentinel.ctx, 'sync_routers', host=HOSTNAME,
+            router_ids=[FAKE_ID], revisions={})
+
+    def _test_get_routers_revisions_unsupported(self, error):
+        self.cctxt.call.side_effect = [error, [mock.sentinel.router],
+                                       [mock.sentinel.router]]
+        for i in range(2):
+            self.assertEqual([mock.sentinel.router],
+                             self.api.get_routers(mock.sentinel.ctx,
+                                                  [FAKE_ID], revisions={}))
+        self.assertFalse(self.api.revisions_supported)
+        self.assertEqual([mock.call(version='1.10'), mock.call(),
+                          mock.call()],
+                         self.client.prepare.call_args_list)
+        self.cctxt.call.assert_called_with(
+            mock.sentinel.ctx, 'sync_routers', host=HOSTNAME,
+            router_ids=[FAKE_ID])
+
+    def test_get_routers_revisions_unsupported(self):
+        self._test_get_routers_revisions_unsupported(
+            oslo_messaging.UnsupportedVersion('1.10'))
+
+    def test_get_routers_revisions_unsupported_by_server(self):
+        self._test_get_routers_revisions_unsupported(
+            oslo_messaging.RemoteError('UnsupportedVersion'))
+
+    def test_get_routers_remote_error(self):
+        self.cctxt.call.side_effect = oslo_messaging.RemoteError('Error')
+        self.assertRaises(oslo_messaging.RemoteError, self.api.get_routers,
+                          mock.sentinel.ctx, [FAKE_ID], revisions={})
+        self.assertTrue(self.api.revisions_supported)
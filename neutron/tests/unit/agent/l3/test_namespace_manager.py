@@ -70,6 +70,16 @@ class TestNamespaceManager(NamespaceManagerTestCaseFramework):
 
         self.assertFalse(self.ns_manager.is_managed('dhcp-' + router_id))
 
+    def test_is_managed_router_filter(self):
+        router_id = _uuid()
+        self.ns_manager.router_filter = lambda r_id: r_id == router_id
+
+        self.assertTrue(self.ns_manager.is_managed(
+            namespaces.NS_PREFIX + router_id))
+        self.assertFalse(self.ns_manager.is_managed(
+            namespaces.NS_PREFIX + _uuid()))
+        self.assertFalse(self.ns_manager.is_managed('dhcp-' + router_id))
+
     def test_list_all(self):
         ns_names = [namespaces.NS_PREFIX + _uuid(),
                     dvr_snat_ns.SNAT_NS_PREFIX + _uuid(),
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 import mock
 from neutron_lib import constants as lib_constants
 from oslo_utils import uuidutils
@@ -17,6 +19,7 @@ from oslo_utils import uuidutils
 from neutron.agent.common import config as agent_config
 from neutron.agent.l3 import router_info
 from neutron.agent.linux import ip_lib
+from neutron.api.rpc.handlers import l3_rpc
 from neutron.common import exceptions as n_exc
 from neutron.tests import base
 
@@ -207,6 +210,89 @@ class TestRouterInfo(base.BaseTestCase):
             p_i_p.assert_called_once_with()
             p_e_o_d.assert_called_once_with()
 
+    def _get_router_delta(self, old_router, router):
+        # the delta sync_routers returns for a router the agent has
+        router = dict(router, revisions=l3_rpc.get_router_revisions(router))
+        return router, l3_rpc.make_router_delta(
+            router, router['revisions'], old_router['revisions'])
+
+    def test_merge_router_delta(self):
+        interfaces = [{'id': _uuid(), 'mtu': 1500} for i in range(3)]
+        fips = [{'id': _uuid(), 'status': 'DOWN'} for i in range(2)]
+        old_router = {'id': _uuid(), 'name': 'router',
+                      lib_constants.INTERFACE_KEY: interfaces,
+                      lib_constants.FLOATINGIP_KEY: fips}
+        old_router['revisions'] = l3_rpc.get_router_revisions(old_router)
+        ri = router_info.RouterInfo(mock.Mock(), old_router['id'],
+                                    old_router, **self.ri_kwargs)
+
+        new_fip = {'id': _uuid(), 'status': 'DOWN'}
+        router = {'id': old_router['id'], 'name': 'router',
+                  lib_constants.INTERFACE_KEY: [
+                      interfaces[0], dict(interfaces[1], mtu=1450)],
+                  lib_constants.FLOATINGIP_KEY: [
+                      dict(fips[0], status='ACTIVE'), fips[1], new_fip]}
+        router, delta = self._get_router_delta(old_router, router)
+        self.assertNotIn('name', delta)
+        self.assertEqual(1, len(delta[lib_constants.INTERFACE_KEY]))
+        self.assertEqual(2, len(delta[lib_constants.FLOATINGIP_KEY]))
+
+        merged = ri.merge_router_delta(delta)
+        for key in (lib_constants.INTERFACE_KEY,
+                    lib_constants.FLOATINGIP_KEY):
+            merged[key].sort(key=lambda item: item['id'])
+            router[key].sort(key=lambda item: item['id'])
+        self.assertEqual(router, merged)
+
+    def test_merge_router_delta_router_changed(self):
+        old_router = {'id': _uuid(), 'name': 'router',
+                      lib_constants.INTERFACE_KEY: [{'id': _uuid()}]}
+        old_router['revisions'] = l3_rpc.get_router_revisions(old_router)
+        ri = router_info.RouterInfo(mock.Mock(), old_router['id'],
+                                    old_router, **self.ri_kwargs)
+        router = {'id': old_router['id'], 'name': 'renamed'}
+        router, delta = self._get_router_delta(old_router, router)
+        self.assertEqual(router, ri.merge_router_delta(delta))
+
+    def test_merge_router_delta_ignores_agent_changes(self):
+        interface = {'id': _uuid(), 'mtu': 1500}
+        old_router = {'id': _uuid(), 'name': 'router',
+                      lib_constants.INTERFACE_KEY: [interface]}
+        old_router['revisions'] = l3_rpc.get_router_revisions(old_router)
+        ri = router_info.RouterInfo(mock.Mock(), old_router['id'],
+                                    copy.deepcopy(old_router),
+                                    **self.ri_kwargs)
+        # the agent changes its router while processing it
+        ri.router['gw_port'] = None
+        ri.router[lib_constants.INTERFACE_KEY][0]['mtu'] = 1400
+        router = dict(old_router, name='renamed')
+        router, delta = self._get_router_delta(old_router, router)
+        merged = ri.merge_router_delta(delta)
+        self.assertEqual(router, merged)
+        merged[lib_constants.INTERFACE_KEY][0]['mtu'] = 1450
+        self.assertEqual(router, ri.merge_router_delta(delta))
+
+    def test_merge_router_delta_without_revisions(self):
+        old_router = {'id': _uuid()}
+        ri = router_info.RouterInfo(mock.Mock(), old_router['id'],
+                                    old_router, **self.ri_kwargs)
+        router = dict(old_router, name='router')
+        router, delta = self._get_router_delta(
+            dict(old_router, revisions={'router': None}), router)
+        self.assertIsNone(ri.merge_router_delta(delta))
+
+    def test_merge_router_delta_unknown_item(self):
+        old_router = {'id': _uuid()}
+        old_router['revisions'] = l3_rpc.get_router_revisions(old_router)
+        ri = router_info.RouterInfo(mock.Mock(), old_router['id'],
+                                    old_router, **self.ri_kwargs)
+        router = {'id': old_router['id'],
+                  lib_constants.FLOATINGIP_KEY: [{'id': _uuid()}]}
+        router, delta = self._get_router_delta(old_router, router)
+        # the delta is made from other revisions than the router's ones
+        del delta[lib_constants.FLOATINGIP_KEY][0]
+        self.assertIsNone(ri.merge_router_delta(delta))
+
 
 class BasicRouterTestCaseFramework(base.BaseTestCase):
     def _create_router(self, router=None, **kwargs):
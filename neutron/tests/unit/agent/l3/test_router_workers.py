@@ -0,0 +1,164 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+import mock
+from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
+
+from neutron.agent.l3 import router_processing_queue as queue
+from neutron.agent.l3 import router_workers
+from neutron.tests import base
+
+_uuid = uuidutils.generate_uuid
+
+
+class TestGetWorkerIndex(base.BaseTestCase):
+
+    def test_get_worker_index(self):
+        router_ids = [_uuid() for i in range(64)]
+        indexes = [router_workers.get_worker_index(r_id, 4)
+                   for r_id in router_ids]
+        self.assertEqual(set(range(4)), set(indexes))
+        self.assertEqual(indexes, [router_workers.get_worker_index(r_id, 4)
+                                   for r_id in router_ids])
+
+    def test_get_worker_index_single_worker(self):
+        self.assertEqual(0, router_workers.get_worker_index(_uuid(), 1))
+
+
+class TestRouterWorkerPool(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRouterWorkerPool, self).setUp()
+        self.pool = router_workers.RouterWorkerPool(2, mock.Mock())
+        self.worker_sockets = []
+        for index in range(2):
+            parent_sock, worker_sock = socket.socketpair()
+            self.addCleanup(parent_sock.close)
+            self.addCleanup(worker_sock.close)
+            self.pool._sockets[index] = parent_sock
+            self.worker_sockets.append(worker_sock.makefile('r'))
+
+    def _read_message(self, index):
+        return jsonutils.loads(self.worker_sockets[index].readline())
+
+    def _get_router_id(self, index):
+        while True:
+            router_id = _uuid()
+            if router_workers.get_worker_index(router_id, 2) == index:
+                return router_id
+
+    def test_add_router_update(self):
+        router_id = self._get_router_id(1)
+        self.pool.add_router_update(queue.RouterUpdate(
+            router_id, queue.PRIORITY_RPC, action=queue.DELETE_ROUTER,
+            router={'id': router_id}))
+        self.assertEqual({'op': 'router_update', 'router_id': router_id,
+                          'priority': queue.PRIORITY_RPC,
+                          'action': queue.DELETE_ROUTER},
+                         self._read_message(1))
+
+    def test_enqueue_state_change(self):
+        router_id = self._get_router_id(0)
+        self.pool.enqueue_state_change(router_id, 'master')
+        self.assertEqual({'op': 'ha_state', 'router_id': router_id,
+                          'state': 'master'},
+                         self._read_message(0))
+
+    def test_fullsync(self):
+        self.pool.fullsync()
+        for index in range(2):
+            self.assertEqual({'op': 'fullsync'}, self._read_message(index))
+
+    def test_send_worker_not_running(self):
+        self.pool._sockets[0] = None
+        self.pool.fullsync()
+        self.assertEqual({'op': 'fullsync'}, self._read_message(1))
+
+    def test_get_stats(self):
+        self.pool._stats = [{'routers': 2, 'ex_gw_ports': 1,
+                             'interfaces': 4, 'floating_ips': 3},
+                            {'routers': 1, 'ex_gw_ports': 1,
+                             'interfaces': 1, 'floating_ips': 0}]
+        self.assertEqual({'routers': 3, 'ex_gw_ports': 2,
+                          'interfaces': 5, 'floating_ips': 3},
+                         self.pool.get_stats())
+
+    @mock.patch('os.waitpid')
+    def test_watch_worker(self, waitpid):
+        parent_sock, worker_sock = socket.socketpair()
+        stats = {'routers': 1, 'ex_gw_ports': 0,
+                 'interfaces': 2, 'floating_ips': 0}
+        router_workers._send(worker_sock, {'op': 'stats', 'stats': stats})
+        worker_sock.close()
+        self.pool._stopped = True
+        with mock.patch.object(self.pool, '_spawn') as spawn:
+            self.pool._watch_worker(1, parent_sock, 1234)
+        waitpid.assert_called_once_with(1234, 0)
+        self.assertFalse(spawn.called)
+        self.assertIsNone(self.pool._sockets[1])
+        # the stats of a worker which exited are dropped
+        self.assertEqual(0, self.pool.get_stats()['routers'])
+
+    @mock.patch('eventlet.sleep')
+    @mock.patch('os.waitpid')
+    def test_watch_worker_respawns_worker(self, waitpid, sleep):
+        parent_sock, worker_sock = socket.socketpair()
+        worker_sock.close()
+        with mock.patch.object(self.pool, '_spawn') as spawn:
+            self.pool._watch_worker(1, parent_sock, 1234)
+        spawn.assert_called_once_with(1)
+
+
+class TestRouterWorker(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRouterWorker, self).setUp()
+        self.worker = router_workers.RouterWorker(1, mock.Mock(), mock.Mock())
+        self.agent = self.worker.agent = mock.Mock()
+
+    def test_handle_router_update(self):
+        self.worker._handle_message(
+            {'op': 'router_update', 'router_id': 'r1',
+             'priority': queue.PRIORITY_RPC, 'action': None})
+        update = self.agent._queue.add.call_args[0][0]
+        self.assertEqual('r1', update.id)
+        self.assertEqual(queue.PRIORITY_RPC, update.priority)
+        self.assertIsNone(update.action)
+        self.assertIsNone(update.router)
+
+    def test_handle_ha_state(self):
+        self.worker._handle_message(
+            {'op': 'ha_state', 'router_id': 'r1', 'state': 'backup'})
+        self.agent.enqueue_state_change.assert_called_once_with('r1',
+                                                                'backup')
+
+    def test_handle_fullsync(self):
+        self.agent.fullsync = False
+        self.worker._handle_message({'op': 'fullsync'})
+        self.assertTrue(self.agent.fullsync)
+
+    def test_handle_pd_update(self):
+        self.worker._handle_message({'op': 'pd_update'})
+        self.agent.create_pd_router_update.assert_called_once_with()
+
+    def test_send_stats(self):
+        parent_sock, worker_sock = socket.socketpair()
+        self.addCleanup(parent_sock.close)
+        self.addCleanup(worker_sock.close)
+        self.worker.sock = worker_sock
+        self.agent.get_router_stats.return_value = {'routers': 1}
+        self.worker._send_stats()
+        self.assertEqual({'op': 'stats', 'stats': {'routers': 1}},
+                         jsonutils.loads(parent_sock.makefile('r').readline()))
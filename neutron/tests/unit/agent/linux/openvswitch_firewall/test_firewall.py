@@ -67,12 +67,13 @@ class TestSecurityGroup(base.BaseTestCase):
         self.assertEqual(expected_raw_rules, self.sg.raw_rules)
         self.assertEqual(expected_remote_rules, self.sg.remote_rules)
 
-    def get_ethertype_filtered_addresses(self):
+    def test_get_ethertype_filtered_addresses(self):
         addresses = self.sg.get_ethertype_filtered_addresses('type')
         expected_addresses = [1, 2, 3, 4]
         self.assertEqual(expected_addresses, addresses)
 
-    def get_ethertype_filtered_addresses_with_excluded_addresses(self):
+    def test_get_ethertype_filtered_addresses_with_excluded_addresses(
+            self):
         addresses = self.sg.get_ethertype_filtered_addresses('type', [2, 3])
         expected_addresses = [1, 4]
         self.assertEqual(expected_addresses, addresses)
@@ -1718,6 +1718,66 @@ class TestDnsmasq(TestBase):
             mock.call(exp_opt_name, exp_opt_data),
         ])
 
+    def _test_reload_allocations_twice(self, update_network):
+        mock.patch.object(dhcp.Dnsmasq, '_CONFIG_ENTRIES', {}).start()
+        self.conf.set_override('enable_isolated_metadata', False)
+        net = FakeV4Network()
+        self.useFixture(tools.OpenFixture('/dhcp/%s/host' % net.id))
+        self.useFixture(tools.OpenFixture('/dhcp/%s/interface' % net.id,
+                                          'tapdancingmice'))
+        self._get_dnsmasq(net).reload_allocations()
+        update_network(net)
+        self.safe.reset_mock()
+        self.external_process().enable.reset_mock()
+        dm = self._get_dnsmasq(net)
+        dm._read_hosts_file_leases = mock.Mock()
+        dm._release_lease = mock.Mock()
+        dm.reload_allocations()
+        self.assertFalse(dm._read_hosts_file_leases.called)
+        return dm
+
+    def test_reload_allocations_updated_port(self):
+        def update_network(net):
+            port = FakePort1()
+            port.fixed_ips = [FakeIPAllocation(
+                '192.168.0.4', 'dddddddd-dddd-dddd-dddd-dddddddddddd')]
+            port.dns_assignment = [FakeDNSAssignment('192.168.0.4')]
+            net.ports = [port]
+
+        dm = self._test_reload_allocations_twice(update_network)
+        # the options did not change
+        self.safe.assert_has_calls([
+            mock.call('/dhcp/%s/host' % dm.network.id,
+                      '00:00:80:aa:bb:cc,host-192-168-0-4.openstacklocal.,'
+                      '192.168.0.4\n'),
+            mock.call('/dhcp/%s/addn_hosts' % dm.network.id,
+                      '192.168.0.4\thost-192-168-0-4.openstacklocal. '
+                      'host-192-168-0-4\n')])
+        self.assertEqual(2, self.safe.call_count)
+        dm._release_lease.assert_called_once_with(
+            '00:00:80:aa:bb:cc', '192.168.0.2', None)
+        self.external_process().enable.assert_called_once_with(
+            reload_cfg=True)
+
+    def test_reload_allocations_removed_port(self):
+        def update_network(net):
+            net.ports = []
+
+        dm = self._test_reload_allocations_twice(update_network)
+        self.safe.assert_has_calls([
+            mock.call('/dhcp/%s/host' % dm.network.id, ''),
+            mock.call('/dhcp/%s/addn_hosts' % dm.network.id, '')])
+        dm._release_lease.assert_called_once_with(
+            '00:00:80:aa:bb:cc', '192.168.0.2', None)
+        self.external_process().enable.assert_called_once_with(
+            reload_cfg=True)
+
+    def test_reload_allocations_unchanged(self):
+        dm = self._test_reload_allocations_twice(lambda net: None)
+        self.assertFalse(self.safe.called)
+        self.assertFalse(dm._release_lease.called)
+        self.assertFalse(self.external_process().enable.called)
+
     def test_release_unused_leases(self):
         dnsmasq = self._get_dnsmasq(FakeDualNetwork())
 
@@ -2467,3 +2527,38 @@ class TestDictModel(base.BaseTestCase):
     def test_string_representation_network(self):
         net = dhcp.DictModel({'id': 'id', 'name': 'myname'})
         self.assertEqual('id=id, name=myname', str(net))
+
+    def test_nested_values_converted_when_read(self):
+        fixed_ips = [{'subnet_id': 'subnet_id', 'ip_address': '10.0.0.2'}]
+        port = dhcp.DictModel({'id': 'id', 'fixed_ips': fixed_ips,
+                               'binding:profile': {}})
+        self.assertIs(fixed_ips, dict.__getitem__(port, 'fixed_ips'))
+        self.assertEqual('subnet_id', port.fixed_ips[0].subnet_id)
+        self.assertIsInstance(port['binding:profile'], dhcp.DictModel)
+        self.assertIs(port.fixed_ips, port.get('fixed_ips'))
+        self.assertEqual(fixed_ips, port.fixed_ips)
+
+    def test_items_converted(self):
+        port = dhcp.DictModel({'fixed_ips': [{'subnet_id': 'subnet_id'}]})
+        for fixed_ips in port.values():
+            self.assertIsInstance(fixed_ips[0], dhcp.DictModel)
+
+
+class TestNetModel(base.BaseTestCase):
+
+    def test_repeated_values_shared(self):
+        network_ids = ['-'.join(['net', 'id']) for i in range(3)]
+        subnet_ids = ['-'.join(['subnet', 'id']) for i in range(2)]
+        net = dhcp.NetModel({
+            'id': 'net-id',
+            'subnets': [{'id': 'subnet-id', 'network_id': network_ids[0]}],
+            'ports': [{'id': 'port-id-%d' % i,
+                       'network_id': network_ids[i + 1],
+                       'fixed_ips': [{'subnet_id': subnet_ids[i],
+                                      'ip_address': '10.0.0.%d' % i}]}
+                      for i in range(2)]})
+        self.assertEqual('qdhcp-net-id', net.namespace)
+        self.assertIs(net.subnets[0].network_id, net.ports[0].network_id)
+        self.assertIs(net.ports[0].network_id, net.ports[1].network_id)
+        self.assertIs(net.ports[0].fixed_ips[0].subnet_id,
+                      net.ports[1].fixed_ips[0].subnet_id)
@@ -14,6 +14,7 @@
 #    under the License.
 
 import errno
+import os
 
 import mock
 import netaddr
@@ -1589,23 +1590,38 @@ class TestGetRoutingTable(base.BaseTestCase):
         self._test_get_routing_table(6, self.ip_db_routes, expected)
 
 
+def mock_netns_iproute():
+    """Mock the switches of the privileged thread to the namespaces.
+
+    :returns: the mock of the os module of the privileged ip_lib, its open()
+              returns the path it is given as file descriptor.
+    """
+    mock_os = mock.patch.object(priv_lib, 'os').start()
+    mock_os.path = os.path
+    mock_os.open.side_effect = lambda path, flags: path
+    mock.patch.object(priv_lib.netns, 'setns').start()
+    return mock_os
+
+
 class TestIpNeighCommand(TestIPCmdBase):
     def setUp(self):
         super(TestIpNeighCommand, self).setUp()
         self.parent.name = 'tap0'
         self.command = 'neigh'
         self.neigh_cmd = ip_lib.IpNeighCommand(self.parent)
+        self.parent.namespace = 'ns'
         self.addCleanup(privileged.default.set_client_mode, True)
         privileged.default.set_client_mode(False)
+        self.mock_os = mock_netns_iproute()
 
-    @mock.patch.object(pyroute2, 'NetNS')
-    def test_add_entry(self, mock_netns):
-        mock_netns_instance = mock_netns.return_value
-        mock_netns_enter = mock_netns_instance.__enter__.return_value
-        mock_netns_enter.link_lookup.return_value = [1]
+    @mock.patch.object(pyroute2, 'IPRoute')
+    def test_add_entry(self, mock_iproute):
+        mock_iproute_instance = mock_iproute.return_value
+        mock_iproute_enter = mock_iproute_instance.__enter__.return_value
+        mock_iproute_enter.link_lookup.return_value = [1]
         self.neigh_cmd.add('192.168.45.100', 'cc:dd:ee:ff:ab:cd')
-        mock_netns_enter.link_lookup.assert_called_once_with(ifname='tap0')
-        mock_netns_enter.neigh.assert_called_once_with(
+        mock_iproute_enter.link_lookup.assert_called_once_with(ifname='tap0')
+        mock_iproute_enter.neigh.assert_called_once_with(
             'replace',
             dst='192.168.45.100',
             lladdr='cc:dd:ee:ff:ab:cd',
@@ -1613,27 +1629,27 @@ class TestIpNeighCommand(TestIPCmdBase):
             ifindex=1,
             state=ndmsg.states['permanent'])
 
-    @mock.patch.object(pyroute2, 'NetNS')
-    def test_add_entry_nonexistent_namespace(self, mock_netns):
-        mock_netns.side_effect = OSError(errno.ENOENT, None)
+    @mock.patch.object(pyroute2, 'IPRoute')
+    def test_add_entry_nonexistent_namespace(self, mock_iproute):
+        self.mock_os.open.side_effect = OSError(errno.ENOENT, None)
         with testtools.ExpectedException(ip_lib.NetworkNamespaceNotFound):
             self.neigh_cmd.add('192.168.45.100', 'cc:dd:ee:ff:ab:cd')
 
-    @mock.patch.object(pyroute2, 'NetNS')
-    def test_add_entry_other_error(self, mock_netns):
+    @mock.patch.object(pyroute2, 'IPRoute')
+    def test_add_entry_other_error(self, mock_iproute):
         expected_exception = OSError(errno.EACCES, None)
-        mock_netns.side_effect = expected_exception
+        self.mock_os.open.side_effect = expected_exception
         with testtools.ExpectedException(expected_exception.__class__):
             self.neigh_cmd.add('192.168.45.100', 'cc:dd:ee:ff:ab:cd')
 
-    @mock.patch.object(pyroute2, 'NetNS')
-    def test_delete_entry(self, mock_netns):
-        mock_netns_instance = mock_netns.return_value
-        mock_netns_enter = mock_netns_instance.__enter__.return_value
-        mock_netns_enter.link_lookup.return_value = [1]
+    @mock.patch.object(pyroute2, 'IPRoute')
+    def test_delete_entry(self, mock_iproute):
+        mock_iproute_instance = mock_iproute.return_value
+        mock_iproute_enter = mock_iproute_instance.__enter__.return_value
+        mock_iproute_enter.link_lookup.return_value = [1]
         self.neigh_cmd.delete('192.168.45.100', 'cc:dd:ee:ff:ab:cd')
-        mock_netns_enter.link_lookup.assert_called_once_with(ifname='tap0')
-        mock_netns_enter.neigh.assert_called_once_with(
+        mock_iproute_enter.link_lookup.assert_called_once_with(ifname='tap0')
+        mock_iproute_enter.neigh.assert_called_once_with(
             'delete',
             dst='192.168.45.100',
             lladdr='cc:dd:ee:ff:ab:cd',
@@ -1646,14 +1662,14 @@ class TestIpNeighCommand(TestIPCmdBase):
         mock_run_iproute.side_effect = NetlinkError(errno.ENOENT, None)
         self.neigh_cmd.delete('192.168.45.100', 'cc:dd:ee:ff:ab:cd')
 
-    @mock.patch.object(pyroute2, 'NetNS')
-    def test_dump_entries(self, mock_netns):
-        mock_netns_instance = mock_netns.return_value
-        mock_netns_enter = mock_netns_instance.__enter__.return_value
-        mock_netns_enter.link_lookup.return_value = [1]
+    @mock.patch.object(pyroute2, 'IPRoute')
+    def test_dump_entries(self, mock_iproute):
+        mock_iproute_instance = mock_iproute.return_value
+        mock_iproute_enter = mock_iproute_instance.__enter__.return_value
+        mock_iproute_enter.link_lookup.return_value = [1]
         self.neigh_cmd.dump(4)
-        mock_netns_enter.link_lookup.assert_called_once_with(ifname='tap0')
-        mock_netns_enter.neigh.assert_called_once_with(
+        mock_iproute_enter.link_lookup.assert_called_once_with(ifname='tap0')
+        mock_iproute_enter.neigh.assert_called_once_with(
             'dump',
             family=2,
             ifindex=1)
@@ -1739,3 +1755,351 @@ class TestSetIpNonlocalBindForHaNamespace(base.BaseTestCase):
         """Make sure message is formatted correctly."""
         with mock.patch.object(ip_lib, 'set_ip_nonlocal_bind', return_value=1):
             ip_lib.set_ip_nonlocal_bind_for_namespace('foo')
+
+
+class TestNetlinkBackend(TestIPCmdBase):
+    def setUp(self):
+        super(TestNetlinkBackend, self).setUp()
+        self.config(group='AGENT', ip_lib_backend='netlink')
+        self.parent.namespace = 'ns'
+        self.apply_changes = mock.patch.object(
+            priv_lib, 'apply_netlink_changes').start()
+
+    def _assert_changes(self, *changes):
+        self.apply_changes.assert_has_calls(
+            [mock.call('ns', [change]) for change in changes])
+        self.assertEqual(len(changes), self.apply_changes.call_count)
+
+    def test_link_set_up(self):
+        ip_lib.IpLinkCommand(self.parent).set_up()
+        self._assert_changes(('set_link_attribute',
+                              {'device': 'eth0', 'state': 'up'}))
+        self.assertFalse(self.parent._as_root.called)
+
+    def test_link_set_mtu(self):
+        ip_lib.IpLinkCommand(self.parent).set_mtu('1450')
+        self._assert_changes(('set_link_attribute',
+                              {'device': 'eth0', 'mtu': 1450}))
+
+    def test_link_set_netns(self):
+        ip_lib.IpLinkCommand(self.parent).set_netns('other-ns')
+        self._assert_changes(('set_link_attribute',
+                              {'device': 'eth0', 'net_ns_fd': 'other-ns'}))
+        self.assertEqual('other-ns', self.parent.namespace)
+
+    def test_link_delete(self):
+        ip_lib.IpLinkCommand(self.parent).delete()
+        self._assert_changes(('delete_link', {'device': 'eth0'}))
+
+    def test_link_set_allmulticast_on_uses_ip_command(self):
+        self.command = 'link'
+        ip_lib.IpLinkCommand(self.parent).set_allmulticast_on()
+        self._assert_sudo([], ('set', 'eth0', 'allmulticast', 'on'))
+        self.assertFalse(self.apply_changes.called)
+
+    @mock.patch.object(priv_lib, 'get_link_attributes')
+    def test_link_attributes(self, get_link_attributes):
+        get_link_attributes.return_value = {'mtu': 1500}
+        self.assertEqual({'mtu': 1500},
+                         ip_lib.IpLinkCommand(self.parent).attributes)
+        get_link_attributes.assert_called_once_with('eth0', 'ns')
+
+    def test_addr_add(self):
+        addr = ip_lib.IpAddrCommand(self.parent)
+        addr.add('192.168.45.100/24')
+        addr.add('2001:db8::1/64', scope='link')
+        addr.add('10.0.0.1/24', add_broadcast=False)
+        self._assert_changes(
+            ('add_ip_address', {'device': 'eth0',
+                                'cidr': '192.168.45.100/24',
+                                'scope': 'global',
+                                'broadcast': '192.168.45.255'}),
+            ('add_ip_address', {'device': 'eth0',
+                                'cidr': '2001:db8::1/64',
+                                'scope': 'link',
+                                'broadcast': None}),
+            ('add_ip_address', {'device': 'eth0',
+                                'cidr': '10.0.0.1/24',
+                                'scope': 'global',
+                                'broadcast': None}))
+
+    def test_addr_delete(self):
+        ip_lib.IpAddrCommand(self.parent).delete('192.168.45.100')
+        self._assert_changes(('delete_ip_address',
+                              {'device': 'eth0',
+                               'cidr': '192.168.45.100/32'}))
+
+    def test_addr_flush(self):
+        ip_lib.IpAddrCommand(self.parent).flush(6)
+        self._assert_changes(('flush_ip_addresses',
+                              {'device': 'eth0', 'ip_version': 6}))
+
+    @mock.patch.object(priv_lib, 'get_ip_addresses')
+    def test_get_devices_with_ip(self, get_ip_addresses):
+        addresses = [{'name': 'eth0', 'cidr': '172.16.77.240/24'},
+                     {'name': 'eth0', 'cidr': '10.0.0.1/24'}]
+        get_ip_addresses.return_value = addresses
+        addr = ip_lib.IpAddrCommand(self.parent)
+        self.assertEqual(addresses,
+                         addr.get_devices_with_ip(name='eth0', ip_version=4))
+        self.assertEqual([addresses[1]],
+                         addr.get_devices_with_ip(to='10.0.0.0/8'))
+        get_ip_addresses.assert_has_calls([
+            mock.call('ns', device='eth0', ip_version=4, scope=None),
+            mock.call('ns', device=None, ip_version=None, scope=None)])
+
+    def test_route_add_gateway(self):
+        route = ip_lib.IpRouteCommand(self.parent)
+        route.add_gateway('192.168.45.1', metric=100)
+        self._assert_changes(('replace_route',
+                              {'ip_version': 4, 'cidr': None,
+                               'via': '192.168.45.1', 'device': 'eth0',
+                               'table': None, 'metric': 100}))
+
+    def test_route_add_route_in_table(self):
+        route = ip_lib.IpRouteCommand(self.parent, table=10)
+        route.add_route('10.0.0.0/24', scope='link')
+        self._assert_changes(('replace_route',
+                              {'ip_version': 4, 'cidr': '10.0.0.0/24',
+                               'via': None, 'device': 'eth0',
+                               'table': 10, 'scope': 'link'}))
+
+    def test_route_add_route_with_other_options_uses_ip_command(self):
+        self.command = 'route'
+        route = ip_lib.IpRouteCommand(self.parent)
+        route.add_route('10.0.0.0/24', proto='kernel')
+        self._assert_sudo([4], ('replace', '10.0.0.0/24', 'dev', 'eth0',
+                                'proto', 'kernel'))
+        self.assertFalse(self.apply_changes.called)
+
+    def test_route_delete_gateway_device_not_found(self):
+        self.apply_changes.side_effect = priv_lib.NetworkInterfaceNotFound
+        route = ip_lib.IpRouteCommand(self.parent)
+        self.assertRaises(exceptions.DeviceNotFoundError,
+                          route.delete_gateway, '192.168.45.1')
+
+    @mock.patch.object(priv_lib, 'create_netns')
+    def test_netns_add(self, create_netns):
+        with mock.patch.object(ip_lib, 'IPWrapper') as ip_wrapper:
+            ip_lib.IpNetnsCommand(self.parent).add('ns2')
+        create_netns.assert_called_once_with('ns2')
+        ip_wrapper.assert_called_once_with(namespace='ns2')
+        self.assertFalse(self.parent._as_root.called)
+
+    @mock.patch.object(priv_lib, 'remove_netns')
+    def test_netns_delete(self, remove_netns):
+        ip_lib.IpNetnsCommand(self.parent).delete('ns2')
+        remove_netns.assert_called_once_with('ns2')
+
+    @mock.patch.object(priv_lib, 'list_netns', return_value=NETNS_SAMPLE)
+    def test_netns_exists(self, list_netns):
+        netns_cmd = ip_lib.IpNetnsCommand(self.parent)
+        self.assertTrue(netns_cmd.exists(NETNS_SAMPLE[1]))
+        self.assertFalse(netns_cmd.exists('ns2'))
+
+
+class TestBatchedChanges(base.BaseTestCase):
+    def setUp(self):
+        super(TestBatchedChanges, self).setUp()
+        self.config(group='AGENT', ip_lib_backend='netlink')
+        self.apply_changes = mock.patch.object(
+            priv_lib, 'apply_netlink_changes').start()
+
+    def test_changes_are_applied_per_namespace_on_exit(self):
+        with ip_lib.batched_changes():
+            ip_lib.IPDevice('eth0', namespace='ns1').link.set_up()
+            ip_lib.IPDevice('eth1', namespace='ns1').addr.delete(
+                '10.0.0.1/24')
+            ip_lib.IPDevice('eth0', namespace='ns2').link.set_down()
+            self.assertFalse(self.apply_changes.called)
+        self.assertEqual([
+            mock.call('ns1', [
+                ('set_link_attribute', {'device': 'eth0', 'state': 'up'}),
+                ('delete_ip_address', {'device': 'eth1',
+                                       'cidr': '10.0.0.1/24'})]),
+            mock.call('ns2', [
+                ('set_link_attribute', {'device': 'eth0',
+                                        'state': 'down'})])],
+            self.apply_changes.call_args_list)
+
+    def test_nested_batches_are_applied_by_outermost(self):
+        with ip_lib.batched_changes():
+            with ip_lib.batched_changes():
+                ip_lib.IPDevice('eth0', namespace='ns1').link.set_up()
+            self.assertFalse(self.apply_changes.called)
+        self.assertEqual(1, self.apply_changes.call_count)
+
+    def test_changes_not_applied_on_exception(self):
+        with testtools.ExpectedException(ValueError):
+            with ip_lib.batched_changes():
+                ip_lib.IPDevice('eth0', namespace='ns1').link.set_up()
+                raise ValueError()
+        self.assertFalse(self.apply_changes.called)
+        # the batch is over
+        ip_lib.IPDevice('eth0', namespace='ns1').link.set_up()
+        self.assertEqual(1, self.apply_changes.call_count)
+
+    def test_ip_backend_applies_changes_immediately(self):
+        self.config(group='AGENT', ip_lib_backend='ip')
+        with mock.patch.object(ip_lib.IpLinkCommand, '_as_root') as as_root:
+            with ip_lib.batched_changes():
+                ip_lib.IPDevice('eth0', namespace='ns1').link.set_up()
+                as_root.assert_called_once_with([], ('set', 'eth0', 'up'))
+        self.assertFalse(self.apply_changes.called)
+
+
+class TestPrivilegedNetlinkChanges(base.BaseTestCase):
+    def setUp(self):
+        super(TestPrivilegedNetlinkChanges, self).setUp()
+        self.addCleanup(privileged.default.set_client_mode, True)
+        privileged.default.set_client_mode(False)
+        self.mock_os = mock_netns_iproute()
+        mock_iproute = mock.patch.object(pyroute2, 'IPRoute').start()
+        self.mock_iproute = mock_iproute
+        self.ip = mock_iproute.return_value.__enter__.return_value
+        self.ip.link_lookup.side_effect = (
+            lambda ifname: {'eth0': [1], 'eth1': [2]}.get(ifname, []))
+
+    def test_apply_changes_looks_up_devices_once(self):
+        priv_lib.apply_netlink_changes('ns', [
+            ('set_link_attribute', {'device': 'eth0', 'mtu': 1450}),
+            ('add_ip_address', {'device': 'eth0', 'cidr': '10.0.0.1/24',
+                                'scope': 'global',
+                                'broadcast': '10.0.0.255'}),
+            ('replace_route', {'ip_version': 6, 'cidr': '2001:db8::/64',
+                               'device': 'eth0', 'table': 'main',
+                               'scope': 'link'}),
+            ('delete_link', {'device': 'eth1'})])
+        self.mock_iproute.assert_called_once_with()
+        self.assertEqual(2, self.ip.link_lookup.call_count)
+        self.ip.link.assert_has_calls([mock.call('set', index=1, mtu=1450),
+                                       mock.call('del', index=2)])
+        self.ip.addr.assert_called_once_with(
+            'add', index=1, address='10.0.0.1', mask=24, scope=0,
+            family=socket.AF_INET, broadcast='10.0.0.255')
+        self.ip.route.assert_called_once_with(
+            'replace', family=socket.AF_INET6, dst='2001:db8::',
+            dst_len=64, oif=1, table=254, scope=253)
+
+    def test_apply_changes_default_route(self):
+        priv_lib.apply_netlink_changes('ns', [
+            ('delete_route', {'ip_version': 4, 'via': '10.0.0.254',
+                              'device': None, 'table': '10'})])
+        self.ip.route.assert_called_once_with(
+            'del', family=socket.AF_INET, dst_len=0, gateway='10.0.0.254',
+            table=10)
+
+    def test_apply_changes_flush_addresses(self):
+        self.ip.get_addr.return_value = [
+            {'prefixlen': 24, 'attrs': [('IFA_ADDRESS', '10.0.0.1')]},
+            {'prefixlen': 32, 'attrs': [('IFA_ADDRESS', '10.0.0.3'),
+                                        ('IFA_LOCAL', '10.0.0.2')]}]
+        priv_lib.apply_netlink_changes('ns', [
+            ('flush_ip_addresses', {'device': 'eth0', 'ip_version': 4})])
+        self.ip.get_addr.assert_called_once_with(family=socket.AF_INET,
+                                                 index=1)
+        self.ip.addr.assert_has_calls([
+            mock.call('del', index=1, address='10.0.0.1', mask=24,
+                      family=socket.AF_INET),
+            mock.call('del', index=1, address='10.0.0.2', mask=32,
+                      family=socket.AF_INET)])
+
+    def test_apply_changes_unknown_change(self):
+        self.assertRaises(ValueError, priv_lib.apply_netlink_changes, 'ns',
+                          [('get_links', {})])
+        self.assertFalse(self.ip.get_links.called)
+
+    def test_apply_changes_device_not_found(self):
+        self.assertRaises(priv_lib.NetworkInterfaceNotFound,
+                          priv_lib.apply_netlink_changes, 'ns',
+                          [('delete_link', {'device': 'eth2'})])
+
+    def test_apply_changes_netlink_error(self):
+        self.ip.link.side_effect = NetlinkError(errno.ENODEV)
+        self.assertRaises(priv_lib.NetworkInterfaceNotFound,
+                          priv_lib.apply_netlink_changes, 'ns',
+                          [('delete_link', {'device': 'eth0'})])
+        self.ip.link.side_effect = NetlinkError(errno.EEXIST)
+        self.assertRaises(RuntimeError,
+                          priv_lib.apply_netlink_changes, 'ns',
+                          [('delete_link', {'device': 'eth0'})])
+
+    def test_apply_changes_nonexistent_namespace(self):
+        self.mock_os.open.side_effect = [
+            priv_lib._DAEMON_NETNS, OSError(errno.ENOENT, None)]
+        with testtools.ExpectedException(ip_lib.NetworkNamespaceNotFound):
+            priv_lib.apply_netlink_changes(
+                'ns', [('delete_link', {'device': 'eth0'})])
+        self.assertFalse(priv_lib.netns.setns.called)
+        self.mock_os.close.assert_called_once_with(priv_lib._DAEMON_NETNS)
+
+    def test_iproute_opened_in_namespace(self):
+        def iproute():
+            # the socket is opened while the thread is in the namespace
+            priv_lib.netns.setns.assert_called_once_with('/var/run/netns/ns')
+            return mock.DEFAULT
+
+        self.mock_iproute.side_effect = iproute
+        priv_lib.get_link_attributes('eth0', 'ns')
+        priv_lib.netns.setns.assert_has_calls([
+            mock.call('/var/run/netns/ns'),
+            mock.call(priv_lib._DAEMON_NETNS)])
+        self.mock_os.close.assert_has_calls([
+            mock.call('/var/run/netns/ns'),
+            mock.call(priv_lib._DAEMON_NETNS)])
+
+    def test_iproute_switches_back_on_error(self):
+        self.mock_iproute.side_effect = OSError(errno.EMFILE, None)
+        self.assertRaises(OSError, priv_lib.get_link_attributes, 'eth0', 'ns')
+        priv_lib.netns.setns.assert_called_with(priv_lib._DAEMON_NETNS)
+        self.assertEqual(2, self.mock_os.close.call_count)
+
+    def test_iproute_in_current_namespace(self):
+        self.ip.get_links.return_value = [{'attrs': []}]
+        priv_lib.get_link_attributes('eth0', None)
+        self.mock_iproute.assert_called_once_with()
+        self.assertFalse(self.mock_os.open.called)
+        self.assertFalse(priv_lib.netns.setns.called)
+
+    def test_get_link_attributes(self):
+        self.ip.get_links.return_value = [{'attrs': [
+            ('IFLA_IFNAME', 'eth0'), ('IFLA_ADDRESS', 'cc:dd:ee:ff:ab:cd'),
+            ('IFLA_OPERSTATE', 'UP'), ('IFLA_MTU', 1500),
+            ('IFLA_QDISC', 'noqueue'), ('IFLA_TXQLEN', 1000)]}]
+        self.assertEqual({'link/ether': 'cc:dd:ee:ff:ab:cd',
+                          'state': 'UP', 'mtu': 1500, 'qdisc': 'noqueue',
+                          'qlen': 1000},
+                         priv_lib.get_link_attributes('eth0', 'ns'))
+        self.ip.get_links.assert_called_once_with(1)
+
+    def test_get_ip_addresses(self):
+        self.ip.get_links.return_value = [
+            {'index': 1, 'attrs': [('IFLA_IFNAME', 'eth0')]}]
+        self.ip.get_addr.return_value = [
+            {'index': 1, 'prefixlen': 24, 'scope': 0, 'flags': 0x80,
+             'attrs': [('IFA_ADDRESS', '172.16.77.240')]},
+            {'index': 1, 'prefixlen': 64, 'scope': 0, 'flags': 0,
+             'attrs': [('IFA_ADDRESS', '2001:470:9:1224:5595:dd51:6ba2:e788'),
+                       ('IFA_FLAGS', 0x40)]},
+            {'index': 1, 'prefixlen': 64, 'scope': 253, 'flags': 0x88,
+             'attrs': [('IFA_ADDRESS', 'fe80::dfcc:aaff:feb9:76ce')]}]
+        self.assertEqual([
+            {'name': 'eth0', 'cidr': '172.16.77.240/24', 'scope': 'global',
+             'dynamic': False, 'tentative': False, 'dadfailed': False},
+            {'name': 'eth0',
+             'cidr': '2001:470:9:1224:5595:dd51:6ba2:e788/64',
+             'scope': 'global', 'dynamic': True, 'tentative': True,
+             'dadfailed': False},
+            {'name': 'eth0', 'cidr': 'fe80::dfcc:aaff:feb9:76ce/64',
+             'scope': 'link', 'dynamic': False, 'tentative': False,
+             'dadfailed': True}],
+            priv_lib.get_ip_addresses('ns', device='eth0'))
+        self.ip.get_addr.assert_called_once_with(index=1)
+
+    def test_get_ip_addresses_filters(self):
+        self.ip.get_links.return_value = []
+        self.ip.get_addr.return_value = []
+        priv_lib.get_ip_addresses('ns', ip_version=6, scope='link')
+        self.ip.get_addr.assert_called_once_with(family=socket.AF_INET6,
+                                                 scope=253)
+        self.assertFalse(self.ip.link_lookup.called)
@@ -2160,6 +2160,23 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
                                [('source_ip_prefix', '%s/32' % ip)])
                           for ip in other_ips])
 
+    def test_sg_rule_expansion_after_members_update(self):
+        self.firewall.update_security_group_members(
+            FAKE_SGID, {'IPv4': ['10.0.0.2'], 'IPv6': []})
+        port = self._fake_port()
+        rule = self._fake_sg_rule_for_ethertype(_IPv4, FAKE_SGID)
+        rules = list(self.firewall._expand_sg_rule_with_remote_ips(
+            rule, port, 'ingress'))
+        self.assertEqual(['10.0.0.2/32'],
+                         [r['source_ip_prefix'] for r in rules])
+        # the prefixes of the previous members are not reused
+        self.firewall.update_security_group_members(
+            FAKE_SGID, {'IPv4': ['10.0.0.3', '10.0.1.0/24'], 'IPv6': []})
+        rules = list(self.firewall._expand_sg_rule_with_remote_ips(
+            rule, port, 'ingress'))
+        self.assertEqual(['10.0.0.3/32', '10.0.1.0/24'],
+                         [r['source_ip_prefix'] for r in rules])
+
     def test_build_ipv4v6_mac_ip_list(self):
         mac_oth = 'ffff-ff0f-ffff'
         mac_unix = 'FF:FF:FF:0F:FF:FF'
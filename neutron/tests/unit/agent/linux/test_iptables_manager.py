@@ -187,6 +187,66 @@ class IptablesTestCase(base.BaseTestCase):
             self.assertEqual('python_-m_unitte', binary_name)
 
 
+class IptablesTableTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(IptablesTableTestCase, self).setUp()
+        self.table = iptables_manager.IptablesTable(binary_name='bn')
+        self.table.add_chain('test')
+        self.table.add_chain('other')
+        self.table.dirty_chains.clear()
+
+    def test_rules_keep_insertion_order(self):
+        self.table.add_rule('test', '-j DROP')
+        self.table.add_rule('test', '-j ACCEPT')
+        self.assertEqual(['-A bn-test -j DROP', '-A bn-test -j ACCEPT'],
+                         [str(r) for r in self.table.rules])
+
+    def test_add_and_remove_rule_marks_chain_dirty(self):
+        self.table.add_rule('test', '-j DROP')
+        self.assertEqual({'bn-test'}, self.table.dirty_chains)
+        self.table.dirty_chains.clear()
+        self.table.remove_rule('test', '-j DROP')
+        self.assertEqual({'bn-test'}, self.table.dirty_chains)
+        self.assertEqual([], self.table.rules)
+
+    def test_remove_duplicated_rule_removes_one_instance(self):
+        self.table.add_rule('test', '-j DROP')
+        self.table.add_rule('test', '-j DROP')
+        self.table.remove_rule('test', '-j DROP')
+        self.assertEqual(['-A bn-test -j DROP'],
+                         [str(r) for r in self.table.rules])
+
+    def test_remove_chain_removes_jumps(self):
+        self.table.add_rule('test', '-j DROP')
+        self.table.add_rule('other', '-j $test')
+        self.table.add_rule('other', '-j ACCEPT')
+        self.table.dirty_chains.clear()
+        self.table.remove_chain('test')
+        self.assertEqual({'bn-test', 'bn-other'}, self.table.dirty_chains)
+        self.assertEqual(['-A bn-other -j ACCEPT'],
+                         [str(r) for r in self.table.rules])
+
+    def test_clear_rules_by_tag(self):
+        self.table.add_rule('test', '-j DROP', tag='foo')
+        self.table.add_rule('other', '-j DROP', tag='bar')
+        self.table.dirty_chains.clear()
+        self.table.clear_rules_by_tag('foo')
+        self.assertEqual({'bn-test'}, self.table.dirty_chains)
+        self.assertEqual(['-A bn-other -j DROP'],
+                         [str(r) for r in self.table.rules])
+
+    def test_generate_path_between_rules_changed_chains(self):
+        old_rules = [':bn-test - [0:0]', ':bn-other - [0:0]',
+                     '-A bn-test -j DROP', '-A bn-other -j DROP']
+        new_rules = [':bn-test - [0:0]', ':bn-other - [0:0]',
+                     '-A bn-test -j ACCEPT', '-A bn-other -j ACCEPT']
+        self.assertEqual(
+            ['-D bn-test 1', '-I bn-test 1 -j ACCEPT'],
+            iptables_manager._generate_path_between_rules(
+                old_rules, new_rules, changed_chains={'bn-test'}))
+
+
 class IptablesCommentsTestCase(base.BaseTestCase):
 
     def setUp(self):
@@ -1265,6 +1325,51 @@ class IptablesManagerStateFulTestCase(base.BaseTestCase):
 
         tools.verify_mock_calls(self.execute, expected_calls_and_values)
 
+    def _get_save_calls(self):
+        return [c for c in self.execute.call_args_list
+                if c[0][0] == ['iptables-save']]
+
+    def test_incremental_apply_skips_iptables_save(self):
+        cfg.CONF.set_override('iptables_incremental_apply', True, 'AGENT')
+        self.execute.return_value = ''
+        self.iptables.ipv4['filter'].add_chain('test-filter')
+        self.iptables.apply()
+        self.iptables.ipv4['filter'].add_rule('test-filter', '-j DROP')
+        commands = self.iptables.apply()
+
+        self.assertEqual(1, len(self._get_save_calls()))
+        self.assertIn('-I %s-test-filter 1 -j DROP' %
+                      iptables_manager.binary_name, commands)
+        self.assertEqual([], self.iptables.apply())
+
+    def test_incremental_apply_saves_after_drift_interval(self):
+        cfg.CONF.set_override('iptables_incremental_apply', True, 'AGENT')
+        cfg.CONF.set_override('iptables_drift_check_interval', 60, 'AGENT')
+        self.execute.return_value = ''
+        with mock.patch.object(iptables_manager.time, 'time',
+                               return_value=1000):
+            self.iptables.apply()
+            self.iptables.apply()
+        self.assertEqual(1, len(self._get_save_calls()))
+        with mock.patch.object(iptables_manager.time, 'time',
+                               return_value=1060):
+            self.iptables.apply()
+        self.assertEqual(2, len(self._get_save_calls()))
+
+    def test_incremental_apply_saves_after_restore_failure(self):
+        cfg.CONF.set_override('iptables_incremental_apply', True, 'AGENT')
+
+        def iptables_restore_failer(*args, **kwargs):
+            if 'iptables-restore' in args[0]:
+                raise RuntimeError()
+            return ''
+        self.execute.side_effect = iptables_restore_failer
+        self.assertRaises(RuntimeError, self.iptables.apply)
+        self.execute.side_effect = None
+        self.execute.return_value = ''
+        self.iptables.apply()
+        self.assertEqual(2, len(self._get_save_calls()))
+
 
 class IptablesManagerStateLessTestCase(base.BaseTestCase):
 
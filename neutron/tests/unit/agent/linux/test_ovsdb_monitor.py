@@ -13,6 +13,7 @@
 #    under the License.
 
 import mock
+from ovs.db import idl
 
 from neutron.agent.common import ovs_lib
 from neutron.agent.linux import ovsdb_monitor
@@ -87,3 +88,81 @@ class TestSimpleInterfaceMonitor(base.BaseTestCase):
             self.monitor.process_events()
             self.assertEqual(self.monitor.new_events['added'][0]['ofport'],
                              ovs_lib.UNASSIGNED_OFPORT)
+
+
+class TestNativeInterfaceMonitor(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestNativeInterfaceMonitor, self).setUp()
+        self.monitor = ovsdb_monitor.NativeInterfaceMonitor(
+            'tcp:127.0.0.1:6640', 10)
+
+    @staticmethod
+    def _row(uuid, name, ofport=None, external_ids=None):
+        row = mock.Mock(uuid=uuid, ofport=[ofport] if ofport else [],
+                        external_ids=external_ids or {})
+        # 'name' is an argument of the Mock constructor
+        row.name = name
+        return row
+
+    def test_created_row_is_reported_as_added(self):
+        row = self._row('uuid1', 'tap1', external_ids={'iface-id': 'port1'})
+        self.monitor.handle_row_event(idl.ROW_CREATE, row)
+        self.assertTrue(self.monitor.has_updates)
+        self.assertEqual(
+            {'added': [{'name': 'tap1',
+                        'ofport': ovs_lib.UNASSIGNED_OFPORT,
+                        'external_ids': {'iface-id': 'port1'}}],
+             'removed': []},
+            self.monitor.get_events())
+        self.assertFalse(self.monitor.has_updates)
+
+    def test_ofport_update_refreshes_pending_added_event(self):
+        row = self._row('uuid1', 'tap1')
+        self.monitor.handle_row_event(idl.ROW_CREATE, row)
+        row.ofport = [5]
+        self.monitor.handle_row_event(idl.ROW_UPDATE, row)
+        events = self.monitor.get_events()
+        self.assertEqual(1, len(events['added']))
+        self.assertEqual(5, events['added'][0]['ofport'])
+        self.assertEqual(5, self.monitor.get_interfaces(['tap1'])[0]['ofport'])
+
+    def test_deleted_row_is_reported_as_removed(self):
+        row = self._row('uuid1', 'tap1', ofport=3)
+        self.monitor.handle_row_event(idl.ROW_CREATE, row)
+        self.monitor.get_events()
+        self.monitor.handle_row_event(idl.ROW_DELETE, row)
+        self.assertEqual(
+            {'added': [],
+             'removed': [{'name': 'tap1', 'ofport': 3, 'external_ids': {}}]},
+            self.monitor.get_events())
+        self.assertEqual([], self.monitor.get_interfaces(['tap1']))
+
+    def test_recreated_row_after_reconnect_is_not_reported(self):
+        row = self._row('uuid1', 'tap1', ofport=3)
+        self.monitor.handle_row_event(idl.ROW_CREATE, row)
+        self.monitor.get_events()
+        self.monitor.handle_row_event(idl.ROW_CREATE, row)
+        self.assertFalse(self.monitor.has_updates)
+
+    def test_remove_stale_rows(self):
+        for uuid, name in (('uuid1', 'tap1'), ('uuid2', 'tap2')):
+            self.monitor.handle_row_event(
+                idl.ROW_CREATE, self._row(uuid, name))
+        self.monitor.get_events()
+        self.monitor.remove_stale_rows({'uuid2': mock.ANY})
+        self.assertEqual(['tap1'], [
+            e['name'] for e in self.monitor.get_events()['removed']])
+        self.assertEqual(1, self.monitor.interface_count)
+
+    def test_restart_reports_known_interfaces_as_added(self):
+        self.monitor.handle_row_event(
+            idl.ROW_CREATE, self._row('uuid1', 'tap1'))
+        self.monitor.get_events()
+        self.monitor._connection = mock.Mock()
+        self.monitor.stop()
+        self.assertFalse(self.monitor.is_active())
+        self.monitor.start()
+        self.assertTrue(self.monitor.is_active())
+        self.assertEqual(['tap1'], [
+            e['name'] for e in self.monitor.get_events()['added']])
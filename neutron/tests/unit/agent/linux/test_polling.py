@@ -15,6 +15,7 @@
 import mock
 
 from neutron.agent.common import base_polling
+from neutron.agent.linux import ovsdb_monitor
 from neutron.agent.linux import polling
 from neutron.agent.ovsdb.native import helpers
 from neutron.tests import base
@@ -69,3 +70,23 @@ class TestInterfacePollingMinimizer(base.BaseTestCase):
     def test__is_polling_required_returns_when_updates_are_present(self):
         with self.mock_has_updates(True):
             self.assertTrue(self.pm._is_polling_required())
+
+    def test_get_interfaces_without_replica(self):
+        self.assertIsNone(self.pm.get_interfaces(['tap1']))
+
+
+class TestNativeInterfacePollingMinimizer(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestNativeInterfacePollingMinimizer, self).setUp()
+        self.pm = polling.InterfacePollingMinimizer(native_monitor=True)
+
+    def test_uses_native_monitor(self):
+        self.assertIsInstance(self.pm._monitor,
+                              ovsdb_monitor.NativeInterfaceMonitor)
+
+    def test_get_interfaces(self):
+        with mock.patch.object(self.pm._monitor, 'get_interfaces',
+                               return_value=['iface']) as get_interfaces:
+            self.assertEqual(['iface'], self.pm.get_interfaces(['tap1']))
+        get_interfaces.assert_called_once_with(['tap1'])
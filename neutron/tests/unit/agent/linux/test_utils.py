@@ -15,6 +15,7 @@
 import signal
 import socket
 
+import eventlet
 import mock
 import six
 import testtools
@@ -177,6 +178,161 @@ class AgentUtilsExecuteTest(base.BaseTestCase):
         result = utils.execute(['ls', self.test_file], return_stderr=True)
         self.assertEqual((out_data, err_data), result)
 
+    def test_execute_records_stats(self):
+        self.mock_popen.return_value = ('', '')
+        with mock.patch.object(utils, 'COMMAND_STATS') as stats:
+            utils.execute(['ip', 'netns', 'exec', 'ns', 'ip', '-o', 'link',
+                           'show'], run_as_root=True)
+            stats.record.assert_called_once_with('ip link', mock.ANY, False)
+
+    def test_execute_records_stats_on_error(self):
+        self.mock_popen.return_value = ('', '')
+        self.process.return_value.returncode = 1
+        with mock.patch.object(utils, 'COMMAND_STATS') as stats:
+            self.assertRaises(RuntimeError, utils.execute, ['ls'])
+            stats.record.assert_called_once_with('ls', mock.ANY, True)
+
+    def test_execute_records_stats_extra_ok_codes(self):
+        self.mock_popen.return_value = ('', '')
+        self.process.return_value.returncode = 1
+        with mock.patch.object(utils, 'COMMAND_STATS') as stats:
+            utils.execute(['conntrack', '-D'], extra_ok_codes=[1])
+            stats.record.assert_called_once_with('conntrack', mock.ANY,
+                                                 False)
+
+
+class TestCommandStats(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCommandStats, self).setUp()
+        self.stats = utils.CommandStats()
+
+    def test_get_command_name(self):
+        self.assertEqual('iptables-save', self.stats.get_command_name(
+            ['env', 'A=1', 'B=2', 'iptables-save']))
+        self.assertEqual('ip addr', self.stats.get_command_name(
+            ['ip', '-4', 'addr', 'show']))
+        self.assertEqual('sysctl', self.stats.get_command_name(
+            ['ip', 'netns', 'exec', 'qrouter-1', '/sbin/sysctl', '-w']))
+
+    def test_record(self):
+        self.stats.record('ip link', 0.5)
+        self.stats.record('ip link', 1.5, failed=True)
+        self.assertEqual(
+            {'ip link': {'count': 2, 'errors': 1,
+                         'total_time': 2.0, 'max_time': 1.5}},
+            self.stats.get_stats())
+        self.stats.reset()
+        self.assertEqual({}, self.stats.get_stats())
+
+
+class TestLogCommandStats(base.BaseTestCase):
+
+    def test_log_command_stats(self):
+        stats = utils.CommandStats()
+        stats.record('ip link', 0.5)
+        stats.record('ip link', 1.5, failed=True)
+        with mock.patch.object(utils, 'COMMAND_STATS', stats),\
+                mock.patch.object(utils.LOG, 'debug') as debug:
+            utils.log_command_stats()
+        debug.assert_called_once_with(
+            mock.ANY, {'name': 'ip link', 'count': 2, 'errors': 1,
+                       'avg': 1.0, 'max': 1.5})
+
+
+class TestRootwrapDaemonPool(base.BaseTestCase):
+
+    def test_execute(self):
+        cmd_client = mock.Mock()
+        cmd_client.execute.return_value = (0, 'out', '')
+        pool = utils.RootwrapDaemonPool(2, lambda: cmd_client)
+        self.assertEqual((0, 'out', ''), pool.execute(['ls'], None))
+        cmd_client.execute.assert_called_once_with(['ls'], None)
+
+    def test_clients_are_reused(self):
+        factory = mock.Mock()
+        pool = utils.RootwrapDaemonPool(2, factory)
+        pool.execute(['ls'], None)
+        pool.execute(['ls'], None)
+        self.assertEqual(1, factory.call_count)
+
+    def test_concurrency_is_limited(self):
+        running = []
+        max_running = []
+
+        def execute(cmd, process_input):
+            running.append(cmd)
+            max_running.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(cmd)
+
+        def new_client():
+            return mock.Mock(execute=mock.Mock(side_effect=execute))
+
+        factory = mock.Mock(side_effect=new_client)
+        pool = utils.RootwrapDaemonPool(2, factory)
+        green_pool = eventlet.GreenPool()
+        for i in range(5):
+            green_pool.spawn(pool.execute, ['cmd%d' % i], None)
+        green_pool.waitall()
+        self.assertEqual(2, max(max_running))
+        self.assertEqual(2, factory.call_count)
+
+    def test_get_pool_size(self):
+        self.config(group='AGENT', root_helper_daemon_pool_size=3)
+        pool = utils.RootwrapDaemonHelper.get_pool()
+        self.assertEqual(3, pool.size)
+        self.assertIs(pool, utils.RootwrapDaemonHelper.get_pool())
+
+    def test_reset_pool(self):
+        self.config(group='AGENT', root_helper_daemon_pool_size=3)
+        pool = utils.RootwrapDaemonHelper.get_pool()
+        self.config(group='AGENT', root_helper_daemon_pool_size=5)
+        utils.RootwrapDaemonHelper.reset_pool()
+        new_pool = utils.RootwrapDaemonHelper.get_pool()
+        self.assertIsNot(pool, new_pool)
+        self.assertEqual(5, new_pool.size)
+
+    @mock.patch.object(utils.RootwrapDaemonHelper, 'get_client')
+    def test_pool_size_is_respected(self, get_client):
+        running = []
+        max_running = []
+
+        def execute(cmd, process_input):
+            running.append(cmd)
+            max_running.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(cmd)
+            return 0, '', ''
+
+        get_client.side_effect = lambda: mock.Mock(
+            execute=mock.Mock(side_effect=execute))
+        self.config(group='AGENT', root_helper_daemon='echo',
+                    root_helper_daemon_pool_size=3)
+        green_pool = eventlet.GreenPool()
+        for i in range(6):
+            green_pool.spawn(utils.execute, ['cmd%d' % i], run_as_root=True)
+        green_pool.waitall()
+        self.assertEqual(3, max(max_running))
+        self.assertEqual(3, get_client.call_count)
+
+    def test_execute_rootwrap_daemon_uses_pool(self):
+        pool = mock.Mock()
+        pool.execute.return_value = (0, '', '')
+        self.config(group='AGENT', root_helper_daemon='echo')
+        with mock.patch.object(utils.RootwrapDaemonHelper, 'get_pool',
+                               return_value=pool):
+            utils.execute(['ls'], run_as_root=True)
+        pool.execute.assert_called_once_with(['ls'], None)
+
+
+class TestRunConcurrently(base.BaseTestCase):
+
+    def test_run_concurrently(self):
+        self.config(group='AGENT', root_helper_daemon_pool_size=3)
+        self.assertEqual([1, 4, 9],
+                         utils.run_concurrently(lambda x: x * x, [1, 2, 3]))
+
 
 class AgentUtilsExecuteEncodeTest(base.BaseTestCase):
     def setUp(self):
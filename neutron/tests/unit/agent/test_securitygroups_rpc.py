@@ -245,6 +245,38 @@ class SGServerRpcCallBackTestCase(test_sg.SecurityGroupDBTestCase):
             '192.168.1.3')
         self.assertFalse(self.notifier.security_groups_provider_updated.called)
 
+    def test_notify_security_group_member_changes(self):
+        with self.network() as n,\
+                self.subnet(n, cidr='10.0.0.0/24'),\
+                self.security_group() as sg:
+            sg_id = sg['security_group']['id']
+            port = self.deserialize(self.fmt, self._create_port(
+                self.fmt, n['network']['id'], security_groups=[sg_id],
+                fixed_ips=[{'ip_address': '10.0.0.5'}]))
+            self.notifier.security_groups_member_updated.\
+                assert_called_once_with(
+                    mock.ANY, [sg_id],
+                    added_members={sg_id: {const.IPv4: ['10.0.0.5']}},
+                    removed_members={}, member_revisions={sg_id: 1})
+            # the test plugin does not notify the updates of the ports
+            plugin = directory.get_plugin()
+            ctx = context.get_admin_context()
+            plugin.update_port(
+                ctx, port['port']['id'],
+                {'port': {'fixed_ips': [{'ip_address': '10.0.0.6'}]}})
+            plugin.check_and_notify_security_group_member_changed(
+                ctx, port['port'], plugin.get_port(ctx, port['port']['id']))
+            self.notifier.security_groups_member_updated.assert_called_with(
+                mock.ANY, [sg_id],
+                added_members={sg_id: {const.IPv4: ['10.0.0.6']}},
+                removed_members={sg_id: {const.IPv4: ['10.0.0.5']}},
+                member_revisions={sg_id: 2})
+            self._delete('ports', port['port']['id'])
+            self.notifier.security_groups_member_updated.assert_called_with(
+                mock.ANY, [sg_id], added_members={},
+                removed_members={sg_id: {const.IPv4: ['10.0.0.6']}},
+                member_revisions={sg_id: 3})
+
     def _test_sg_rules_for_devices_ipv4_ingress_port_range(
             self, min_port, max_port):
         fake_prefix = FAKE_PREFIX[const.IPv4]
@@ -324,6 +356,101 @@ class SGServerRpcCallBackTestCase(test_sg.SecurityGroupDBTestCase):
             self.assertEqual(expected, sg_info['security_groups'])
             self._delete('ports', port_id)
 
+    def test_security_group_info_for_ports_sharing_security_group(self):
+        with self.network() as n,\
+                self.subnet(n),\
+                self.security_group() as sg:
+            sg_id = sg['security_group']['id']
+            rule = self._build_security_group_rule(
+                sg_id, 'ingress', const.PROTO_NAME_TCP, '22', '22',
+                remote_group_id=sg_id)
+            res = self._create_security_group_rule(
+                self.fmt, {'security_group_rules': [
+                    rule['security_group_rule']]})
+            self.assertEqual(webob.exc.HTTPCreated.code, res.status_int)
+            ports = [self.deserialize(self.fmt, self._create_port(
+                self.fmt, n['network']['id'], security_groups=[sg_id]))
+                for i in range(3)]
+            devices = [port['port']['id'] for port in ports]
+            ctx = context.get_admin_context()
+            sg_info = self.rpc.security_group_info_for_devices(
+                ctx, devices=devices)
+
+            # the rules of the group are sent once, whatever the number of
+            # ports bound to it
+            expected = [{'direction': 'egress', 'ethertype': const.IPv4},
+                        {'direction': 'egress', 'ethertype': const.IPv6},
+                        {'direction': 'ingress',
+                         'protocol': const.PROTO_NAME_TCP,
+                         'ethertype': const.IPv4,
+                         'port_range_max': 22, 'port_range_min': 22,
+                         'remote_group_id': sg_id}]
+            self.assertEqual({sg_id: expected}, sg_info['security_groups'])
+            self.assertEqual(
+                sorted(port['port']['fixed_ips'][0]['ip_address']
+                       for port in ports),
+                sorted(sg_info['sg_member_ips'][sg_id][const.IPv4]))
+            for device in devices:
+                self.assertEqual(
+                    [sg_id], sg_info['devices'][device][
+                        'security_group_source_groups'])
+            for device in devices:
+                self._delete('ports', device)
+
+    @contextlib.contextmanager
+    def _port_with_remote_group_rule(self):
+        with self.network() as n,\
+                self.subnet(n),\
+                self.security_group() as sg1,\
+                self.security_group() as sg2:
+            sg1_id = sg1['security_group']['id']
+            sg2_id = sg2['security_group']['id']
+            rule = self._build_security_group_rule(
+                sg1_id, 'ingress', const.PROTO_NAME_TCP, '22', '22',
+                remote_group_id=sg2_id)
+            res = self._create_security_group_rule(
+                self.fmt, {'security_group_rules': [
+                    rule['security_group_rule']]})
+            self.assertEqual(webob.exc.HTTPCreated.code, res.status_int)
+            port = self.deserialize(self.fmt, self._create_port(
+                self.fmt, n['network']['id'],
+                security_groups=[sg1_id, sg2_id]))
+            yield port['port'], sg1_id, sg2_id
+            self._delete('ports', port['port']['id'])
+
+    def test_security_group_info_for_devices_cached_rules(self):
+        with self._port_with_remote_group_rule() as (port, sg1_id, sg2_id):
+            ctx = context.get_admin_context()
+            sg_info = self.rpc.security_group_info_for_devices(
+                ctx, devices=[port['id']], cached_rules=[sg1_id],
+                cached_members=[])
+            self.assertEqual([sg2_id], list(sg_info['security_groups']))
+            # the members are returned for all the ethertypes, to be cached
+            self.assertEqual(
+                {const.IPv4: set([port['fixed_ips'][0]['ip_address']]),
+                 const.IPv6: set()},
+                sg_info['sg_member_ips'][sg2_id])
+            # revised by the creation of the port
+            self.assertEqual({sg2_id: 1}, sg_info['sg_member_revisions'])
+            self.assertEqual(
+                [sg2_id],
+                sg_info['devices'][port['id']][
+                    'security_group_source_groups'])
+
+    def test_security_group_info_for_devices_cached_members(self):
+        with self._port_with_remote_group_rule() as (port, sg1_id, sg2_id):
+            ctx = context.get_admin_context()
+            sg_info = self.rpc.security_group_info_for_devices(
+                ctx, devices=[port['id']], cached_rules=[sg1_id, sg2_id],
+                cached_members=[sg2_id])
+            self.assertEqual({}, sg_info['security_groups'])
+            self.assertEqual({}, sg_info['sg_member_ips'])
+            self.assertEqual({}, sg_info['sg_member_revisions'])
+            self.assertEqual(
+                [sg2_id],
+                sg_info['devices'][port['id']][
+                    'security_group_source_groups'])
+
     @contextlib.contextmanager
     def _port_with_addr_pairs_and_security_group(self):
         plugin_obj = directory.get_plugin()
@@ -1102,6 +1229,228 @@ class SecurityGroupAgentEnhancedRpcTestCase(
         self.assertFalse(self.firewall.called)
 
 
+class SecurityGroupInfoCacheTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(SecurityGroupInfoCacheTestCase, self).setUp()
+        self.cache = sg_rpc.SecurityGroupInfoCache()
+        self.cache.update(
+            {'sg1': [{'ethertype': 'IPv4', 'remote_group_id': 'sg2'}],
+             'sg2': []},
+            {'sg2': {'IPv4': ['10.0.0.1'], 'IPv6': ['fe80::1']}},
+            {'sg2': 3}, self.cache.generation)
+
+    def test_get_info(self):
+        devices = [{'security_groups': ['sg1']},
+                   {'security_groups': ['sg1', 'sg2', 'sg3']}]
+        self.assertEqual(
+            ({'sg1': [{'ethertype': 'IPv4', 'remote_group_id': 'sg2'}],
+              'sg2': []},
+             {'sg2': {'IPv4': ['10.0.0.1']}}),
+            self.cache.get_info(devices, {}, {}))
+
+    def test_get_info_received(self):
+        devices = [{'security_groups': ['sg1']}]
+        self.assertEqual(
+            ({'sg1': [{'ethertype': 'IPv6', 'remote_group_id': 'sg2'}]},
+             {'sg2': {'IPv6': ['fe80::2']}}),
+            self.cache.get_info(
+                devices,
+                {'sg1': [{'ethertype': 'IPv6', 'remote_group_id': 'sg2'}]},
+                {'sg2': {'IPv4': [], 'IPv6': ['fe80::2']}}))
+
+    def test_invalidate(self):
+        generation = self.cache.generation
+        self.cache.invalidate_rules(['sg1'])
+        self.cache.invalidate_members(['sg2'])
+        self.assertEqual({'sg2': []}, self.cache.rules)
+        self.assertEqual({}, self.cache.members)
+        self.assertEqual({}, self.cache.member_revisions)
+        # the information requested before the invalidation is not stored
+        self.cache.update({'sg1': []}, {}, {}, generation)
+        self.assertEqual({'sg2': []}, self.cache.rules)
+
+    def test_update_members(self):
+        members = self.cache.members['sg2']
+        generation = self.cache.generation
+        self.cache.update_members(
+            ['sg2', 'sg3'],
+            {'sg2': {'IPv4': ['10.0.0.1', '10.0.0.2']},
+             'sg3': {'IPv4': ['10.0.0.3']}},
+            {'sg2': {'IPv6': ['fe80::1']}},
+            {'sg2': 4, 'sg3': 1})
+        self.assertEqual(
+            {'sg2': {'IPv4': ['10.0.0.1', '10.0.0.2'], 'IPv6': []}},
+            self.cache.members)
+        self.assertEqual({'sg2': 4}, self.cache.member_revisions)
+        # the lists shared with the firewall are not modified
+        self.assertEqual({'IPv4': ['10.0.0.1'], 'IPv6': ['fe80::1']}, members)
+        self.assertNotEqual(generation, self.cache.generation)
+
+    def _test_update_members_out_of_order(self, member_revisions):
+        self.cache.update_members(
+            ['sg2'], {'sg2': {'IPv4': ['10.0.0.2']}}, {}, member_revisions)
+        # the members are fetched again
+        self.assertEqual({}, self.cache.members)
+        self.assertEqual({}, self.cache.member_revisions)
+
+    def test_update_members_missed_revision(self):
+        self._test_update_members_out_of_order({'sg2': 5})
+
+    def test_update_members_late_revision(self):
+        self._test_update_members_out_of_order({'sg2': 3})
+
+    def test_update_members_without_revision(self):
+        self._test_update_members_out_of_order({})
+
+    def test_update_members_unknown_revision(self):
+        self.cache.update({}, {'sg3': {'IPv4': []}}, {},
+                          self.cache.generation)
+        self.cache.update_members(
+            ['sg3'], {'sg3': {'IPv4': ['10.0.0.3']}}, {}, {'sg3': 1})
+        self.assertNotIn('sg3', self.cache.members)
+
+    def test_prune(self):
+        self.cache.prune(['sg1'])
+        self.assertEqual(['sg1'], list(self.cache.rules))
+        self.assertEqual({}, self.cache.members)
+        self.assertEqual({}, self.cache.member_revisions)
+
+
+class SecurityGroupAgentCachedRpcTestCase(
+    BaseSecurityGroupAgentRpcTestCase):
+
+    def setUp(self):
+        super(SecurityGroupAgentCachedRpcTestCase, self).setUp()
+        cfg.CONF.set_override('cache_security_group_info', True,
+                              'SECURITYGROUP')
+        self.rpc = self.agent.plugin_rpc
+        self.sg_info = {
+            'security_groups': {
+                'fake_sgid1': [{'ethertype': 'IPv4',
+                                'remote_group_id': 'fake_sgid2'}],
+                'fake_sgid2': []},
+            'sg_member_ips': {'fake_sgid2': {'IPv4': ['10.0.0.1'],
+                                             'IPv6': []}},
+            'sg_member_revisions': {'fake_sgid2': 1},
+            'devices': self.firewall.ports}
+        self.rpc.security_group_info_for_devices.side_effect = (
+            self._security_group_info_for_devices)
+
+    def _security_group_info_for_devices(self, context, devices,
+                                         cached_rules=None,
+                                         cached_members=None):
+        return {
+            'security_groups': dict(
+                (sg_id, rules)
+                for sg_id, rules in self.sg_info['security_groups'].items()
+                if sg_id not in (cached_rules or [])),
+            'sg_member_ips': dict(
+                (sg_id, members)
+                for sg_id, members in self.sg_info['sg_member_ips'].items()
+                if sg_id not in (cached_members or [])),
+            'sg_member_revisions': dict(
+                (sg_id, revision) for sg_id, revision
+                in self.sg_info['sg_member_revisions'].items()
+                if sg_id not in (cached_members or [])),
+            'devices': dict(self.sg_info['devices'])}
+
+    def _assert_firewall_updated(self):
+        self.firewall.update_security_group_rules.assert_has_calls(
+            [mock.call('fake_sgid1', [{'ethertype': 'IPv4',
+                                       'remote_group_id': 'fake_sgid2'}]),
+             mock.call('fake_sgid2', [])], any_order=True)
+        self.firewall.update_security_group_members.assert_called_once_with(
+            'fake_sgid2', {'IPv4': ['10.0.0.1']})
+        self.firewall.reset_mock()
+
+    def test_prepare_devices_filter_cached(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self._assert_firewall_updated()
+        self.agent.refresh_firewall(['fake_device'])
+        self.rpc.security_group_info_for_devices.assert_called_with(
+            None, ['fake_device'],
+            cached_rules=mock.ANY, cached_members=['fake_sgid2'])
+        self.assertEqual(
+            ['fake_sgid1', 'fake_sgid2'],
+            sorted(self.rpc.security_group_info_for_devices.call_args[1][
+                'cached_rules']))
+        # the firewall is updated from the cache
+        self._assert_firewall_updated()
+
+    def test_security_groups_member_updated_cached(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.sg_info['sg_member_ips']['fake_sgid2']['IPv4'] = ['10.0.0.2']
+        self.agent.security_groups_member_updated(['fake_sgid2'])
+        self.rpc.security_group_info_for_devices.assert_called_with(
+            None, ['fake_device'],
+            cached_rules=mock.ANY, cached_members=[])
+        self.firewall.update_security_group_members.assert_called_with(
+            'fake_sgid2', {'IPv4': ['10.0.0.2']})
+
+    def test_security_groups_member_updated_with_changes(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.agent.security_groups_member_updated(
+            ['fake_sgid2'],
+            added_members={'fake_sgid2': {'IPv4': ['10.0.0.2']}},
+            removed_members={'fake_sgid2': {'IPv4': ['10.0.0.1']}},
+            member_revisions={'fake_sgid2': 2})
+        # the patched members are not requested again
+        self.rpc.security_group_info_for_devices.assert_called_with(
+            None, ['fake_device'],
+            cached_rules=mock.ANY, cached_members=['fake_sgid2'])
+        self.firewall.update_security_group_members.assert_called_with(
+            'fake_sgid2', {'IPv4': ['10.0.0.2']})
+
+    def test_security_groups_member_updated_out_of_order(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.sg_info['sg_member_ips']['fake_sgid2']['IPv4'] = ['10.0.0.3']
+        self.sg_info['sg_member_revisions']['fake_sgid2'] = 3
+        self.agent.security_groups_member_updated(
+            ['fake_sgid2'],
+            added_members={'fake_sgid2': {'IPv4': ['10.0.0.3']}},
+            removed_members={'fake_sgid2': {'IPv4': ['10.0.0.1']}},
+            member_revisions={'fake_sgid2': 3})
+        # a change was missed, the members are requested again
+        self.rpc.security_group_info_for_devices.assert_called_with(
+            None, ['fake_device'],
+            cached_rules=mock.ANY, cached_members=[])
+        self.firewall.update_security_group_members.assert_called_with(
+            'fake_sgid2', {'IPv4': ['10.0.0.3']})
+        self.assertEqual(
+            {'fake_sgid2': 3}, self.agent.sg_info_cache.member_revisions)
+
+    def test_security_groups_rule_updated_cached(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.agent.security_groups_rule_updated(['fake_sgid1'])
+        self.assertEqual(
+            ['fake_sgid2'],
+            self.rpc.security_group_info_for_devices.call_args[1][
+                'cached_rules'])
+
+    def test_refresh_firewall_clears_cache(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.agent.refresh_firewall()
+        self.rpc.security_group_info_for_devices.assert_called_with(
+            None, ['fake_device'], cached_rules=[], cached_members=[])
+
+    def test_remove_devices_filter_prunes_cache(self):
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.firewall.remove_port_filter.side_effect = (
+            lambda device: self.firewall.ports.pop(device['device']))
+        self.agent.remove_devices_filter(['fake_device'])
+        self.assertEqual({}, self.agent.sg_info_cache.rules)
+        self.assertEqual({}, self.agent.sg_info_cache.members)
+
+    def test_server_not_supporting_cache(self):
+        self.rpc.security_group_info_for_devices.side_effect = [
+            {}, oslo_messaging.UnsupportedVersion('1.3'), self.sg_info]
+        self.agent.prepare_devices_filter(['fake_device'])
+        self.assertFalse(self.agent.use_sg_info_cache)
+        self.rpc.security_group_info_for_devices.assert_called_with(
+            None, ['fake_device'])
+
+
 class SecurityGroupAgentRpcWithDeferredRefreshTestCase(
     SecurityGroupAgentRpcTestCase):
 
@@ -1391,6 +1740,18 @@ class SecurityGroupAgentRpcApiTestCase(base.BaseTestCase):
             [mock.call(None, 'security_groups_member_updated',
                        security_groups=['fake_sgid'])])
 
+    def test_security_groups_member_updated_with_changes(self):
+        self.notifier.security_groups_member_updated(
+            None, security_groups=['fake_sgid'],
+            added_members={'fake_sgid': {'IPv4': ['10.0.0.1']}},
+            member_revisions={'fake_sgid': 2})
+        self.mock_cast.assert_has_calls(
+            [mock.call(None, 'security_groups_member_updated',
+                       security_groups=['fake_sgid'],
+                       added_members={'fake_sgid': {'IPv4': ['10.0.0.1']}},
+                       removed_members={},
+                       member_revisions={'fake_sgid': 2})])
+
     def test_security_groups_rule_not_updated(self):
         self.notifier.security_groups_rule_updated(
             None, security_groups=[])
@@ -2816,9 +3177,13 @@ class SGNotificationTestMixin(object):
                     self.assertEqual(res['port'][ext_sg.SECURITYGROUPS][0],
                                      security_group_id)
                     self._delete('ports', port['port']['id'])
+                    ip_address = port['port']['fixed_ips'][0]['ip_address']
                     self.notifier.assert_has_calls(
                         [mock.call.security_groups_member_updated(
-                            mock.ANY, [mock.ANY])])
+                            mock.ANY, [security_group_id],
+                            added_members={},
+                            removed_members={security_group_id: {
+                                const.IPv4: [ip_address]}})])
 
 
 class TestSecurityGroupAgentWithOVSIptables(
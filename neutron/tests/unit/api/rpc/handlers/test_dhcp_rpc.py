@@ -20,6 +20,7 @@ from neutron_lib.plugins import directory
 from oslo_db import exception as db_exc
 
 from neutron.api.rpc.handlers import dhcp_rpc
+from neutron.api.rpc.handlers import result_cache
 from neutron.callbacks import resources
 from neutron.common import constants as n_const
 from neutron.common import exceptions
@@ -85,6 +86,61 @@ class TestDhcpRpcCallback(base.BaseTestCase):
                     {'id': 'b', 'subnets': [subnets[0]], 'ports': []}]
         self.assertEqual(expected, networks)
 
+    def test_get_active_networks_info_page(self):
+        self.plugin.get_networks.return_value = [
+            {'id': 'c'}, {'id': 'a'}, {'id': 'b'}]
+        self.plugin.get_ports.return_value = []
+        self.plugin.get_subnets.return_value = []
+        page = self.callbacks.get_active_networks_info_page(
+            mock.Mock(), host='host', marker=None, limit=2)
+        self.assertEqual(['a', 'b'], [n['id'] for n in page['networks']])
+        self.assertEqual('b', page['marker'])
+        self.assertEqual(['a', 'b'], self.plugin.get_ports.call_args[1][
+            'filters']['network_id'])
+        page = self.callbacks.get_active_networks_info_page(
+            mock.Mock(), host='host', marker='b', limit=2)
+        self.assertEqual({'networks': [{'id': 'c', 'subnets': [],
+                                        'ports': []}],
+                          'marker': None}, page)
+
+    def test_get_active_networks_info_page_schedules_first_page(self):
+        self.plugin.supported_extension_aliases = [
+            constants.DHCP_AGENT_SCHEDULER_EXT_ALIAS]
+        self.plugin.list_active_networks_on_active_dhcp_agent.return_value = []
+        self.callbacks.get_active_networks_info_page(
+            mock.Mock(), host='host', marker=None, limit=2)
+        self.callbacks.get_active_networks_info_page(
+            mock.Mock(), host='host', marker='b', limit=2)
+        self.plugin.auto_schedule_networks.assert_called_once_with(
+            mock.ANY, 'host')
+
+    def test_get_active_networks_info_cached(self):
+        self.config(rpc_result_cache_ttl=60)
+        mock.patch.object(result_cache, '_CACHE', None).start()
+        self.plugin.supported_extension_aliases = [
+            constants.DHCP_AGENT_SCHEDULER_EXT_ALIAS]
+        list_networks = self.plugin.list_active_networks_on_active_dhcp_agent
+        list_networks.side_effect = lambda *args: [{'id': 'a'}]
+        self.plugin.get_ports.return_value = []
+        self.plugin.get_subnets.return_value = []
+        for i in range(2):
+            self.assertEqual(
+                [{'id': 'a', 'subnets': [], 'ports': []}],
+                self.callbacks.get_active_networks_info(mock.Mock(),
+                                                        host='host'))
+        # the networks are scheduled and listed on each call, their subnets
+        # and ports are cached
+        self.assertEqual(2, self.plugin.auto_schedule_networks.call_count)
+        self.assertEqual(2, list_networks.call_count)
+        self.assertEqual(1, self.plugin.get_ports.call_count)
+        # a network scheduled to the agent gets in the result
+        list_networks.side_effect = lambda *args: [{'id': 'a'}, {'id': 'b'}]
+        self.assertEqual(
+            ['a', 'b'],
+            [n['id'] for n in self.callbacks.get_active_networks_info(
+                mock.Mock(), host='host')])
+        self.assertEqual(2, self.plugin.get_ports.call_count)
+
     def _test__port_action_with_failures(self, exc=None, action=None):
         port = {
             'network_id': 'foo_network_id',
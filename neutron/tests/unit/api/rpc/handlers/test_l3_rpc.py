@@ -19,6 +19,7 @@ from oslo_config import cfg
 
 from neutron.api.rpc.handlers import l3_rpc
 from neutron import context
+from neutron.tests import base
 from neutron.tests.unit.db import test_db_base_plugin_v2
 from neutron.tests.unit import testlib_api
 
@@ -65,3 +66,62 @@ class TestL3RpcCallback(testlib_api.SqlTestCase):
         updated_subnet = res[0]
         self.assertEqual(updated_subnet['cidr'], data[subnet['id']])
         self.assertEqual(updated_subnet['allocation_pools'], allocation_pools)
+
+
+class TestRouterDelta(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRouterDelta, self).setUp()
+        self.router = {
+            'id': 'r1', 'name': 'router', 'revision_number': 3,
+            constants.INTERFACE_KEY: [{'id': 'p1', 'revision_number': 1},
+                                      {'id': 'p2', 'revision_number': 5}],
+            constants.FLOATINGIP_KEY: [{'id': 'f1', 'status': 'ACTIVE'}]}
+        self.revisions = l3_rpc.get_router_revisions(self.router)
+
+    def test_get_router_revisions(self):
+        self.assertEqual(['p1', 'p2'],
+                         sorted(self.revisions[constants.INTERFACE_KEY]))
+        self.assertEqual(['f1'],
+                         list(self.revisions[constants.FLOATINGIP_KEY]))
+        self.router[constants.FLOATINGIP_KEY][0]['status'] = 'DOWN'
+        revisions = l3_rpc.get_router_revisions(self.router)
+        self.assertEqual(self.revisions['router'], revisions['router'])
+        self.assertEqual(self.revisions[constants.INTERFACE_KEY],
+                         revisions[constants.INTERFACE_KEY])
+        self.assertNotEqual(self.revisions[constants.FLOATINGIP_KEY],
+                            revisions[constants.FLOATINGIP_KEY])
+
+    def test_make_router_delta_unchanged(self):
+        delta = l3_rpc.make_router_delta(self.router, self.revisions,
+                                         self.revisions)
+        self.assertEqual({'id': 'r1', 'delta': True,
+                          'revisions': self.revisions,
+                          constants.INTERFACE_KEY: [],
+                          constants.FLOATINGIP_KEY: []}, delta)
+
+    def test_make_router_delta(self):
+        known_revisions = l3_rpc.get_router_revisions(self.router)
+        self.router['name'] = 'renamed'
+        self.router[constants.INTERFACE_KEY][1]['revision_number'] = 6
+        del self.router[constants.FLOATINGIP_KEY]
+        revisions = l3_rpc.get_router_revisions(self.router)
+        delta = l3_rpc.make_router_delta(self.router, revisions,
+                                         known_revisions)
+        self.assertEqual('renamed', delta['name'])
+        self.assertEqual([self.router[constants.INTERFACE_KEY][1]],
+                         delta[constants.INTERFACE_KEY])
+        self.assertEqual([], delta[constants.FLOATINGIP_KEY])
+        self.assertEqual({}, delta['revisions'][constants.FLOATINGIP_KEY])
+
+    def test_get_router_delta_unknown_router(self):
+        router = l3_rpc.L3RpcCallback._get_router_delta(
+            self.router, {'r2': self.revisions})
+        self.assertIs(self.router, router)
+        self.assertEqual(self.revisions, router['revisions'])
+
+    def test_get_router_delta_known_router(self):
+        delta = l3_rpc.L3RpcCallback._get_router_delta(
+            self.router, {'r1': self.revisions})
+        self.assertTrue(delta['delta'])
+        self.assertNotIn('name', delta)
@@ -0,0 +1,159 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.api.rpc.handlers import result_cache
+from neutron.callbacks import events
+from neutron.callbacks import registry
+from neutron.callbacks import resources
+from neutron.tests import base
+
+
+class FakeRpcCallback(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    @result_cache.cached(
+        lambda kwargs: (result_cache.network_tag(kwargs['network_id']),))
+    def get_network_info(self, context, **kwargs):
+        self.calls += 1
+        return {'id': kwargs['network_id'], 'calls': self.calls}
+
+    @result_cache.cached((result_cache.NETWORKS,))
+    def get_active_networks_info(self, context, **kwargs):
+        self.calls += 1
+        return [{'id': 'n1'}]
+
+    @result_cache.cached((result_cache.PORTS,))
+    def get_ports(self, context, filters):
+        self.calls += 1
+        return None
+
+
+class TestRpcResultCache(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRpcResultCache, self).setUp()
+        self.cache = result_cache.RpcResultCache(2, 60)
+
+    def test_get_set(self):
+        result = {'id': 'a'}
+        self.assertIsNone(self.cache.get('k'))
+        self.cache.set('k', result, ['tag'], self.cache.generation)
+        cached = self.cache.get('k')
+        self.assertEqual(result, cached)
+        # the cached result is a copy
+        cached['id'] = 'b'
+        self.assertEqual(result, self.cache.get('k'))
+        self.assertEqual({'hits': 2, 'misses': 1, 'invalidations': 0,
+                          'entries': 1}, self.cache.stats)
+
+    def test_ttl(self):
+        self.cache.set('k', 'v', [], self.cache.generation)
+        with mock.patch('time.time', return_value=2 ** 40):
+            self.assertIsNone(self.cache.get('k'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_size(self):
+        generation = self.cache.generation
+        self.cache.set('k1', 'v1', ['tag'], generation)
+        self.cache.set('k2', 'v2', ['tag'], generation)
+        # k1 is the most recently used
+        self.cache.get('k1')
+        self.cache.set('k3', 'v3', ['tag'], generation)
+        self.assertEqual('v1', self.cache.get('k1'))
+        self.assertIsNone(self.cache.get('k2'))
+        self.assertEqual({'k1', 'k3'}, self.cache._tags['tag'])
+
+    def test_invalidate(self):
+        generation = self.cache.generation
+        self.cache.set('k1', 'v1', ['tag1', 'tag2'], generation)
+        self.cache.set('k2', 'v2', ['tag2'], generation)
+        self.cache.invalidate(['tag1'])
+        self.assertIsNone(self.cache.get('k1'))
+        self.assertEqual('v2', self.cache.get('k2'))
+        self.assertEqual({'tag2': {'k2'}}, self.cache._tags)
+        self.assertEqual(1, self.cache.invalidations)
+
+    def test_set_after_invalidation(self):
+        generation = self.cache.generation
+        self.cache.invalidate(['tag'])
+        self.cache.set('k', 'v', ['tag'], generation)
+        self.assertIsNone(self.cache.get('k'))
+
+    def _set_network_entries(self):
+        generation = self.cache.generation
+        self.cache.set('net1', 'v', [result_cache.network_tag('n1')],
+                       generation)
+        self.cache.set('networks', 'v', [result_cache.NETWORKS], generation)
+
+    def test_port_changed(self):
+        self.cache.subscribe()
+        self._set_network_entries()
+        registry.notify(resources.PORT, events.AFTER_UPDATE, self,
+                        context=mock.Mock(), port={'network_id': 'n2'})
+        self.assertIsNotNone(self.cache.get('net1'))
+        self.assertIsNone(self.cache.get('networks'))
+        registry.notify(resources.PORT, events.AFTER_DELETE, self,
+                        context=mock.Mock(), port={'network_id': 'n1'})
+        self.assertIsNone(self.cache.get('net1'))
+
+    def test_unknown_network_changed(self):
+        self.cache.subscribe()
+        self._set_network_entries()
+        registry.notify(resources.SUBNET, events.AFTER_CREATE, self,
+                        context=mock.Mock(), subnet={})
+        self.assertEqual(0, len(self.cache))
+
+
+class TestCached(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCached, self).setUp()
+        self.callback = FakeRpcCallback()
+        mock.patch.object(result_cache, '_CACHE', None).start()
+
+    def test_disabled(self):
+        self.callback.get_network_info(mock.Mock(), network_id='n1')
+        self.callback.get_network_info(mock.Mock(), network_id='n1')
+        self.assertEqual(2, self.callback.calls)
+        self.assertIsNone(result_cache._CACHE)
+
+    def test_cached(self):
+        self.config(rpc_result_cache_ttl=60)
+        first = self.callback.get_network_info(mock.Mock(), network_id='n1')
+        self.assertEqual(first, self.callback.get_network_info(
+            mock.Mock(), network_id='n1'))
+        self.callback.get_network_info(mock.Mock(), network_id='n2')
+        self.callback.get_active_networks_info(mock.Mock(), host='h',
+                                               marker=None)
+        self.callback.get_active_networks_info(mock.Mock(), marker=None,
+                                               host='h')
+        self.assertEqual(3, self.callback.calls)
+        self.assertEqual(2, result_cache._CACHE.hits)
+        self.assertEqual(3, result_cache._CACHE.misses)
+
+    def test_none_not_cached(self):
+        self.config(rpc_result_cache_ttl=60)
+        self.callback.get_ports(mock.Mock(), {'device_id': ['d1']})
+        self.callback.get_ports(mock.Mock(), {'device_id': ['d1']})
+        self.assertEqual(2, self.callback.calls)
+
+    def test_invalidated_by_network_change(self):
+        self.config(rpc_result_cache_ttl=60)
+        self.callback.get_network_info(mock.Mock(), network_id='n1')
+        registry.notify(resources.NETWORK, events.AFTER_UPDATE, self,
+                        context=mock.Mock(), network={'id': 'n1'})
+        self.callback.get_network_info(mock.Mock(), network_id='n1')
+        self.assertEqual(2, self.callback.calls)
@@ -33,6 +33,22 @@ class SecurityGroupServerRpcApiTestCase(base.BaseTestCase):
                     'security_group_rules_for_devices',
                     devices=['fake_device'])
 
+    def test_security_group_info_for_devices_cached(self):
+        rpcapi = securitygroups_rpc.SecurityGroupServerRpcApi('fake_topic')
+
+        with mock.patch.object(rpcapi.client, 'call') as rpc_mock,\
+                mock.patch.object(rpcapi.client, 'prepare') as prepare_mock:
+            prepare_mock.return_value = rpcapi.client
+            rpcapi.security_group_info_for_devices(
+                'context', ['fake_device'], cached_rules=['fake_sgid'])
+
+            prepare_mock.assert_called_once_with(version='1.3')
+            rpc_mock.assert_called_once_with(
+                    'context',
+                    'security_group_info_for_devices',
+                    devices=['fake_device'], cached_rules=['fake_sgid'],
+                    cached_members=[])
+
 
 class SGAgentRpcCallBackMixinTestCase(base.BaseTestCase):
 
@@ -53,6 +69,17 @@ class SGAgentRpcCallBackMixinTestCase(base.BaseTestCase):
         self.rpc.sg_agent.assert_has_calls(
             [mock.call.security_groups_member_updated(['fake_sgid'])])
 
+    def test_security_groups_member_updated_with_changes(self):
+        self.rpc.security_groups_member_updated(
+            None, security_groups=['fake_sgid'],
+            added_members={'fake_sgid': {'IPv4': ['10.0.0.1']}},
+            removed_members={}, member_revisions={'fake_sgid': 2})
+        self.rpc.sg_agent.assert_has_calls(
+            [mock.call.security_groups_member_updated(
+                ['fake_sgid'],
+                added_members={'fake_sgid': {'IPv4': ['10.0.0.1']}},
+                removed_members={}, member_revisions={'fake_sgid': 2})])
+
     def test_security_groups_provider_updated(self):
         self.rpc.security_groups_provider_updated(None)
         # this is now a NOOP on the agent side. provider rules don't change
@@ -556,6 +556,15 @@ class JSONV2TestCase(APIv2TestBase, testlib_api.WebTestCase):
     def test_list_noauth(self):
         self._test_list(None, _uuid())
 
+    def test_list_streamed(self):
+        cfg.CONF.set_override('stream_list_responses', True)
+        self._test_list(None, _uuid())
+
+    def test_list_streamed_keystone_bad(self):
+        cfg.CONF.set_override('stream_list_responses', True)
+        tenant_id = _uuid()
+        self._test_list(tenant_id + "bad", tenant_id)
+
     def test_list_keystone(self):
         tenant_id = _uuid()
         self._test_list(tenant_id, tenant_id)
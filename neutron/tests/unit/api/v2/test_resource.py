@@ -287,6 +287,19 @@ class ResourceTestCase(base.BaseTestCase):
         res = resource.get('', extra_environ=environ)
         self.assertEqual(200, res.status_int)
 
+    def test_status_200_streamed(self):
+        controller = mock.MagicMock()
+        controller.test = lambda request: {
+            'foos': ({'id': i} for i in range(3)), 'foos_links': []}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'test'})}
+        res = resource.get('', extra_environ=environ)
+        self.assertEqual(200, res.status_int)
+        self.assertEqual({'foos': [{'id': 0}, {'id': 1}, {'id': 2}],
+                          'foos_links': []}, res.json)
+
     def _test_unhandled_error_logs_details(self, e, expected_details):
         with mock.patch.object(wsgi_resource.LOG, 'exception') as log:
             self._make_request_with_side_effect(side_effect=e)
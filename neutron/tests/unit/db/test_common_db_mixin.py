@@ -14,9 +14,14 @@
 #    under the License.
 
 import mock
+from oslo_utils import uuidutils
 
 from neutron import context
 from neutron.db import _utils as db_utils
+from neutron.db import api as db_api
+from neutron.db import common_db_mixin
+from neutron.db.models import l3 as l3_models
+from neutron.db import models_v2
 from neutron.tests.unit import testlib_api
 
 
@@ -46,3 +51,118 @@ class TestCommonHelpFunctions(testlib_api.SqlTestCase):
                           self.admin_ctx, create_fn, delete_fn,
                           create_bindings)
         delete_fn.assert_called_once_with(1234)
+
+
+class TestDictExtendLoads(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestDictExtendLoads, self).setUp()
+        self.admin_ctx = context.get_admin_context()
+        self.mixin = common_db_mixin.CommonDbMixin()
+        mock.patch.dict(common_db_mixin.CommonDbMixin._dict_extend_loads,
+                        clear=True).start()
+
+    def test_lazy_relationships(self):
+        common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+            models_v2.Network, ['ports'])
+        common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+            models_v2.Port, ['routerport'])
+        self.assertEqual(1, len(
+            self.mixin._get_dict_extend_load_options(models_v2.Network)))
+        # the scalars are joined
+        query = self.mixin._get_collection_query(self.admin_ctx,
+                                                 models_v2.Port)
+        self.assertIn('JOIN routerports', str(query))
+
+    def test_eager_and_unknown_relationships(self):
+        common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+            models_v2.Port, ['fixed_ips', 'standard_attr.tags', 'unknown'])
+        common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+            l3_models.Router, ['attached_ports'])
+        self.assertEqual(
+            [], self.mixin._get_dict_extend_load_options(models_v2.Port))
+        self.assertEqual(
+            [], self.mixin._get_dict_extend_load_options(l3_models.Router))
+
+    def _create_networks(self, count):
+        with self.admin_ctx.session.begin():
+            for i in range(count):
+                network = models_v2.Network(id=uuidutils.generate_uuid(),
+                                            tenant_id='tenant')
+                self.admin_ctx.session.add(network)
+                self.admin_ctx.session.add(models_v2.Port(
+                    id=uuidutils.generate_uuid(), network_id=network.id,
+                    tenant_id='tenant', mac_address='fa:16:3e:00:00:%02x' % i,
+                    admin_state_up=True, status='ACTIVE', device_id='',
+                    device_owner=''))
+
+    def _count_list_queries(self):
+        queries = []
+
+        def _count(*args, **kwargs):
+            queries.append(args)
+
+        engine = db_api.context_manager.writer.get_engine()
+        db_api.sqla_listen(engine, 'after_execute', _count)
+        self.admin_ctx.session.expunge_all()
+        networks = self.mixin._get_collection_query(self.admin_ctx,
+                                                    models_v2.Network)
+        for network in networks:
+            [port.id for port in network.ports]
+        return len(queries)
+
+    def test_list_queries_constant(self):
+        common_db_mixin.CommonDbMixin.register_dict_extend_loads(
+            models_v2.Network, ['ports'])
+        self._create_networks(1)
+        count = self._count_list_queries()
+        self._create_networks(4)
+        self.assertEqual(count, self._count_list_queries())
+
+    def test_list_queries_lazy_without_loads(self):
+        self._create_networks(1)
+        count = self._count_list_queries()
+        self._create_networks(4)
+        self.assertGreater(self._count_list_queries(), count)
+
+
+class TestProjectedFields(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(TestProjectedFields, self).setUp()
+        self.admin_ctx = context.get_admin_context()
+        self.mixin = common_db_mixin.CommonDbMixin()
+        mock.patch.dict(common_db_mixin.CommonDbMixin._projectable_fields,
+                        clear=True).start()
+        common_db_mixin.CommonDbMixin.register_projectable_fields(
+            models_v2.Network, ['id', 'name', 'tenant_id'])
+
+    def test_get_projected_fields(self):
+        self.assertIsNone(
+            self.mixin._get_projected_fields(models_v2.Network, None))
+        self.assertIsNone(self.mixin._get_projected_fields(
+            models_v2.Network, ['id', 'subnets']))
+        self.assertIsNone(
+            self.mixin._get_projected_fields(models_v2.Port, ['id']))
+        self.assertEqual(['name', 'id'], self.mixin._get_projected_fields(
+            models_v2.Network, ['name', 'id', 'name']))
+
+    def test_make_projected_dicts_drops_duplicates(self):
+        rows = [('n1', 'n1', 'net1'), ('n2', 'n2', 'net2'),
+                ('n1', 'n1', 'net1')]
+        self.assertEqual(
+            [{'id': 'n1', 'name': 'net1'}, {'id': 'n2', 'name': 'net2'}],
+            self.mixin._make_projected_dicts(models_v2.Network,
+                                             ['id', 'name'], rows))
+
+    def test_get_collection_projected(self):
+        with self.admin_ctx.session.begin():
+            self.admin_ctx.session.add(models_v2.Network(
+                id='n1', name='net1', tenant_id='tenant'))
+        dict_func = mock.Mock()
+        self.assertEqual(
+            [{'name': 'net1', 'tenant_id': 'tenant', 'project_id': 'tenant'}],
+            self.mixin._get_collection(self.admin_ctx, models_v2.Network,
+                                       dict_func,
+                                       fields=['name', 'tenant_id']))
+        self.assertFalse(dict_func.called)
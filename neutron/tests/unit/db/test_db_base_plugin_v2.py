@@ -1161,6 +1161,33 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
             self._test_list_resources('port', [port1],
                                       query_params=query_params)
 
+    def test_list_ports_with_fields_projected(self):
+        cfg.CONF.set_default('allow_overlapping_ips', True)
+        with self.port() as port1, self.port() as port2:
+            plugin = directory.get_plugin()
+            with mock.patch.object(plugin, '_make_port_dict') as make_dict:
+                req = self.new_list_request('ports',
+                                            params='fields=id&fields=status')
+                res = self.deserialize(self.fmt, req.get_response(self.api))
+            self.assertFalse(make_dict.called)
+            self.assertEqual(
+                sorted([{'id': port['port']['id'], 'status': 'ACTIVE'}
+                        for port in (port1, port2)],
+                       key=lambda port: port['id']),
+                sorted(res['ports'], key=lambda port: port['id']))
+
+    def test_list_ports_with_fields_projected_pagination_native(self):
+        if self._skip_native_pagination:
+            self.skipTest("Skip test for not implemented pagination feature")
+        cfg.CONF.set_default('allow_overlapping_ips', True)
+        with self.port(mac_address='00:00:00:00:00:01') as port1,\
+                self.port(mac_address='00:00:00:00:00:02') as port2,\
+                self.port(mac_address='00:00:00:00:00:03') as port3:
+            self._test_list_with_pagination('port',
+                                            (port1, port2, port3),
+                                            ('mac_address', 'asc'), 2, 2,
+                                            query_params='fields=id')
+
     def test_list_ports_public_network(self):
         with self.network(shared=True) as network:
             with self.subnet(network) as subnet:
@@ -3014,6 +3041,20 @@ class TestNetworksV2(NeutronDbPluginV2TestCase):
             self.assertNotIn('tenant_id', net)
             self.assertNotIn('project_id', net)
 
+    def test_list_networks_with_core_fields_not_extended(self):
+        with self.network(name='net1'):
+            with mock.patch.object(
+                    db_base_plugin_common.DbBasePluginCommon,
+                    '_apply_dict_extend_functions') as extend:
+                req = self.new_list_request('networks',
+                                            params='fields=name')
+                res = self.deserialize(self.fmt, req.get_response(self.api))
+                self.assertEqual('net1', res['networks'][0]['name'])
+                self.assertFalse(extend.called)
+                req = self.new_list_request('networks')
+                req.get_response(self.api)
+                self.assertTrue(extend.called)
+
     def test_list_networks_with_parameters_invalid_values(self):
         with self.network(name='net1', admin_state_up=False),\
                 self.network(name='net2'):
@@ -25,6 +25,7 @@ from oslo_utils import uuidutils
 import webob.exc
 
 from neutron.common import constants as n_const
+from neutron import context
 from neutron.db import ipam_backend_mixin
 from neutron.db import ipam_pluggable_backend
 from neutron.db import models_v2
@@ -270,6 +271,62 @@ class TestDbBasePluginIpam(test_db_base.NeutronDbPluginV2TestCase):
 
         self._validate_allocate_calls(ips, mocks)
 
+    def test_allocate_multiple_ips_same_subnet(self):
+        mocks = self._prepare_ipam()
+        subnet_id = self._gen_subnet_id()
+        other_subnet_id = self._gen_subnet_id()
+        ips = [{'subnet_id': subnet_id},
+               {'subnet_id': other_subnet_id},
+               {'subnet_id': subnet_id, 'ip_address': '10.0.0.5'}]
+        mocks['subnets'].allocate.return_value = (
+            '10.0.1.2', other_subnet_id)
+        mocks['subnets'].bulk_allocate.return_value = [
+            ('10.0.0.5', subnet_id), ('10.0.0.2', subnet_id)]
+
+        results = mocks['ipam']._ipam_allocate_ips(
+            mock.ANY, mocks['driver'], mocks['port'], ips)
+
+        self.assertEqual([{'ip_address': '10.0.0.5', 'subnet_id': subnet_id},
+                          {'ip_address': '10.0.0.2', 'subnet_id': subnet_id},
+                          {'ip_address': '10.0.1.2',
+                           'subnet_id': other_subnet_id}],
+                         results)
+        mocks['driver'].get_allocator.assert_has_calls(
+            [mock.call([subnet_id]), mock.call([other_subnet_id])],
+            any_order=True)
+        requests = mocks['subnets'].bulk_allocate.call_args[0][0]
+        self.assertIsInstance(requests[0], ipam_req.SpecificAddressRequest)
+        self.assertIsInstance(requests[1], ipam_req.AnyAddressRequest)
+        self.assertEqual(1, mocks['subnets'].allocate.call_count)
+
+    def test_allocate_ips_for_ports(self):
+        with self.subnet() as subnet:
+            subnet = subnet['subnet']
+            ports = [{'port': {'network_id': subnet['network_id'],
+                               'device_owner': '',
+                               'fixed_ips': constants.ATTR_NOT_SPECIFIED}}
+                     for _ in range(3)]
+            # a port without fixed_ips gets addresses as well
+            del ports[0]['port']['fixed_ips']
+            fixed_ips = [{'subnet_id': subnet['id']}]
+            ports.append({'port': {'network_id': subnet['network_id'],
+                                   'device_owner': '',
+                                   'fixed_ips': fixed_ips}})
+            ipam = ipam_pluggable_backend.IpamPluggableBackend()
+            ctx = context.get_admin_context()
+            with ctx.session.begin(subtransactions=True):
+                ipam.allocate_ips_for_ports(ctx, ports)
+            preallocated = [
+                port['port'].get(ipam_pluggable_backend.PREALLOCATED_IPS)
+                for port in ports]
+            self.assertIsNone(preallocated[3])
+            ip_addresses = set()
+            for ips in preallocated[:3]:
+                self.assertEqual(1, len(ips))
+                self.assertEqual(subnet['id'], ips[0]['subnet_id'])
+                ip_addresses.add(ips[0]['ip_address'])
+            self.assertEqual(3, len(ip_addresses))
+
     def _test_allocate_multiple_ips_with_exception(self,
                                                    exc_on_deallocate=False):
         mocks = self._prepare_ipam()
@@ -356,6 +356,17 @@ class TestSegment(SegmentTestCase):
         res = self._list('segments')
         self.assertEqual(2, len(res['segments']))
 
+    def test_list_segments_with_pagination(self):
+        with self.network() as network:
+            network = network['network']
+        segments = [self._test_create_segment(network_id=network['id'],
+                                              physical_network='phys_net%d' %
+                                              i,
+                                              segmentation_id=200 + i)
+                    for i in range(3)]
+        self._test_list_with_pagination('segment', segments,
+                                        ('segmentation_id', 'asc'), 2, 2)
+
     def test_update_segments(self):
         with self.network() as network:
             net = network['network']
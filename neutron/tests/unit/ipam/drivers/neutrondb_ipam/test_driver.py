@@ -23,6 +23,7 @@ from oslo_utils import uuidutils
 from neutron.common import constants as n_const
 from neutron import context
 from neutron.ipam.drivers.neutrondb_ipam import driver
+from neutron.ipam.drivers.neutrondb_ipam import free_ranges
 from neutron.ipam import exceptions as ipam_exc
 from neutron.ipam import requests as ipam_req
 from neutron.objects import ipam as ipam_obj
@@ -359,6 +360,40 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
                           ipam_subnet.allocate,
                           ipam_req.AnyAddressRequest)
 
+    def test_bulk_allocate(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        ip_addresses = ipam_subnet.bulk_allocate(
+            [ipam_req.PreferNextAddressRequest(),
+             ipam_req.SpecificAddressRequest('10.0.0.2'),
+             ipam_req.AnyAddressRequest,
+             ipam_req.PreferNextAddressRequest()])
+        self.assertEqual('10.0.0.3', ip_addresses[0])
+        self.assertEqual('10.0.0.2', ip_addresses[1])
+        self.assertEqual(4, len(set(ip_addresses)))
+        self.assertEqual(
+            sorted(ip_addresses),
+            sorted(ipam_subnet.subnet_manager.list_allocated_ips(self.ctx)))
+
+    def test_bulk_allocate_duplicate_specific_address_fails(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        addr_req = ipam_req.SpecificAddressRequest('10.0.0.2')
+        self.assertRaises(ipam_exc.IpAddressAlreadyAllocated,
+                          ipam_subnet.bulk_allocate,
+                          [addr_req, addr_req])
+
+    def test_bulk_allocate_exhausted_pools_fails(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/29', ip_version=4)[0]
+        ipam_subnet.allocate(ipam_req.SpecificAddressRequest('192.168.0.3'))
+        self.assertRaises(ipam_exc.IpAddressGenerationFailure,
+                          ipam_subnet.bulk_allocate,
+                          [ipam_req.AnyAddressRequest] * 5)
+        self.assertEqual(
+            ['192.168.0.3'],
+            ipam_subnet.subnet_manager.list_allocated_ips(self.ctx))
+
     def _test_deallocate_address(self, cidr, ip_version):
         ipam_subnet = self._create_and_allocate_ipam_subnet(
             cidr, ip_version=ip_version)[0]
@@ -435,3 +470,65 @@ class TestNeutronDbIpamSubnet(testlib_api.SqlTestCase,
         pools = [netaddr.IPRange('192.168.10.20', '192.168.10.41'),
                  netaddr.IPRange('192.168.10.50', '192.168.10.60')]
         self.assertTrue(self._test__no_pool_changes(pools))
+
+
+class TestNeutronDbIpamSubnetFreeRanges(TestNeutronDbIpamSubnet):
+    """Test case for the generation of addresses from the free ranges."""
+
+    def setUp(self):
+        super(TestNeutronDbIpamSubnetFreeRanges, self).setUp()
+        self.config(ipam_free_ranges_cache_size=10)
+        mock.patch.object(free_ranges, '_CACHE', None).start()
+
+    def _get_free_ranges(self, ipam_subnet):
+        return free_ranges.get_cache().get(
+            ipam_subnet.subnet_manager.neutron_id,
+            ipam_subnet.subnet_manager.list_pools(self.ctx))
+
+    def test_allocate_any_address_prefer_next(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        ipam_subnet.allocate(ipam_req.SpecificAddressRequest('10.0.0.2'))
+        self.assertEqual(
+            ['10.0.0.3', '10.0.0.4'],
+            [ipam_subnet.allocate(ipam_req.PreferNextAddressRequest())
+             for _ in range(2)])
+        self.assertEqual(250, self._get_free_ranges(ipam_subnet)[0].size)
+
+    def test_allocate_skips_addresses_allocated_by_other_workers(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)[0]
+        ipam_subnet.allocate(ipam_req.PreferNextAddressRequest())
+        # allocated without updating the free ranges of this worker
+        ipam_subnet.subnet_manager.create_allocation(self.ctx, '10.0.0.3')
+        self.assertEqual(
+            '10.0.0.4',
+            ipam_subnet.allocate(ipam_req.PreferNextAddressRequest()))
+
+    def test_allocate_reloads_exhausted_free_ranges(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/30', ip_version=4)[0]
+        ip_address = ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+        # deallocated without updating the free ranges of this worker
+        ipam_subnet.subnet_manager.delete_allocation(self.ctx, ip_address)
+        self.assertEqual(
+            ip_address, ipam_subnet.allocate(ipam_req.AnyAddressRequest))
+
+    def test_deallocate_frees_address(self):
+        ipam_subnet = self._create_and_allocate_ipam_subnet(
+            '192.168.0.0/30', ip_version=4)[0]
+        ip_address = ipam_subnet.allocate(ipam_req.AnyAddressRequest)
+        self.assertEqual(0, self._get_free_ranges(ipam_subnet)[0].size)
+        ipam_subnet.deallocate(ip_address)
+        self.assertEqual(1, self._get_free_ranges(ipam_subnet)[0].size)
+
+    def test_update_allocation_pools(self):
+        ipam_subnet, subnet = self._create_and_allocate_ipam_subnet(
+            '10.0.0.0/24', ip_version=4)
+        ipam_subnet.allocate(ipam_req.PreferNextAddressRequest())
+        ipam_subnet.update_allocation_pools(
+            [netaddr.IPRange('10.0.0.100', '10.0.0.110')],
+            netaddr.IPNetwork('10.0.0.0/24'))
+        self.assertEqual(
+            '10.0.0.100',
+            ipam_subnet.allocate(ipam_req.PreferNextAddressRequest()))
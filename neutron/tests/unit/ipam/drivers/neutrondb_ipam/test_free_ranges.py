@@ -0,0 +1,99 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.ipam.drivers.neutrondb_ipam import free_ranges
+from neutron.tests import base
+
+
+class TestFreeRanges(base.BaseTestCase):
+
+    def test_init(self):
+        ranges = free_ranges.FreeRanges(10, 20, [9, 10, 12, 13, 20, 21])
+        self.assertEqual([11, 14, 15, 16], ranges.first_ips(4))
+        self.assertEqual(7, ranges.size)
+        self.assertEqual([11, 14], ranges._firsts)
+        self.assertEqual([11, 19], ranges._lasts)
+
+    def test_init_exhausted(self):
+        ranges = free_ranges.FreeRanges(10, 11, [10, 11])
+        self.assertEqual(0, ranges.size)
+        self.assertEqual([], ranges.first_ips(1))
+
+    def test_remove(self):
+        ranges = free_ranges.FreeRanges(10, 20)
+        for ip in (10, 20, 15, 16, 14):
+            self.assertTrue(ranges.remove(ip))
+        self.assertFalse(ranges.remove(15))
+        self.assertFalse(ranges.remove(21))
+        self.assertEqual([11, 17], ranges._firsts)
+        self.assertEqual([13, 19], ranges._lasts)
+        self.assertEqual(6, ranges.size)
+        self.assertNotIn(15, ranges)
+        self.assertIn(17, ranges)
+
+    def test_add(self):
+        ranges = free_ranges.FreeRanges(10, 20, [11, 12, 13, 15, 17, 18])
+        for ip in (13, 11, 12, 18):
+            self.assertTrue(ranges.add(ip))
+        self.assertFalse(ranges.add(10))
+        self.assertEqual([10, 16, 18], ranges._firsts)
+        self.assertEqual([14, 16, 20], ranges._lasts)
+        self.assertEqual(9, ranges.size)
+
+    def test_add_exhausted(self):
+        ranges = free_ranges.FreeRanges(10, 20, range(10, 21))
+        self.assertTrue(ranges.add(15))
+        self.assertEqual([15], ranges.first_ips(2))
+
+
+class TestFreeRangesCache(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestFreeRangesCache, self).setUp()
+        self.cache = free_ranges.FreeRangesCache(2)
+        self.pools = [mock.Mock(id='p1', first_ip='10.0.0.2',
+                                last_ip='10.0.0.3'),
+                      mock.Mock(id='p2', first_ip='10.0.0.5',
+                                last_ip='10.0.0.6')]
+        self.ranges = [free_ranges.FreeRanges(2, 3),
+                       free_ranges.FreeRanges(5, 6)]
+        self.cache.set('s1', self.pools, self.ranges)
+
+    def test_get(self):
+        self.assertIs(self.ranges, self.cache.get('s1', self.pools))
+        self.assertIsNone(self.cache.get('s2', self.pools))
+
+    def test_get_other_pools(self):
+        self.pools[1].last_ip = '10.0.0.7'
+        self.assertIsNone(self.cache.get('s1', self.pools))
+        self.assertEqual(0, len(self.cache))
+
+    def test_size(self):
+        self.cache.set('s2', self.pools, [])
+        self.cache.get('s1', self.pools)
+        self.cache.set('s3', self.pools, [])
+        self.assertIsNotNone(self.cache.get('s1', self.pools))
+        self.assertIsNone(self.cache.get('s2', self.pools))
+
+    def test_allocated_deallocated(self):
+        self.cache.allocated('s1', 5)
+        self.assertEqual([6], self.ranges[1].first_ips(2))
+        self.cache.deallocated('s1', 5)
+        self.cache.deallocated('s1', 4)
+        self.assertEqual([5, 6], self.ranges[1].first_ips(2))
+        self.assertEqual(4, sum(r.size for r in self.ranges))
+
+    def test_remove(self):
+        self.cache.remove('s1')
+        self.assertIsNone(self.cache.get('s1', self.pools))
@@ -46,3 +46,90 @@ class OVSAgentBridgeTestCase(ovs_test_base.OVSRyuTestBase):
         # make sure that in case of any misconfiguration when no datapath is
         # found a proper exception, not a TypeError is raised
         self.assertRaises(RuntimeError, br._get_dp)
+
+    def _mock_flow_mods(self, br, count):
+        ofpp = mock.Mock()
+        mock.patch.object(br, '_get_dp',
+                          return_value=(mock.Mock(), mock.Mock(),
+                                        ofpp)).start()
+        msgs = [mock.Mock(xid=None) for i in range(count)]
+        ofpp.OFPFlowMod.side_effect = msgs
+        for xid, msg in enumerate(msgs):
+            msg.datapath.set_xid.side_effect = (
+                lambda msg, xid=xid: setattr(msg, 'xid', xid))
+        return msgs
+
+    def test_bundled_flows(self):
+        br = self.br_int_cls('br-int')
+        msgs = self._mock_flow_mods(br, 3)
+        br._app.get_flow_mod_errors.return_value = {}
+        send_msg = mock.patch.object(br, '_send_msg').start()
+        with br.bundled_flows():
+            br.install_drop(table_id=1)
+            br.install_drop(table_id=2)
+            br.delete_flows(table_id=3)
+            self.assertFalse(send_msg.called)
+        # the flow mods are pipelined, only the last one is followed by a
+        # barrier
+        for msg in msgs[:2]:
+            msg.datapath.send_msg.assert_called_once_with(msg)
+        send_msg.assert_called_once_with(msgs[2])
+        br._app.watch_flow_mod_errors.assert_called_once_with([0, 1])
+        br._app.get_flow_mod_errors.assert_called_once_with([0, 1])
+
+    def test_bundled_flows_error(self):
+        br = self.br_int_cls('br-int')
+        msgs = self._mock_flow_mods(br, 3)
+        br._app.get_flow_mod_errors.return_value = {1: mock.Mock()}
+        send_msg = mock.patch.object(br, '_send_msg').start()
+
+        def install_flows():
+            with br.bundled_flows():
+                for table_id in range(3):
+                    br.install_drop(table_id=table_id)
+
+        self.assertRaises(RuntimeError, install_flows)
+        # the flow mods queued after the failed one are still sent
+        msgs[1].datapath.send_msg.assert_called_once_with(msgs[1])
+        send_msg.assert_called_once_with(msgs[2])
+
+    def test_bundled_flows_last_error(self):
+        br = self.br_int_cls('br-int')
+        self._mock_flow_mods(br, 2)
+        br._app.get_flow_mod_errors.return_value = {}
+        mock.patch.object(br, '_send_msg',
+                          side_effect=RuntimeError('error')).start()
+
+        def install_flows():
+            with br.bundled_flows():
+                br.install_drop(table_id=1)
+                br.install_drop(table_id=2)
+
+        self.assertRaises(RuntimeError, install_flows)
+        br._app.get_flow_mod_errors.assert_called_once_with([0])
+
+    def test_install_uninstall_flows(self):
+        br = self.br_int_cls('br-int')
+        mock.patch.object(br, '_get_dp',
+                          return_value=(mock.Mock(), mock.Mock(),
+                                        mock.Mock())).start()
+        # the native bridges never run ovs-ofctl
+        mock.patch.object(br, 'run_ofctl',
+                          side_effect=AssertionError).start()
+        send_flow_mods = mock.patch.object(br, '_send_flow_mods').start()
+        install_instructions = mock.patch.object(
+            br, 'install_instructions',
+            wraps=br.install_instructions).start()
+        delete_flows = mock.patch.object(
+            br, 'delete_flows', wraps=br.delete_flows).start()
+        br.install_flows([{'table_id': 1, 'priority': 2, 'instructions': [],
+                           'in_port': 3},
+                          {'table_id': 4, 'instructions': []}])
+        br.uninstall_flows([{'table_id': 5, 'cookie': 6}])
+        install_instructions.assert_has_calls([
+            mock.call(table_id=1, priority=2, instructions=[], in_port=3),
+            mock.call(table_id=4, instructions=[])])
+        delete_flows.assert_called_once_with(table_id=5, cookie=6)
+        # each list of flows is sent at once
+        self.assertEqual([2, 1], [len(c[0][0]) for c in
+                                  send_flow_mods.call_args_list])
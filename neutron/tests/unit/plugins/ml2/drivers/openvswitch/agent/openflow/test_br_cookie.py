@@ -16,6 +16,8 @@
 import mock
 
 from neutron.agent.common import ovs_lib
+from neutron.plugins.ml2.drivers.openvswitch.agent.openflow \
+    import br_cookie
 from neutron.plugins.ml2.drivers.openvswitch.agent.openflow.ovs_ofctl \
     import ovs_bridge
 from neutron.tests import base
@@ -29,8 +31,20 @@ class TestBRCookieOpenflow(base.BaseTestCase):
             'neutron.agent.ovsdb.native.connection.Connection.start')
         conn_patcher.start()
         self.addCleanup(conn_patcher.stop)
+        self.external_ids = {}
+        mock.patch.object(ovs_bridge.OVSAgentBridge, 'db_get_val',
+                          side_effect=self._db_get_val).start()
+        self.set_db_attribute = mock.patch.object(
+            ovs_bridge.OVSAgentBridge, 'set_db_attribute',
+            side_effect=self._set_db_attribute).start()
         self.br = ovs_bridge.OVSAgentBridge('br-int')
 
+    def _db_get_val(self, table, record, column):
+        return dict(self.external_ids)
+
+    def _set_db_attribute(self, table, record, column, value):
+        self.external_ids.update(value)
+
     def test_reserved_cookies(self):
         def_cookie = self.br.default_cookie
         self.assertIn(def_cookie, self.br.reserved_cookies)
@@ -64,3 +78,46 @@ class TestBRCookieOpenflow(base.BaseTestCase):
         self.assertIn(new_cookie, self.br.reserved_cookies)
         self.assertNotIn(def_cookie, self.br.reserved_cookies)
         self.assertEqual(set([new_cookie]), self.br.reserved_cookies)
+
+    def test_get_retired_cookies_without_record(self):
+        self.assertIsNone(self.br.get_retired_cookies())
+
+    def test_record_cookies(self):
+        cookie = self.br.request_cookie()
+        self.br.record_cookies()
+        self.assertEqual(
+            set([self.br.default_cookie, cookie]),
+            set(int(c, 16) for c in
+                self.external_ids[br_cookie.COOKIES_EXTERNAL_ID].split(',')))
+        self.assertEqual(set(), self.br.get_retired_cookies())
+
+    def test_get_retired_cookies(self):
+        self.external_ids[br_cookie.COOKIES_EXTERNAL_ID] = '0x4d2,0x2345'
+        old_cookie = self.br.default_cookie
+        new_cookie = ovs_lib.generate_random_cookie()
+        self.br.set_agent_uuid_stamp(new_cookie)
+        self.assertEqual(set([0x4d2, 0x2345, old_cookie]),
+                         self.br.get_retired_cookies())
+
+    def test_add_recorded_cookies(self):
+        self.external_ids[br_cookie.COOKIES_EXTERNAL_ID] = '0x4d2'
+        cookie = self.br.request_cookie()
+        self.br.add_recorded_cookies()
+        recorded = self.external_ids[br_cookie.COOKIES_EXTERNAL_ID]
+        self.assertEqual(
+            set(['0x4d2', '0x%x' % cookie, '0x%x' % self.br.default_cookie]),
+            set(recorded.split(',')))
+
+    def test_add_recorded_cookies_without_record(self):
+        self.br.request_cookie()
+        self.br.add_recorded_cookies()
+        self.assertFalse(self.set_db_attribute.called)
+
+    def test_create_adds_to_record(self):
+        self.external_ids[br_cookie.COOKIES_EXTERNAL_ID] = '0x4d2'
+        with mock.patch.object(ovs_lib.OVSBridge, 'create'):
+            self.br.create()
+        recorded = self.external_ids[br_cookie.COOKIES_EXTERNAL_ID]
+        self.assertEqual(['0x4d2', '0x%x' % self.br.default_cookie],
+                         sorted(recorded.split(','),
+                                key=lambda c: int(c, 16)))
@@ -120,6 +120,8 @@ class TestOvsNeutronAgent(object):
             'neutron.agent.common.ovs_lib.OVSBridge.get_ports_attributes',
             return_value=[]).start()
 
+        mock.patch.object(self.mod_agent.OVSNeutronAgent,
+                          '_record_flow_cookies').start()
         mock.patch('neutron.agent.common.ovs_lib.BaseOVS.config',
                    new_callable=mock.PropertyMock,
                    return_value={}).start()
@@ -554,6 +556,77 @@ class TestOvsNeutronAgent(object):
                 (expected_ports, expected_ancillary,
                  expected_devices_not_ready), actual)
 
+    def test_process_port_events_port_not_ready_yet_uses_replica(self):
+        events = {'added': [], 'removed': []}
+        get_interfaces = mock.Mock(return_value=[
+            {'name': 'port4', 'ofport': 4,
+             'external_ids': {'attached-mac': 'mac4'}}])
+        expected_ports = dict(current=set([1, 4]), added=set([4]),
+                              removed=set())
+        self.agent.ancillary_brs = []
+        with mock.patch.object(self.agent.int_br, 'portid_from_external_ids',
+                               return_value=4), \
+            mock.patch.object(self.agent, 'check_changed_vlans',
+                              return_value=set()), \
+            mock.patch.object(self.agent.int_br,
+                              'get_ports_attributes') as get_attrs:
+            actual = self.agent.process_ports_events(
+                events, set([1]), set(), {'port4'},
+                {'added': set(), 'removed': set()},
+                {'added': set(), 'removed': set()},
+                get_interfaces=get_interfaces)
+        self.assertEqual(expected_ports, actual[0])
+        self.assertEqual(set(), actual[2])
+        get_interfaces.assert_called_once_with({'port4'})
+        self.assertFalse(get_attrs.called)
+
+    def test_process_ports_events_removed_and_added_uses_replica(self):
+        port_id = 'f6f104bd-37c7-4f7b-9d70-53a6bb42728f'
+        device = {'ofport': 1, 'name': 'qvof6f104bd-37',
+                  'external_ids': {'iface-id': port_id,
+                                   'attached-mac': 'fa:16:3e:f6:1b:fb'}}
+        events = {'removed': [dict(device)], 'added': [dict(device)]}
+        with mock.patch.object(ovs_lib.BaseOVS, 'port_exists') as exists, \
+                mock.patch.object(self.agent, 'check_changed_vlans',
+                                  return_value=set()):
+            port_info = self.agent.process_ports_events(
+                events, {port_id}, set(), set(),
+                {'added': set(), 'removed': set()},
+                {'added': set(), 'removed': set()},
+                get_interfaces=mock.Mock(return_value=[device]))[0]
+        self.assertEqual({port_id}, port_info['added'])
+        self.assertEqual(set(), port_info['removed'])
+        self.assertFalse(exists.called)
+
+    def test_process_ports_events_removed_and_added_without_replica(self):
+        port_id = 'f6f104bd-37c7-4f7b-9d70-53a6bb42728f'
+        device = {'ofport': 1, 'name': 'qvof6f104bd-37',
+                  'external_ids': {'iface-id': port_id,
+                                   'attached-mac': 'fa:16:3e:f6:1b:fb'}}
+        events = {'removed': [dict(device)], 'added': [dict(device)]}
+        with mock.patch.object(ovs_lib.BaseOVS, 'port_exists',
+                               return_value=True) as exists, \
+                mock.patch.object(self.agent.int_br,
+                                  'get_ports_attributes') as get_attrs, \
+                mock.patch.object(self.agent, 'check_changed_vlans',
+                                  return_value=set()):
+            port_info = self.agent.process_ports_events(
+                events, {port_id}, set(), set(),
+                {'added': set(), 'removed': set()},
+                {'added': set(), 'removed': set()},
+                get_interfaces=mock.Mock(return_value=None))[0]
+        self.assertEqual({port_id}, port_info['added'])
+        exists.assert_called_once_with(device['name'])
+        self.assertFalse(get_attrs.called)
+
+    def test_get_replica_lookup_native_monitor_disabled(self):
+        polling_manager = mock.Mock()
+        self.agent.native_ovsdb_monitor = False
+        self.assertIsNone(self.agent._get_replica_lookup(polling_manager))
+        self.agent.native_ovsdb_monitor = True
+        self.assertEqual(polling_manager.get_interfaces,
+                         self.agent._get_replica_lookup(polling_manager))
+
     def _test_process_port_events_with_updated_ports(self, updated_ports):
         events = {'added': [{'name': 'port3', 'ofport': 3,
                             'external_ids': {'attached-mac': 'test-mac'}},
@@ -1009,6 +1082,54 @@ class TestOvsNeutronAgent(object):
     def test_process_network_port_with_empty_port(self):
         self._test_process_network_ports({})
 
+    def test_process_network_ports_in_chunks(self):
+        self.agent.port_processing_chunk_size = 2
+        port_info = {'current': set(['tap0', 'tap1', 'tap2']),
+                     'updated': set(['tap2']),
+                     'added': set(['tap0', 'tap1'])}
+        details = {'devices': [], 'failed_devices': []}
+        with mock.patch.object(self.agent.sg_agent,
+                               "setup_port_filters") as setup_port_filters,\
+                mock.patch.object(
+                    self.agent, "_get_devices_details_list",
+                    return_value=details) as get_details,\
+                mock.patch.object(
+                    self.agent, "treat_devices_added_or_updated",
+                    side_effect=[(['tap1'], [], set()),
+                                 ([], [], set(['tap2']))]) as treat,\
+                mock.patch.object(self.agent, "_add_port_tag_info"),\
+                mock.patch.object(self.agent, "_bind_devices",
+                                  return_value=set()),\
+                mock.patch.object(self.agent,
+                                  "treat_devices_skipped") as skipped:
+            failed_devices = self.agent.process_network_ports(port_info,
+                                                              False)
+        skipped.assert_called_once_with(set(['tap1']))
+        get_details.assert_has_calls([mock.call(['tap0', 'tap1']),
+                                      mock.call(['tap2'])])
+        treat.assert_has_calls([
+            mock.call(['tap0', 'tap1'], False, details),
+            mock.call(['tap2'], False, details)])
+        setup_port_filters.assert_has_calls([
+            mock.call(set(['tap0']), set()),
+            mock.call(set(), set(['tap2']))])
+        self.assertEqual(set(['tap2']), failed_devices['added'])
+        self.assertEqual(set(['tap0', 'tap2']), port_info['current'])
+
+    def test_batched_port_db_writes(self):
+        self.agent.port_processing_chunk_size = 10
+        with mock.patch.object(self.agent, 'int_br') as int_br:
+            with self.agent._batched_port_db_writes():
+                self.agent._set_port_db_attribute('tap0', 'tag', 1)
+                self.agent._set_port_db_attribute('tap1', 'tag', 2)
+                self.assertFalse(int_br.ovsdb.transaction.called)
+            self.assertFalse(int_br.set_db_attribute.called)
+            txn = int_br.ovsdb.transaction.return_value.__enter__.return_value
+            self.assertEqual(2, txn.add.call_count)
+            int_br.ovsdb.db_set.assert_has_calls([
+                mock.call('Port', 'tap0', ('tag', 1)),
+                mock.call('Port', 'tap1', ('tag', 2))])
+
     def test_hybrid_plug_flag_based_on_firewall(self):
         cfg.CONF.set_default(
             'firewall_driver',
@@ -1620,7 +1741,8 @@ class TestOvsNeutronAgent(object):
             with mock.patch.object(self.agent, 'rpc_loop') as mock_loop:
                 self.agent.daemon_loop()
         mock_get_pm.assert_called_with(True,
-                                       constants.DEFAULT_OVSDBMON_RESPAWN)
+                                       constants.DEFAULT_OVSDBMON_RESPAWN,
+                                       native_monitor=False)
         mock_loop.assert_called_once_with(polling_manager=mock.ANY)
 
     def test_setup_tunnel_port_invalid_ofport(self):
@@ -2104,7 +2226,10 @@ class TestOvsNeutronAgentOFCtl(TestOvsNeutronAgent,
         with mock.patch.object(self.agent.int_br,
                               'dump_flows_all_tables') as dump_flows,\
                 mock.patch.object(self.agent.int_br,
-                                  'delete_flows') as del_flow:
+                                  'get_retired_cookies', return_value=None),\
+                mock.patch.object(self.agent.int_br, 'record_cookies'),\
+                mock.patch.object(self.agent.int_br,
+                                  'uninstall_flows') as uninstall_flows:
             self.agent.int_br.set_agent_uuid_stamp(1234)
             dump_flows.return_value = [
                 'cookie=0x4d2, duration=50.156s, table=0,actions=drop',
@@ -2114,11 +2239,29 @@ class TestOvsNeutronAgentOFCtl(TestOvsNeutronAgent,
             ]
             self.agent.iter_num = 3
             self.agent.cleanup_stale_flows()
-            expected = [
-                mock.call(cookie='0x4321/-1', table='2'),
-                mock.call(cookie='0x2345/-1', table='2'),
-            ]
-            self.assertEqual(expected, del_flow.mock_calls)
+            # the stale flows are deleted with a single call
+            uninstall_flows.assert_called_once_with([
+                {'cookie': '0x4321/-1', 'table': '2'},
+                {'cookie': '0x2345/-1', 'table': '2'},
+            ])
+
+    def test_cleanup_stale_flows_retired_cookies(self):
+        with mock.patch.object(self.agent.int_br,
+                              'dump_flows_all_tables') as dump_flows,\
+                mock.patch.object(self.agent.int_br, 'get_retired_cookies',
+                                  return_value=set([0x4321, 0x2345])),\
+                mock.patch.object(self.agent.int_br,
+                                  'record_cookies') as record_cookies,\
+                mock.patch.object(self.agent.int_br,
+                                  'uninstall_flows') as uninstall_flows:
+            self.agent.iter_num = 3
+            self.agent.cleanup_stale_flows()
+            self.assertFalse(dump_flows.called)
+            uninstall_flows.assert_called_once_with([
+                {'cookie': '0x2345/-1'},
+                {'cookie': '0x4321/-1'},
+            ])
+            record_cookies.assert_called_once_with()
 
 
 class TestOvsNeutronAgentRyu(TestOvsNeutronAgent,
@@ -2127,6 +2270,9 @@ class TestOvsNeutronAgentRyu(TestOvsNeutronAgent,
         uint64_max = (1 << 64) - 1
         with mock.patch.object(self.agent.int_br,
                               'dump_flows') as dump_flows,\
+                mock.patch.object(self.agent.int_br,
+                                  'get_retired_cookies', return_value=None),\
+                mock.patch.object(self.agent.int_br, 'record_cookies'),\
                 mock.patch.object(self.agent.int_br,
                                   'delete_flows') as del_flow:
             self.agent.int_br.set_agent_uuid_stamp(1234)
@@ -2146,6 +2292,24 @@ class TestOvsNeutronAgentRyu(TestOvsNeutronAgent,
             del_flow.assert_has_calls(expected, any_order=True)
             self.assertEqual(len(expected), len(del_flow.mock_calls))
 
+    def test_cleanup_stale_flows_retired_cookies(self):
+        uint64_max = (1 << 64) - 1
+        with mock.patch.object(self.agent.int_br,
+                              'dump_flows') as dump_flows,\
+                mock.patch.object(self.agent.int_br, 'get_retired_cookies',
+                                  return_value=set([17185, 9029])),\
+                mock.patch.object(self.agent.int_br,
+                                  'record_cookies') as record_cookies,\
+                mock.patch.object(self.agent.int_br,
+                                  'delete_flows') as del_flow:
+            self.agent.iter_num = 3
+            self.agent.cleanup_stale_flows()
+            self.assertFalse(dump_flows.called)
+            del_flow.assert_has_calls([
+                mock.call(cookie=9029, cookie_mask=uint64_max),
+                mock.call(cookie=17185, cookie_mask=uint64_max)])
+            record_cookies.assert_called_once_with()
+
 
 class AncillaryBridgesTest(object):
 
@@ -2163,6 +2327,8 @@ class AncillaryBridgesTest(object):
                              'neutron.agent.firewall.NoopFirewallDriver',
                              group='SECURITYGROUP')
         cfg.CONF.set_override('report_interval', 0, 'AGENT')
+        mock.patch.object(self.mod_agent.OVSNeutronAgent,
+                          '_record_flow_cookies').start()
         mock.patch('neutron.agent.common.ovs_lib.BaseOVS.config',
                    new_callable=mock.PropertyMock,
                    return_value={}).start()
@@ -2282,6 +2448,8 @@ class TestOvsDvrNeutronAgent(object):
                              'neutron.agent.firewall.NoopFirewallDriver',
                              group='SECURITYGROUP')
 
+        mock.patch.object(self.mod_agent.OVSNeutronAgent,
+                          '_record_flow_cookies').start()
         mock.patch('neutron.agent.common.ovs_lib.BaseOVS.config',
                    new_callable=mock.PropertyMock,
                    return_value={}).start()
@@ -253,6 +253,7 @@ class TunnelTest(object):
             mock.call.add_patch_port('patch-tun', 'patch-int'),
         ]
         self.mock_int_bridge_expected += [
+            mock.call.add_recorded_cookies(),
             mock.call.get_vif_ports((ovs_lib.INVALID_OFPORT,
                                      ovs_lib.UNASSIGNED_OFPORT)),
             mock.call.get_ports_attributes(
@@ -261,6 +262,10 @@ class TunnelTest(object):
 
         self.mock_tun_bridge_expected += [
             mock.call.setup_default_table(self.INT_OFPORT, arp_responder),
+            mock.call.add_recorded_cookies(),
+        ]
+        self.mock_map_tun_bridge_expected += [
+            mock.call.add_recorded_cookies(),
         ]
 
         self.ipdevice_expected = []
@@ -702,6 +707,7 @@ class TunnelTestUseVethInterco(TunnelTest):
             mock.call.add_patch_port('patch-tun', 'patch-int')
         ]
         self.mock_int_bridge_expected += [
+            mock.call.add_recorded_cookies(),
             mock.call.get_vif_ports((ovs_lib.INVALID_OFPORT,
                                      ovs_lib.UNASSIGNED_OFPORT)),
             mock.call.get_ports_attributes(
@@ -709,6 +715,10 @@ class TunnelTestUseVethInterco(TunnelTest):
         ]
         self.mock_tun_bridge_expected += [
             mock.call.setup_default_table(self.INT_OFPORT, arp_responder),
+            mock.call.add_recorded_cookies(),
+        ]
+        self.mock_map_tun_bridge_expected += [
+            mock.call.add_recorded_cookies(),
         ]
 
         self.ipdevice_expected = [
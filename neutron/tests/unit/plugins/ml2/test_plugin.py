@@ -47,6 +47,7 @@ from neutron.extensions import external_net
 from neutron.extensions import multiprovidernet as mpnet
 from neutron.extensions import portbindings
 from neutron.extensions import providernet as pnet
+from neutron.ipam.drivers.neutrondb_ipam import driver as ipam_driver
 from neutron.plugins.common import constants as p_const
 from neutron.plugins.ml2.common import exceptions as ml2_exc
 from neutron.plugins.ml2 import config
@@ -328,6 +329,28 @@ class TestMl2NetworksV2(test_plugin.TestNetworksV2,
         for expected, actual in zip(expected_segments, segments):
             self.assertEqual(expected, actual)
 
+    def test_list_networks_with_provider_filters_paginated(self):
+        self._create_and_verify_networks(self.nets)
+        # the networks are filtered in the query, before being paginated
+        params_str = "%s=%s&%s=%s&limit=1&sort_key=name&sort_dir=asc" % (
+            pnet.PHYSICAL_NETWORK, 'physnet2', pnet.SEGMENTATION_ID, 220)
+        req = self.new_list_request('networks', None, params=params_str)
+        networks = self.deserialize(self.fmt, req.get_response(self.api))
+        self.assertEqual(['net3'],
+                         [n['name'] for n in networks['networks']])
+
+    def test_list_networks_with_provider_filters_no_segments(self):
+        ctx = context.get_admin_context()
+        with self.network(name='net_no_segments') as net:
+            segment = segments_db.get_network_segments(
+                ctx, net['network']['id'])[0]
+            segments_db.delete_network_segment(ctx, segment['id'])
+            self._create_and_verify_networks(self.pnets)
+            networks = self._lookup_network_by_segmentation_id(210, 2)
+            self.assertEqual(['net2', 'net_no_segments'],
+                             sorted(n['name']
+                                    for n in networks['networks']))
+
     def test_create_network_segment_allocation_fails(self):
         plugin = directory.get_plugin()
         mock.patch.object(db_api._retry_db_errors, 'max_retries',
@@ -635,6 +658,13 @@ class TestMl2DbOperationBounds(test_plugin.DbOperationBoundMixin,
                                                            'name',
                                                            'device_id'])
 
+    def test_port_list_queries_constant_any_size(self):
+        self.make_port()
+        before_count = self._list_and_count_queries('ports')
+        for i in range(4):
+            self.make_port()
+        self.assertEqual(before_count, self._list_and_count_queries('ports'))
+
 
 class TestMl2DbOperationBoundsTenant(TestMl2DbOperationBounds):
     admin = False
@@ -847,6 +877,41 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
                                           network=net)
                 self.assertFalse(get_net.called)
 
+    def test_update_ports_status(self):
+        ctx = context.get_admin_context()
+        plugin = directory.get_plugin()
+        updated_ports = []
+        with self.port() as port1, self.port() as port2:
+            port1_id = port1['port']['id']
+            port2_id = port2['port']['id']
+            registry.subscribe(
+                lambda *a, **k: updated_ports.append(k['port']),
+                resources.PORT, events.AFTER_UPDATE)
+            res = plugin.update_ports_status(
+                ctx, {port1_id[:11]: constants.PORT_STATUS_ACTIVE,
+                      port2_id: constants.PORT_STATUS_DOWN,
+                      'fake-port-id': constants.PORT_STATUS_ACTIVE})
+            self.assertEqual({port1_id[:11]: port1_id,
+                              port2_id: port2_id,
+                              'fake-port-id': None}, res)
+            self.assertEqual(constants.PORT_STATUS_ACTIVE,
+                             plugin.get_port(ctx, port1_id)['status'])
+            # only the ports whose status changed are notified
+            self.assertEqual([port1_id],
+                             [port['id'] for port in updated_ports])
+
+    def test_update_ports_status_with_network(self):
+        registry.clear()  # don't care about callback behavior
+        ctx = context.get_admin_context()
+        plugin = directory.get_plugin()
+        with self.port() as port:
+            net = plugin.get_network(ctx, port['port']['network_id'])
+            with mock.patch.object(plugin, 'get_network') as get_net:
+                plugin.update_ports_status(
+                    ctx, {port['port']['id']: 'UP'},
+                    networks={net['id']: net})
+                self.assertFalse(get_net.called)
+
     def test_update_port_mac(self):
         self.check_update_port_mac(
             host_arg={portbindings.HOST_ID: HOST},
@@ -915,9 +980,28 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
                                          'test', True, context=ctx)
             ports = self.deserialize(self.fmt, res)
             used_sg = ports['ports'][0]['security_groups']
-            m_upd.assert_called_once_with(ctx, used_sg)
+            m_upd.assert_called_once_with(
+                ctx, used_sg, added_members={}, removed_members={},
+                member_revisions={used_sg[0]: 1})
             self.assertFalse(p_upd.called)
 
+    def test_create_ports_bulk_allocates_ips_at_once(self):
+        ctx = context.get_admin_context()
+        bulk_allocate = ipam_driver.NeutronDbSubnet.bulk_allocate
+        with self.network() as net,\
+                self.subnet(network=net),\
+                mock.patch.object(ipam_driver.NeutronDbSubnet,
+                                  'bulk_allocate', autospec=True,
+                                  side_effect=bulk_allocate) as m_bulk:
+            res = self._create_port_bulk(self.fmt, 3, net['network']['id'],
+                                         'test', True, context=ctx)
+            ports = self.deserialize(self.fmt, res)['ports']
+            m_bulk.assert_called_once_with(mock.ANY, mock.ANY)
+            self.assertEqual(3, len(m_bulk.call_args[0][1]))
+            ip_addresses = set(port['fixed_ips'][0]['ip_address']
+                               for port in ports)
+            self.assertEqual(3, len(ip_addresses))
+
     def _check_security_groups_provider_updated_args(self, p_upd_mock, net_id):
         query_params = "network_id=%s" % net_id
         network_ports = self._list('ports', query_params=query_params)
@@ -952,7 +1036,9 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
                                               data, context=ctx)
             ports = self.deserialize(self.fmt, res)
             used_sg = ports['ports'][0]['security_groups']
-            m_upd.assert_called_once_with(ctx, used_sg)
+            m_upd.assert_called_once_with(
+                ctx, used_sg, added_members={}, removed_members={},
+                member_revisions={used_sg[0]: 1})
             self._check_security_groups_provider_updated_args(p_upd, net_id)
             m_upd.reset_mock()
             p_upd.reset_mock()
@@ -165,16 +165,18 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         res = self.callbacks.get_device_details(mock.Mock(), host='fake')
         self.assertEqual('test-port-policy-id', res['qos_policy_id'])
 
-    def _test_get_devices_list(self, callback, side_effect, expected):
+    def _test_get_devices_list(self, callback, side_effect, expected,
+                               **details_kwargs):
         devices = [1, 2, 3, 4, 5]
         kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        details_kwargs.update(kwargs)
         with mock.patch.object(self.callbacks, '_get_device_details',
                                side_effect=side_effect) as f:
             res = callback('fake_context', devices=devices, **kwargs)
             self.assertEqual(expected, res)
             self.assertEqual(len(devices), f.call_count)
             calls = [mock.call('fake_context', device=i,
-                               port_context=mock.ANY, **kwargs)
+                               port_context=mock.ANY, **details_kwargs)
                      for i in devices]
             f.assert_has_calls(calls)
 
@@ -195,7 +197,8 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         expected = {'devices': devices, 'failed_devices': []}
         callback = (
             self.callbacks.get_devices_details_list_and_failed_devices)
-        self._test_get_devices_list(callback, devices, expected)
+        self._test_get_devices_list(callback, devices, expected,
+                                    port_statuses={})
 
     def test_get_devices_details_list_and_failed_devices_failures(self):
         devices = [1, Exception('testdevice'), 3,
@@ -203,7 +206,50 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         expected = {'devices': [1, 3, 5], 'failed_devices': [2, 4]}
         callback = (
             self.callbacks.get_devices_details_list_and_failed_devices)
-        self._test_get_devices_list(callback, devices, expected)
+        self._test_get_devices_list(callback, devices, expected,
+                                    port_statuses={})
+
+    def _get_bound_ports_contexts(self, statuses):
+        contexts = {}
+        segment = {'network_type': 'vlan', 'segmentation_id': 100,
+                   'physical_network': 'physnet1'}
+        for device, status in statuses.items():
+            port_context = mock.Mock(host='fake_host',
+                                     bottom_bound_segment=segment)
+            port_context.current = collections.defaultdict(
+                lambda: 'fake', id='port_%s' % device, admin_state_up=True,
+                status=status, network_id='fake_network')
+            port_context.network._network = {'id': 'fake_network'}
+            contexts[device] = port_context
+        self.plugin.get_bound_ports_contexts.return_value = contexts
+
+    def test_get_devices_details_list_and_failed_devices_bulk_status(self):
+        self._get_bound_ports_contexts(
+            {'dev1': constants.PORT_STATUS_DOWN,
+             'dev2': constants.PORT_STATUS_ACTIVE,
+             'dev3': constants.PORT_STATUS_BUILD})
+        res = self.callbacks.get_devices_details_list_and_failed_devices(
+            'fake_context', devices=['dev1', 'dev2', 'dev3'],
+            host='fake_host')
+        self.assertEqual(['dev1', 'dev2', 'dev3'],
+                         [entry['device'] for entry in res['devices']])
+        self.assertEqual([], res['failed_devices'])
+        self.assertFalse(self.plugin.update_port_status.called)
+        self.plugin.update_ports_status.assert_called_once_with(
+            'fake_context', {'port_dev1': constants.PORT_STATUS_BUILD,
+                             'port_dev2': constants.PORT_STATUS_BUILD},
+            'fake_host', {'fake_network': mock.ANY})
+
+    def test_get_devices_details_list_and_failed_devices_bulk_failure(self):
+        self._get_bound_ports_contexts(
+            {'dev1': constants.PORT_STATUS_DOWN,
+             'dev2': constants.PORT_STATUS_BUILD})
+        self.plugin.update_ports_status.side_effect = Exception
+        res = self.callbacks.get_devices_details_list_and_failed_devices(
+            'fake_context', devices=['dev1', 'dev2'], host='fake_host')
+        self.assertEqual(['dev2'],
+                         [entry['device'] for entry in res['devices']])
+        self.assertEqual(['dev1'], res['failed_devices'])
 
     def test_get_devices_details_list_and_failed_devices_empty_dev(self):
         with mock.patch.object(self.callbacks, 'get_device_details') as f:
@@ -260,10 +306,13 @@ class RpcCallbacksTestCase(base.BaseTestCase):
         devices_up = [1, 2, 3]
         devices_down = [4, 5]
         kwargs = {'host': 'fake_host', 'agent_id': 'fake_agent_id'}
+        # the devices are updated down one by one if the bulk update fails
         with mock.patch.object(self.callbacks, 'update_device_up',
                                side_effect=devices_up_side_effect) as f_up, \
             mock.patch.object(self.callbacks, 'update_device_down',
-                              side_effect=devices_down_side_effect) as f_down:
+                              side_effect=devices_down_side_effect) as f_down,\
+            mock.patch.object(self.callbacks, '_update_devices_down',
+                              side_effect=Exception):
             res = self.callbacks.update_device_list(
                 'fake_context', devices_up=devices_up,
                 devices_down=devices_down, **kwargs)
@@ -301,6 +350,43 @@ class RpcCallbacksTestCase(base.BaseTestCase):
                                       devices_down_side_effect,
                                       expected)
 
+    def test_update_device_list_devices_down(self):
+        self.plugin._device_to_port_id.side_effect = lambda ctx, d: d[3:]
+        self.plugin.port_bound_to_host.side_effect = (
+            lambda ctx, port_id, host: port_id != 'port3')
+        self.plugin.update_ports_status.return_value = {'port1': 'port1',
+                                                        'port2': None}
+        with mock.patch.object(self.callbacks,
+                               'notify_ha_port_status') as notify:
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_up=[],
+                devices_down=['tapport1', 'tapport2', 'tapport3'],
+                host='fake_host', agent_id='fake_agent_id')
+        self.plugin.update_ports_status.assert_called_once_with(
+            'fake_context', {'port1': constants.PORT_STATUS_DOWN,
+                             'port2': constants.PORT_STATUS_DOWN},
+            'fake_host')
+        self.assertFalse(self.plugin.update_port_status.called)
+        self.assertEqual(3, notify.call_count)
+        self.assertEqual({'devices_up': [],
+                          'failed_devices_up': [],
+                          'devices_down': [
+                              {'device': 'tapport1', 'exists': True},
+                              {'device': 'tapport2', 'exists': False},
+                              {'device': 'tapport3', 'exists': True}],
+                          'failed_devices_down': []}, res)
+
+    def test_update_device_list_devices_down_notify_failure(self):
+        self.plugin.update_ports_status.return_value = {}
+        with mock.patch.object(self.callbacks, 'notify_ha_port_status',
+                               side_effect=[None, Exception]):
+            res = self.callbacks.update_device_list(
+                'fake_context', devices_down=['dev1', 'dev2'],
+                host='fake_host', agent_id='fake_agent_id')
+        self.assertEqual(['dev1'],
+                         [dev['device'] for dev in res['devices_down']])
+        self.assertEqual(['dev2'], res['failed_devices_down'])
+
     def test_update_device_list_empty_devices(self):
 
         expected = {'devices_up': [],
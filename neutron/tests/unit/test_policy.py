@@ -587,6 +587,75 @@ class NeutronPolicyTestCase(base.BaseTestCase):
                 policy.enforce(self.context, action, target)
         self.assertEqual(1, getter.call_count)
 
+    def test_check_cache(self):
+        check_cache = policy.CheckCache(self.context)
+        targets = [{'tenant_id': 'fake', 'name': 'net1'},
+                   {'tenant_id': 'fake', 'name': 'net2'},
+                   {'tenant_id': 'other', 'shared': True},
+                   {'tenant_id': 'other', 'shared': False},
+                   {'tenant_id': 'other', 'shared': False}]
+        results = [check_cache.check('get_network', target,
+                                     pluralized='networks')
+                   for target in targets]
+        self.assertEqual([True, True, True, False, False], results)
+        self.assertEqual(2, check_cache.hits)
+        self.assertEqual(3, check_cache.misses)
+        self.assertEqual(0.4, check_cache.hit_rate)
+
+    def test_check_cache_admin_context(self):
+        check_cache = policy.CheckCache(context.get_admin_context())
+        self.assertTrue(check_cache.check('get_network',
+                                          {'tenant_id': 'other'}))
+        self.assertEqual(0, check_cache.misses)
+
+    def test_check_cache_might_not_exist(self):
+        check_cache = policy.CheckCache(self.context)
+        self.assertTrue(check_cache.check('get_network:unknown',
+                                          {'tenant_id': 'other'},
+                                          might_not_exist=True))
+
+    def test_check_cache_parent_resource(self):
+        self._set_rules(get_port="rule:admin_or_network_owner")
+        check_cache = policy.CheckCache(self.context)
+        plugin = directory.get_plugin()
+        with mock.patch.object(plugin, 'get_network',
+                               side_effect=lambda ctx, net_id, fields: {
+                                   'tenant_id': net_id}):
+            self.assertTrue(check_cache.check('get_port',
+                                              {'network_id': 'fake'}))
+            self.assertFalse(check_cache.check('get_port',
+                                               {'network_id': 'other'}))
+            self.assertTrue(check_cache.check('get_port',
+                                              {'network_id': 'fake'}))
+        self.assertEqual(1, check_cache.hits)
+
+    def test_check_cache_attribute_based_action(self):
+        check_cache = policy.CheckCache(self.context)
+        with mock.patch.object(policy, 'check',
+                               return_value=True) as check:
+            for i in range(2):
+                check_cache.check('create_network', {'tenant_id': 'fake'})
+        self.assertEqual(2, check.call_count)
+        self.assertEqual(0, check_cache.hits)
+
+    def test_check_cache_http_check(self):
+        self._set_rules(get_network="http://example.com/%(name)s")
+        check_cache = policy.CheckCache(self.context)
+        with mock.patch.object(policy, 'check',
+                               return_value=True) as check:
+            for i in range(2):
+                check_cache.check('get_network', {'tenant_id': 'fake'})
+        self.assertEqual(2, check.call_count)
+
+    def test_compile_rule_target_fields(self):
+        self._set_rules(get_port="rule:admin_or_network_owner")
+        policy.init()
+        self.assertEqual(('shared', 'tenant_id'),
+                         policy._compile_rule('get_firewall_rule', None)[1])
+        self.assertEqual(('network:tenant_id', 'network_id'),
+                         policy._compile_rule('get_port', None)[1])
+        self.assertIsNone(policy._compile_rule('create_subnet', None)[1])
+
     def _test_enforce_tenant_id_raises(self, bad_rule):
         self._set_rules(admin_or_owner=bad_rule)
         # Trigger a policy with rule admin_or_owner
@@ -30,6 +30,18 @@ class TestRpcWorker(test_wsgi.TestServiceBase):
         self._test_reset(rpc_worker)
 
 
+class TestService(base.BaseTestCase):
+
+    @mock.patch('neutron.common.profiler.setup')
+    @mock.patch('oslo_utils.importutils.import_class')
+    def test_stop(self, import_class, profiler_setup):
+        manager = import_class.return_value.return_value
+        server = service.Service('host', 'binary', 'topic', 'manager')
+        server.conn = mock.Mock()
+        server.stop()
+        manager.stop.assert_called_once_with()
+
+
 class TestRunWsgiApp(base.BaseTestCase):
     def setUp(self):
         super(TestRunWsgiApp, self).setUp()
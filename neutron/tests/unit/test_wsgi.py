@@ -20,6 +20,7 @@ import ssl
 import mock
 from neutron_lib import exceptions as exception
 from oslo_config import cfg
+from oslo_serialization import jsonutils
 import six.moves.urllib.request as urlrequest
 import testtools
 import webob
@@ -515,6 +516,24 @@ class JSONDictSerializerTest(base.BaseTestCase):
 
         self.assertEqual(expected_json, result)
 
+    def test_iter_serialize(self):
+        serializer = wsgi.JSONDictSerializer()
+        for count in range(6):
+            input_dict = {'servers': ({'id': i} for i in range(count)),
+                          'servers_links': [{'href': 'next'}]}
+            chunks = list(serializer.iter_serialize(input_dict,
+                                                    chunk_size=2))
+            self.assertEqual(
+                {'servers': [{'id': i} for i in range(count)],
+                 'servers_links': [{'href': 'next'}]},
+                jsonutils.loads(b''.join(chunks)))
+            # the servers are serialized 2 at a time
+            self.assertEqual(count // 2 + 3, len(chunks))
+
+    def test_iter_serialize_empty(self):
+        serializer = wsgi.JSONDictSerializer()
+        self.assertEqual(b'{}', b''.join(serializer.iter_serialize({})))
+
     # The tested behaviour is only meant to be witnessed in Python 2, so it is
     # OK to skip this test with Python 3.
     @helpers.requires_py2
@@ -21,6 +21,7 @@ import errno
 import socket
 import sys
 import time
+import types
 
 import eventlet.wsgi
 from neutron.conf import wsgi as wsgi_config
@@ -51,6 +52,9 @@ wsgi_config.register_socket_opts()
 
 LOG = logging.getLogger(__name__)
 
+# Number of objects serialized at a time in the streamed responses
+STREAM_CHUNK_SIZE = 100
+
 
 def encode_body(body):
     """Encode unicode body.
@@ -331,6 +335,36 @@ class JSONDictSerializer(DictSerializer):
             return six.text_type(obj)
         return encode_body(jsonutils.dumps(data, default=sanitizer))
 
+    def iter_serialize(self, data, chunk_size=STREAM_CHUNK_SIZE):
+        """Serialize a dict incrementally, yielding the body in chunks.
+
+        The values of data which are generators, like the objects of a
+        collection, are serialized as lists, chunk_size items at a time.
+        """
+        def dumps(obj):
+            return jsonutils.dumps(obj, default=six.text_type)
+
+        separator = '{'
+        for key, value in data.items():
+            header = '%s%s: ' % (separator, dumps(key))
+            separator = ', '
+            if not isinstance(value, types.GeneratorType):
+                yield encode_body(header + dumps(value))
+                continue
+            prefix = header + '['
+            chunk = []
+            for item in value:
+                chunk.append(dumps(item))
+                if len(chunk) == chunk_size:
+                    yield encode_body(prefix + ', '.join(chunk))
+                    prefix = ', '
+                    chunk = []
+            if chunk or prefix != ', ':
+                yield encode_body(prefix + ', '.join(chunk) + ']')
+            else:
+                yield encode_body(']')
+        yield encode_body('}' if separator == ', ' else '{}')
+
 
 class ResponseHeaderSerializer(ActionDispatcher):
     """Default response headers serialization."""